@@ -2,6 +2,8 @@ import logging
 from .base import BaseAIProvider
 from core.config.settings_loader import load_ai_models
 from core.constants import DEFAULT_AI_MODEL
+from core.config import settings
+from .response_cache import get_ai_response_cache, make_key
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
@@ -69,7 +71,7 @@ async def get_ai_provider(model=None):
             self._target = target
             self._breaker = breaker
             
-        async def process_message(self, *args, **kwargs):
+        async def _call_with_breaker(self, *args, **kwargs):
             async def _call():
                 return await self._target.process_message(*args, **kwargs)
             
@@ -83,6 +85,22 @@ async def get_ai_provider(model=None):
             except Exception as e:
                 # Rethrow other exceptions so CB counts them
                 raise e
+
+        async def process_message(self, message=None, prompt=None, images=None, **kwargs):
+            if not settings.AI_CACHE_ENABLED:
+                return await self._call_with_breaker(message, prompt=prompt, images=images, **kwargs)
+
+            # 相同 (提供商, 模型, 提示词, 文本, 图片) 的请求复用结果并合并并发调用
+            extra = {k: v for k, v in kwargs.items() if k != "model"}
+            key = make_key(
+                provider_name, kwargs.get("model") or model, prompt, message, images, extra
+            )
+            return await get_ai_response_cache().get_or_call(
+                key,
+                lambda: self._call_with_breaker(message, prompt=prompt, images=images, **kwargs),
+                prompt=prompt,
+                text=message,
+            )
                 
         def __getattr__(self, name):
             return getattr(self._target, name)
@@ -92,5 +110,6 @@ async def get_ai_provider(model=None):
 
 __all__ = [
     'BaseAIProvider',
-    'get_ai_provider'
+    'get_ai_provider',
+    'get_ai_response_cache'
 ]
\ No newline at end of file
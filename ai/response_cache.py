@@ -0,0 +1,215 @@
+"""
+AI 响应缓存 (内容寻址 + 单飞合并)
+
+键为 (提供商, 模型, 提示词, 规范化文本, 图片摘要, 其余参数) 的 SHA-256：
+镜像频道/多源聊天转发的同一段文本只调用一次付费接口。
+  - L1: 进程内 LRU (条目数上限 + TTL)
+  - L2: 可选持久化到 persistent_cache (AI_CACHE_PERSIST)
+  - 同一键的并发请求共享一个 in-flight Future
+失败/空响应/熔断降级结果不缓存。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.helpers.metrics import AI_CACHE_REQUESTS_TOTAL, AI_CACHE_SAVED_TOKENS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+_L2_PREFIX = "ai:resp:"
+# 提供商在出错时返回的文本前缀 (见各 provider 的 except 分支)
+_ERROR_PREFIXES = ("AI处理失败", "模型未能生成有效回答")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """统一换行与行尾空白；不折叠行内空白，避免改写类提示词的格式差异被误合并"""
+    if not text:
+        return ""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def images_digest(images: Optional[List[Dict[str, Any]]]) -> str:
+    if not images:
+        return ""
+    h = hashlib.sha256()
+    for image in images:
+        h.update(str(image.get("mime_type", "")).encode("utf-8"))
+        data = image.get("data", "")
+        h.update(data if isinstance(data, bytes) else str(data).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def make_key(
+    provider: str,
+    model: str,
+    prompt: Optional[str],
+    text: Optional[str],
+    images: Optional[List[Dict[str, Any]]] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    payload = json.dumps(
+        [provider, model, prompt or "", normalize_text(text), images_digest(images), extra or {}],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(*parts: Optional[str]) -> int:
+    """粗略 token 估算 (UTF-8 字节数 / 4)，仅用于节省量统计"""
+    return sum(len(p.encode("utf-8")) for p in parts if p) // 4
+
+
+def is_cacheable(response: Any) -> bool:
+    return isinstance(response, str) and bool(response.strip()) and not response.startswith(_ERROR_PREFIXES)
+
+
+class AIResponseCache:
+    def __init__(self, max_entries: int = 2048, ttl: float = 3600.0, persist: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        # key -> (过期时间, 响应)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_tokens = 0
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put_local(self, key: str, response: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_l2(self, key: str) -> Optional[str]:
+        if not self.persist:
+            return None
+        try:
+            from core.cache.persistent_cache import get_async_persistent_cache
+
+            return await get_async_persistent_cache().get(_L2_PREFIX + key)
+        except Exception as e:
+            logger.debug(f"读取 AI 持久缓存失败: {e}")
+            return None
+
+    async def _set_l2(self, key: str, response: str) -> None:
+        if not self.persist:
+            return
+        try:
+            from core.cache.persistent_cache import get_async_persistent_cache
+
+            await get_async_persistent_cache().set(_L2_PREFIX + key, response, ttl=int(self.ttl))
+        except Exception as e:
+            logger.debug(f"写入 AI 持久缓存失败: {e}")
+
+    def _record_saving(self, result: str, response: str, prompt: Optional[str], text: Optional[str]) -> None:
+        AI_CACHE_REQUESTS_TOTAL.labels(result=result).inc()
+        tokens = estimate_tokens(prompt, text, response)
+        self.saved_tokens += tokens
+        AI_CACHE_SAVED_TOKENS_TOTAL.inc(tokens)
+
+    async def get_or_call(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[str]],
+        prompt: Optional[str] = None,
+        text: Optional[str] = None,
+    ) -> str:
+        """命中缓存直接返回；同键并发请求等待同一次调用"""
+        cached = self._get_local(key)
+        if cached is not None:
+            self.hits += 1
+            self._record_saving("hit", cached, prompt, text)
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                response = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if pending.cancelled():
+                    # 发起方被取消，由当前请求重新发起
+                    return await self.get_or_call(key, call, prompt, text)
+                raise
+            if is_cacheable(response):
+                self._record_saving("coalesced", response, prompt, text)
+            return response
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._get_l2(key)
+            if response is not None:
+                self.hits += 1
+                self._record_saving("hit", response, prompt, text)
+                self._put_local(key, response)
+            else:
+                self.misses += 1
+                AI_CACHE_REQUESTS_TOTAL.labels(result="miss").inc()
+                response = await call()
+                if is_cacheable(response):
+                    self._put_local(key, response)
+                    await self._set_l2(key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+_response_cache: Optional[AIResponseCache] = None
+
+
+def get_ai_response_cache() -> AIResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        from core.config import settings
+
+        _response_cache = AIResponseCache(
+            max_entries=settings.AI_CACHE_MAX_ENTRIES,
+            ttl=settings.AI_CACHE_TTL,
+            persist=settings.AI_CACHE_PERSIST,
+        )
+    return _response_cache
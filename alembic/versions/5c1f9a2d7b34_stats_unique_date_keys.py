@@ -0,0 +1,87 @@
+"""Unique (chat_id, date) / (rule_id, date) keys for statistics tables
+
+Revision ID: 5c1f9a2d7b34
+Revises: e76e90efcd4c
+Create Date: 2026-10-17 10:12:31.402118
+
+StatsRepository.flush_stats 依赖这两组唯一键执行 INSERT ... ON CONFLICT DO UPDATE。
+早期由 migrate_db / create_all 建出的库可能缺少约束并已存在重复行：
+先把重复行的计数合并到 id 最小的一行，再建立唯一索引。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f9a2d7b34'
+down_revision: Union[str, Sequence[str], None] = 'e76e90efcd4c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (表名, 分组键, 累加列, 唯一索引名)
+_STATS_KEYS = [
+    (
+        'chat_statistics', 'chat_id',
+        ['message_count', 'forward_count', 'saved_traffic_bytes', 'error_count'],
+        'uq_chat_statistics_chat_date',
+    ),
+    (
+        'rule_statistics', 'rule_id',
+        ['total_triggered', 'success_count', 'filtered_count', 'error_count'],
+        'uq_rule_statistics_rule_date',
+    ),
+]
+
+
+def _has_unique_key(inspector, table: str, columns: Sequence[str]) -> bool:
+    """表上是否已有恰好覆盖 columns 的唯一约束/唯一索引"""
+    wanted = set(columns)
+    for uc in inspector.get_unique_constraints(table):
+        if set(uc['column_names']) == wanted:
+            return True
+    for idx in inspector.get_indexes(table):
+        if idx.get('unique') and set(idx['column_names']) == wanted:
+            return True
+    return False
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, key, counters, index_name in _STATS_KEYS:
+        if table not in tables or _has_unique_key(inspector, table, [key, 'date']):
+            continue
+
+        sums = ", ".join(
+            f"{col} = (SELECT SUM(COALESCE(d.{col}, 0)) FROM {table} d "
+            f"WHERE d.{key} = {table}.{key} AND d.date = {table}.date)"
+            for col in counters
+        )
+        op.execute(
+            f"UPDATE {table} SET {sums} WHERE id IN ("
+            f"SELECT MIN(id) FROM {table} GROUP BY {key}, date HAVING COUNT(*) > 1)"
+        )
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN ("
+            f"SELECT MIN(id) FROM {table} GROUP BY {key}, date)"
+        )
+        op.create_index(index_name, table, [key, 'date'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, _key, _counters, index_name in _STATS_KEYS:
+        if table not in tables:
+            continue
+        if any(idx['name'] == index_name for idx in inspector.get_indexes(table)):
+            op.drop_index(index_name, table_name=table)
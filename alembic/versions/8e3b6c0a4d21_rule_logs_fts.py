@@ -0,0 +1,56 @@
+"""FTS5 full-text index for rule_logs
+
+Revision ID: 8e3b6c0a4d21
+Revises: 5c1f9a2d7b34
+Create Date: 2026-10-17 14:03:52.771904
+
+rule_logs_fts 为 rule_logs(message_text, action) 的外部内容 FTS5 表，
+由触发器随 INSERT/DELETE/UPDATE 同步；trigram 分词以支持中文子串检索。
+
+需要 SQLite >= 3.34 且编译启用 FTS5 (trigram 分词器随 3.34 引入)。
+本迁移没有不依赖 FTS5 的替代实现：条件不满足时升级直接失败；
+migrate_db 路径下则只记录警告、不建索引，搜索整体退回 LIKE 扫描。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3b6c0a4d21'
+down_revision: Union[str, Sequence[str], None] = '5c1f9a2d7b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS rule_logs_fts USING fts5("
+        "message_text, action, content='rule_logs', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS rule_logs_fts_ai AFTER INSERT ON rule_logs BEGIN "
+        "INSERT INTO rule_logs_fts(rowid, message_text, action) VALUES (new.id, new.message_text, new.action); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS rule_logs_fts_ad AFTER DELETE ON rule_logs BEGIN "
+        "INSERT INTO rule_logs_fts(rule_logs_fts, rowid, message_text, action) "
+        "VALUES ('delete', old.id, old.message_text, old.action); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS rule_logs_fts_au AFTER UPDATE OF message_text, action ON rule_logs BEGIN "
+        "INSERT INTO rule_logs_fts(rule_logs_fts, rowid, message_text, action) "
+        "VALUES ('delete', old.id, old.message_text, old.action); "
+        "INSERT INTO rule_logs_fts(rowid, message_text, action) VALUES (new.id, new.message_text, new.action); END"
+    )
+    # 为已有日志建立索引
+    op.execute("INSERT INTO rule_logs_fts(rule_logs_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS rule_logs_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS rule_logs_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS rule_logs_fts_ai")
+    op.execute("DROP TABLE IF EXISTS rule_logs_fts")
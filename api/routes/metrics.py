@@ -84,6 +84,31 @@ async def get_io_latency_metrics() -> Dict[str, Dict[str, Any]]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/api_latency")
+async def get_api_latency_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    获取按操作类型划分的 Telegram API 延迟指标
+
+    Returns:
+        {
+            "SendMsg": {
+                "count": int,
+                "p50_ms": float,
+                "p95_ms": float,
+                "p99_ms": float,
+                "windows": {"1m": {...}, "5m": {...}, "1h": {...}}
+            },
+            ...
+        }
+    """
+    try:
+        from services.metrics_collector import metrics_collector
+        return metrics_collector.get_api_latency_metrics()
+    except Exception as e:
+        logger.error(f"Failed to get API latency metrics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/system")
 async def get_system_metrics() -> Dict[str, Any]:
     """
@@ -1,72 +1,188 @@
 import collections
-from typing import List, Dict, Set
+import threading
+from array import array
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
 
 class ACAutomaton:
     """
-    Aho-Corasick 自动机 (纯 Python 实现)
+    Aho-Corasick 自动机 (纯 Python 实现，紧凑数组存储)
     用于高效地在长文本中查找多个关键词。
-    复杂度: 构建 O(sum of keyword lengths), 搜索 O(text length + total matches)
+
+    - 构建期使用字典树；build() 后编译为双数组 (base/check/next, array('i'))，
+      转移函数已预先展开失败指针，匹配时每个字符只做一次查表，不再回溯 fail 链。
+    - 字符先映射为字母表序号 (仅关键词中出现过的字符)，未出现的字符直接回到根节点。
+      与根节点转移相同的边不入表，由根节点的稠密行兜底。
+    - 每个节点预先汇总 (含失败链继承) 的输出关键词与标签位掩码。
+
+    复杂度: 构建 O(sum of keyword lengths * depth), 搜索 O(text length)
     """
 
     def __init__(self) -> None:
-        # trie[node][char] = next_node
+        # 构建期字典树: trie[node][char] = next_node (build 后释放)
         self.trie: List[Dict[str, int]] = [{}]
-        # 失败指针: fail[node] = longest proper suffix node
-        self.fail: List[int] = [0]
-        # 输出: output[node] = set of keyword indices that end at this node
-        self.output: List[Set[int]] = [set()]
+        # 以该节点结尾的关键词索引 (构建期)
+        self._terminals: Dict[int, List[int]] = {}
         # 关键词列表
         self.keywords: List[str] = []
+        # 关键词标签位 (如白/黑名单、规则位)，build 后汇总为 node_tags[node]
+        self.tags: List[int] = []
+        self.node_tags: List[int] = []
+        # 节点数
+        self.size = 1
+        # 编译结果
+        self._alphabet: Dict[str, int] = {}
+        self._root_row = array('i')
+        self._base = array('i')
+        self._check = array('i')
+        self._next = array('i')
+        # 接受节点 -> 命中的关键词索引 (含失败链继承)
+        self._outputs: Dict[int, Tuple[int, ...]] = {}
+        self._accept = bytearray()
         # 是否已构建完成
         self.built = False
 
-    def add_keyword(self, keyword: str) -> None:
-        """添加一个关键词到字典树"""
+    def add_keyword(self, keyword: str, tag: int = 0) -> None:
+        """添加一个关键词到字典树 (tag 为可选的标签位掩码)"""
         if self.built:
             raise RuntimeError("自动机已构建，无法添加新关键词。若要更新，请创建新实例。")
-        
+
         idx = len(self.keywords)
         self.keywords.append(keyword)
-        
+        self.tags.append(tag)
+
+        trie = self.trie
         node = 0
         for char in keyword:
-            if char not in self.trie[node]:
-                self.trie[node][char] = len(self.trie)
-                self.trie.append({})
-                self.fail.append(0)
-                self.output.append(set())
-            node = self.trie[node][char]
-        
-        self.output[node].add(idx)
+            nxt = trie[node].get(char)
+            if nxt is None:
+                nxt = len(trie)
+                trie[node][char] = nxt
+                trie.append({})
+            node = nxt
+
+        self._terminals.setdefault(node, []).append(idx)
 
     def build(self) -> None:
-        """构建失败指针 (BFS)"""
+        """展开失败指针并编译为双数组转移表"""
         if self.built:
             return
-        
-        queue: collections.deque[int] = collections.deque()
-        
-        # 处理第一层子节点
-        for char, next_node in self.trie[0].items():
-            self.fail[next_node] = 0
-            queue.append(next_node)
-            
-        # 广度优先遍历构建失败指针
+
+        trie = self.trie
+        n = len(trie)
+
+        alphabet: Dict[str, int] = {}
+        for edges in trie:
+            for char in edges:
+                if char not in alphabet:
+                    alphabet[char] = len(alphabet) + 1
+        width = len(alphabet) + 1
+
+        root_row = array('i', bytes(4 * width))
+        for char, v in trie[0].items():
+            root_row[alphabet[char]] = v
+
+        # delta[u]: 展开失败链后与根节点转移不同的边 (字母序号 -> 目标)
+        fail = [0] * n
+        delta: List[Optional[Dict[int, int]]] = [None] * n
+        delta[0] = {}
+        order: List[int] = []
+        queue: collections.deque[int] = collections.deque(trie[0].values())
         while queue:
             u = queue.popleft()
-            for char, v in self.trie[u].items():
-                # 找到 v 的失败指针
-                f = self.fail[u]
-                while char not in self.trie[f] and f != 0:
-                    f = self.fail[f]
-                
-                self.fail[v] = self.trie[f].get(char, 0)
-                # 继承失败节点的输出，确保能匹配到子集关键词
-                self.output[v].update(self.output[self.fail[v]])
+            order.append(u)
+            row = dict(delta[fail[u]])
+            fail_row = delta[fail[u]]
+            for char, v in trie[u].items():
+                c = alphabet[char]
+                if u:
+                    f = fail_row.get(c)
+                    fail[v] = root_row[c] if f is None else f
+                row[c] = v
                 queue.append(v)
-        
+            delta[u] = row
+
+        # 汇总输出与标签位 (BFS 顺序保证失败节点先完成)
+        terminals, tags = self._terminals, self.tags
+        outputs: Dict[int, Tuple[int, ...]] = {}
+        node_tags = [0] * n
+        accept = bytearray(n)
+        for u in order:
+            inherited = outputs.get(fail[u], ())
+            own = terminals.get(u)
+            if own:
+                inherited = tuple(sorted(set(inherited).union(own)))
+                mask = node_tags[fail[u]]
+                for idx in own:
+                    mask |= tags[idx]
+                node_tags[u] = mask
+            else:
+                node_tags[u] = node_tags[fail[u]]
+            if inherited:
+                outputs[u] = inherited
+                accept[u] = 1
+
+        self._pack(delta, width)
+        self._alphabet = alphabet
+        self._root_row = root_row
+        self._outputs = outputs
+        self._accept = accept
+        self.node_tags = node_tags
+        self.size = n
+        # 释放构建期结构
+        self.trie = []
+        self._terminals = {}
         self.built = True
 
+    def _pack(self, delta: List[Optional[Dict[int, int]]], width: int) -> None:
+        """首次适配 (first-fit) 将各节点的稀疏行压入共享的 check/next 数组"""
+        n = len(delta)
+        base = array('i', bytes(4 * n))
+        check = array('i', [-1]) * (width * 2)
+        nxt = array('i', bytes(4 * len(check)))
+
+        # 槽位占用标记，bytearray.find 以 C 速度跳过已占用区间
+        used = bytearray(len(check))
+
+        def ensure(size: int) -> None:
+            if size > len(check):
+                grow = max(size - len(check), len(check) // 2)
+                check.extend(array('i', [-1]) * grow)
+                nxt.extend(array('i', bytes(4 * grow)))
+                used.extend(bytes(grow))
+
+        def next_free(pos: int) -> int:
+            found = used.find(0, pos)
+            if found < 0:
+                found = max(pos, len(used))
+                ensure(found + width)
+            return found
+
+        first_free = 1
+        for u in range(n):
+            row = delta[u]
+            if not row:
+                continue
+            cols = sorted(row)
+            lo, hi = cols[0], cols[-1]
+            pos = next_free(max(first_free, lo))
+            while True:
+                b = pos - lo
+                ensure(b + hi + 1)
+                if not any(used[b + c] for c in cols):
+                    break
+                pos = next_free(pos + 1)
+            base[u] = b
+            for c in cols:
+                used[b + c] = 1
+                check[b + c] = u
+                nxt[b + c] = row[c]
+            first_free = next_free(first_free)
+
+        # 尾部补齐一行，匹配时 base + c 无需越界判断
+        ensure((max(base) if n else 0) + width)
+        self._base, self._check, self._next = base, check, nxt
+
     def search(self, text: str) -> List[int]:
         """
         在文本中搜索所有关键词
@@ -74,36 +190,139 @@ class ACAutomaton:
         """
         if not self.built:
             self.build()
-        
+
+        get_cls = self._alphabet.get
+        root_row, base, check, nxt, accept = self._root_row, self._base, self._check, self._next, self._accept
         node = 0
+        hit_nodes = set()
+
+        for char in text:
+            c = get_cls(char, 0)
+            if c:
+                if node:
+                    i = base[node] + c
+                    node = nxt[i] if check[i] == node else root_row[c]
+                else:
+                    node = root_row[c]
+                if accept[node]:
+                    hit_nodes.add(node)
+            else:
+                node = 0
+
         matches = set()
-        
+        outputs = self._outputs
+        for node in hit_nodes:
+            matches.update(outputs[node])
+        return sorted(matches)
+
+    def match_tags(self, text: str, stop_mask: int = 0) -> int:
+        """
+        单次扫描返回所有命中关键词的标签位并集。
+        stop_mask 非零时，一旦已命中的标签覆盖 stop_mask 即提前返回。
+        """
+        if not self.built:
+            self.build()
+
+        get_cls = self._alphabet.get
+        root_row, base, check, nxt = self._root_row, self._base, self._check, self._next
+        node_tags = self.node_tags
+        node = 0
+        mask = 0
         for char in text:
-            while char not in self.trie[node] and node != 0:
-                node = self.fail[node]
-            node = self.trie[node].get(char, 0)
-            
-            if self.output[node]:
-                matches.update(self.output[node])
-                
-        return sorted(list(matches))
+            c = get_cls(char, 0)
+            if c:
+                if node:
+                    i = base[node] + c
+                    node = nxt[i] if check[i] == node else root_row[c]
+                else:
+                    node = root_row[c]
+                tag = node_tags[node]
+                if tag:
+                    mask |= tag
+                    if stop_mask and (mask & stop_mask) == stop_mask:
+                        break
+            else:
+                node = 0
+        return mask
 
     def has_any_match(self, text: str) -> bool:
         """快速判断是否有任何关键词匹配"""
         if not self.built:
             self.build()
-        
+
+        get_cls = self._alphabet.get
+        root_row, base, check, nxt, accept = self._root_row, self._base, self._check, self._next, self._accept
         node = 0
         for char in text:
-            while char not in self.trie[node] and node != 0:
-                node = self.fail[node]
-            node = self.trie[node].get(char, 0)
-            
-            if self.output[node]:
-                return True
+            c = get_cls(char, 0)
+            if c:
+                if node:
+                    i = base[node] + c
+                    node = nxt[i] if check[i] == node else root_row[c]
+                else:
+                    node = root_row[c]
+                if accept[node]:
+                    return True
+            else:
+                node = 0
         return False
 
-import threading
+    def memory_bytes(self) -> int:
+        """编译后转移表与标记数组的近似内存占用 (字节)"""
+        return (
+            self._base.itemsize * len(self._base)
+            + self._check.itemsize * len(self._check)
+            + self._next.itemsize * len(self._next)
+            + self._root_row.itemsize * len(self._root_row)
+            + len(self._accept)
+        )
+
+
+class MultiRuleAutomaton:
+    """
+    多规则合并自动机
+
+    以所有规则关键词的并集构建一个 ACAutomaton，每条规则占一个标签位，
+    对一条消息只扫描一次即可得到命中的规则集合 (同一源聊天的 N 条规则不再扫描 N 次)。
+    规则 ID 可以是任意可哈希对象 (如 (rule_id, 黑/白名单))。
+    """
+
+    def __init__(self, rule_keywords: Mapping[Hashable, Iterable[str]]):
+        self.rule_ids: List[Hashable] = []
+        self._bits: Dict[Hashable, int] = {}
+        self._ac = ACAutomaton()
+        for rule_id, words in rule_keywords.items():
+            bit = 1 << len(self.rule_ids)
+            self.rule_ids.append(rule_id)
+            self._bits[rule_id] = bit
+            for word in words:
+                if word:
+                    self._ac.add_keyword(word, bit)
+        self._ac.build()
+        self.full_mask = (1 << len(self.rule_ids)) - 1
+
+    def bit_of(self, rule_id: Hashable) -> int:
+        """规则对应的标签位 (未收录的规则为 0)"""
+        return self._bits.get(rule_id, 0)
+
+    def match_mask(self, text: str) -> int:
+        """单次扫描返回命中规则的位掩码 (所有规则均命中时提前结束)"""
+        if not text or not self.rule_ids:
+            return 0
+        return self._ac.match_tags(text, stop_mask=self.full_mask)
+
+    def match_rules(self, text: str) -> Set[Hashable]:
+        """单次扫描返回命中的规则 ID 集合"""
+        mask = self.match_mask(text)
+        matched: Set[Hashable] = set()
+        ordinal = 0
+        while mask:
+            if mask & 1:
+                matched.add(self.rule_ids[ordinal])
+            mask >>= 1
+            ordinal += 1
+        return matched
+
 
 class ACManager:
     """管理不同规则的 AC 自动机缓存 (Thread-Safe)"""
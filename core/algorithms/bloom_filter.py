@@ -1,117 +1,279 @@
-import hashlib
 import math
+import mmap
 import os
-import pickle
 import logging
-from typing import List, Any, Optional
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from core.algorithms.hashing import HASH64_ID, hash64, to_bytes
 
 logger = logging.getLogger(__name__)
 
+# 文件头 (64 字节，位数组按 64 字节对齐):
+# 魔数, 版本, k, 哈希实现, 块数, 元素计数, 容量, 误判率
+_HEADER = struct.Struct("<4sHHB3xQQQd")
+_HEADER_SIZE = 64
+_MAGIC = b"BBF1"
+_VERSION = 1
+
+# 一个块 = 一条缓存行 = 512 位
+BLOCK_BYTES = 64
+BLOCK_BITS = BLOCK_BYTES * 8
+# 块内位模式表大小 (每个元素取两个模式按位或，组合数 2^24)
+_PATTERN_BITS = 12
+_PATTERN_MASK = (1 << _PATTERN_BITS) - 1
+_PATTERN_COUNT = 1 << _PATTERN_BITS
+_FPR_MARGIN = 0.9
+
+_M64 = (1 << 64) - 1
+_pattern_tables: Dict[Tuple[int, int], List[int]] = {}
+
+
+def _splitmix64(state: int) -> Tuple[int, int]:
+    state = (state + 0x9E3779B97F4A7C15) & _M64
+    z = state
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _M64
+    return state, z ^ (z >> 31)
+
+
+def _patterns(bits: int, seed: int) -> List[int]:
+    """
+    块内位模式表：每项为恰好置 bits 个位的 512 位整数
+
+    由 splitmix64 确定性生成 (不依赖 random 模块的实现)，
+    持久化文件中的位依赖于此表，生成方式不可修改。
+    """
+    key = (bits, seed)
+    table = _pattern_tables.get(key)
+    if table is None:
+        table = []
+        state = seed
+        for _ in range(1 << _PATTERN_BITS):
+            mask = 0
+            n = 0
+            while n < bits:
+                state, r = _splitmix64(state)
+                bit = 1 << (r & (BLOCK_BITS - 1))
+                if not mask & bit:
+                    mask |= bit
+                    n += 1
+            table.append(mask)
+        _pattern_tables[key] = table
+    return table
+
+
+def _expected_fpr(num_blocks: int, n: int, k_a: int, k_b: int) -> float:
+    """
+    分块布隆在插入 n 个元素后的理论误判率
+
+    按块内元素数 i ~ Poisson(n / 块数) 求期望；块内每个模式若已被块中某元素选中
+    (概率 1-(1-1/表大小)^i) 则必然命中，否则其 k 个位逐位按填充率命中。
+    实测误判率比模型高约 5%，按容量计算块数时以 _FPR_MARGIN 留出余量。
+    """
+    lam = n / num_blocks
+    k = k_a + k_b - k_a * k_b / BLOCK_BITS
+    total = 0.0
+    p = math.exp(-lam)
+    hi = int(lam + 12 * math.sqrt(lam) + 20)
+    for i in range(hi + 1):
+        fill = 1 - (1 - 1 / BLOCK_BITS) ** (i * k)
+        miss = (1 - 1 / _PATTERN_COUNT) ** i
+        total += p * ((1 - miss) + miss * fill ** k_a) * ((1 - miss) + miss * fill ** k_b)
+        p *= lam / (i + 1)
+    return total
+
+
 class BloomFilter:
     """
-    高性能布隆过滤器 (高性能纯 Python 实现)
-    
+    高性能布隆过滤器 (分块布隆，纯 Python 实现)
+
     特性:
-    - 使用 bytearray 最小化内存占用 (1GB VPS 友好)
-    - 使用 Double Hashing (MD5 + SHA1) 优化哈希分布
-    - 支持持久化 (Save/Load)
-    - 针对非确定性 hash() 的安全实现 (使用 hashlib)
+    - 每个元素的 k 个位都落在同一个 64 字节块 (一条缓存行) 内
+    - 单个 64 位哈希：低 32 位选块，高位从两张预生成的位模式表中各取一个，
+      查询只需一次块读取 + 一次整数与运算，与 k 无关
+    - 指定 filepath 时位数组直接 mmap 到文件 (64 字节头 + 位数组)：
+      启动无需加载，save() 只 msync 修改过的页
+    - lazy=True 时推迟到 open() 或首次 add/查询才创建并映射文件
     """
 
     def __init__(
-        self, 
-        capacity: int = 1000000, 
-        error_rate: float = 0.001, 
-        filepath: Optional[str] = None
+        self,
+        capacity: int = 1000000,
+        error_rate: float = 0.001,
+        filepath: Optional[str] = None,
+        num_bits: Optional[int] = None,
+        hash_count: Optional[int] = None,
+        lazy: bool = False,
     ) -> None:
         """
         Args:
             capacity: 预估处理的元素数量
             error_rate: 容许的假阳性概率
-            filepath: 持久化文件路径
+            filepath: 持久化文件路径 (None 或 ":memory:" 表示仅内存)
+            num_bits / hash_count: 直接指定位数与哈希数 (覆盖按容量计算的值)
+            lazy: 延迟映射持久化文件 (模块级单例在导入时不触碰磁盘)
         """
         self.capacity = capacity
         self.error_rate = error_rate
-        self.filepath = filepath
-        
-        # 计算位数组大小 m 和哈希函数数量 k
-        # m = -(n * ln(p)) / (ln(2)^2)
-        self.bit_size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
-        self.hash_count = int((self.bit_size / capacity) * math.log(2))
-        
-        # 使用 bytearray 存储 (8 bit per index)
-        self.bit_array = bytearray(math.ceil(self.bit_size / 8))
+        self.filepath = None if filepath in (None, ":memory:") else str(filepath)
+
+        # 按标准布隆计算 m 和 k: m = -(n * ln(p)) / (ln(2)^2)
+        base_bits = -capacity * math.log(error_rate) / (math.log(2) ** 2)
+        if hash_count is None:
+            hash_count = int((num_bits or base_bits) / capacity * math.log(2))
+        self.hash_count = max(2, min(hash_count, 32))
+        if num_bits is None:
+            # 块负载不均与模式复用会抬高误判率，按理论模型逐步加块直到满足 error_rate
+            num_blocks = max(1, math.ceil(base_bits / BLOCK_BITS))
+            k_a, k_b = (self.hash_count + 1) // 2, self.hash_count // 2
+            while _expected_fpr(num_blocks, capacity, k_a, k_b) > error_rate * _FPR_MARGIN:
+                num_blocks = int(num_blocks * 1.02) + 1
+            num_bits = num_blocks * BLOCK_BITS
+        self.num_blocks = max(1, math.ceil(num_bits / BLOCK_BITS))
+        self.bit_size = self.num_blocks * BLOCK_BITS
         self.count = 0
-        
-        if filepath and os.path.exists(filepath):
+
+        self._table_a = _patterns((self.hash_count + 1) // 2, 1)
+        self._table_b = _patterns(self.hash_count // 2, 2)
+        self._mm: Optional[mmap.mmap] = None
+        self._offset = 0
+        self._dirty: Set[int] = set()
+        self._pending = False
+        self._open_lock = threading.Lock()
+
+        if not self.filepath:
+            self.bit_array = bytearray(self.num_blocks * BLOCK_BYTES)
+        elif lazy:
+            self._pending = True
+            self.bit_array = bytearray(0)
+        else:
             self.load()
 
-    def _get_hashes(self, item: Any) -> List[int]:
-        """使用 Double Hashing 模拟 k 个哈希函数"""
-        item_str = str(item).encode('utf-8')
-        
-        # 使用 MD5 和 SHA1 模拟两个基础哈希函数
-        h1 = int(hashlib.md5(item_str).hexdigest(), 16)
-        h2 = int(hashlib.sha1(item_str).hexdigest(), 16)
-        
-        hashes = []
-        for i in range(self.hash_count):
-            # gi(x) = h1(x) + i * h2(x)
-            pos = (h1 + i * h2) % self.bit_size
-            hashes.append(pos)
-        return hashes
+    def _locate(self, item: Any) -> Tuple[int, int]:
+        """返回 (块在缓冲区中的起始偏移, 块内位掩码)"""
+        h = hash64(to_bytes(item))
+        block = ((h & 0xFFFFFFFF) * self.num_blocks) >> 32
+        mask = self._table_a[(h >> 32) & _PATTERN_MASK] | self._table_b[(h >> 44) & _PATTERN_MASK]
+        return self._offset + block * BLOCK_BYTES, mask
 
     def add(self, item: Any) -> None:
         """添加元素"""
-        for pos in self._get_hashes(item):
-            byte_index = pos // 8
-            bit_index = pos % 8
-            self.bit_array[byte_index] |= (1 << bit_index)
+        if self._pending:
+            self.open()
+        start, mask = self._locate(item)
+        end = start + BLOCK_BYTES
+        buf = self.bit_array
+        block = int.from_bytes(buf[start:end], "little")
+        if block & mask != mask:
+            buf[start:end] = (block | mask).to_bytes(BLOCK_BYTES, "little")
+            if self._mm is not None:
+                self._dirty.add(start // mmap.PAGESIZE)
         self.count += 1
 
     def __contains__(self, item: Any) -> bool:
         """检查元素是否存在"""
-        for pos in self._get_hashes(item):
-            byte_index = pos // 8
-            bit_index = pos % 8
-            if not (self.bit_array[byte_index] & (1 << bit_index)):
+        if self._pending:
+            self.open()
+        start, mask = self._locate(item)
+        return int.from_bytes(self.bit_array[start:start + BLOCK_BYTES], "little") & mask == mask
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+    def _header(self) -> bytes:
+        return _HEADER.pack(
+            _MAGIC, _VERSION, self.hash_count, HASH64_ID,
+            self.num_blocks, self.count, self.capacity, self.error_rate,
+        )
+
+    def _create_file(self) -> None:
+        """写入文件头与全零位数组 (真实写零，避免稀疏文件在磁盘满时触发 SIGBUS)"""
+        os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+        tmp = f"{self.filepath}.tmp"
+        remaining = self.num_blocks * BLOCK_BYTES
+        chunk = b"\x00" * (1 << 20)
+        with open(tmp, "wb") as f:
+            f.write(self._header().ljust(_HEADER_SIZE, b"\x00"))
+            while remaining > 0:
+                n = min(remaining, len(chunk))
+                f.write(chunk[:n])
+                remaining -= n
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.filepath)
+
+    def _compatible(self) -> bool:
+        expected = _HEADER_SIZE + self.num_blocks * BLOCK_BYTES
+        try:
+            if os.path.getsize(self.filepath) != expected:
                 return False
-        return True
+            with open(self.filepath, "rb") as f:
+                magic, version, k, hash_id, num_blocks, _, _, _ = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return (magic, version, k, hash_id, num_blocks) == (
+            _MAGIC, _VERSION, self.hash_count, HASH64_ID, self.num_blocks
+        )
 
-    def save(self) -> None:
-        """持久化到磁盘"""
+    def open(self) -> None:
+        """映射延迟打开的持久化文件 (可提前在线程中调用，避免首次访问时阻塞事件循环)"""
+        with self._open_lock:
+            if self._pending:
+                self.load()
+
+    def load(self) -> None:
+        """映射持久化文件 (不存在、旧格式或参数变化时重新创建)"""
         if not self.filepath:
             return
+        self.close()
+        if not self._compatible():
+            if os.path.exists(self.filepath):
+                logger.warning(f"Bloom Filter 文件格式或参数已变化，重新初始化: {self.filepath}")
+            self._create_file()
+
+        with open(self.filepath, "r+b") as f:
+            self._mm = mmap.mmap(f.fileno(), 0)
+        self.bit_array = self._mm
+        self._offset = _HEADER_SIZE
+        self.count = _HEADER.unpack_from(self._mm, 0)[5]
+        self._pending = False
+        logger.info(f"Bloom Filter mapped from {self.filepath}. Count: {self.count}")
+
+    def save(self) -> None:
+        """把修改过的页与计数同步到磁盘 (仅内存模式时无操作)"""
+        if self._mm is None:
+            return
         try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
-            with open(self.filepath, 'wb') as f:
-                data = {
-                    'capacity': self.capacity,
-                    'error_rate': self.error_rate,
-                    'count': self.count,
-                    'bit_array': self.bit_array
-                }
-                pickle.dump(data, f)
-            logger.info(f"Bloom Filter saved to {self.filepath} (Count: {self.count})")
+            # 先整体换出脏页集合：save 可能在线程中运行，期间事件循环上的 add 写入新集合
+            dirty, self._dirty = self._dirty, set()
+            self._mm[:_HEADER.size] = self._header()
+            pages = sorted(dirty | {0})
+            page = mmap.PAGESIZE
+            size = len(self._mm)
+            # 合并连续页，逐段 msync
+            start = prev = pages[0]
+            for p in pages[1:] + [None]:
+                if p is not None and p == prev + 1:
+                    prev = p
+                    continue
+                offset = start * page
+                self._mm.flush(offset, min((prev + 1) * page, size) - offset)
+                if p is not None:
+                    start = prev = p
         except Exception as e:
             logger.error(f"Failed to save Bloom Filter: {e}")
 
-    def load(self) -> None:
-        """从磁盘加载"""
-        if not self.filepath or not os.path.exists(self.filepath):
+    def close(self) -> None:
+        """同步并解除映射"""
+        if self._mm is None:
             return
-        try:
-            with open(self.filepath, 'rb') as f:
-                data = pickle.load(f)
-                if data.get('capacity') == self.capacity and data.get('error_rate') == self.error_rate:
-                    self.bit_array = data['bit_array']
-                    self.count = data.get('count', 0)
-                    logger.info(f"Bloom Filter loaded from {self.filepath}. Count: {self.count}")
-                else:
-                    logger.warning("Bloom Filter params changed, initialization required.")
-        except Exception as e:
-            logger.error(f"Failed to load Bloom Filter: {e}")
+        self.save()
+        self._mm.close()
+        self._mm = None
+        self.bit_array = bytearray(0)
+        self._offset = 0
 
 class BloomFilterManager:
     """管理多个布隆过滤器单例"""
@@ -0,0 +1,334 @@
+"""
+多索引海明近邻表 (Multi-Index Hashing)
+
+将 f 位 SimHash 切分为 k+1 个互不重叠的位块 (等价于 k+1 个置换后取前缀)。
+由鸽巢原理，海明距离 <= k 的两个指纹至少有一个位块完全相同，
+因此只需在 k+1 张精确哈希表中取候选，再逐个精确校验海明距离：
+- 召回完整: 距离 <= k 的条目一定被找到 (不同于 LSH Forest 的概率性前缀近邻)
+- 结果精确: 返回的每一项都经过距离校验 (不会把"附近的任意条目"当作重复)
+
+支持按作用域 (scope，如目标会话 / spam) 隔离、按文档 ID 删除、TTL 过期、
+总条目上限 (先进先出淘汰) 以及落盘快照。
+"""
+import heapq
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# 条目: (scope, doc_id, fingerprint, expires_at)；expires_at 为 0 表示永不过期
+Entry = Tuple[str, Optional[str], int, float]
+
+
+class HammingIndex:
+    """
+    精确有界的 SimHash 近邻索引
+
+    Args:
+        k: 最大容忍海明距离 (查询时可取更小值)
+        f: 指纹位数
+        max_entries: 条目上限，超出时淘汰最早写入的条目 (0 表示不限)
+        ttl: 默认存活秒数 (0 表示不过期)
+    """
+
+    def __init__(self, k: int = 3, f: int = 64, max_entries: int = 0, ttl: float = 0):
+        if k < 0 or k >= f:
+            raise ValueError("k 必须满足 0 <= k < f")
+        self.k = k
+        self.f = f
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # 位块划分: k+1 块，余数位均摊到前几块
+        blocks = k + 1
+        width, extra = divmod(f, blocks)
+        self._blocks: List[Tuple[int, int]] = []
+        shift = 0
+        for i in range(blocks):
+            w = width + (1 if i < extra else 0)
+            self._blocks.append((shift, (1 << w) - 1))
+            shift += w
+
+        # scope -> [块表]，块表: 块值 -> 条目 ID 集合
+        self._tables: Dict[str, List[Dict[int, Set[int]]]] = {}
+        # 条目 ID -> Entry (插入顺序即写入先后，用于上限淘汰)
+        self._entries: "OrderedDict[int, Entry]" = OrderedDict()
+        # (scope, doc_id) -> 条目 ID
+        self._docs: Dict[Tuple[str, str], int] = {}
+        # 过期最小堆: (expires_at, 条目 ID)
+        self._expiry: List[Tuple[float, int]] = []
+        self._next_id = 0
+
+        self.dirty = False
+        self.queries = 0
+        self.candidates = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, fp: int) -> List[int]:
+        return [(fp >> shift) & mask for shift, mask in self._blocks]
+
+    # ------------------------------------------------------------------
+    # 写入与删除
+    # ------------------------------------------------------------------
+    def add(
+        self,
+        fp: int,
+        doc_id: Optional[Hashable] = None,
+        scope: str = "",
+        ttl: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> int:
+        """
+        写入指纹；同一 scope 下重复的 doc_id 会替换旧条目。
+
+        Returns:
+            条目 ID
+        """
+        now = time.time() if now is None else now
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl and ttl > 0 else 0.0
+        doc = None if doc_id is None else str(doc_id)
+        if doc is not None:
+            self.remove(doc, scope)
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (scope, doc, fp, expires_at)
+        if doc is not None:
+            self._docs[(scope, doc)] = entry_id
+
+        tables = self._tables.get(scope)
+        if tables is None:
+            tables = self._tables[scope] = [{} for _ in self._blocks]
+        for table, key in zip(tables, self._keys(fp)):
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = {entry_id}
+            else:
+                bucket.add(entry_id)
+
+        if expires_at:
+            heapq.heappush(self._expiry, (expires_at, entry_id))
+        self.dirty = True
+
+        if self.max_entries and len(self._entries) > self.max_entries:
+            self.expire(now)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+        if len(self._expiry) > 2 * len(self._entries):
+            self._compact_expiry()
+        return entry_id
+
+    def remove(self, doc_id: Hashable, scope: str = "") -> bool:
+        """按文档 ID 删除条目"""
+        entry_id = self._docs.get((scope, str(doc_id)))
+        if entry_id is None:
+            return False
+        self._drop(entry_id)
+        return True
+
+    def remove_fingerprint(self, fp: int, scope: str = "") -> int:
+        """删除 scope 下指纹完全相同的所有条目，返回删除数量"""
+        tables = self._tables.get(scope)
+        if not tables:
+            return 0
+        bucket = tables[0].get(self._keys(fp)[0], ())
+        victims = [eid for eid in bucket if self._entries[eid][2] == fp]
+        for eid in victims:
+            self._drop(eid)
+        return len(victims)
+
+    def clear_scope(self, scope: str) -> int:
+        """删除整个作用域"""
+        victims = [eid for eid, entry in self._entries.items() if entry[0] == scope]
+        for eid in victims:
+            self._drop(eid)
+        return len(victims)
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        scope, doc, fp, _ = entry
+        if doc is not None and self._docs.get((scope, doc)) == entry_id:
+            del self._docs[(scope, doc)]
+        tables = self._tables.get(scope)
+        if tables:
+            for table, key in zip(tables, self._keys(fp)):
+                bucket = table.get(key)
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del table[key]
+            if not tables[0]:
+                del self._tables[scope]
+        self.dirty = True
+
+    def _compact_expiry(self) -> None:
+        """
+        按存活条目重建过期堆。
+
+        被上限淘汰、按 doc_id 替换或删除的条目仍留在堆中直到 TTL 到期；
+        堆长度超过存活条目两倍时重建，摊还 O(1)，堆大小保持与条目数同阶。
+        """
+        self._expiry = [
+            (entry[3], eid) for eid, entry in self._entries.items() if entry[3]
+        ]
+        heapq.heapify(self._expiry)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """清理已过期条目，返回清理数量"""
+        now = time.time() if now is None else now
+        removed = 0
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            expires_at, entry_id = heapq.heappop(heap)
+            entry = self._entries.get(entry_id)
+            # 条目可能已被删除或替换
+            if entry is not None and entry[3] == expires_at:
+                self._drop(entry_id)
+                removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def query(
+        self,
+        fp: int,
+        scope: str = "",
+        k: Optional[int] = None,
+        limit: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> List[Tuple[Optional[str], int, int]]:
+        """
+        查询海明距离 <= k 的全部条目 (k 不能超过建索引时的 k)。
+
+        Returns:
+            [(doc_id, 指纹, 距离)]，按距离升序、同距离新者优先
+        """
+        k = self.k if k is None else min(k, self.k)
+        self.queries += 1
+        tables = self._tables.get(scope)
+        if not tables:
+            return []
+
+        now = time.time() if now is None else now
+        seen: Set[int] = set()
+        for table, key in zip(tables, self._keys(fp)):
+            bucket = table.get(key)
+            if bucket:
+                seen.update(bucket)
+        self.candidates += len(seen)
+
+        entries = self._entries
+        results = []
+        for eid in seen:
+            _, doc, other, expires_at = entries[eid]
+            if expires_at and expires_at <= now:
+                continue
+            dist = (fp ^ other).bit_count()
+            if dist <= k:
+                results.append((dist, -eid, doc, other))
+        results.sort()
+        if limit is not None:
+            results = results[:limit]
+        return [(doc, other, dist) for dist, _, doc, other in results]
+
+    def nearest(self, fp: int, scope: str = "", k: Optional[int] = None) -> Optional[Tuple[Optional[str], int, int]]:
+        """距离最近的一条 (无则 None)"""
+        hits = self.query(fp, scope, k, limit=1)
+        return hits[0] if hits else None
+
+    def contains_near(self, fp: int, scope: str = "", k: Optional[int] = None) -> bool:
+        """是否存在距离 <= k 的条目"""
+        return bool(self.query(fp, scope, k, limit=1))
+
+    # ------------------------------------------------------------------
+    # 快照
+    # ------------------------------------------------------------------
+    def export_rows(self) -> List[Entry]:
+        """导出全部条目 (写入顺序)，可在事件循环内快速拷贝后交给线程落盘"""
+        return list(self._entries.values())
+
+    def load_rows(self, rows, now: Optional[float] = None) -> int:
+        """批量导入条目 (跳过已过期的)，返回导入数量"""
+        now = time.time() if now is None else now
+        loaded = 0
+        for scope, doc, fp, expires_at in rows:
+            expires_at = float(expires_at or 0)
+            if expires_at and expires_at <= now:
+                continue
+            self.add(int(fp), doc, scope, ttl=(expires_at - now) if expires_at else 0, now=now)
+            loaded += 1
+        return loaded
+
+    def snapshot_meta(self) -> Dict[str, Any]:
+        return {"version": SNAPSHOT_VERSION, "k": self.k, "f": self.f, "saved_at": time.time()}
+
+    @staticmethod
+    def write_snapshot(path: Union[str, Path], rows: List[Entry], meta: Dict[str, Any]) -> None:
+        """原子写入快照 (首行元数据，其余每行一个条目)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(meta) + "\n")
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """同步保存快照"""
+        self.write_snapshot(path, self.export_rows(), self.snapshot_meta())
+        self.dirty = False
+
+    @staticmethod
+    def read_snapshot(path: Union[str, Path]) -> Tuple[Dict[str, Any], List[Entry]]:
+        """读取快照；损坏的尾行会被忽略"""
+        rows: List[Entry] = []
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.loads(f.readline() or "{}")
+            for line in f:
+                try:
+                    scope, doc, fp, expires_at = json.loads(line)
+                except (ValueError, TypeError):
+                    break
+                rows.append((scope, doc, fp, expires_at))
+        return meta, rows
+
+    def load(self, path: Union[str, Path]) -> int:
+        """从快照恢复 (追加到当前索引)，返回导入数量；文件不存在时返回 0"""
+        if not os.path.exists(path):
+            return 0
+        meta, rows = self.read_snapshot(path)
+        if meta.get("f", self.f) != self.f:
+            logger.warning(f"近邻索引快照位数不匹配 ({meta.get('f')} != {self.f})，已忽略: {path}")
+            return 0
+        loaded = self.load_rows(rows)
+        self.dirty = False
+        return loaded
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "scopes": len(self._tables),
+            "k": self.k,
+            "queries": self.queries,
+            "avg_candidates": round(self.candidates / self.queries, 2) if self.queries else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,38 @@
+"""
+64 位非加密哈希
+
+概率数据结构 (HLL、Bloom) 只需要分布均匀的 64 位哈希，不需要抗碰撞。
+优先使用 xxh64，未安装 xxhash 时回退到 blake2b(digest_size=8) (同为 C 实现)。
+
+两种实现的结果不同：持久化的草图应记录 HASH64_ID，加载时校验一致再合并。
+"""
+import hashlib
+from typing import Any
+
+try:
+    import xxhash
+    _HAS_XXHASH = True
+except ImportError:
+    xxhash = None
+    _HAS_XXHASH = False
+
+# 1 = xxh64, 2 = blake2b-64
+HASH64_ID = 1 if _HAS_XXHASH else 2
+
+
+def to_bytes(item: Any) -> bytes:
+    """统一把元素编码为字节 (与旧实现一致，非 bytes 一律按 str() 编码)"""
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        return bytes(item)
+    return str(item).encode("utf-8", errors="surrogatepass")
+
+
+if _HAS_XXHASH:
+    def hash64(data: bytes, seed: int = 0) -> int:
+        """64 位无符号哈希"""
+        return xxhash.xxh64_intdigest(data, seed)
+else:
+    def hash64(data: bytes, seed: int = 0) -> int:
+        """64 位无符号哈希"""
+        h = hashlib.blake2b(data, digest_size=8, salt=seed.to_bytes(8, "little") if seed else b"")
+        return int.from_bytes(h.digest(), "little")
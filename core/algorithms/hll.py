@@ -1,11 +1,32 @@
-import hashlib
 import math
-from typing import Any
+import struct
+from typing import Any, Dict, Optional
+
+from core.algorithms.hashing import HASH64_ID, hash64, to_bytes
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    np = None
+    _HAS_NUMPY = False
+
+# 序列化格式: 版本, 精度 b, 哈希实现, 表示方式 (0 稀疏 / 1 稠密)
+_HEADER = struct.Struct(">BBBB")
+_FORMAT_VERSION = 1
+_SPARSE, _DENSE = 0, 1
+# 稀疏项: 寄存器下标 (uint16) + 值 (uint8)
+_SPARSE_ENTRY = struct.Struct(">HB")
+
 
 class HyperLogLog:
     """
     HyperLogLog 基数估计算法 (纯 Python 实现)
     用于以极低内存估算亿级独立数据的基数 (Cardinality)。
+
+    - 64 位非加密哈希 (xxh64)，前 b 位选寄存器，其余位取前导零个数
+    - 低基数时以稀疏字典保存非零寄存器，超过 m/4 项后转为 bytearray 稠密寄存器
+    - 同精度草图可按寄存器取最大值合并 (并集)，可序列化后持久化
     """
 
     def __init__(self, b: int = 10):
@@ -15,55 +36,141 @@ class HyperLogLog:
                b=10 (m=1024) 误差约 3%.
                b=14 (m=16384) 误差约 0.8%.
         """
+        if not 4 <= b <= 16:
+            raise ValueError("b 必须在 4~16 之间")
         self.b = b
         self.m = 1 << b
-        self.registers = [0] * self.m
-        
+        self.hash_id = HASH64_ID
+        self._shift = 64 - b
+        self._mask = (1 << self._shift) - 1
+        self._sparse: Optional[Dict[int, int]] = {}
+        self._dense: Optional[bytearray] = None
+
         # 修正系数
         if self.m == 16: self.alpha = 0.673
         elif self.m == 32: self.alpha = 0.697
         elif self.m == 64: self.alpha = 0.709
         else: self.alpha = 0.7213 / (1 + 1.079 / self.m)
 
-    def _hash(self, item: Any) -> int:
-        """使用 SHA256 生成 256 位哈希值"""
-        h = hashlib.sha256(str(item).encode('utf-8')).hexdigest()
-        return int(h, 16)
+    @staticmethod
+    def hash_item(item: Any) -> int:
+        """元素的 64 位哈希 (同一元素写入多个草图时只需计算一次)"""
+        return hash64(to_bytes(item))
 
     def add(self, item: Any) -> None:
         """添加元素"""
-        x = self._hash(item)
-        # 前 b 位作为寄存器索引
-        idx = x >> (256 - self.b)
-        # 剩余位中首个 '1' 出现的位置
-        w = x & ((1 << (256 - self.b)) - 1)
-        rho = self._get_rho(w, 256 - self.b)
-        self.registers[idx] = max(self.registers[idx], rho)
-
-    def _get_rho(self, w: int, max_bits: int) -> int:
-        """返回首个 1 出现的位置 (从右往左，1-indexed)"""
-        if w == 0:
-            return max_bits + 1
-        return (w & -w).bit_length() # 这是一个捷径：w & -w 提取最低位的 1
+        self.add_hash(hash64(to_bytes(item)))
+
+    def add_hash(self, x: int) -> None:
+        """按预先计算的 64 位哈希添加元素"""
+        idx = x >> self._shift
+        # 剩余位中首个 '1' 的位置 (从高位数，1-indexed)
+        rho = self._shift - (x & self._mask).bit_length() + 1
+        dense = self._dense
+        if dense is not None:
+            if rho > dense[idx]:
+                dense[idx] = rho
+            return
+        sparse = self._sparse
+        if rho > sparse.get(idx, 0):
+            sparse[idx] = rho
+            if len(sparse) > self.m >> 2:
+                self._densify()
+
+    def _densify(self) -> None:
+        dense = bytearray(self.m)
+        for idx, rho in self._sparse.items():
+            dense[idx] = rho
+        self._dense = dense
+        self._sparse = None
+
+    @property
+    def is_sparse(self) -> bool:
+        return self._dense is None
+
+    @property
+    def registers(self) -> bytearray:
+        """稠密寄存器视图 (稀疏表示时返回临时展开的副本)"""
+        if self._dense is not None:
+            return self._dense
+        dense = bytearray(self.m)
+        for idx, rho in self._sparse.items():
+            dense[idx] = rho
+        return dense
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """并入另一个草图 (寄存器取最大值)"""
+        if other.b != self.b or other.hash_id != self.hash_id:
+            raise ValueError("只能合并相同精度与哈希实现的 HLL")
+        if other._dense is None:
+            for idx, rho in other._sparse.items():
+                if self._dense is not None:
+                    if rho > self._dense[idx]:
+                        self._dense[idx] = rho
+                elif rho > self._sparse.get(idx, 0):
+                    self._sparse[idx] = rho
+            if self._dense is None and len(self._sparse) > self.m >> 2:
+                self._densify()
+            return
+        if self._dense is None:
+            self._densify()
+        self._dense[:] = _max_registers(self._dense, other._dense)
 
     def count(self) -> int:
         """估算基数"""
-        # 调和平均值计算
-        z = sum(2.0 ** -r for r in self.registers)
+        if self._dense is None:
+            # 稀疏表示下绝大多数寄存器为 0，只需累加非零项
+            zeros = self.m - len(self._sparse)
+            z = zeros + sum(2.0 ** -r for r in self._sparse.values())
+        else:
+            regs = self._dense
+            zeros = regs.count(0)
+            # 寄存器取值不超过 65，按取值计数比逐个累加快得多
+            z = sum(regs.count(r) * 2.0 ** -r for r in range(max(regs) + 1))
         estimate = self.alpha * (self.m ** 2) / z
-        
-        # 小基数修正
-        if estimate <= 2.5 * self.m:
-            v = self.registers.count(0)
-            if v > 0:
-                estimate = self.m * math.log(self.m / v)
-        
-        # 大基数修正 (2^256 极其大，通常不触发)
-        elif estimate > (1/30) * (2**256):
-            estimate = -(2**256) * math.log(1 - estimate / (2**256))
-            
+
+        # 小基数修正 (线性计数)
+        if estimate <= 2.5 * self.m and zeros > 0:
+            estimate = self.m * math.log(self.m / zeros)
+        # 64 位哈希在本项目的基数量级下无需大基数修正
         return int(estimate)
 
+    def to_bytes(self) -> bytes:
+        """序列化 (稀疏时每个非零寄存器 3 字节，稠密时 m 字节)"""
+        if self._dense is None and len(self._sparse) * _SPARSE_ENTRY.size < self.m:
+            header = _HEADER.pack(_FORMAT_VERSION, self.b, self.hash_id, _SPARSE)
+            return header + b"".join(
+                _SPARSE_ENTRY.pack(idx, rho) for idx, rho in sorted(self._sparse.items())
+            )
+        return _HEADER.pack(_FORMAT_VERSION, self.b, self.hash_id, _DENSE) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        version, b, hash_id, kind = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"不支持的 HLL 序列化版本: {version}")
+        hll = cls(b=b)
+        hll.hash_id = hash_id
+        payload = memoryview(data)[_HEADER.size:]
+        if kind == _DENSE:
+            if len(payload) != hll.m:
+                raise ValueError("HLL 稠密寄存器长度不匹配")
+            hll._dense = bytearray(payload)
+            hll._sparse = None
+        else:
+            hll._sparse = {idx: rho for idx, rho in _SPARSE_ENTRY.iter_unpack(payload)}
+            if len(hll._sparse) > hll.m >> 2:
+                hll._densify()
+        return hll
+
+
+def _max_registers(a: bytearray, b: bytearray) -> bytes:
+    """逐字节取最大值"""
+    if _HAS_NUMPY:
+        return np.maximum(np.frombuffer(a, dtype=np.uint8), np.frombuffer(b, dtype=np.uint8)).tobytes()
+    return bytes(map(max, a, b))
+
+
 class GlobalHLL:
     """全局 HLL 管理器"""
     _instances: dict[str, HyperLogLog] = {}
@@ -1,6 +1,14 @@
 import hashlib
 import re
-from typing import List, Dict, Set, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    np = None
+    _HAS_NUMPY = False
+
 
 class SimHash:
     """
@@ -19,11 +27,49 @@ class SimHash:
         """从文本生成 SimHash 指纹"""
         if not text:
             return 0
-        
+        return self.build_fingerprints([text])[0]
+
+    def build_fingerprints(self, texts: Sequence[str]) -> List[int]:
+        """
+        批量生成 SimHash 指纹 (结果与逐条计算一致)
+
+        NumPy 可用时，所有文本的特征哈希拼成一个 (特征数, f) 的位矩阵，
+        按权重转为 ±w 后按文本分段求和，一次得到全部指纹；否则逐条按位累加。
+        """
         # 1. 分词与权重复现 (这里使用简单的 n-gram 或分词)
-        features = self._extract_features(text)
-        
-        # 2. 累加权重位
+        feature_sets = [self._extract_features(t) if t else {} for t in texts]
+        if not _HAS_NUMPY or self.f > 64:
+            return [self._fold(features) for features in feature_sets]
+
+        keys: List[str] = []
+        weights: List[int] = []
+        counts = np.zeros(len(feature_sets), dtype=np.int64)
+        for row, features in enumerate(feature_sets):
+            keys.extend(features)
+            weights.extend(features.values())
+            counts[row] = len(features)
+        if not keys:
+            return [0] * len(feature_sets)
+
+        # 2. MD5 低 64 位 (与 _hash 一致) -> 小端字节 -> 位矩阵，第 i 列即第 i 位
+        digests = b"".join(hashlib.md5(k.encode('utf-8')).digest() for k in keys)
+        low = np.frombuffer(digests, dtype='>u8')[1::2].astype('<u8')
+        bits = np.unpackbits(low.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')[:, :self.f]
+
+        # 3. 累加带符号权重位 (特征按文本连续排列，reduceat 分段求和)
+        signed = bits.astype(np.int64) * 2 - 1
+        signed *= np.asarray(weights, dtype=np.int64)[:, None]
+        nonempty = np.flatnonzero(counts)
+        starts = (np.cumsum(counts) - counts)[nonempty]
+        sums = np.zeros((len(feature_sets), 64), dtype=np.int64)
+        sums[nonempty, :self.f] = np.add.reduceat(signed, starts, axis=0)
+
+        # 4. 降维
+        packed = np.packbits(sums > 0, axis=1, bitorder='little')
+        return packed.view('<u8').ravel().tolist()
+
+    def _fold(self, features: Dict[str, int]) -> int:
+        """纯 Python 按位累加 (无 NumPy 时的回退路径)"""
         v = [0] * self.f
         for feature, weight in features.items():
             h = self._hash(feature)
@@ -32,13 +78,12 @@ class SimHash:
                     v[i] += weight
                 else:
                     v[i] -= weight
-                    
-        # 3. 降维
+
         fingerprint = 0
         for i in range(self.f):
             if v[i] > 0:
                 fingerprint |= (1 << i)
-                
+
         return fingerprint
 
     def _hash(self, source: str) -> int:
@@ -87,65 +132,122 @@ class SimHash:
         dist = self.hamming_distance(f1, f2)
         return 1.0 - (dist / self.f)
 
-class SimHashIndex:
+if _HAS_NUMPY:
+    _POPCOUNT_LUT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(val: int, fps: "np.ndarray") -> "np.ndarray":
+    """向量化计算 val 与 uint64 指纹数组中每一项的海明距离"""
+    x = np.bitwise_xor(fps, np.uint64(val))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    return _POPCOUNT_LUT[x.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class FingerprintRing:
     """
-    SimHash 索引优化
-    使用分段搜索法加速海明距离匹配 (64位分为4段)
+    定长 SimHash 指纹环形缓冲 (NumPy)
+
+    以 uint64 指纹数组 + 文本长度数组存储最近 capacity 条指纹，写满后覆盖最旧项。
+    nearest() 对整个窗口做一次向量化 XOR + popcount，比对窗口可从百级提升到万级。
+    trim() 收缩窗口，discard() 以长度 -1 标记删除 (不再参与比对)。
     """
-    def __init__(self, k: int = 3, f: int = 64):
+
+    def __init__(self, capacity: int = 20000, f: int = 64):
+        if not _HAS_NUMPY:
+            raise RuntimeError("FingerprintRing 需要 numpy")
+        self.capacity = max(1, int(capacity))
+        self.f = f
+        self._fps = np.zeros(self.capacity, dtype=np.uint64)
+        self._lens = np.zeros(self.capacity, dtype=np.int32)
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, fp: int, length: int = 0) -> None:
+        """追加一条指纹 (length 为清洗后文本长度，用于长度剪枝；0 表示未知)"""
+        self._fps[self._head] = fp
+        self._lens[self._head] = length
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _newest_index(self) -> "np.ndarray":
+        """窗口内各条目在数组中的下标 (从新到旧)"""
+        return (self._head - 1 - np.arange(self._count)) % self.capacity
+
+    def trim(self, max_len: int) -> None:
+        """只保留最新的 max_len 条 (容量配置调小时收缩窗口)"""
+        if self._count > max_len:
+            self._count = max(0, int(max_len))
+
+    def discard(self, fp: int) -> int:
+        """删除窗口内所有等于 fp 的指纹，返回删除条数"""
+        idx = self._newest_index()
+        idx = idx[(self._fps[idx] == np.uint64(fp)) & (self._lens[idx] >= 0)]
+        self._lens[idx] = -1
+        return len(idx)
+
+    def nearest(
+        self,
+        fp: int,
+        length: int = 0,
+        threshold: float = 0.0,
+        max_checks: Optional[int] = None,
+    ) -> Tuple[Optional[int], float, int]:
         """
-        Args:
-            k: 最大容忍海明距离 (默认 3 为高度相似)
-            f: 指纹位数
+        从新到旧查找第一条相似度 >= threshold 的指纹。
+
+        语义与逐条比对一致: 长度差异使相似度上限低于阈值的条目被剪枝且不计入比对次数，
+        最多比对 max_checks 条。
+
+        Returns:
+            (命中的指纹 或 None, 相似度, 实际比对次数)
         """
-        self.k = k
-        self.f = f
-        self.bucket_size = k + 1
-        self.buckets: List[Dict[int, Set[Tuple[str, int]]]] = [{} for _ in range(self.bucket_size)]
-
-    def _get_keys(self, val: int) -> List[int]:
-        """将指纹分为 k+1 段作为搜索键"""
-        keys = []
-        bits_per_segment = self.f // self.bucket_size
-        mask = (1 << bits_per_segment) - 1
-        for i in range(self.bucket_size):
-            shift = i * bits_per_segment
-            keys.append((val >> shift) & mask)
-        return keys
-
-    def add(self, obj_id: str, val: int) -> None:
-        """添加指纹到索引"""
-        keys = self._get_keys(val)
-        for i, key in enumerate(keys):
-            if key not in self.buckets[i]:
-                self.buckets[i][key] = set()
-            self.buckets[i][key].add((obj_id, val))
-
-    def search(self, val: int) -> List[str]:
-        """搜索相似的内容"""
-        keys = self._get_keys(val)
-        candidates = set()
-        for i, key in enumerate(keys):
-            if key in self.buckets[i]:
-                candidates.update(self.buckets[i][key])
-        
-        results = []
-        for obj_id, other_val in candidates:
-            dist = SimHash.hamming_distance(val, other_val)
-            if dist <= self.k:
-                results.append(obj_id)
-        return results
-
-    def remove(self, obj_id: str, val: int) -> None:
-        """从索引中移除"""
-        keys = self._get_keys(val)
-        for i, key in enumerate(keys):
-            if key in self.buckets[i]:
-                self.buckets[i][key].discard((obj_id, val))
-                if not self.buckets[i][key]:
-                    del self.buckets[i][key]
+        if not self._count:
+            return None, 0.0, 0
+
+        idx = self._newest_index()
+        fps = self._fps[idx]
+        prev = self._lens[idx]
+        valid = prev >= 0
+        if length > 0:
+            upper = np.minimum(prev, length) / np.maximum(prev, length)
+            valid &= (prev == 0) | (upper >= threshold)
+        if max_checks is not None:
+            valid &= np.cumsum(valid) <= max_checks
+
+        candidates = fps[valid]
+        sims = 1.0 - hamming_distances(fp, candidates) / float(self.f)
+        hits = np.flatnonzero(sims >= threshold)
+        if not len(hits):
+            return None, 0.0, len(candidates)
+        first = int(hits[0])
+        return int(candidates[first]), float(sims[first]), first + 1
+
+    def to_state(self) -> Dict[str, Any]:
+        """导出为可 JSON 序列化的状态 (从旧到新)"""
+        idx = self._newest_index()[::-1]
+        idx = idx[self._lens[idx] >= 0]
+        fps, lens = self._fps[idx], self._lens[idx]
+        return {"capacity": self.capacity, "fps": fps.tolist(), "lens": lens.tolist()}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], capacity: Optional[int] = None) -> "FingerprintRing":
+        ring = cls(capacity=capacity or state.get("capacity", 20000))
+        for fp, length in zip(state.get("fps", []), state.get("lens", [])):
+            ring.add(int(fp), int(length))
+        return ring
+
 
 # Helper function for backward compatibility and ease of use
 def compute_simhash(text: str, f: int = 64) -> int:
     """计算 SimHash 指纹 (快捷函数)"""
     return SimHash(f).build_fingerprint(text)
+
+
+def compute_simhash_batch(texts: Sequence[str], f: int = 64) -> List[int]:
+    """批量计算 SimHash 指纹 (快捷函数)"""
+    return SimHash(f).build_fingerprints(texts)
@@ -1,90 +1,194 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple, Union
+import asyncio
 import logging
+import threading
 from datetime import datetime, timedelta
 from core.helpers.lazy_import import LazyImport
 duckdb = LazyImport("duckdb")
 from core.config import settings
-from repositories.archive_store import ARCHIVE_ROOT, _configure_httpfs_and_s3
+from repositories.archive_store import ARCHIVE_ROOT, _configure_httpfs_and_s3, search_text_index
+from core.archive.executor import DuckDBExecutor, QueryTimeoutError
 
 logger = logging.getLogger(__name__)
 
 class UnifiedQueryBridge:
-    """热冷统一查询桥接器，使用 DuckDB 联邦查询 SQLite 和 Parquet。"""
+    """热冷统一查询桥接器，使用 DuckDB 联邦查询 SQLite 和 Parquet。
+
+    查询经 DuckDBExecutor 在专用线程池中执行 (超时中断、并发上限)，不阻塞事件循环。
+    """
 
     def __init__(self):
         self.db_path = str(settings.DB_PATH.replace("sqlite+aiosqlite:///", "")).replace("\\", "/")
         self.archive_root = str(ARCHIVE_ROOT).replace("\\", "/")
         self._con = None
+        self._con_lock = threading.Lock()
+        self._executor: Optional[DuckDBExecutor] = None
 
     def _get_connection(self):
+        """根连接 (懒初始化)；查询线程从它派生各自的游标"""
         if self._con is None:
-            self._con = duckdb.connect(database=':memory:')
-            # 配置 S3/HTTP 访问
-            _configure_httpfs_and_s3(self._con)
-            # 安装并加载 sqlite 扩展
-            self._con.execute("INSTALL sqlite; LOAD sqlite;")
+            with self._con_lock:
+                if self._con is None:
+                    con = duckdb.connect(database=':memory:')
+                    # 配置 S3/HTTP 访问
+                    _configure_httpfs_and_s3(con)
+                    # 安装并加载 sqlite 扩展
+                    con.execute("INSTALL sqlite; LOAD sqlite;")
+                    self._con = con
         return self._con
 
-    async def query_aggregate(
-        self,
-        table_name: str,
-        sql_template: str,
-        params: List[Any] = None,
-        use_hot: bool = True,
-        use_cold: bool = True
-    ) -> List[Dict[str, Any]]:
-        """跨热冷数据库执行聚合查询 (如 COUNT, SUM)"""
-        con = self._get_connection()
-        params = params or []
-        
+    @property
+    def executor(self) -> DuckDBExecutor:
+        """查询执行池 (懒创建)"""
+        if self._executor is None:
+            self._executor = DuckDBExecutor(
+                self._get_connection,
+                max_workers=settings.ARCHIVE_QUERY_WORKERS,
+                timeout=settings.ARCHIVE_QUERY_TIMEOUT,
+                batch_rows=settings.ARCHIVE_QUERY_BATCH_ROWS,
+            )
+        return self._executor
+
+    async def _build_query(
+        self, table_name: str, sql_template: str, use_hot: bool, use_cold: bool
+    ) -> Tuple[Optional[str], bool]:
+        """
+        生成联邦查询 SQL。
+
+        Returns:
+            (最终 SQL, 是否包含冷数据)；无可用数据源时 SQL 为 None
+        """
         sqlite_table = f"sqlite_scan('{self.db_path}', '{table_name}')"
         parquet_path = f"{self.archive_root}/{table_name}/**/*.parquet"
-        
-        # 确定可用数据源
+
+        # 确定可用数据源 (本地递归 glob 可能很慢，放到线程中执行)
         has_cold = False
         if use_cold:
             if self.archive_root.startswith("s3://") or "://" in self.archive_root:
                 has_cold = True
             else:
                 import glob
-                if glob.glob(parquet_path, recursive=True):
+                if await asyncio.to_thread(glob.glob, parquet_path, recursive=True):
                     has_cold = True
-        
-        if not use_hot and not has_cold:
-            # 如果请求了冷库但没有文件，且没请求热库，直接返回空
-            if use_cold and not use_hot:
-                return []
-            # 如果既没请求热库也没请求冷库
-            if not use_hot and not use_cold:
-                return []
-            # 其他情况（如只请求了热库但 use_hot=False，其实已经包含在上面了）
-            return []
 
-        combined_table = ""
         if use_hot and has_cold:
             combined_table = f"(SELECT * FROM {sqlite_table} UNION ALL BY NAME SELECT * FROM read_parquet('{parquet_path}', union_by_name=true))"
         elif use_hot:
             combined_table = sqlite_table
         elif has_cold:
             combined_table = f"read_parquet('{parquet_path}', union_by_name=true)"
-        
-        final_query = sql_template.replace("{table}", combined_table)
-        
+        else:
+            # 未请求热库且冷库无文件
+            return None, False
+
+        return sql_template.replace("{table}", combined_table), has_cold
+
+    async def query_aggregate(
+        self,
+        table_name: str,
+        sql_template: str,
+        params: List[Any] = None,
+        use_hot: bool = True,
+        use_cold: bool = True,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """跨热冷数据库执行聚合查询 (如 COUNT, SUM)"""
+        params = params or []
+        final_query, has_cold = await self._build_query(table_name, sql_template, use_hot, use_cold)
+        if final_query is None:
+            return []
+
         try:
             if settings.ARCHIVE_QUERY_DEBUG:
                 logger.debug(f"[UnifiedQueryBridge] Aggregate SQL: {final_query} | Params: {params}")
-            
-            res = con.execute(final_query, params).fetchall()
-            cols = [desc[0] for desc in con.description]
-            return [dict(zip(cols, row)) for row in res]
+
+            return await self.executor.fetch_dicts(final_query, params, timeout=timeout)
+        except QueryTimeoutError as e:
+            # 超时不再降级重试，避免把一次慢查询放大为两次
+            logger.warning(f"[UnifiedQueryBridge] {e}")
+            return []
         except Exception as e:
             logger.error(f"[UnifiedQueryBridge] 聚合查询失败: {e}", exc_info=True)
             # 降级：如果联合查询失败，尝试仅热数据 (仅当允许热数据且之前尝试过联合查询时)
             if use_cold and use_hot and has_cold:
                 logger.info("[UnifiedQueryBridge] 聚合联合查询失败，降级为仅热数据...")
-                return await self.query_aggregate(table_name, sql_template, params, use_hot=True, use_cold=False)
+                return await self.query_aggregate(table_name, sql_template, params, use_hot=True, use_cold=False, timeout=timeout)
+            return []
+
+    async def stream_aggregate(
+        self,
+        table_name: str,
+        sql_template: str,
+        params: List[Any] = None,
+        use_hot: bool = True,
+        use_cold: bool = True,
+        batch_rows: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        跨热冷流式查询，逐个产出 pyarrow.RecordBatch (适合导出等大结果集)。
+        与 query_aggregate 不同，失败时直接抛出异常，由调用方决定如何处理。
+        """
+        final_query, _ = await self._build_query(table_name, sql_template, use_hot, use_cold)
+        if final_query is None:
+            return
+        if settings.ARCHIVE_QUERY_DEBUG:
+            logger.debug(f"[UnifiedQueryBridge] Stream SQL: {final_query} | Params: {params}")
+        async for batch in self.executor.stream(final_query, params or [], batch_rows=batch_rows, timeout=timeout):
+            yield batch
+
+    async def close(self) -> None:
+        """关闭查询线程池与根连接"""
+        if self._executor is not None:
+            await self._executor.close()
+        con, self._con = self._con, None
+        if con is not None:
+            try:
+                con.close()
+            except Exception:
+                pass
+
+    async def search_cold_text(
+        self,
+        table_name: str,
+        match: str,
+        limit: int = 50,
+        after: Optional[Tuple[str, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        冷数据全文检索：查询各分区的 FTS sidecar 取得 (created_at, id)，再按分区回表读取 Parquet 行。
+
+        Returns:
+            按 (created_at, id) 由新到旧的行字典列表 (含排序键 sort_ts)
+        """
+        hits, unindexed = await asyncio.to_thread(search_text_index, table_name, match, limit, after)
+        if unindexed:
+            logger.debug(f"[UnifiedQueryBridge] {len(unindexed)} 个 {table_name} 分区缺少全文索引，已跳过")
+        if not hits:
             return []
 
+        ids_by_partition: Dict[str, List[int]] = {}
+        for _ts, row_id, part_dir in hits:
+            ids_by_partition.setdefault(part_dir, []).append(row_id)
+
+        rows_by_id: Dict[int, Dict[str, Any]] = {}
+        for part_dir, ids in ids_by_partition.items():
+            pattern = f"{part_dir}/*.parquet".replace("\\", "/").replace("'", "''")
+            placeholders = ", ".join("?" * len(ids))
+            sql = f"SELECT * FROM read_parquet('{pattern}', union_by_name=true) WHERE id IN ({placeholders})"
+            try:
+                for row in await self.executor.fetch_dicts(sql, ids):
+                    rows_by_id.setdefault(row["id"], row)
+            except Exception as e:
+                logger.warning(f"[UnifiedQueryBridge] 冷数据回表失败 {part_dir}: {e}")
+
+        results = []
+        for ts, row_id, _part_dir in hits:
+            row = rows_by_id.pop(row_id, None)
+            if row is not None:
+                results.append({**row, "sort_ts": ts})
+        return results
+
     async def query_unified(
         self,
         table_name: str,
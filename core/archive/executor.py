@@ -0,0 +1,352 @@
+"""
+DuckDB 查询执行池 (DuckDB Query Executor)
+
+DuckDB 的 execute/fetch 是同步阻塞调用，直接在事件循环上执行会冻结
+Telegram 监听、Worker 与 Web 管理端。本模块把查询放到专用线程池：
+- 每个工作线程持有从根连接派生的独立游标 (DuckDB 连接不可跨线程并发使用)
+- 异步信号量限制同时执行的查询数，超出的查询在事件循环上排队 (不占线程)
+- 超时或调用方取消时对执行中的游标调用 interrupt()，线程随即释放
+- 结果以 Arrow RecordBatch 形式流式读取，行字典转换也在工作线程中完成
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    _HAS_ARROW = True
+except ImportError:  # pragma: no cover - pyarrow 为 requirements 依赖
+    pa = None
+    _HAS_ARROW = False
+
+from core.helpers.metrics import ARCHIVE_QUERY_SECONDS, ARCHIVE_QUERY_TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimeoutError(asyncio.TimeoutError):
+    """归档查询超时 (执行中的查询已被中断)"""
+
+
+class _Cancelled(Exception):
+    """查询在开始执行前已被取消"""
+
+
+class _QueryHandle:
+    """单次查询的取消句柄：记录执行游标，取消时中断之"""
+
+    __slots__ = ("cursor", "cancelled", "_lock")
+
+    def __init__(self):
+        self.cursor = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def bind(self, cursor) -> bool:
+        """工作线程开始执行前登记游标；已取消时返回 False"""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self.cursor = cursor
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.cursor = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            cursor = self.cursor
+        if cursor is not None:
+            try:
+                cursor.interrupt()
+            except Exception as e:
+                logger.debug(f"[DuckDBExecutor] 中断查询失败: {e}")
+
+
+class _StreamCursor:
+    """流式查询的独立游标；关闭与工作线程中的读取互斥，避免并发操作同一游标"""
+
+    def __init__(self, connect: Callable[[], Any], sql: str, params: Sequence[Any], batch_rows: int):
+        self._connect = connect
+        self.sql = sql
+        self.params = params
+        self.batch_rows = batch_rows
+        self.cursor = None
+        self.reader = None
+        self._busy = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _enter(self, handle: _QueryHandle) -> None:
+        with self._lock:
+            if self._closed:
+                raise _Cancelled()
+            self._busy = True
+
+    def _exit(self, handle: _QueryHandle) -> None:
+        handle.release()
+        with self._lock:
+            self._busy = False
+            if self._closed:
+                self._close_cursor()
+
+    def open(self, handle: _QueryHandle) -> None:
+        self._enter(handle)
+        try:
+            self.cursor = self._connect().cursor()
+            DuckDBExecutor._execute(self.cursor, handle, self.sql, self.params)
+            self.reader = self.cursor.fetch_record_batch(self.batch_rows)
+        finally:
+            self._exit(handle)
+
+    def next_batch(self, handle: _QueryHandle):
+        self._enter(handle)
+        try:
+            if not handle.bind(self.cursor):
+                raise _Cancelled()
+            try:
+                return self.reader.read_next_batch()
+            except StopIteration:
+                return None
+        finally:
+            self._exit(handle)
+
+    def close(self) -> None:
+        """关闭游标；读取仍在进行 (已被中断) 时由工作线程在读取结束后关闭"""
+        with self._lock:
+            self._closed = True
+            if not self._busy:
+                self._close_cursor()
+
+    def _close_cursor(self) -> None:
+        cursor, self.cursor, self.reader = self.cursor, None, None
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+class DuckDBExecutor:
+    """
+    事件循环外的 DuckDB 查询执行器
+
+    Args:
+        connect: 返回根连接的回调 (在工作线程中调用，可执行 INSTALL/LOAD 等阻塞操作)
+        max_workers: 工作线程数 (即同时执行的查询上限)
+        timeout: 默认查询超时秒数 (<= 0 表示不限)
+        batch_rows: 流式读取时每个 RecordBatch 的行数
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_workers: int = 2,
+        timeout: float = 30.0,
+        batch_rows: int = 10000,
+    ):
+        self._connect = connect
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.batch_rows = max(1, int(batch_rows))
+
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        # 根连接代次：reset() 后各线程游标失效并重新派生
+        self._generation = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    # ------------------------------------------------------------------
+    # 线程池与游标
+    # ------------------------------------------------------------------
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="duckdb-query")
+        return self._pool
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """信号量绑定到当前事件循环 (测试或重启时循环可能更换)"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._loop = loop
+        return self._semaphore
+
+    def _thread_cursor(self):
+        """当前工作线程的复用游标"""
+        local = self._local
+        if getattr(local, "generation", None) != self._generation or local.cursor is None:
+            local.cursor = self._connect().cursor()
+            local.generation = self._generation
+        return local.cursor
+
+    def reset(self) -> None:
+        """根连接被替换后调用，使各线程游标在下次使用时重新派生"""
+        self._generation += 1
+
+    # ------------------------------------------------------------------
+    # 调度
+    # ------------------------------------------------------------------
+    async def _submit(self, job: Callable[[_QueryHandle], Any], timeout: Optional[float], label: str) -> Any:
+        """在线程池中执行 job(handle)，带并发上限、超时与取消"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout and timeout > 0 else None
+        handle = _QueryHandle()
+        semaphore = self._get_semaphore()
+        loop = asyncio.get_running_loop()
+
+        self.queued += 1
+        try:
+            try:
+                if deadline is None:
+                    await semaphore.acquire()
+                else:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+            finally:
+                self.queued -= 1
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            ARCHIVE_QUERY_TOTAL.labels(status="timeout").inc()
+            raise QueryTimeoutError(f"归档查询排队超时 ({timeout}s): {label}")
+
+        start = time.perf_counter()
+        self.active += 1
+        try:
+            future = loop.run_in_executor(self._get_pool(), job, handle)
+            # 超时/取消后线程仍会结束并设置结果，提前取走异常以免产生未检索告警
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+            except asyncio.TimeoutError:
+                handle.cancel()
+                self.timeouts += 1
+                ARCHIVE_QUERY_TOTAL.labels(status="timeout").inc()
+                raise QueryTimeoutError(f"归档查询超时 ({timeout}s)，已中断: {label}")
+            except asyncio.CancelledError:
+                handle.cancel()
+                self.cancelled += 1
+                ARCHIVE_QUERY_TOTAL.labels(status="cancelled").inc()
+                raise
+            except Exception:
+                self.failed += 1
+                ARCHIVE_QUERY_TOTAL.labels(status="error").inc()
+                raise
+            self.completed += 1
+            ARCHIVE_QUERY_TOTAL.labels(status="ok").inc()
+            ARCHIVE_QUERY_SECONDS.observe(time.perf_counter() - start)
+            return result
+        finally:
+            self.active -= 1
+            semaphore.release()
+
+    # ------------------------------------------------------------------
+    # 工作线程内执行
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _execute(cursor, handle: _QueryHandle, sql: str, params: Sequence[Any]):
+        if not handle.bind(cursor):
+            raise _Cancelled()
+        try:
+            return cursor.execute(sql, list(params or []))
+        except BaseException:
+            handle.release()
+            raise
+
+    @staticmethod
+    def _to_dicts(cursor) -> List[Dict[str, Any]]:
+        if _HAS_ARROW:
+            return cursor.fetch_arrow_table().to_pylist()
+        rows = cursor.fetchall()
+        cols = [desc[0] for desc in cursor.description or ()]
+        return [dict(zip(cols, row)) for row in rows]
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+    async def fetch_dicts(
+        self, sql: str, params: Sequence[Any] = (), timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """执行查询并返回行字典列表 (经 Arrow 列式结果在工作线程内转换)"""
+
+        def job(handle: _QueryHandle):
+            cursor = self._thread_cursor()
+            self._execute(cursor, handle, sql, params)
+            try:
+                return self._to_dicts(cursor)
+            finally:
+                handle.release()
+
+        return await self._submit(job, timeout, sql[:120])
+
+    async def fetch_arrow(self, sql: str, params: Sequence[Any] = (), timeout: Optional[float] = None):
+        """执行查询并返回 pyarrow.Table"""
+        if not _HAS_ARROW:
+            raise RuntimeError("pyarrow 未安装，无法返回 Arrow 结果")
+
+        def job(handle: _QueryHandle):
+            cursor = self._thread_cursor()
+            self._execute(cursor, handle, sql, params)
+            try:
+                return cursor.fetch_arrow_table()
+            finally:
+                handle.release()
+
+        return await self._submit(job, timeout, sql[:120])
+
+    async def stream(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        batch_rows: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        流式读取查询结果，逐个产出 pyarrow.RecordBatch。
+
+        流使用独立游标 (读取期间线程游标可被其它查询复用)；timeout 约束每个批次的等待时间。
+        迭代提前结束或被取消时中断查询并关闭游标。
+        """
+        if not _HAS_ARROW:
+            raise RuntimeError("pyarrow 未安装，无法流式读取 Arrow 结果")
+        stream = _StreamCursor(self._connect, sql, params, batch_rows or self.batch_rows)
+        try:
+            await self._submit(stream.open, timeout, sql[:120])
+            while True:
+                batch = await self._submit(stream.next_batch, timeout, sql[:120])
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            stream.close()
+
+    async def close(self) -> None:
+        """关闭线程池 (不等待执行中的查询结束)"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.reset()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+        }
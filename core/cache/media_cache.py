@@ -0,0 +1,334 @@
+"""内容寻址的本地媒体缓存。
+
+按 Telegram 文档/照片 ID + 尺寸类别寻址，同一文件被多个聊天转发、被多条规则
+命中或被多个下载点使用时，在缓存窗口内只从 Telegram 下载一次。
+
+目录结构::
+
+    <root>/<digest>/<原始文件名>    已完成条目 (每个目录恰好一个文件)
+    <root>/.tmp/<uuid>/...          下载中，完成后整目录原子 rename 为 <digest>
+
+- 调用方拿到的是缓存文件的硬链接 (跨设备时退化为复制)，可自行删除，不影响缓存
+- 同一文件的并发请求共享一次进行中的下载
+- 按字节预算 LRU 淘汰；启动时在线程中扫描目录重建索引并清理未完成的下载
+- 导出文件名冲突时与 Telethon 一致：显式指定 file_name 时覆盖，否则追加 " (n)" 后缀
+
+用法::
+
+    path = await get_media_cache().fetch(message, TEMP_DIR)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from core.helpers.metrics import MEDIA_CACHE_REQUESTS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+_TMP_DIR = ".tmp"
+
+
+def media_key(message: Any, thumb: Any = None) -> Optional[str]:
+    """文档/照片 ID + 尺寸类别；无法确定唯一 ID 的媒体 (网页预览、位置等) 返回 None"""
+    media = getattr(message, "media", None)
+    size_class = "full" if thumb is None else f"thumb:{thumb}"
+    for kind in ("document", "photo"):
+        obj = getattr(message, kind, None) or getattr(media, kind, None)
+        obj_id = getattr(obj, "id", None)
+        if isinstance(obj_id, int) and not isinstance(obj_id, bool):
+            return f"{kind}:{obj_id}:{size_class}"
+    return None
+
+
+def _unique_path(dest_dir: str, name: str) -> str:
+    path = os.path.join(dest_dir, name)
+    if not os.path.exists(path):
+        return path
+    stem, ext = os.path.splitext(name)
+    n = 1
+    while True:
+        path = os.path.join(dest_dir, f"{stem} ({n}){ext}")
+        if not os.path.exists(path):
+            return path
+        n += 1
+
+
+def _link_or_copy(src: str, dest_dir: str, file_name: Optional[str]) -> str:
+    """导出到 dest_dir：指定 file_name 时覆盖同名文件，否则取不冲突的文件名"""
+    os.makedirs(dest_dir, exist_ok=True)
+    if not file_name:
+        dst = _unique_path(dest_dir, os.path.basename(src))
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+        return dst
+
+    dst = os.path.join(dest_dir, os.path.basename(file_name))
+    # 先写到临时名再原子替换，读者不会看到半写的文件
+    tmp = os.path.join(dest_dir, f".{uuid.uuid4().hex}.part")
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return dst
+
+
+class MediaCache:
+    def __init__(self, root: str | Path, max_bytes: int, enabled: bool = True):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        # digest -> (缓存文件路径, 字节数)，按最近使用排序
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    # ---- 索引 ----
+
+    def _scan(self) -> list:
+        """扫描缓存目录 (阻塞 I/O)：清理未完成的下载与残缺条目，返回 [(mtime, digest, 路径, 字节数)]"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        shutil.rmtree(self.root / _TMP_DIR, ignore_errors=True)
+
+        found = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            files = [f for f in os.scandir(entry.path) if f.is_file()]
+            if len(files) != 1:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            st = files[0].stat()
+            found.append((st.st_mtime, entry.name, files[0].path, st.st_size))
+        return found
+
+    def recover(self) -> int:
+        """扫描目录重建索引，按 mtime 恢复 LRU 顺序 (阻塞调用；事件循环中请使用 load)"""
+        return self._apply(self._scan())
+
+    async def load(self) -> int:
+        """在线程中扫描目录、在事件循环中重建索引；已加载时直接返回"""
+        if self._loaded:
+            return len(self._entries)
+        async with self._load_lock:
+            if not self._loaded:
+                self._apply(await asyncio.to_thread(self._scan))
+        return len(self._entries)
+
+    def _apply(self, found: list) -> int:
+        self._entries.clear()
+        self._bytes = 0
+        for _, digest, path, size in sorted(found):
+            self._entries[digest] = (path, size)
+            self._bytes += size
+        self._loaded = True
+        self._evict()
+        logger.info(f"媒体缓存已加载: {len(self._entries)} 个文件, {self._bytes} 字节")
+        return len(self._entries)
+
+    def _get(self, digest: str) -> Optional[str]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        self._entries.move_to_end(digest)
+        return entry[0]
+
+    def _drop(self, digest: str) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        shutil.rmtree(self.root / digest, ignore_errors=True)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """按 LRU 淘汰至预算内；keep 为刚写入、尚待导出的条目"""
+        for digest in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            self._drop(digest)
+            self.evictions += 1
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    # ---- 读取 ----
+
+    def lookup(self, message: Any, thumb: Any = None) -> Optional[str]:
+        """已缓存时返回缓存内路径 (只读，调用方不得删除或修改)，否则 None"""
+        key = media_key(message, thumb) if self.enabled else None
+        if key is None or not self._loaded:
+            # 索引尚未加载时按未命中处理，不在调用方线程中扫描目录
+            return None
+        path = self._get(self._digest(key))
+        if path is not None and not os.path.exists(path):
+            self._drop(self._digest(key))
+            return None
+        return path
+
+    async def fetch(
+        self,
+        message: Any,
+        dest_dir: str | Path,
+        client: Any = None,
+        file_name: Optional[str] = None,
+        thumb: Any = None,
+    ) -> Optional[str]:
+        """
+        获取消息媒体，返回调用方独占的文件路径 (位于 dest_dir，可自由删除)
+
+        Args:
+            client: 提供时使用 client.download_media(message)，否则 message.download_media()
+            file_name: 指定导出的文件名，默认沿用 Telegram 下载时的文件名
+        """
+        dest_dir = str(dest_dir)
+        key = media_key(message, thumb) if self.enabled else None
+        if key is None:
+            MEDIA_CACHE_REQUESTS_TOTAL.labels(result="bypass").inc()
+            target = os.path.join(dest_dir, file_name) if file_name else dest_dir
+            return await self._download(message, target, client, thumb)
+
+        await self.load()
+        digest = self._digest(key)
+        for _ in range(2):
+            path = await self._get_or_download(digest, message, client, file_name, thumb)
+            if path is None:
+                return None
+            try:
+                result = await asyncio.to_thread(_link_or_copy, path, dest_dir, file_name)
+            except FileNotFoundError:
+                # 缓存文件被外部删除，重新下载一次
+                self._drop(digest)
+                continue
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return result
+        return None
+
+    async def _get_or_download(
+        self, digest: str, message: Any, client: Any, file_name: Optional[str], thumb: Any
+    ) -> Optional[str]:
+        path = self._get(digest)
+        if path is not None:
+            self.hits += 1
+            MEDIA_CACHE_REQUESTS_TOTAL.labels(result="hit").inc()
+            return path
+
+        pending = self._inflight.get(digest)
+        if pending is not None:
+            self.shared += 1
+            MEDIA_CACHE_REQUESTS_TOTAL.labels(result="shared").inc()
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        MEDIA_CACHE_REQUESTS_TOTAL.labels(result="miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        try:
+            path = await self._fill(digest, message, client, file_name, thumb)
+            future.set_result(path)
+            return path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(digest, None)
+
+    async def _fill(
+        self, digest: str, message: Any, client: Any, file_name: Optional[str], thumb: Any
+    ) -> Optional[str]:
+        tmp = self.root / _TMP_DIR / uuid.uuid4().hex
+        tmp.mkdir(parents=True, exist_ok=True)
+        try:
+            target = str(tmp / os.path.basename(file_name)) if file_name else str(tmp)
+            downloaded = await self._download(message, target, client, thumb)
+            if not downloaded or not os.path.isfile(downloaded):
+                return None
+            name = os.path.basename(downloaded)
+            final_dir = self.root / digest
+            try:
+                # 整目录原子 rename：崩溃时只会留下 .tmp 下的残留
+                os.rename(tmp, final_dir)
+            except OSError:
+                if not (final_dir / name).is_file():
+                    raise
+            path = str(final_dir / name)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        size = os.path.getsize(path)
+        self._entries[digest] = (path, size)
+        self._entries.move_to_end(digest)
+        self._bytes += size
+        self._evict(keep=digest)
+        return path
+
+    @staticmethod
+    async def _download(message: Any, target: str, client: Any, thumb: Any) -> Optional[str]:
+        kwargs = {"thumb": thumb} if thumb is not None else {}
+        if client is not None:
+            return await client.download_media(message, file=target, **kwargs)
+        return await message.download_media(target, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
+
+
+_media_cache: Optional[MediaCache] = None
+
+
+def get_media_cache() -> MediaCache:
+    global _media_cache
+    if _media_cache is None:
+        from core.config import settings
+
+        _media_cache = MediaCache(
+            settings.MEDIA_CACHE_DIR,
+            settings.MEDIA_CACHE_MAX_BYTES,
+            enabled=settings.MEDIA_CACHE_ENABLED,
+        )
+    return _media_cache
@@ -4,15 +4,23 @@
     cache = get_persistent_cache()
     cache.set("key", "value", ttl=30)
     val = cache.get("key")
+
+    # 事件循环中使用异步门面 (在专用线程中执行，不阻塞事件循环)
+    acache = get_async_persistent_cache()
+    await acache.set_many({"a": "1", "b": "2"}, ttl=30)
+    vals = await acache.get_many(["a", "b"])
 """
 
 from __future__ import annotations
 
+import asyncio
 import sqlite3
+import threading
 
 import time
 import logging
-from typing import Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Mapping, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +40,24 @@ class BasePersistentCache:
     def clear(self) -> None:
         raise NotImplementedError
 
+    # 批量接口（默认逐键实现，后端可覆盖为单次往返）
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """批量读取，仅返回命中的键。"""
+        result: Dict[str, str] = {}
+        for key in keys:
+            val = self.get(key)
+            if val is not None:
+                result[key] = val
+        return result
+
+    def set_many(self, items: Mapping[str, str], ttl: int) -> None:
+        """批量写入，所有键使用相同 TTL。"""
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def close(self) -> None:
+        """释放连接等资源。默认无操作。"""
+
     # 统计/管理（可选实现）
     def delete_prefix(self, prefix: str) -> int:
         """删除指定前缀的键，返回删除数量。默认不实现。"""
@@ -65,6 +91,27 @@ class RedisPersistentCache(BasePersistentCache):
     def clear(self) -> None:
         self._client.flushdb()
 
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        vals = self._client.mget(keys)
+        return {k: v.decode("utf-8") for k, v in zip(keys, vals) if v is not None}
+
+    def set_many(self, items: Mapping[str, str], ttl: int) -> None:
+        if not items:
+            return
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(key, ttl, value)
+        pipe.execute()
+
+    def close(self) -> None:
+        try:
+            self._client.close()
+        except Exception:
+            pass
+
     def delete_prefix(self, prefix: str) -> int:
         try:
             count = 0
@@ -84,46 +131,124 @@ class RedisPersistentCache(BasePersistentCache):
             return 0
 
 
+# SQLite 单条语句的参数上限 (旧版本为 999)，批量读取按此分块
+_SQLITE_MAX_PARAMS = 900
+
+
 class SQLitePersistentCache(BasePersistentCache):
-    def __init__(self, db_path: str) -> None:
+    """
+    SQLite 持久化缓存
+
+    - 每个线程持有一个长连接 (autocommit)，语句由 sqlite3 语句缓存复用，
+      读取不再产生 connect 与写事务
+    - 过期在读取时判断 (expires_at >= now)，过期行由后台清理线程按
+      idx_expires 索引分批删除，每轮删除量有上限，避免与写入争锁
+    """
+
+    _GET_SQL = "SELECT value FROM kv_cache WHERE key = ? AND expires_at >= ?"
+    _SET_SQL = "REPLACE INTO kv_cache(key, value, expires_at) VALUES (?, ?, ?)"
+    _DELETE_SQL = "DELETE FROM kv_cache WHERE key = ?"
+    _SWEEP_SQL = (
+        "DELETE FROM kv_cache WHERE rowid IN "
+        "(SELECT rowid FROM kv_cache WHERE expires_at < ? LIMIT ?)"
+    )
+
+    def __init__(
+        self,
+        db_path: str,
+        sweep_interval: float = 60.0,
+        sweep_batch: int = 500,
+        sweep_max_batches: int = 20,
+    ) -> None:
         self._db_path = db_path
-        self._ensure_schema()
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = max(1, int(sweep_batch))
+        self.sweep_max_batches = max(1, int(sweep_max_batches))
+
+        self._local = threading.local()
+        # 连接代次：损坏恢复或 close() 后各线程连接失效并重建
+        self._generation = 0
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
 
-    def _conn(self):
-        conn = sqlite3.connect(self._db_path, timeout=30)
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.swept = 0
+
+        self._ensure_schema()
+        if sweep_interval and sweep_interval > 0:
+            self._start_sweeper()
+
+    # ------------------------------------------------------------------
+    # 连接管理
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False 仅用于 close()/损坏恢复时跨线程关闭，
+        # 正常读写中每个连接只被其所属线程使用
+        return sqlite3.connect(
+            self._db_path,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=64,
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """当前线程的长连接 (首次使用时创建并设置 PRAGMA)"""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None and local.generation == self._generation:
+            return conn
+
+        conn = self._connect()
         try:
             cur = conn.cursor()
             cur.execute("PRAGMA busy_timeout=30000")
             cur.execute("PRAGMA journal_mode=WAL")
             cur.execute("PRAGMA synchronous=NORMAL")
-            cur.execute("PRAGMA foreign_keys=ON")
         except sqlite3.DatabaseError:
             conn.close()
             if self._handle_corruption():
                 # Retry connection after reset
-                return sqlite3.connect(self._db_path, timeout=30)
-            raise
-        except Exception as e:
-            logger.warning(f'已忽略预期内的异常: {e}' if 'e' in locals() else '已忽略静默异常')
+                conn = self._connect()
+            else:
+                raise
+
+        local.conn = conn
+        local.generation = self._generation
+        with self._conns_lock:
+            self._conns.append(conn)
         return conn
 
+    def _reset_connections(self) -> None:
+        """关闭所有线程的连接，各线程下次访问时重新建立"""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+            self._generation += 1
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
     def _handle_corruption(self) -> bool:
         """Handle database corruption by deleting the file."""
         import os
-        
+
         try:
             logger.error(f"❌ SQLite Cache Corruption Detected: {self._db_path}")
+            self._reset_connections()
             if os.path.exists(self._db_path):
                 # Try to backup? No, cache is disposable.
                 os.remove(self._db_path)
                 logger.warning(f"🧹 Corrupted cache file deleted: {self._db_path}")
-            
+
             # Clean up SHM/WAL files if they exist
             for ext in ["-shm", "-wal"]:
                 p = f"{self._db_path}{ext}"
                 if os.path.exists(p):
                     os.remove(p)
-            
+
             # Re-initialize schema
             self._ensure_schema()
             logger.info("✅ Cache database re-initialized successfully.")
@@ -136,15 +261,7 @@ class SQLitePersistentCache(BasePersistentCache):
         try:
             conn = self._conn()
         except sqlite3.DatabaseError:
-            # If _conn fails even after retry logic (recursive risk if not careful, but _conn handles it once)
-            # Actually _conn calls _handle_corruption which calls _ensure_schema... recursion risk!
-            # We need to break recursion. 
-            # Simple way: _conn calls sqlite3.connect. If that fails, it's OS level.
-            # If PRAGMA fails with DatabaseError, _conn calls _handle_corruption.
-            # _handle_corruption deletes file and calls _ensure_schema.
-            # _ensure_schema calls _conn.
-            # The new file should be clean, so _conn PRAGMA should pass.
-            # So recursion depth = 1. Safe.
+            # _conn 遇到损坏时会删除文件并重建 (递归深度为 1)，仍失败说明是 OS 层问题
             return
 
         try:
@@ -161,137 +278,210 @@ class SQLitePersistentCache(BasePersistentCache):
             cur.execute(
                 "CREATE INDEX IF NOT EXISTS idx_expires ON kv_cache(expires_at)"
             )
-            conn.commit()
         except sqlite3.DatabaseError:
-            conn.close()
             self._handle_corruption()
-        finally:
-            conn.close()
 
+    def close(self) -> None:
+        """停止清理线程并关闭所有连接"""
+        self._stop.set()
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None and sweeper is not threading.current_thread():
+            sweeper.join(timeout=5)
+        self._reset_connections()
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
     def get(self, key: str) -> Optional[str]:
-        now = int(time.time())
         try:
-            conn = self._conn()
-        except Exception: 
-            return None
-
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "DELETE FROM kv_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
-                (now,),
-            )
-            conn.commit()
-            cur.execute("SELECT value FROM kv_cache WHERE key = ?", (key,))
-            row = cur.fetchone()
+            row = self._conn().execute(self._GET_SQL, (key, int(time.time()))).fetchone()
             return row[0] if row else None
         except sqlite3.DatabaseError:
-            # If error happens during query (even if connect worked)
-            conn.close()
             self._handle_corruption()
             return None
-        finally:
-            conn.close()
+        except Exception:
+            return None
 
-    def set(self, key: str, value: str, ttl: int) -> None:
-        expires_at = int(time.time()) + max(1, int(ttl))
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = int(time.time())
+        result: Dict[str, str] = {}
         try:
             conn = self._conn()
+            for i in range(0, len(keys), _SQLITE_MAX_PARAMS):
+                chunk = keys[i:i + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value FROM kv_cache WHERE key IN ({placeholders}) AND expires_at >= ?",
+                    (*chunk, now),
+                ).fetchall()
+                result.update(rows)
+        except sqlite3.DatabaseError:
+            self._handle_corruption()
+            return {}
         except Exception:
-            return
+            return {}
+        return result
 
+    def set(self, key: str, value: str, ttl: int) -> None:
+        expires_at = int(time.time()) + max(1, int(ttl))
         try:
-            cur = conn.cursor()
-            cur.execute(
-                "REPLACE INTO kv_cache(key, value, expires_at) VALUES (?, ?, ?)",
-                (key, value, expires_at),
-            )
-            conn.commit()
+            self._conn().execute(self._SET_SQL, (key, value, expires_at))
         except sqlite3.DatabaseError:
-            conn.close()
             self._handle_corruption()
-        finally:
-            conn.close()
+        except Exception:
+            return
 
-    def delete(self, key: str) -> None:
+    def set_many(self, items: Mapping[str, str], ttl: int) -> None:
+        if not items:
+            return
+        expires_at = int(time.time()) + max(1, int(ttl))
         try:
             conn = self._conn()
         except Exception:
             return
 
         try:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM kv_cache WHERE key = ?", (key,))
-            conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    self._SET_SQL,
+                    ((key, value, expires_at) for key, value in items.items()),
+                )
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
         except sqlite3.DatabaseError:
-            conn.close()
             self._handle_corruption()
-        finally:
-            conn.close()
 
-    def clear(self) -> None:
-        conn = self._conn()
+    def delete(self, key: str) -> None:
         try:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM kv_cache")
-            conn.commit()
-        finally:
-            conn.close()
+            self._conn().execute(self._DELETE_SQL, (key,))
+        except sqlite3.DatabaseError:
+            self._handle_corruption()
+        except Exception:
+            return
 
-    def delete_prefix(self, prefix: str) -> int:
-        conn = self._conn()
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM kv_cache")
+
+    # ------------------------------------------------------------------
+    # 过期清理
+    # ------------------------------------------------------------------
+    def sweep(self, now: Optional[int] = None) -> int:
+        """
+        删除已过期的行，返回删除数量。
+
+        每批最多 sweep_batch 行 (走 idx_expires 索引)，每轮最多 sweep_max_batches 批；
+        批次之间释放写锁，让业务写入有机会插入。
+        """
+        now = int(time.time()) if now is None else now
+        total = 0
         try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT COUNT(*) FROM kv_cache WHERE key LIKE ?", (prefix + "%",)
-            )
-            row = cur.fetchone()
-            cnt = int(row[0]) if row else 0
-            cur.execute("DELETE FROM kv_cache WHERE key LIKE ?", (prefix + "%",))
-            conn.commit()
-            return cnt
-        finally:
-            conn.close()
+            conn = self._conn()
+            for _ in range(self.sweep_max_batches):
+                deleted = conn.execute(self._SWEEP_SQL, (now, self.sweep_batch)).rowcount
+                total += max(0, deleted)
+                if deleted < self.sweep_batch or self._stop.is_set():
+                    break
+                time.sleep(0)
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"[PersistentCache] 过期清理失败: {e}")
+        self.swept += total
+        return total
+
+    def _start_sweeper(self) -> None:
+        def _run() -> None:
+            while not self._stop.wait(self.sweep_interval):
+                try:
+                    deleted = self.sweep()
+                    if deleted:
+                        logger.debug(f"[PersistentCache] 清理过期缓存 {deleted} 条")
+                except Exception as e:
+                    logger.warning(f"[PersistentCache] 清理线程异常: {e}")
+
+        self._sweeper = threading.Thread(target=_run, name="persist-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    # ------------------------------------------------------------------
+    # 统计/管理
+    # ------------------------------------------------------------------
+    def delete_prefix(self, prefix: str) -> int:
+        cur = self._conn().execute("DELETE FROM kv_cache WHERE key LIKE ?", (prefix + "%",))
+        return max(0, cur.rowcount)
 
     def count_prefix(self, prefix: str) -> int:
-        conn = self._conn()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT COUNT(*) FROM kv_cache WHERE key LIKE ?", (prefix + "%",)
-            )
-            row = cur.fetchone()
-            return int(row[0]) if row else 0
-        finally:
-            conn.close()
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM kv_cache WHERE key LIKE ?", (prefix + "%",)
+        ).fetchone()
+        return int(row[0]) if row else 0
 
     def stat_prefix(self, prefix: str) -> dict:
-        conn = self._conn()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT COUNT(*), SUM(LENGTH(value)) FROM kv_cache WHERE key LIKE ?",
-                (prefix + "%",),
-            )
-            row = cur.fetchone()
-            return {
-                "count": int(row[0]) if row and row[0] is not None else 0,
-                "bytes": int(row[1]) if row and row[1] is not None else 0,
-            }
-        finally:
-            conn.close()
+        row = self._conn().execute(
+            "SELECT COUNT(*), SUM(LENGTH(value)) FROM kv_cache WHERE key LIKE ?",
+            (prefix + "%",),
+        ).fetchone()
+        return {
+            "count": int(row[0]) if row and row[0] is not None else 0,
+            "bytes": int(row[1]) if row and row[1] is not None else 0,
+        }
+
+
+# 异步门面共享的专用 I/O 线程 (单线程：SQLite 后端在该线程上只维持一个长连接)
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_lock = threading.Lock()
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist-cache")
+    return _io_executor
+
+
+class AsyncPersistentCache:
+    """持久化缓存的异步门面：所有操作在专用线程中执行，不阻塞事件循环"""
+
+    def __init__(self, backend: BasePersistentCache) -> None:
+        self.backend = backend
+
+    async def _run(self, func, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_io_executor(), func, *args)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._run(self.backend.get, key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        return await self._run(self.backend.get_many, list(keys))
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._run(self.backend.set, key, value, ttl)
+
+    async def set_many(self, items: Mapping[str, str], ttl: int) -> None:
+        await self._run(self.backend.set_many, dict(items), ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self.backend.delete, key)
 
 
 from core.config import settings
 
 _persistent_cache: Optional[BasePersistentCache] = None
+_async_persistent_cache: Optional[AsyncPersistentCache] = None
 
 
 def get_persistent_cache() -> BasePersistentCache:
     global _persistent_cache
     if _persistent_cache is not None:
         return _persistent_cache
-        
+
     url = settings.REDIS_URL
     if url:
         try:
@@ -300,13 +490,26 @@ def get_persistent_cache() -> BasePersistentCache:
         except Exception as e:
             # Redis 连接失败，回退到 SQLite
             pass
-            
+
     # fallback: local sqlite file
     db_path = str(settings.PERSIST_CACHE_SQLITE)
-    _persistent_cache = SQLitePersistentCache(db_path)
+    _persistent_cache = SQLitePersistentCache(
+        db_path,
+        sweep_interval=settings.PERSIST_CACHE_SWEEP_INTERVAL,
+        sweep_batch=settings.PERSIST_CACHE_SWEEP_BATCH,
+    )
     return _persistent_cache
 
 
+def get_async_persistent_cache() -> AsyncPersistentCache:
+    """获取全局持久化缓存的异步门面"""
+    global _async_persistent_cache
+    backend = get_persistent_cache()
+    if _async_persistent_cache is None or _async_persistent_cache.backend is not backend:
+        _async_persistent_cache = AsyncPersistentCache(backend)
+    return _async_persistent_cache
+
+
 def dumps_json(obj: Any) -> str:
     return json_dumps(obj)
 
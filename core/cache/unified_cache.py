@@ -16,7 +16,7 @@ from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar, cast
 
 from core.helpers.error_handler import handle_errors
 from core.logging import get_logger, log_performance
-from .persistent_cache import get_persistent_cache
+from .persistent_cache import AsyncPersistentCache, get_persistent_cache
 
 
 # 实现一个简单的TTLCache类作为临时解决方案
@@ -142,6 +142,8 @@ class MultiLevelCache(Generic[T]):
 
         # L2: 持久化缓存（Redis/SQLite）
         self.l2_cache = get_persistent_cache() if enable_persistent else None
+        # L2 异步门面：在专用线程中访问，供协程调用方使用
+        self.l2_async = AsyncPersistentCache(self.l2_cache) if self.l2_cache else None
 
         # 统计信息
         self.stats = CacheStats()
@@ -238,6 +240,68 @@ class MultiLevelCache(Generic[T]):
                 logger.log_error(f"缓存存储-{self.name}", e, context={"key": key})
                 return False
 
+    @handle_errors(default_return=None)
+    async def aget(self, key: str) -> Optional[T]:
+        """
+        异步获取缓存值：L1 命中直接返回，L2 查询在专用线程中执行
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值或None
+        """
+        with self._lock:
+            value = self.l1_cache.get(key)
+            if value is not None:
+                self.stats.hits += 1
+                return cast(Optional[T], value)
+
+        if self.l2_async:
+            try:
+                l2_value = await self.l2_async.get(key)
+                if l2_value is not None:
+                    value = json.loads(l2_value)
+                    with self._lock:
+                        self.l1_cache.set(key, value)
+                        self.stats.hits += 1
+                    logger.log_data_flow(
+                        f"L2缓存命中-{self.name}", 1, "条目", {"key": key}
+                    )
+                    return cast(Optional[T], value)
+            except Exception as e:
+                logger.log_error(f"L2缓存读取-{self.name}", e, context={"key": key})
+
+        with self._lock:
+            self.stats.misses += 1
+        return None
+
+    @handle_errors(default_return=False)
+    async def aset(self, key: str, value: T, ttl: Optional[int] = None) -> bool:
+        """
+        异步设置缓存值：L1 立即写入，L2 写入在专用线程中执行
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 生存时间（可选，使用默认值）
+
+        Returns:
+            是否设置成功
+        """
+        with self._lock:
+            self.l1_cache.set(key, value)
+            self.stats.sets += 1
+            self.stats.size = len(self.l1_cache._store)
+
+        if self.l2_async:
+            try:
+                serialized_value = json.dumps(value, default=str)
+                await self.l2_async.set(key, serialized_value, ttl or self.l2_ttl)
+            except Exception as e:
+                logger.log_error(f"L2缓存写入-{self.name}", e, context={"key": key})
+        return True
+
     @handle_errors(default_return=False)
     def delete(self, key: str) -> bool:
         """
@@ -518,7 +582,7 @@ def cached(cache_name: Optional[str] = None, ttl: int = 300, key_func: Optional[
                 cache_key = CacheKey.generate_for_function(func, *args, **kwargs)
 
             # 1. 尝试从缓存直接获取
-            cached_result = cache.get(cache_key)
+            cached_result = await cache.aget(cache_key)
             if cached_result is not None:
                 logger.debug(f"[缓存命中] {cache_name} - 键: {cache_key}")
                 return cached_result
@@ -527,7 +591,7 @@ def cached(cache_name: Optional[str] = None, ttl: int = 300, key_func: Optional[
             # 使用特定键的锁，保证同一时间只有一个请求穿透到原函数
             async with _request_locks[cache_key]:
                 # 双重检查命中 (Double-Check Locking)
-                cached_result = cache.get(cache_key)
+                cached_result = await cache.aget(cache_key)
                 if cached_result is not None:
                     logger.debug(f"[缓存命中-并发保护] {cache_name} - 键: {cache_key}")
                     return cached_result
@@ -544,7 +608,7 @@ def cached(cache_name: Optional[str] = None, ttl: int = 300, key_func: Optional[
                 duration = time.time() - start_time
 
                 # 存储到缓存
-                cache.set(cache_key, result, ttl)
+                await cache.aset(cache_key, result, ttl)
 
                 logger.log_performance(
                     f"缓存写入-{cache_name}",
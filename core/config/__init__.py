@@ -197,6 +197,8 @@ class Settings(BaseSettings):
         default_factory=lambda: Path(__file__).resolve().parent.parent.parent / "data" / "db" / "cache.db",
         description="SQLite 持久化缓存文件路径"
     )
+    PERSIST_CACHE_SWEEP_INTERVAL: float = Field(default=60.0, description="SQLite 持久化缓存过期清理间隔秒数 (0 表示关闭后台清理)")
+    PERSIST_CACHE_SWEEP_BATCH: int = Field(default=500, description="SQLite 持久化缓存每批清理的过期行数")
 
     # === API 优化与流量控制 ===
     API_LOG_LEVEL: str = Field(default="WARNING")
@@ -208,9 +210,33 @@ class Settings(BaseSettings):
     
     FORWARD_MAX_BATCH_SIZE: int = Field(default=50)
     FORWARD_MIN_BATCH_SIZE: int = Field(default=2)
+    FORWARD_AGGREGATE_ENABLED: bool = Field(
+        default=True,
+        description="是否合并不同任务发往同一 源->目标 的纯转发为一次 ForwardMessages"
+    )
+    FORWARD_AGGREGATE_WINDOW_MS: float = Field(
+        default=300.0,
+        description="转发聚合延迟预算 (毫秒)"
+    )
+    FORWARD_AGGREGATE_MAX_IDS: int = Field(
+        default=100,
+        description="单次聚合转发的最大消息数 (Telegram 上限 100)"
+    )
     
     MEDIA_SAMPLE_SIZE: int = Field(default=1024)
     ENABLE_MEDIA_CACHE: bool = Field(default=True)
+    MEDIA_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否启用按文档/照片 ID 寻址的本地媒体缓存 (同一文件只下载一次)"
+    )
+    MEDIA_CACHE_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parent.parent.parent / "data" / "media_cache",
+        description="媒体缓存目录 (应与 TEMP_DIR/DOWNLOAD_DIR 同一文件系统以便硬链接)"
+    )
+    MEDIA_CACHE_MAX_BYTES: int = Field(
+        default=1024**3,  # 1 GiB
+        description="媒体缓存磁盘字节预算 (LRU 淘汰)"
+    )
     
     SEARCH_CACHE_TTL: int = Field(default=300)
     MAX_SEARCH_RESULTS: int = Field(default=100)
@@ -320,6 +346,14 @@ class Settings(BaseSettings):
     HISTORY_POWER_SAVE: bool = Field(default=False)
     HISTORY_SMART_ADAPT: bool = Field(default=True)
     HISTORY_QUEUE_SIZE: int = Field(default=500)
+    HISTORY_PUSH_CHUNK_SIZE: int = Field(
+        default=200,
+        description="历史任务每批写入任务队列的消息数 (筛选与 push_batch 按此分页)"
+    )
+    HISTORY_PREFETCH_PAGES: int = Field(
+        default=2,
+        description="历史任务预读页数 (写队列的同时继续从 Telegram 拉取下一页)"
+    )
     
     # === 用户与备份配置 ===
     USER_ID: Optional[int] = Field(default=None)
@@ -374,6 +408,9 @@ class Settings(BaseSettings):
     # DuckDB 性能优化
     DUCKDB_THREADS: int = Field(default=0)
     DUCKDB_MEMORY_LIMIT: Optional[str] = Field(default=None)
+    ARCHIVE_QUERY_WORKERS: int = Field(default=2, description="归档查询线程池大小 (同时执行的 DuckDB 查询上限)")
+    ARCHIVE_QUERY_TIMEOUT: float = Field(default=30.0, description="归档查询超时秒数，超时后中断查询 (0 表示不限)")
+    ARCHIVE_QUERY_BATCH_ROWS: int = Field(default=10000, description="归档查询流式读取的 Arrow 批次行数")
     
     # === 热冷分层归档配置 ===
     HOT_DAYS_TASK: int = Field(default=1, description="TaskQueue 热数据保留天数")
@@ -394,7 +431,10 @@ class Settings(BaseSettings):
     BLOOM_HASHES: int = Field(default=7)
     BLOOM_SHARD_BY: str = Field(default="chat")
     BLOOM_CACHE_MAX_ENTRIES: int = Field(default=1024)
-    BLOOM_CACHE_TTL_SEC: int = Field(default=300)
+    BLOOM_MAPPED_SHARDS_MAX: int = Field(
+        default=64,
+        description="同时保持 mmap 映射的 Bloom 分片上限 (每个分片占用一个文件描述符)"
+    )
     
     # === AI 提供者配置 ===
     OPENAI_API_KEY: Optional[str] = Field(default=None)
@@ -471,6 +511,14 @@ class Settings(BaseSettings):
         default=300.0,
         description="热词分析引擎空闲自动挂起时间 (秒)"
     )
+    HOTWORD_SPAM_INDEX_MAX_ENTRIES: int = Field(
+        default=10000,
+        description="垃圾消息 SimHash 拦截网的指纹上限 (超出后淘汰最早的指纹)"
+    )
+    HOTWORD_SPAM_TTL_SECONDS: float = Field(
+        default=21600.0,
+        description="垃圾消息指纹的存活时间 (秒)"
+    )
 
     # === 错误通知配置 ===
     ERROR_NOTIFY_THROTTLE_SECONDS: int = Field(
@@ -524,6 +572,52 @@ class Settings(BaseSettings):
         default=15552000, 
         description="视频哈希持久化TTL (默认180天)"
     )
+    DEDUP_NEAR_INDEX_K: int = Field(
+        default=3,
+        description="SimHash 近邻索引的最大海明距离 (分为 k+1 个位块，查询距离不超过该值)"
+    )
+    DEDUP_NEAR_INDEX_MAX_ENTRIES: int = Field(
+        default=100000,
+        description="近邻索引的指纹条目上限 (所有目标会话合计，超出后淘汰最早写入的条目；常驻内存并写入快照，每条约 1.7KB，默认约 170MB)"
+    )
+    DEDUP_NEAR_INDEX_TTL_SECONDS: int = Field(
+        default=604800,
+        description="近邻索引条目的存活时间 (默认7天，0 表示不过期)"
+    )
+    DEDUP_NEAR_INDEX_SNAPSHOT_PATH: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parent.parent.parent / "data" / "dedup" / "near_index.jsonl",
+        description="近邻索引磁盘快照路径"
+    )
+    DEDUP_NEAR_INDEX_SNAPSHOT_INTERVAL: float = Field(
+        default=300.0,
+        description="近邻索引快照写盘间隔 (秒，仅在有变更时写入)"
+    )
+    DEDUP_BLOOM_PATH: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parent.parent.parent / "data" / "dedup" / "dedup_l0.bbf",
+        description="去重 L0 布隆过滤器的 mmap 文件路径 (重启后无需预热)"
+    )
+
+    # === 基数统计 (HLL Store) ===
+    HLL_STORE_ENABLED: bool = Field(
+        default=True,
+        description="是否按 聊天/日期 持久化独立消息数与独立发送者数的 HLL 草图"
+    )
+    HLL_STORE_PATH: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parent.parent.parent / "data" / "db" / "hll.db",
+        description="HLL 草图 SQLite 文件路径"
+    )
+    HLL_STORE_PRECISION: int = Field(
+        default=12,
+        description="HLL 精度 b (寄存器数 2^b，12 约 1.6% 误差；修改后旧草图不再参与统计)"
+    )
+    HLL_STORE_FLUSH_INTERVAL: float = Field(
+        default=30.0,
+        description="HLL 内存增量落库间隔 (秒)"
+    )
+    HLL_STORE_RETENTION_DAYS: int = Field(
+        default=400,
+        description="HLL 草图保留天数"
+    )
     
     # === RSS 进阶配置 ===
     RSS_ENABLED: bool = Field(
@@ -544,7 +638,23 @@ class Settings(BaseSettings):
     RSS_DATA_DIR: Path = Field(
         default_factory=lambda: Path(__file__).resolve().parent.parent.parent / "data" / "rss" / "data"
     )
-    
+    RSS_ENTRY_SEGMENT_SIZE: int = Field(
+        default=64,
+        description="RSS 条目日志单个分段的最大条目数 (超出 max_items 时按整段丢弃)"
+    )
+    RSS_FEED_CONFIG_TTL: float = Field(
+        default=300.0,
+        description="已渲染 Feed 缓存中 RSS 配置快照的复核间隔 (秒，ORM 修改会立即失效)"
+    )
+    RSS_FEED_GZIP: bool = Field(
+        default=True,
+        description="渲染 Feed 时预先生成 gzip 压缩版本"
+    )
+    RSS_FEED_CACHE_MAX_SLOTS: int = Field(
+        default=64,
+        description="已渲染 Feed 缓存的最大槽位数 (按 规则 × 访问域名 计，LRU 淘汰)"
+    )
+
     # === Web 服务配置 ===
     WEB_ENABLED: bool = Field(
         default=True,
@@ -598,6 +708,22 @@ class Settings(BaseSettings):
     DEFAULT_AI_PROMPT: str = Field(
         default="请尊重原意，保持原有格式不变，用简体中文重写下面的内容："
     )
+    AI_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否缓存 AI 响应 (按提供商/模型/提示词/文本/图片内容寻址)"
+    )
+    AI_CACHE_TTL: float = Field(
+        default=3600.0,
+        description="AI 响应缓存有效期 (秒)"
+    )
+    AI_CACHE_MAX_ENTRIES: int = Field(
+        default=2048,
+        description="AI 响应内存缓存最大条目数 (LRU)"
+    )
+    AI_CACHE_PERSIST: bool = Field(
+        default=False,
+        description="是否将 AI 响应同时写入持久缓存，重启后仍可命中"
+    )
     BOT_MESSAGE_DELETE_TIMEOUT: int = Field(default=300)
     USER_MESSAGE_DELETE_ENABLE: bool = Field(default=False)
     
@@ -712,7 +838,89 @@ class Settings(BaseSettings):
     )
     TASK_DISPATCHER_MAX_SLEEP: float = Field(
         default=30.0,
-        description="Dispatcher 最大休眠时间"
+        description="Dispatcher 兜底轮询间隔 (新任务提交后会被立即唤醒)"
+    )
+
+    # === 消息交接缓存 (监听器 -> Worker) ===
+    MESSAGE_HANDOFF_ENABLED: bool = Field(
+        default=True,
+        description="是否由监听器将消息对象直接交给 Worker，避免重复 GetMessages"
+    )
+    MESSAGE_HANDOFF_TTL_SECONDS: float = Field(
+        default=300.0,
+        description="交接缓存条目存活时间 (秒)"
+    )
+    MESSAGE_HANDOFF_MAX_ENTRIES: int = Field(
+        default=5000,
+        description="交接缓存最大条目数"
+    )
+    MESSAGE_HANDOFF_MAX_BYTES: int = Field(
+        default=32 * 1024 * 1024,
+        description="交接缓存估算内存上限 (字节)"
+    )
+
+    # === 聊天名称解析缓存 ===
+    CHAT_NAME_CACHE_MAX_ENTRIES: int = Field(
+        default=10000,
+        description="聊天名称缓存最大条目数 (LRU)"
+    )
+    CHAT_NAME_CACHE_TTL: float = Field(
+        default=3600.0,
+        description="聊天名称缓存有效期 (秒)，过期后返回旧值并后台刷新"
+    )
+    CHAT_NAME_NEGATIVE_TTL: float = Field(
+        default=300.0,
+        description="无法解析的聊天 ID 负缓存有效期 (秒)"
+    )
+
+    # === 消息拉取合并 (Worker -> GetMessages) ===
+    MESSAGE_FETCH_COALESCE_ENABLED: bool = Field(
+        default=True,
+        description="是否合并同一聊天短窗口内的 GetMessages 请求"
+    )
+    MESSAGE_FETCH_COALESCE_WINDOW_MS: float = Field(
+        default=5.0,
+        description="拉取合并窗口 (毫秒)"
+    )
+    MESSAGE_FETCH_COALESCE_MAX_IDS: int = Field(
+        default=100,
+        description="单次合并拉取的最大消息 ID 数 (Telegram 上限 100)"
+    )
+
+    # === 规则路由索引 ===
+    RULE_ROUTING_INDEX_ENABLED: bool = Field(
+        default=True,
+        description="是否使用内存规则路由快照解析源聊天规则 (热路径不查库)"
+    )
+    RULE_ROUTING_INDEX_MAX_AGE_SEC: float = Field(
+        default=30.0,
+        description="规则路由快照最大存活时间 (秒)，超时后全量重建，兜底遗漏失效的写路径；0 表示不限"
+    )
+
+    # === 入队预写日志 (MessageQueueService Spool) ===
+    QUEUE_LANE_MAX_SIZE: int = Field(
+        default=1000,
+        description="MessageQueueService 每条泳道的最大深度"
+    )
+    QUEUE_SPOOL_ENABLED: bool = Field(
+        default=False,
+        description="是否为内存泳道启用追加写 spool，崩溃后重放未提交的入队记录"
+    )
+    QUEUE_SPOOL_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parent.parent.parent / "data" / "spool" / "ingest",
+        description="spool 分段文件目录"
+    )
+    QUEUE_SPOOL_SEGMENT_BYTES: int = Field(
+        default=4 * 1024 * 1024,
+        description="单个 spool 分段的滚动阈值 (字节)"
+    )
+    QUEUE_SPOOL_FSYNC_INTERVAL: float = Field(
+        default=0.2,
+        description="spool 批量 fsync 间隔 (秒)"
+    )
+    QUEUE_SPOOL_MAX_RETRIES: int = Field(
+        default=3,
+        description="spool 条目提交失败的最大次数，超过后丢弃不再重放"
     )
     
     # === 资源监控与熔断阈值 ===
@@ -763,6 +971,8 @@ class Settings(BaseSettings):
     @field_validator(
         "BASE_DIR", "DATA_ROOT", "DOWNLOAD_DIR", "SESSION_DIR", 
         "TEMP_DIR", "HOT_DIR", "LOG_DIR", "DB_DIR", "BACKUP_DIR", "FORWARD_RECORDER_DIR",
+        "QUEUE_SPOOL_DIR", "DEDUP_NEAR_INDEX_SNAPSHOT_PATH", "MEDIA_CACHE_DIR",
+        "HLL_STORE_PATH", "DEDUP_BLOOM_PATH",
         mode="after"
     )
     @classmethod
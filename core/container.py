@@ -100,8 +100,23 @@ class Container:
         if not hasattr(self, '_rule_repo'):
             from repositories.rule_repo import RuleRepository
             self._rule_repo = RuleRepository(self.db)
+            # 规则变更时一并丢弃预编译的替换程序
+            from services.rule.replace import replace_program_cache
+            self._rule_repo.add_invalidation_listener(replace_program_cache.invalidate)
         return self._rule_repo
 
+    @property
+    def rule_routing_index(self):
+        if not hasattr(self, '_rule_routing_index'):
+            from services.rule.routing_index import RuleRoutingIndex
+            from core.config import settings
+            self._rule_routing_index = RuleRoutingIndex(
+                self.db, self.rule_repo, max_age_seconds=settings.RULE_ROUTING_INDEX_MAX_AGE_SEC
+            )
+            # 复用现有规则缓存失效入口驱动增量重建
+            self.rule_repo.add_invalidation_listener(self._rule_routing_index.invalidate)
+        return self._rule_routing_index
+
     @property
     def stats_repo(self) -> StatsRepository:
         if not hasattr(self, '_stats_repo'):
@@ -157,8 +172,18 @@ class Container:
     @property
     def queue_service(self) -> MessageQueueService:
         if not hasattr(self, '_queue_service'):
+            from core.config import settings
             from services.queue_service import MessageQueueService
-            self._queue_service = MessageQueueService(max_size=1000)
+            spool = None
+            if settings.QUEUE_SPOOL_ENABLED:
+                from services.queue_spool import QueueSpool
+                spool = QueueSpool(
+                    settings.QUEUE_SPOOL_DIR,
+                    segment_bytes=settings.QUEUE_SPOOL_SEGMENT_BYTES,
+                    fsync_interval=settings.QUEUE_SPOOL_FSYNC_INTERVAL,
+                    max_retries=settings.QUEUE_SPOOL_MAX_RETRIES,
+                )
+            self._queue_service = MessageQueueService(max_size=settings.QUEUE_LANE_MAX_SIZE, spool=spool)
             self._queue_service.set_processor(self._process_ingestion_queue)
             logger.info("MessageQueueService 已初始化 (惰性加载)")
         return self._queue_service
@@ -318,7 +343,9 @@ class Container:
         from filters.factory import get_filter_chain_factory
         get_filter_chain_factory().set_container(self)
         
-        pipeline.add(RuleLoaderMiddleware(self.rule_repo))  # 1. 加载规则
+        from core.config import settings
+        routing_index = self.rule_routing_index if settings.RULE_ROUTING_INDEX_ENABLED else None
+        pipeline.add(RuleLoaderMiddleware(self.rule_repo, routing_index))  # 1. 加载规则
         pipeline.add(DedupMiddleware())                     # 2. 去重检查
         pipeline.add(FilterMiddleware())                    # 3. 过滤 & 内容修改
         from middlewares.ai import AIMiddleware             # 引入AI中间件
@@ -385,8 +412,37 @@ class Container:
         if self.rss_puller:
             self.services.append(asyncio.create_task(self.rss_puller.start(), name="RSSPuller"))
         
+        # 预加载启用规则引用的聊天名称，热路径日志/渲染无需查库或访问网络
+        try:
+            await self.chat_info_service.preload()
+        except Exception as e:
+            logger.warning(f"聊天名称预加载失败: {e}")
+
+        # 编译规则路由索引 (失败时 Loader 自动回退到数据库查询)
+        if hasattr(self, '_rule_routing_index'):
+            try:
+                await self._rule_routing_index.build()
+            except Exception as e:
+                logger.warning(f"规则路由索引编译失败，将回退到数据库查询: {e}")
+
         # 启动 StatsRepository 的缓冲刷新任务 (H.5)
         await self.stats_repo.start()
+
+        # 启动 HLL 基数草图的定期落库
+        from core.config import settings
+        if settings.HLL_STORE_ENABLED:
+            from repositories.hll_store import get_hll_store
+            await get_hll_store().start(settings.HLL_STORE_FLUSH_INTERVAL)
+
+        # 映射去重 L0 布隆过滤器文件 (首次启动需写零创建，放到线程中)
+        from services.dedup.engine import smart_deduplicator
+        if smart_deduplicator.bloom_filter is not None:
+            await asyncio.to_thread(smart_deduplicator.bloom_filter.open)
+
+        # 重建本地媒体缓存索引 (目录扫描在线程中进行)
+        from core.cache.media_cache import get_media_cache
+        if settings.MEDIA_CACHE_ENABLED:
+            await get_media_cache().load()
         
         # 启动背压队列服务
         await self.queue_service.start()
@@ -447,9 +503,29 @@ class Container:
         try:
             from services.bloom_filter import bloom_filter_service
             bloom_filter_service.save()
+            from services.dedup.engine import smart_deduplicator
+            if smart_deduplicator.bloom_filter is not None:
+                smart_deduplicator.bloom_filter.save()
             logger.info("布隆过滤器已保存")
         except Exception as e:
             logger.error(f"Failed to save Bloom Filter: {e}")
+
+        # HLL 基数草图最终落库
+        try:
+            from core.config import settings
+            if settings.HLL_STORE_ENABLED:
+                from repositories.hll_store import get_hll_store
+                await get_hll_store().stop()
+        except Exception as e:
+            logger.error(f"HLL 草图落库失败: {e}")
+
+        # 保存去重近邻索引快照
+        try:
+            from services.dedup.engine import smart_deduplicator
+            if await smart_deduplicator.save_near_index_snapshot():
+                logger.info("去重近邻索引快照已保存")
+        except Exception as e:
+            logger.error(f"保存去重近邻索引快照失败: {e}")
             
         # Close HTTP Session
         if self.http_session and not self.http_session.closed:
@@ -544,6 +620,8 @@ class Container:
             await self.task_repo.push_batch(items)
         except Exception as e:
             logger.error(f"Batch ingestion failed: {e}", exc_info=True)
+            # 向上抛出，避免 spool 将未落库的批次标记为已提交
+            raise
 
 
 
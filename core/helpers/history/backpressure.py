@@ -38,7 +38,11 @@ class BackpressureController:
         self.total_pause_time = 0.0
 
     async def check_and_wait(
-        self, task_repo: Any, processed_count: int, cancel_event: Optional[asyncio.Event] = None
+        self,
+        task_repo: Any,
+        processed_count: int,
+        cancel_event: Optional[asyncio.Event] = None,
+        previous_count: Optional[int] = None,
     ) -> bool:
         """
         检查队列状态并根据需要暂停
@@ -47,12 +51,16 @@ class BackpressureController:
             task_repo: 任务仓库
             processed_count: 已处理消息数
             cancel_event: 取消事件
+            previous_count: 上次检查时的已处理数 (按批推进时传入，跨过检查间隔即检查)
 
         Returns:
             bool: True=继续处理, False=已取消
         """
         # 只在检查间隔时执行
-        if processed_count % self.check_interval != 0:
+        if previous_count is not None:
+            if processed_count // self.check_interval == previous_count // self.check_interval:
+                return True
+        elif processed_count % self.check_interval != 0:
             return True
 
         # 检查是否取消
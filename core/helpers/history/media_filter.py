@@ -3,7 +3,7 @@
 根据全局媒体设置筛选消息
 """
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +95,28 @@ class MediaFilter:
         self.total_allowed += 1
         return True, None
 
+    async def filter_messages(
+        self, messages: List[Any]
+    ) -> Tuple[List[Any], List[Tuple[Any, Optional[str]]]]:
+        """
+        批量筛选一页消息
+
+        Args:
+            messages: Telethon消息对象列表
+
+        Returns:
+            Tuple[List, List]: (保留的消息, [(被过滤的消息, 过滤原因)])，均保持原顺序
+        """
+        kept: List[Any] = []
+        filtered: List[Tuple[Any, Optional[str]]] = []
+        for message in messages:
+            should_process, reason = await self.should_process_message(message)
+            if should_process:
+                kept.append(message)
+            else:
+                filtered.append((message, reason))
+        return kept, filtered
+
     def _get_media_type(self, message: Any) -> Optional[str]:
         """
         获取消息的媒体类型
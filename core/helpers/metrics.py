@@ -88,6 +88,20 @@ ARCHIVE_RUN_TOTAL = Counter(
 ARCHIVE_RUN_SECONDS = Histogram(
     "archive_run_seconds", "Archive job duration seconds", registry=REGISTRY
 )
+ARCHIVE_QUERY_TOTAL = Counter(
+    "archive_query_total", "Archive (DuckDB) queries", ["status"], registry=REGISTRY
+)
+ARCHIVE_QUERY_SECONDS = Histogram(
+    "archive_query_seconds", "Archive (DuckDB) query duration seconds", registry=REGISTRY
+)
+
+# AI 响应缓存指标
+AI_CACHE_REQUESTS_TOTAL = Counter(
+    "ai_cache_requests_total", "AI response cache lookups", ["result"], registry=REGISTRY
+)
+AI_CACHE_SAVED_TOKENS_TOTAL = Counter(
+    "ai_cache_saved_tokens_total", "Estimated AI tokens saved by cache hits", registry=REGISTRY
+)
 
 # 消息处理指标
 MESSAGES_RECEIVED_TOTAL = Counter(
@@ -160,6 +174,22 @@ TASK_QUEUE_LENGTH = Gauge(
     "task_queue_length", "Task queue length", ["status"], registry=REGISTRY
 )
 
+# 消息交接缓存 (监听器 -> Worker) 命中情况
+MESSAGE_HANDOFF_LOOKUPS_TOTAL = Counter(
+    "message_handoff_lookups_total",
+    "Message handoff cache lookups",
+    ["result"],
+    registry=REGISTRY,
+)
+
+# 消息拉取合并 (result=api_call 为实际 GetMessages 次数, id 为拉取的消息 ID 数)
+MESSAGE_FETCH_COALESCED_TOTAL = Counter(
+    "message_fetch_coalesced_total",
+    "Coalesced GetMessages calls and ids",
+    ["result"],
+    registry=REGISTRY,
+)
+
 # 转发发送耗时与 FloodWait 观测
 FORWARD_SEND_SECONDS = Histogram(
     "forward_send_seconds", "Forward send duration seconds", registry=REGISTRY
@@ -167,6 +197,20 @@ FORWARD_SEND_SECONDS = Histogram(
 FORWARD_FLOODWAIT_SECONDS = Histogram(
     "forward_floodwait_seconds", "Observed FloodWait seconds", registry=REGISTRY
 )
+# 媒体缓存 (result=hit / miss / shared / bypass)
+MEDIA_CACHE_REQUESTS_TOTAL = Counter(
+    "media_cache_requests_total",
+    "Content-addressed media cache requests",
+    ["result"],
+    registry=REGISTRY,
+)
+# 跨任务转发聚合 (result=api_call / message / fallback)
+FORWARD_AGGREGATED_TOTAL = Counter(
+    "forward_aggregated_total",
+    "Aggregated ForwardMessages calls, messages and fallbacks",
+    ["result"],
+    registry=REGISTRY,
+)
 
 # 压实（小文件合并）指标
 COMPACT_RUN_TOTAL = Counter(
@@ -0,0 +1,132 @@
+"""
+任务到达信号 (Task Arrival Signal)
+
+TaskRepository 在 push / push_batch 提交后调用 notify()，TaskDispatcher
+据此立即唤醒，而不是盲目指数退避轮询。带 scheduled_at / next_retry_at 的
+延迟任务通过 schedule() 登记到最小堆，Dispatcher 只在最近的到期时间醒来。
+轮询仅作为兜底 (跨进程写入、进程重启前遗留的延迟任务)。
+"""
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 唤醒原因
+WAKE_SIGNAL = "signal"
+WAKE_DEADLINE = "deadline"
+WAKE_POLL = "poll"
+
+
+class TaskSignal:
+    """进程内任务通知通道 + 到期时间最小堆"""
+
+    def __init__(self, max_deadlines: int = 10000):
+        self.max_deadlines = max_deadlines
+        self._event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._notified = False
+        self._deadlines: List[float] = []
+
+        self.notifications = 0
+        self.scheduled = 0
+
+    def _get_event(self) -> asyncio.Event:
+        """事件绑定到当前事件循环 (测试或重启时循环可能更换)"""
+        loop = asyncio.get_running_loop()
+        if self._event is None or self._loop is not loop:
+            self._event = asyncio.Event()
+            self._loop = loop
+        return self._event
+
+    def _wake(self) -> None:
+        try:
+            self._get_event().set()
+        except RuntimeError:
+            # 非事件循环上下文 (同步调用)，等待者会在下次检查 _notified 时感知
+            pass
+
+    def notify(self) -> None:
+        """有可立即执行的新任务"""
+        self.notifications += 1
+        self._notified = True
+        self._wake()
+
+    def schedule(self, due_at: Optional[datetime]) -> None:
+        """
+        登记延迟任务的到期时间 (UTC naive datetime，与 TaskQueue 字段一致)。
+        已到期的时间等同于 notify()。
+        """
+        if due_at is None:
+            self.notify()
+            return
+
+        delay = (due_at - datetime.utcnow()).total_seconds()
+        if delay <= 0:
+            self.notify()
+            return
+
+        if len(self._deadlines) >= self.max_deadlines:
+            # 堆已满时不再登记，由兜底轮询负责
+            return
+        due_ts = time.time() + delay
+        earliest = not self._deadlines or due_ts < self._deadlines[0]
+        heapq.heappush(self._deadlines, due_ts)
+        self.scheduled += 1
+        if earliest:
+            # 仅唤醒等待者重新计算超时，不触发拉取
+            self._wake()
+
+    def clear(self) -> None:
+        """在拉取任务之前调用，避免拉取期间到达的通知被丢失"""
+        self._notified = False
+        if self._event is not None:
+            self._event.clear()
+
+    def next_deadline_in(self) -> Optional[float]:
+        """距离最近到期时间的秒数 (已过期的条目会被弹出)；无则返回 None"""
+        now = time.time()
+        while self._deadlines and self._deadlines[0] <= now:
+            heapq.heappop(self._deadlines)
+        if not self._deadlines:
+            return None
+        return self._deadlines[0] - now
+
+    async def wait(self, max_timeout: float) -> str:
+        """
+        等待下一次唤醒，返回唤醒原因 (signal / deadline / poll)。
+
+        Args:
+            max_timeout: 兜底轮询间隔
+        """
+        event = self._get_event()
+        poll_at = time.monotonic() + max_timeout
+        while True:
+            if self._notified:
+                return WAKE_SIGNAL
+            event.clear()
+
+            timeout = poll_at - time.monotonic()
+            reason = WAKE_POLL
+            deadline_in = self.next_deadline_in()
+            if deadline_in is not None and deadline_in < timeout:
+                timeout = deadline_in
+                reason = WAKE_DEADLINE
+
+            try:
+                await asyncio.wait_for(event.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                if reason == WAKE_DEADLINE:
+                    # 弹出已到期的截止时间
+                    self.next_deadline_in()
+                return reason
+            # 被 schedule() 提前唤醒：重新计算超时后继续等待
+
+    def pending_deadlines(self) -> int:
+        return len(self._deadlines)
+
+
+task_signal = TaskSignal()
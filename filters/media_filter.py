@@ -2,6 +2,7 @@ import logging
 import os
 from core.helpers.media import get_media_size
 from core.constants import TEMP_DIR
+from core.cache.media_cache import get_media_cache
 from filters.base_filter import BaseFilter
 from models.models import MediaTypes
 # AsyncSessionManager is deprecated, use container.db.get_session() instead
@@ -495,8 +496,8 @@ class MediaFilter(BaseFilter):
                 if file_size > 50 * 1024 * 1024:  # 50MB
                     logger.warning(f"大文件下载: {file_size} bytes，可能需要较长时间")
             
-            # 使用原有的下载方法
-            file_path = await message.download_media(temp_dir)
+            # 经媒体缓存下载：同一文件被多条规则/多个聊天命中时只下载一次
+            file_path = await get_media_cache().fetch(message, temp_dir)
             if file_path:
                 logger.info(f'媒体文件下载完成: {file_path}')
             
@@ -1,6 +1,7 @@
 import logging
 import os
 from core.config import settings
+from core.cache.media_cache import get_media_cache
 try:
     import pytz
     PYTZ_AVAILABLE = True
@@ -141,7 +142,7 @@ class PushFilter(BaseFilter):
                     
                 for message in context.media_group_messages:
                     if message.media:
-                        file_path = await message.download_media(temp_dir)
+                        file_path = await get_media_cache().fetch(message, temp_dir)
                         if file_path:
                             files.append(file_path)
                             logger.info(f'已下载媒体组文件: {file_path}')
@@ -155,7 +156,7 @@ class PushFilter(BaseFilter):
                 need_cleanup = True
                 for message in context.media_group_messages:
                     if message.media:
-                        file_path = await message.download_media(str(settings.TEMP_DIR))
+                        file_path = await get_media_cache().fetch(message, settings.TEMP_DIR)
                         if file_path:
                             files.append(file_path)
                             logger.info(f'已下载媒体文件: {file_path}')
@@ -298,7 +299,7 @@ class PushFilter(BaseFilter):
             elif rule.enable_only_push and event.message and event.message.media:
                 logger.info(f'需要自己下载文件，开始下载单个媒体消息...')
                 need_cleanup = True
-                file_path = await event.message.download_media(str(settings.TEMP_DIR))
+                file_path = await get_media_cache().fetch(event.message, settings.TEMP_DIR)
                 if file_path:
                     files.append(file_path)
                     logger.info(f'已下载媒体文件: {file_path}')
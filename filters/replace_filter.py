@@ -1,6 +1,6 @@
 import logging
-import re
 from filters.base_filter import BaseFilter
+from services.rule.replace import replace_program_cache
 
 logger = logging.getLogger(__name__)
 
@@ -41,28 +41,17 @@ class ReplaceFilter(BaseFilter):
             if not replace_rules:
                 return True  # 没有替换规则，直接返回
             
-            # 应用所有替换规则
-            for replace_rule in replace_rules:
-                if replace_rule.pattern == '.*':
-                    # 全文替换
-                    logger.info(f'执行全文替换:\n原文: "{message_text}"\n替换为: "{replace_rule.content or ""}"')
-                    message_text = replace_rule.content or ''
-                    break  # 如果是全文替换，就不继续处理其他规则
-                else:
-                    try:
-                        # 正则替换
-                        old_text = message_text
-                        matches = re.finditer(replace_rule.pattern, message_text)
-                        message_text = re.sub(
-                            replace_rule.pattern,
-                            replace_rule.content or '',
-                            message_text
-                        )
-                        if old_text != message_text:
-                            matched_texts = [m.group(0) for m in matches]
-                            logger.info(f'执行部分替换:\n原文: "{old_text}"\n匹配内容: {matched_texts}\n替换规则: "{replace_rule.pattern}" -> "{replace_rule.content}"\n替换后: "{message_text}"')
-                    except re.error as e:
-                        logger.error(f'替换规则格式错误: {replace_rule.pattern}, 错误: {str(e)}')
+            # 应用预编译的替换程序 (按规则缓存，规则变更后自动重建)
+            program = replace_program_cache.get(replace_rules, rule.id)
+            if program.full_replace is not None:
+                # 全文替换
+                logger.info(f'执行全文替换:\n原文: "{message_text}"\n替换为: "{program.full_replace}"')
+                message_text = program.full_replace
+            else:
+                old_text = message_text
+                message_text, count = program.apply(message_text)
+                if old_text != message_text:
+                    logger.info(f'执行部分替换:\n原文: "{old_text}"\n替换次数: {count}\n替换后: "{message_text}"')
             
             # 更新上下文中的消息文本
             context.message_text = message_text
@@ -16,6 +16,7 @@ from telethon import events
 from core.container import container
 from core.helpers.sleep_manager import sleep_manager
 from core.config import settings
+from services.message_handoff_cache import message_handoff_cache
 
 # 获取logger
 logger = logging.getLogger(__name__)
@@ -147,6 +148,18 @@ async def setup_listeners(user_client: Any, bot_client: Any) -> None:
                     if error_limiter.should_log("sender_preload"):
                         logger.error(f"预加载发送者信息失败: {e}", exc_info=True)
             
+            # 独立消息数 / 独立发送者数 (按聊天、按天的 HLL 草图，仅内存更新)
+            if settings.HLL_STORE_ENABLED:
+                try:
+                    from repositories.hll_store import get_hll_store
+                    hll_store = get_hll_store()
+                    hll_store.add("messages", event.chat_id, f"{event.chat_id}:{event.id}")
+                    if event.sender_id:
+                        hll_store.add("senders", event.chat_id, event.sender_id)
+                except Exception as e:
+                    if error_limiter.should_log("hll_store"):
+                        logger.error(f"记录基数统计失败: {e}", exc_info=True)
+
             # [Hotword Auto-Collection]
             if getattr(settings, "ENABLE_HOTWORD", True) and getattr(event, "message", None):
                 msg_text = getattr(event, "raw_text", getattr(event.message, "message", ""))
@@ -181,6 +194,8 @@ async def setup_listeners(user_client: Any, bot_client: Any) -> None:
                         "manual_trigger": True, # 标记为手动触发
                         "target_chat_id": user_session.get(event.chat_id, {}).get('target_chat_id') # 捕获目标聊天ID
                     }
+                    if settings.MESSAGE_HANDOFF_ENABLED:
+                        message_handoff_cache.put(event.chat_id, event.message)
                     # 写入高优先级任务 (Priority=100) -> 写入背压队列
                     await container.queue_service.enqueue(
                         ("manual_download", payload, 100)
@@ -232,6 +247,10 @@ async def setup_listeners(user_client: Any, bot_client: Any) -> None:
             rule_priority = await _get_chat_priority(event.chat_id)
             final_priority = base_priority + rule_priority
             
+            # [Handoff] 将已持有的消息对象交给 Worker，省去一次 GetMessages 往返
+            if settings.MESSAGE_HANDOFF_ENABLED:
+                message_handoff_cache.put(event.chat_id, event.message)
+
             # 写入背压消息队列 (由 MessageQueueService QoS 4.0 自动分流和处理背压)
             await container.queue_service.enqueue(
                 ("process_message", payload, final_priority)
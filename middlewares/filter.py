@@ -29,56 +29,64 @@ class FilterMiddleware(Middleware):
             ctx.is_terminated = True
             return
         
+        # 同一消息的多条规则共用一次普通关键词扫描
+        from services.rule.filter import RuleFilterService
+        RuleFilterService.prescan_keywords(ctx.rules, getattr(ctx.message_obj, 'text', None) or '')
+
         # 过滤规则
         passed_rules = []
-        for rule in ctx.rules:
-            logger.info(f"🎯 [过滤器] 正在处理规则 {rule.id}")
+        try:
+            for rule in ctx.rules:
+                logger.info(f"🎯 [过滤器] 正在处理规则 {rule.id}")
             
-            # 1. 动态获取过滤器链
-            chain = self.filter_factory.create_chain_for_rule(rule)
+                # 1. 动态获取过滤器链
+                chain = self.filter_factory.create_chain_for_rule(rule)
             
-            # 2. 创建上下文
-            filter_context = await self._create_filter_context(ctx, rule)
+                # 2. 创建上下文
+                filter_context = await self._create_filter_context(ctx, rule)
             
-            # 3. 执行过滤链
-            should_process = await chain.process_context(filter_context)
+                # 3. 执行过滤链
+                should_process = await chain.process_context(filter_context)
             
-            if should_process:
-                passed_rules.append(rule)
-                # 保存修改后的文本供 Sender 使用
-                final_text = getattr(filter_context, 'message_text', None)
-                original_text = ctx.message_obj.text if hasattr(ctx.message_obj, 'text') else ''
-                if final_text != original_text:
-                    if not hasattr(ctx, 'metadata'):
-                        ctx.metadata = {}
-                    ctx.metadata[f'modified_text_{rule.id}'] = final_text
-                    logger.info(f"📝 [过滤器] 规则 {rule.id} 修改文本成功")
+                if should_process:
+                    passed_rules.append(rule)
+                    # 保存修改后的文本供 Sender 使用
+                    final_text = getattr(filter_context, 'message_text', None)
+                    original_text = ctx.message_obj.text if hasattr(ctx.message_obj, 'text') else ''
+                    if final_text != original_text:
+                        if not hasattr(ctx, 'metadata'):
+                            ctx.metadata = {}
+                        ctx.metadata[f'modified_text_{rule.id}'] = final_text
+                        logger.info(f"📝 [过滤器] 规则 {rule.id} 修改文本成功")
+                    else:
+                        logger.info(f"✅ [过滤器] 规则 {rule.id} 通过所有过滤条件")
                 else:
-                    logger.info(f"✅ [过滤器] 规则 {rule.id} 通过所有过滤条件")
-            else:
-                logger.info(f"🚫 [过滤器] 规则 {rule.id} 被链条拦截")
-                # 计算耗时
-                import time
-                duration = (time.time() - ctx.start_time) * 1000 if hasattr(ctx, 'start_time') else 0
+                    logger.info(f"🚫 [过滤器] 规则 {rule.id} 被链条拦截")
+                    # 计算耗时
+                    import time
+                    duration = (time.time() - ctx.start_time) * 1000 if hasattr(ctx, 'start_time') else 0
                 
-                # 发布过滤事件，用于统计上报
-                if getattr(self.filter_factory, 'container', None):
-                    from core.helpers.msg_utils import detect_message_type
-                    await self.filter_factory.container.bus.publish("FORWARD_FILTERED", {
-                        "rule_id": rule.id,
-                        "msg_id": ctx.message_id,
-                        "reason": str(filter_context.errors[0]) if filter_context.errors else "Unknown",
-                        "msg_text": ctx.message_obj.text if hasattr(ctx.message_obj, 'text') else "",
-                        "msg_type": detect_message_type(ctx.message_obj),
-                        "duration": duration
-                    })
-                else:
-                    logger.warning(f"由于 filter_factory.container 未设置，跳过 FORWARD_FILTERED 事件发布 (Rule={rule.id})")
-                # 记录失败原因到 ctx (可选)
-                if not hasattr(ctx, 'failed_rules'):
-                    ctx.failed_rules = []
-                ctx.failed_rules.append({'rule_id': rule.id, 'errors': filter_context.errors})
-        
+                    # 发布过滤事件，用于统计上报
+                    if getattr(self.filter_factory, 'container', None):
+                        from core.helpers.msg_utils import detect_message_type
+                        await self.filter_factory.container.bus.publish("FORWARD_FILTERED", {
+                            "rule_id": rule.id,
+                            "msg_id": ctx.message_id,
+                            "reason": str(filter_context.errors[0]) if filter_context.errors else "Unknown",
+                            "msg_text": ctx.message_obj.text if hasattr(ctx.message_obj, 'text') else "",
+                            "msg_type": detect_message_type(ctx.message_obj),
+                            "duration": duration
+                        })
+                    else:
+                        logger.warning(f"由于 filter_factory.container 未设置，跳过 FORWARD_FILTERED 事件发布 (Rule={rule.id})")
+                    # 记录失败原因到 ctx (可选)
+                    if not hasattr(ctx, 'failed_rules'):
+                        ctx.failed_rules = []
+                    ctx.failed_rules.append({'rule_id': rule.id, 'errors': filter_context.errors})
+        finally:
+            # 过滤链抛异常时也要清理，避免预扫描结果残留到下一条消息
+            RuleFilterService.clear_prescan()
+
         # 更新上下文规则
         ctx.rules = passed_rules
         
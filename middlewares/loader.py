@@ -5,10 +5,11 @@ from core.helpers.id_utils import normalize_chat_id
 logger = logging.getLogger(__name__)
 
 class RuleLoaderMiddleware(Middleware):
-    def __init__(self, rule_repo):
+    def __init__(self, rule_repo, routing_index=None):
         self.rule_repo = rule_repo
         # [Scheme 7 Fix] 移除 Middleware 级缓存
-        # 信任 Repo 层的 TTL 缓存，确保规则变更能在 60秒内生效
+        # 优先使用 RuleRoutingIndex 快照 (单次字典查找)，未就绪/待重建时回退到 Repo 层缓存
+        self.routing_index = routing_index
 
     async def process(self, ctx, next_call):
         # 复用你现有的缓存查询逻辑
@@ -24,7 +25,10 @@ class RuleLoaderMiddleware(Middleware):
             rule = await self.rule_repo.get_by_id(target_rule_id)
             ctx.rules = [rule] if rule else []
         else:
-            ctx.rules = await self.rule_repo.get_rules_for_source_chat(ctx.chat_id)
+            rules = self.routing_index.lookup(ctx.chat_id) if self.routing_index else None
+            if rules is None:
+                rules = await self.rule_repo.get_rules_for_source_chat(ctx.chat_id)
+            ctx.rules = rules
         
         if not ctx.rules:
             # 日志记录：无规则忽略 (降级为DEBUG以减少噪音)
@@ -1,4 +1,6 @@
+from core.config import settings
 from core.pipeline import Middleware
+from services.forward_aggregator import get_forward_aggregator
 from services.queue_service import forward_messages_queued 
 from services.dedup_service import dedup_service
 from services.smart_buffer import smart_buffer
@@ -141,11 +143,24 @@ class SenderMiddleware(Middleware):
                 logger.info(f"🚀 [发送器] 开始纯转发: 来源={chat_display}({ctx.chat_id}), 目标={target_id}, 消息ID列表={messages_to_forward}")
                 
                 # Execute with Smart Retry
-                await retry_manager.execute(
-                    forward_messages_queued,
-                    ctx.client,
-                    **forward_kwargs
-                )
+                if settings.FORWARD_AGGREGATE_ENABLED:
+                    # 与其他任务发往同一目标的转发合并发送，返回逐条结果
+                    results = await retry_manager.execute(
+                        get_forward_aggregator().forward,
+                        ctx.client,
+                        **forward_kwargs
+                    )
+                    failed_ids = [mid for mid, res in zip(messages_to_forward, results) if res is None]
+                    if results and len(failed_ids) == len(results):
+                        raise RuntimeError(f"转发未返回任何消息: {failed_ids}")
+                    if failed_ids:
+                        logger.warning(f"⚠️ [发送器] 部分消息转发失败: 目标={target_id}, 消息ID={failed_ids}")
+                else:
+                    await retry_manager.execute(
+                        forward_messages_queued,
+                        ctx.client,
+                        **forward_kwargs
+                    )
                 logger.info(f"🚀 [发送器] 纯转发执行成功: 目标={target_id}, 规则ID={rule.id}")
 
             # 触发成功事件
@@ -7,7 +7,7 @@ from models.rule import (
     RSSConfig, RSSPattern
 )
 from models.user import User, AuditLog, ActiveSession, AccessControlList
-from models.stats import ChatStatistics, RuleStatistics, RuleLog
+from models.stats import ChatStatistics, RuleStatistics, RuleLog, RULE_LOGS_FTS_TABLE, RULE_LOGS_FTS_DDL
 from models.system import SystemConfiguration, ErrorLog, TaskQueue, RSSSubscription
 from models.dedup import MediaSignature
 
@@ -20,6 +20,52 @@ def _get_existing_columns(inspector, table_name):
     except Exception:
         return set()
 
+def _ensure_stats_unique_keys(connection, inspector, existing_tables):
+    """
+    确保统计表存在 (chat_id, date) / (rule_id, date) 唯一键 (flush_stats 的 ON CONFLICT 目标)。
+    旧库缺少约束时，先把重复行计数合并到 id 最小的一行，再建唯一索引。
+    """
+    stats_keys = [
+        ('chat_statistics', 'chat_id', ['message_count', 'forward_count', 'saved_traffic_bytes', 'error_count'], 'uq_chat_statistics_chat_date'),
+        ('rule_statistics', 'rule_id', ['total_triggered', 'success_count', 'filtered_count', 'error_count'], 'uq_rule_statistics_rule_date'),
+    ]
+    for table, key, counters, index_name in stats_keys:
+        if table not in existing_tables:
+            continue
+        try:
+            wanted = {key, 'date'}
+            if any(set(uc['column_names']) == wanted for uc in inspector.get_unique_constraints(table)):
+                continue
+            if any(idx.get('unique') and set(idx['column_names']) == wanted for idx in inspector.get_indexes(table)):
+                continue
+
+            sums = ", ".join(
+                f"{col} = (SELECT SUM(COALESCE(d.{col}, 0)) FROM {table} d WHERE d.{key} = {table}.{key} AND d.date = {table}.date)"
+                for col in counters
+            )
+            connection.execute(text(
+                f"UPDATE {table} SET {sums} WHERE id IN (SELECT MIN(id) FROM {table} GROUP BY {key}, date HAVING COUNT(*) > 1)"
+            ))
+            connection.execute(text(
+                f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key}, date)"
+            ))
+            connection.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table}({key}, date)"))
+            logger.info(f"已为 {table} 添加唯一键 ({key}, date)")
+        except Exception as e:
+            logger.warning(f"为 {table} 添加唯一键失败: {e}")
+
+def _ensure_rule_logs_fts(connection, existing_tables):
+    """为已有库补建 rule_logs 全文索引 (首次创建时按现有数据重建)"""
+    if 'rule_logs' not in existing_tables or RULE_LOGS_FTS_TABLE in existing_tables:
+        return
+    try:
+        logger.info("创建 rule_logs 全文索引 (FTS5)...")
+        for sql in RULE_LOGS_FTS_DDL:
+            connection.execute(text(sql))
+        logger.info("rule_logs 全文索引创建完成")
+    except Exception as e:
+        logger.warning(f"创建 rule_logs 全文索引失败 (搜索将退回 LIKE): {e}")
+
 def migrate_db(engine):
     """数据库迁移函数，确保新字段的添加"""
     inspector = inspect(engine)
@@ -364,6 +410,9 @@ def migrate_db(engine):
                 logger.info('已创建所有性能优化索引')
             except Exception as e:
                 logger.warning(f'创建索引时出错: {str(e)}')
+
+            _ensure_stats_unique_keys(connection, inspector, existing_tables)
+            _ensure_rule_logs_fts(connection, existing_tables)
             
             if 'media_types' not in existing_tables:
                 logger.info("创建media_types表...")
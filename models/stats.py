@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, Boolean, DateTime, event
 from sqlalchemy.orm import relationship
+import logging
 from datetime import datetime
 from models.base import Base
 
@@ -55,3 +56,40 @@ class RuleLog(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     rule = relationship('ForwardRule', back_populates='rule_logs')
+
+
+# rule_logs 全文索引：FTS5 外部内容表 + 触发器同步 (trigram 分词，支持中文子串匹配，查询需 >= 3 字符)
+RULE_LOGS_FTS_TABLE = 'rule_logs_fts'
+RULE_LOGS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS rule_logs_fts USING fts5("
+    "message_text, action, content='rule_logs', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS rule_logs_fts_ai AFTER INSERT ON rule_logs BEGIN "
+    "INSERT INTO rule_logs_fts(rowid, message_text, action) VALUES (new.id, new.message_text, new.action); END",
+    "CREATE TRIGGER IF NOT EXISTS rule_logs_fts_ad AFTER DELETE ON rule_logs BEGIN "
+    "INSERT INTO rule_logs_fts(rule_logs_fts, rowid, message_text, action) "
+    "VALUES ('delete', old.id, old.message_text, old.action); END",
+    "CREATE TRIGGER IF NOT EXISTS rule_logs_fts_au AFTER UPDATE OF message_text, action ON rule_logs BEGIN "
+    "INSERT INTO rule_logs_fts(rule_logs_fts, rowid, message_text, action) "
+    "VALUES ('delete', old.id, old.message_text, old.action); "
+    "INSERT INTO rule_logs_fts(rowid, message_text, action) VALUES (new.id, new.message_text, new.action); END",
+    # 按当前 rule_logs 内容重建索引 (新建或修复时)
+    "INSERT INTO rule_logs_fts(rule_logs_fts) VALUES ('rebuild')",
+]
+
+
+@event.listens_for(RuleLog.__table__, 'after_create')
+def _create_rule_logs_fts(target, connection, **kw):
+    """create_all 建表后同步创建全文索引；SQLite 不支持 FTS5/trigram 时仅告警，搜索退回 LIKE"""
+    if connection.dialect.name != 'sqlite':
+        return
+    try:
+        for sql in RULE_LOGS_FTS_DDL:
+            connection.exec_driver_sql(sql)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"创建 rule_logs 全文索引失败: {e}")
+
+
+@event.listens_for(RuleLog.__table__, 'before_drop')
+def _drop_rule_logs_fts(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {RULE_LOGS_FTS_TABLE}")
@@ -86,9 +86,10 @@ def init_archive_system() -> bool:
         contains_hash = bloom.probably_contains("media_signatures", "123", "test_hash")
         if contains_sig and contains_hash:
             logger.info("✅ Bloom索引系统验证通过")
-            # 清理测试生成的 .bf 文件
+            # 清理测试生成的 .bbf 文件
             try:
-                test_bf = os.path.join(BLOOM_ROOT, "media_signatures", "123.bf")
+                from repositories.bloom_index import _bitfile_path
+                test_bf = _bitfile_path("media_signatures", "123")
                 if os.path.exists(test_bf):
                     os.remove(test_bf)
                     logger.debug(f"已清理测试 Bloom 文件: {test_bf}")
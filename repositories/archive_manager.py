@@ -9,7 +9,7 @@ from models.models import (
     RuleLog, RuleStatistics, ChatStatistics, 
     ErrorLog, MediaSignature, TaskQueue
 )
-from repositories.archive_store import write_parquet, compact_small_files
+from repositories.archive_store import write_parquet, compact_small_files, build_missing_text_indexes
 from repositories.archive_init import init_archive_system
 from core.config import settings
 from core.logging import get_logger
@@ -61,7 +61,9 @@ class ArchiveManager:
             for model in self.archive_config.keys():
                 table_name = model.__tablename__
                 compact_small_files(table_name)
-                
+                # 为历史分区补建全文索引 sidecar (已有 sidecar 的分区跳过)
+                await asyncio.to_thread(build_missing_text_indexes, table_name)
+
             logger.info("数据归档周期执行完成")
         except Exception as e:
             logger.error(f"归档周期执行异常: {e}", exc_info=True)
@@ -30,7 +30,8 @@ def repair_bloom_index() -> bool:
 
         # 2. 检查是否需要重建索引
         logger.debug("检查Bloom索引文件")
-        bloom_files = list(Path(BLOOM_ROOT).rglob("*.bf"))
+        # 只统计新格式分片：仅有旧版 .bf 文件时同样从归档重建
+        bloom_files = list(Path(BLOOM_ROOT).rglob("*.bbf"))
         logger.debug(f"找到 {len(bloom_files)} 个Bloom索引文件")
         if not bloom_files:
             logger.info("未发现Bloom索引文件，尝试从归档重建...")
@@ -62,10 +63,10 @@ def repair_bloom_index() -> bool:
         logger.debug(f"测试结果: signature={contains_sig}, hash={contains_hash}")
         if contains_sig and contains_hash:
             logger.info("✅ Bloom索引功能测试通过")
-            # 清理测试生成的 .bf 文件
+            # 清理测试生成的 .bbf 文件
             try:
-                from repositories.bloom_index import BLOOM_ROOT
-                test_bf = os.path.join(BLOOM_ROOT, "media_signatures", "999999.bf")
+                from repositories.bloom_index import _bitfile_path
+                test_bf = _bitfile_path("media_signatures", "999999")
                 if os.path.exists(test_bf):
                     os.remove(test_bf)
                     logger.debug(f"已清理测试 Bloom 文件: {test_bf}")
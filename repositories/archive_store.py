@@ -6,6 +6,8 @@ import glob
 import shutil
 import tempfile
 import random
+import heapq
+import sqlite3
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -130,6 +132,160 @@ def _partition_path(table: str, dt: datetime) -> str:
     )
 
 
+# 分区全文索引 sidecar：表名 -> 参与索引的文本列 (rowid 取行的 id)
+_TEXT_INDEX_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "rule_logs": ("message_text", "action"),
+}
+# v2 起附带 docs(id, created_at) 表以按时间排序；旧版 sidecar 由补建任务替换
+TEXT_INDEX_FILENAME = "_fts_v2.sqlite3"
+_LEGACY_TEXT_INDEX_FILENAMES = ("_fts.sqlite3",)
+
+
+def _is_remote_root() -> bool:
+    return ARCHIVE_ROOT.startswith("s3://") or "://" in ARCHIVE_ROOT
+
+
+def text_index_timestamp(value: Any) -> str:
+    """
+    将 created_at 规整为 SQLAlchemy 在 SQLite 中的存储格式 (YYYY-MM-DD HH:MM:SS.ffffff)，
+    使热库与冷库 sidecar 的时间可按字符串直接比较。
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None).strftime("%Y-%m-%d %H:%M:%S.%f")
+    return str(value)
+
+
+def _write_text_index(table: str, out_dir: str, rows: List[Dict[str, Any]]) -> None:
+    """
+    将本批行追加到分区的全文索引 sidecar (无内容 FTS5，仅存倒排表；docs 表保存 id 与 created_at)。
+    仅支持本地归档根；索引失败不影响 Parquet 归档本身，检索时该分区被跳过。
+    """
+    cols = _TEXT_INDEX_COLUMNS.get(table)
+    if not cols or _is_remote_root():
+        return
+    path = os.path.join(out_dir, TEXT_INDEX_FILENAME)
+    placeholders = ", ".join("?" * (len(cols) + 1))
+    rows = [row for row in rows if row.get("id") is not None]
+    try:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5({', '.join(cols)}, content='', tokenize='trigram')"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, created_at TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_created ON docs(created_at, id)")
+            conn.executemany(
+                f"INSERT INTO fts(rowid, {', '.join(cols)}) VALUES ({placeholders})",
+                ((row["id"], *(row.get(c) for c in cols)) for row in rows),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO docs(id, created_at) VALUES (?, ?)",
+                ((row["id"], text_index_timestamp(row.get("created_at"))) for row in rows),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"写入全文索引 sidecar 失败 {path}: {e}")
+
+
+def _text_index_bounds(path: str) -> Optional[Tuple[Tuple[str, int], Tuple[str, int]]]:
+    """返回 sidecar 中 docs 的最小/最大 (created_at, id)；无文档时返回 None。"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+    try:
+        lowest = conn.execute("SELECT created_at, id FROM docs ORDER BY created_at, id LIMIT 1").fetchone()
+        if lowest is None:
+            return None
+        highest = conn.execute(
+            "SELECT created_at, id FROM docs ORDER BY created_at DESC, id DESC LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+    return tuple(lowest), tuple(highest)
+
+
+def search_text_index(
+    table: str,
+    match: str,
+    limit: int,
+    after: Optional[Tuple[str, int]] = None,
+) -> Tuple[List[Tuple[str, int, str]], List[str]]:
+    """
+    在各日分区的全文索引 sidecar 中检索 (阻塞调用，应在线程中执行)。
+
+    各分区的 BM25 统计量彼此独立、与热库也不可比，因此结果按 (created_at, id) 由新到旧排列，
+    与热库检索使用同一排序键。
+
+    Args:
+        match: FTS5 MATCH 表达式
+        limit: 返回条数上限
+        after: 键集分页游标 (created_at, id)，只返回排在其后 (更旧) 的结果
+
+    Returns:
+        (按 (created_at, id) 降序的 [(created_at, id, 分区目录)], 缺少 sidecar 的分区目录列表)
+    """
+    if _is_remote_root():
+        return [], []
+    sql = "SELECT d.created_at, d.id FROM fts JOIN docs d ON d.id = fts.rowid WHERE fts MATCH ?"
+    params: List[Any] = [match]
+    if after is not None:
+        sql += " AND (d.created_at < ? OR (d.created_at = ? AND d.id < ?))"
+        params += [after[0], after[0], after[1]]
+    sql += " ORDER BY d.created_at DESC, d.id DESC LIMIT ?"
+    params.append(limit)
+
+    # 先经 docs(created_at, id) 索引探测各分区的键区间 (两次索引定位，不触及倒排表)，
+    # 整体早于游标之外的分区按最大键由新到旧排序；已凑满 limit 且下一分区最大键
+    # 早于当前第 limit 条命中时，其后分区都不可能再进入结果，直接停止
+    candidates: List[Tuple[Tuple[str, int], str]] = []
+    unindexed: List[str] = []
+    for part_dir in _list_day_partitions(table):
+        path = os.path.join(part_dir, TEXT_INDEX_FILENAME)
+        if not os.path.exists(path):
+            unindexed.append(part_dir)
+            continue
+        try:
+            bounds = _text_index_bounds(path)
+        except sqlite3.Error as e:
+            logger.warning(f"读取全文索引 sidecar 失败 {path}: {e}")
+            unindexed.append(part_dir)
+            continue
+        if bounds is None:
+            continue
+        lowest, highest = bounds
+        if after is not None and lowest >= tuple(after):
+            continue
+        candidates.append((highest, part_dir))
+    candidates.sort(reverse=True)
+
+    hits: List[Tuple[str, int, str]] = []
+    for highest, part_dir in candidates:
+        if len(hits) >= limit and highest < hits[limit - 1][:2]:
+            break
+        path = os.path.join(part_dir, TEXT_INDEX_FILENAME)
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"检索全文索引 sidecar 失败 {path}: {e}")
+            unindexed.append(part_dir)
+            continue
+        if rows:
+            found = [(ts, row_id, part_dir) for ts, row_id in rows]
+            hits = list(heapq.merge(hits, found, key=lambda h: (h[0], h[1]), reverse=True))[:limit]
+    return hits, unindexed
+
+
 def write_parquet(
     table: str, rows: List[Dict[str, Any]], partition_dt: Optional[datetime] = None
 ) -> str:
@@ -158,6 +314,7 @@ def write_parquet(
             start = end
             chunk_index += 1
         logger.debug(f"分块写入完成，输出目录: {out_dir}")
+        _write_text_index(table, out_dir, rows)
         return out_dir
 
     fname = f"part-{int(datetime.utcnow().timestamp())}-{int(datetime.utcnow().microsecond)}-{os.getpid()}-{random.randint(1000, 9999)}.parquet"
@@ -240,6 +397,7 @@ def write_parquet(
             raise IOError(f"目标文件缺失: {out_file}")
 
         logger.debug(f"写入 Parquet 文件完成: {out_dir}")
+        _write_text_index(table, out_dir, rows)
         return out_dir
 
     except Exception as e:
@@ -410,6 +568,40 @@ def _list_day_partitions(table: str) -> List[str]:
     return result
 
 
+def build_missing_text_indexes(table: str) -> int:
+    """为缺少全文索引 sidecar 的历史分区补建索引 (从分区 Parquet 读取文本列)，返回补建的分区数。"""
+    cols = _TEXT_INDEX_COLUMNS.get(table)
+    if not cols or _is_remote_root():
+        return 0
+    built = 0
+    for part_dir in _list_day_partitions(table):
+        if os.path.exists(os.path.join(part_dir, TEXT_INDEX_FILENAME)):
+            continue
+        pattern = os.path.join(part_dir, "*.parquet").replace("\\", "/")
+        if not glob.glob(pattern):
+            continue
+        try:
+            con = duckdb.connect(database=":memory:")
+            try:
+                res = con.execute(
+                    f"SELECT id, created_at, {', '.join(cols)} FROM read_parquet(?, union_by_name=true)", [pattern]
+                )
+                names = [d[0] for d in res.description]
+                rows = [dict(zip(names, r)) for r in res.fetchall()]
+            finally:
+                con.close()
+            _write_text_index(table, part_dir, rows)
+            # 旧版 sidecar 不含 docs 表，已被新索引取代
+            for legacy in _LEGACY_TEXT_INDEX_FILENAMES:
+                legacy_path = os.path.join(part_dir, legacy)
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+            built += 1
+        except Exception as e:
+            logger.warning(f"补建全文索引失败 {part_dir}: {e}")
+    return built
+
+
 def compact_small_files(table: str, min_files: int = 10) -> List[Tuple[str, int]]:
     """将按日分区目录中较多小文件合并为单个 parquet。"""
     logger.debug(f"压实小文件: table={table}, min_files={min_files}")
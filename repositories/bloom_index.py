@@ -6,7 +6,7 @@ import threading
 import duckdb
 import logging
 import os
-import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple
 
 try:
@@ -19,6 +19,7 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+from core.algorithms.bloom_filter import BloomFilter
 from core.config import settings
 
 # 全局配置映射
@@ -27,8 +28,8 @@ BLOOM_BITS = settings.BLOOM_BITS
 BLOOM_HASHES = settings.BLOOM_HASHES
 BLOOM_SHARD_BY = settings.BLOOM_SHARD_BY
 
-_CACHE_MAX_ENTRIES = settings.BLOOM_CACHE_MAX_ENTRIES
-_CACHE_TTL_SEC = settings.BLOOM_CACHE_TTL_SEC
+# 每个已映射分片持有一个 (mmap 复制的) 文件描述符，上限需远低于 RLIMIT_NOFILE
+_CACHE_MAX_ENTRIES = max(1, min(settings.BLOOM_CACHE_MAX_ENTRIES, settings.BLOOM_MAPPED_SHARDS_MAX))
 
 
 def _ensure_dir(path: str) -> None:
@@ -43,12 +44,18 @@ def _ensure_dir(path: str) -> None:
 
 
 def _bitfile_path(table: str, shard_key: str) -> str:
+    safe = str(shard_key).replace(os.sep, "_")
+    return os.path.join(BLOOM_ROOT, table, f"{safe}.bbf")
+
+
+def _legacy_bitfile_path(table: str, shard_key: str) -> str:
+    """旧版裸位图文件 (无文件头，按 _hashes 置位)，重建前只读回退"""
     safe = str(shard_key).replace(os.sep, "_")
     return os.path.join(BLOOM_ROOT, table, f"{safe}.bf")
 
 
 def _hashes(value: str, k: int, m: int) -> List[int]:
-    # ✅ 优化方案：使用 xxHash + Double Hashing
+    # 仅用于读取旧版 .bf 文件
     if _HAS_XXHASH:
         data = value.encode("utf-8", errors="ignore")
         # 计算两个基础哈希 (64bit)
@@ -62,7 +69,6 @@ def _hashes(value: str, k: int, m: int) -> List[int]:
             positions.append(pos)
         return positions
 
-    # ❌ 原有回退逻辑 (保留用于未安装 xxhash 的情况)
     positions: List[int] = []
     v = value.encode("utf-8", errors="ignore")
     for i in range(k):
@@ -85,8 +91,8 @@ class BloomIndex:
         self.bits = bits or BLOOM_BITS
         self.hashes = hashes or BLOOM_HASHES
         self.shard_by = (shard_by or BLOOM_SHARD_BY).lower()
-        # 简单 LRU/TTL 缓存：path -> (bits, mtime, last_access_epoch)
-        self._cache: Dict[str, Tuple[bytearray, float, float]] = {}
+        # 已映射的分片：path -> (BloomFilter, inode)，按最近使用排序
+        self._filters: "OrderedDict[str, Tuple[BloomFilter, int]]" = OrderedDict()
         self._cache_lock = threading.RLock()  # 保护缓存并发访问
         logger.debug(
             f"BloomIndex 初始化: root={self.root}, bits={self.bits}, hashes={self.hashes}, shard_by={self.shard_by}"
@@ -94,132 +100,67 @@ class BloomIndex:
 
     @property
     def active_shard_count(self) -> int:
-        """返回当前活跃的 Bloom 分片文件数量 (.bf 文件数)"""
+        """返回当前活跃的 Bloom 分片文件数量 (.bbf 文件数)"""
         try:
             return sum(
                 1 for _, _, files in os.walk(self.root)
-                for f in files if f.endswith('.bf')
+                for f in files if f.endswith('.bbf')
             )
         except Exception:
             return 0
 
-    def _prune_cache(self) -> None:
-        with self._cache_lock:
-            if len(self._cache) <= _CACHE_MAX_ENTRIES:
-                return
-            # 以 last_access 排序，淘汰最久未使用的一半
-            items = sorted(self._cache.items(), key=lambda kv: kv[1][2])
-            prune_count = max(1, len(items) // 2)
-            logger.debug(
-                f"缓存条目数 {len(self._cache)} 超过最大值 {_CACHE_MAX_ENTRIES}，淘汰 {prune_count} 个最旧条目"
-            )
-            for path, _ in items[:prune_count]:
-                self._cache.pop(path, None)
-
-    # Removed _get_mmap as it leaks fd and causes SIGBUS. Inlined into add_values.
+    def _open_filter(self, table: str, shard_key: str, create: bool) -> Optional[BloomFilter]:
+        """
+        获取分片的 mmap 布隆过滤器 (分块布隆，见 core.algorithms.bloom_filter)
 
-    def _load_bitarray(self, table: str, shard_key: str) -> bytearray:
+        文件被外部删除或替换 (inode 变化) 时重新映射；create=False 且文件不存在时返回 None。
+        """
         path = _bitfile_path(table, shard_key)
-        logger.debug(f"加载位数组: table={table}, shard_key={shard_key}, path={path}")
-        _ensure_dir(os.path.dirname(path))
-        bytes_len = (self.bits + 7) // 8
-
-        # 缓存命中且未过期、且底层文件未变化
-        now = time.time()
-        with self._cache_lock:
-            cache_item = self._cache.get(path)
         try:
-            file_mtime = os.path.getmtime(path)
-            file_exists = True
-            logger.debug(f"文件存在，修改时间: {file_mtime}")
-        except Exception as e:
-            file_mtime = 0.0
-            file_exists = False
-            logger.debug(f"文件不存在或获取修改时间失败: {e}")
-
-        if cache_item is not None:
-            data, cached_mtime, _last_access = cache_item
-            logger.debug(
-                f"缓存命中: cached_mtime={cached_mtime}, now-last_access={now - _last_access}, file_exists={file_exists}, file_mtime={file_mtime}"
-            )
-            if (now - _last_access) <= _CACHE_TTL_SEC and (
-                not file_exists or cached_mtime == file_mtime
-            ):
-                # 刷新 last_access
-                with self._cache_lock:
-                    self._cache[path] = (data, cached_mtime, now)
-                logger.debug("使用缓存数据")
-                return data
-
-        # 磁盘加载或创建新位图
-        if file_exists:
-            try:
-                logger.debug("从磁盘加载位图")
-                with open(path, "rb") as f:
-                    data = bytearray(f.read())
-                if len(data) < bytes_len:
-                    logger.debug(f"文件大小 {len(data)} 小于预期 {bytes_len}，扩展")
-                    data.extend(b"\x00" * (bytes_len - len(data)))
-                elif len(data) > bytes_len:
-                    logger.debug(f"文件大小 {len(data)} 大于预期 {bytes_len}，截断")
-                    data = data[:bytes_len]
-            except Exception as e:
-                logger.error(f"加载位图文件失败: {e}")
-                logger.debug("加载位图文件失败详细信息", exc_info=True)
-                data = bytearray(bytes_len)
-        else:
-            logger.debug("文件不存在，创建新的位图")
-            data = bytearray(bytes_len)
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            inode = None
+            if not create:
+                return None
 
-        # 写入缓存并做容量控制
         with self._cache_lock:
-            self._cache[path] = (data, file_mtime, now)
-        self._prune_cache()
-        logger.debug(f"位数组加载完成，大小: {len(data)}")
-        return data
-
-    def _save_bitarray(self, table: str, shard_key: str, bits: bytearray) -> None:
-        path = _bitfile_path(table, shard_key)
-        logger.debug(
-            f"保存位数组: table={table}, shard_key={shard_key}, path={path}, size={len(bits)}"
-        )
-        _ensure_dir(os.path.dirname(path))
-        try:
-            with open(path, "wb") as f:
-                f.write(bits)
-            logger.debug("位数组保存完成")
-        except Exception as e:
-            logger.error(f"保存位数组文件失败: {e}")
-            logger.debug("保存位数组文件失败详细信息", exc_info=True)
-            raise
-        try:
-            mtime = os.path.getmtime(path)
-        except Exception as e:
-            logger.warning(f"获取文件修改时间失败: {e}")
-            logger.debug("获取文件修改时间失败详细信息", exc_info=True)
-            mtime = 0.0
-        # 同步缓存
+            cached = self._filters.get(path)
+            if cached is not None and inode is not None and cached[1] == inode:
+                self._filters.move_to_end(path)
+                return cached[0]
+            if cached is not None:
+                self._filters.pop(path)
+                cached[0].close()
+
+            _ensure_dir(os.path.dirname(path))
+            bf = BloomFilter(filepath=path, num_bits=self.bits, hash_count=self.hashes)
+            self._filters[path] = (bf, os.stat(path).st_ino)
+            # 超过上限时关闭最久未用的分片 (解除映射，数据已在文件中)
+            while len(self._filters) > _CACHE_MAX_ENTRIES:
+                _, (old, _) = self._filters.popitem(last=False)
+                old.close()
+            return bf
+
+    def close(self) -> None:
+        """同步并关闭所有已映射的分片"""
         with self._cache_lock:
-            self._cache[path] = (bits, mtime, time.time())
-        logger.debug("缓存同步完成")
-
-    def _set_bit(self, bits: bytearray, pos: int) -> None:
-        byte_index = pos // 8
-        bit_index = pos % 8
-        old_value = bits[byte_index]
-        bits[byte_index] |= 1 << bit_index
-        logger.debug(
-            f"设置位: pos={pos}, byte_index={byte_index}, bit_index={bit_index}, old_value={old_value:08b}, new_value={bits[byte_index]:08b}"
-        )
+            filters, self._filters = self._filters, OrderedDict()
+        for bf, _ in filters.values():
+            bf.close()
 
-    def _get_bit(self, bits: bytearray, pos: int) -> bool:
-        byte_index = pos // 8
-        bit_index = pos % 8
-        result = (bits[byte_index] >> bit_index) & 1 == 1
-        logger.debug(
-            f"获取位: pos={pos}, byte_index={byte_index}, bit_index={bit_index}, value={result}"
-        )
-        return result
+    def _legacy_contains(self, table: str, shard_key: str, value: str) -> bool:
+        """在旧版裸位图文件中查询 (只读映射，不缓存)"""
+        path = _legacy_bitfile_path(table, shard_key)
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    bits = min(self.bits, len(mm) * 8)
+                    for pos in _hashes(str(value), self.hashes, self.bits):
+                        if pos >= bits or not (mm[pos // 8] >> (pos % 8)) & 1:
+                            return False
+                    return True
+        except (FileNotFoundError, ValueError):
+            return False
 
     def _shard(self, row: Dict[str, Any]) -> str:
         if self.shard_by == "chat":
@@ -233,52 +174,13 @@ class BloomIndex:
         logger.debug(
             f"添加值: table={table}, shard_key={shard_key}, values_count={len(values)}"
         )
-        
-        path = _bitfile_path(table, shard_key)
-        _ensure_dir(os.path.dirname(path))
-        bytes_len = (self.bits + 7) // 8
-
-        # 确保文件存在且被填满，避免稀疏文件和阶段性为 0 引发 SIGBUS
-        if not os.path.exists(path) or os.path.getsize(path) < bytes_len:
-            logger.debug(f"文件不存在或大小不足，追加真实零数据: size={bytes_len}")
-            # 使用 ab 追加，避免并发时 wb 截断导致另一个线程由于超出文件范围而 SIGBUS
-            with open(path, "ab") as f:
-                current_size = f.tell()
-                if current_size < bytes_len:
-                    f.write(b"\x00" * (bytes_len - current_size))
-
-        # 使用 mmap 直接操作文件，使用上下文管理器确保 fd 闭环，防泄漏
-        changed = False
-        with open(path, "r+b") as f:
-            with mmap.mmap(f.fileno(), 0) as mm:
-                for val in values:
-                    if not val:
-                        continue
-                    logger.debug(f"处理值: {val}")
-                    for pos in _hashes(str(val), self.hashes, self.bits):
-                        byte_index = pos // 8
-                        bit_index = pos % 8
-                        # 读取当前字节值
-                        current_byte = mm[byte_index]
-                        # 检查位是否已设置
-                        if not (current_byte & (1 << bit_index)):
-                            # 设置位
-                            mm[byte_index] = current_byte | (1 << bit_index)
-                            changed = True
-                            logger.debug(
-                                f"设置位: pos={pos}, byte_index={byte_index}, bit_index={bit_index}, old_value={current_byte:08b}, new_value={mm[byte_index]:08b}"
-                            )
-
-        if changed:
-            logger.debug("位数组已更新，mmap 自动回写")
-        else:
-            logger.debug("位数组未发生变化")
-
-        # 清除缓存，确保下次读取时获取最新数据
-        path = _bitfile_path(table, shard_key)
         with self._cache_lock:
-            self._cache.pop(path, None)
-        logger.debug("缓存已清除，确保数据一致性")
+            bf = self._open_filter(table, shard_key, create=True)
+            for val in values:
+                if val:
+                    bf.add(str(val))
+            # 只 msync 本批修改过的页
+            bf.save()
 
     def add_batch(
         self, table: str, rows: List[Dict[str, Any]], fields: List[str]
@@ -299,21 +201,12 @@ class BloomIndex:
             self.add_values(table, shard_key, values)
 
     def probably_contains(self, table: str, shard_key: str, value: str) -> bool:
-        path = _bitfile_path(table, shard_key)
-        logger.debug(
-            f"Bloom索引检查开始: table={table}, shard_key={shard_key}, value={value}, path={path}"
-        )
-        if not os.path.exists(path):
-            logger.debug("Bloom索引文件不存在，检查结果: False")
-            return False
-        bits = self._load_bitarray(table, shard_key)
-        logger.debug(f"加载位数组完成，大小: {len(bits)}")
-        for pos in _hashes(str(value), self.hashes, self.bits):
-            if not self._get_bit(bits, pos):
-                logger.debug(f"Bloom索引检查结果: False (在位置 {pos} 未找到匹配位)")
-                return False
-        logger.debug("Bloom索引检查结果: True (所有哈希位都匹配)")
-        return True
+        with self._cache_lock:
+            bf = self._open_filter(table, shard_key, create=False)
+            if bf is not None and str(value) in bf:
+                return True
+        # 未重建的旧版分片仍可命中，避免升级后冷区去重漏判
+        return self._legacy_contains(table, shard_key, value)
 
     # ==== 归档重建（媒体签名表）====
     def rebuild_media_signatures(self, archive_root: Optional[str] = None) -> int:
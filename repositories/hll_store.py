@@ -0,0 +1,373 @@
+"""
+HLL 基数存储 (按 指标/作用域/日期 持久化的 HyperLogLog)
+
+每个 (name, scope, day) 一个草图，存于独立 SQLite 文件 (hll_sketches 表)。
+scope 一般为聊天 ID；写入时同时计入 scope='*' 的当日汇总，全局查询只需读汇总行。
+
+- add() 只更新内存中的增量草图 (无 I/O，可在事件循环中直接调用)
+- flush_async() 在线程中把增量按寄存器取最大值并入库内草图
+- count() 合并日期区间 × 作用域内的所有草图 (含尚未落库的增量)，
+  如 "这 50 个聊天本月的独立发送者数" 只需读取并合并 50×30 个寄存器块
+- count_async() 在线程中读库，供事件循环中的统计接口使用
+
+用法::
+
+    store = get_hll_store()
+    store.add("senders", chat_id, sender_id)
+    await store.count_async("senders", "2026-10-01", "2026-10-31", scopes=chat_ids)
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from core.algorithms.hashing import HASH64_ID
+from core.algorithms.hll import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+ALL_SCOPES = "*"
+# IN 查询每批参数个数 (SQLite 默认上限 999)
+_IN_CHUNK = 500
+
+_Key = Tuple[str, str, str]
+
+
+def _day_str(day: Any = None) -> str:
+    if day is None:
+        return date.today().isoformat()
+    if isinstance(day, (date, datetime)):
+        return day.strftime("%Y-%m-%d")
+    return str(day)
+
+
+class HLLStore:
+    """按 (指标, 作用域, 日期) 持久化的 HLL 草图集合"""
+
+    _UPSERT_SQL = (
+        "REPLACE INTO hll_sketches(name, scope, day, registers, updated_at) VALUES (?, ?, ?, ?, ?)"
+    )
+
+    def __init__(self, db_path: str, precision: int = 12, retention_days: int = 400):
+        self.db_path = str(db_path)
+        self.precision = precision
+        self.retention_days = retention_days
+        # 尚未落库的增量 / 正在落库的增量 (查询时两者都要合并)
+        self._deltas: Dict[_Key, HyperLogLog] = {}
+        self._flushing: Dict[_Key, HyperLogLog] = {}
+        self._lock = threading.Lock()
+        # 读连接在线程间共享，串行使用
+        self._read_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.added = 0
+        self.flushed_rows = 0
+        self.skipped_rows = 0
+
+    # ------------------------------------------------------------------
+    # 连接
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+
+    def _db(self) -> sqlite3.Connection:
+        """写连接 (持有 _lock 时使用)"""
+        if self._conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hll_sketches (
+                    name TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    registers BLOB NOT NULL,
+                    updated_at INTEGER NOT NULL,
+                    PRIMARY KEY (name, scope, day)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_hll_day ON hll_sketches(name, day)")
+            self._conn = conn
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """读连接：WAL 模式下查询不等待后台落库事务"""
+        if self._read_conn is None:
+            with self._lock:
+                self._db()
+            self._read_conn = self._connect()
+        return self._read_conn
+
+    def close(self) -> None:
+        with self._lock, self._read_lock:
+            for conn in (self._conn, self._read_conn):
+                if conn is not None:
+                    conn.close()
+            self._conn = None
+            self._read_conn = None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def _delta(self, key: _Key) -> HyperLogLog:
+        hll = self._deltas.get(key)
+        if hll is None:
+            hll = self._deltas[key] = HyperLogLog(b=self.precision)
+        return hll
+
+    def add(self, name: str, scope: Any, item: Any, day: Any = None) -> None:
+        """记录一个元素 (同时计入当日全局汇总)"""
+        day = _day_str(day)
+        x = HyperLogLog.hash_item(item)
+        self._delta((name, str(scope), day)).add_hash(x)
+        self._delta((name, ALL_SCOPES, day)).add_hash(x)
+        self.added += 1
+
+    def _take(self) -> Dict[_Key, HyperLogLog]:
+        pending, self._deltas = self._deltas, {}
+        self._flushing = pending
+        return pending
+
+    def _restore(self, pending: Dict[_Key, HyperLogLog]) -> None:
+        """写入失败时把增量放回，下次刷新重试"""
+        for key, delta in pending.items():
+            current = self._deltas.get(key)
+            if current is not None:
+                delta.merge(current)
+            self._deltas[key] = delta
+
+    def _write(self, pending: Dict[_Key, HyperLogLog]) -> int:
+        """在单个事务中把增量并入库内草图 (增量只读，不会被修改)"""
+        with self._lock:
+            conn = self._db()
+            rows = []
+            now = int(time.time())
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for (name, scope, day), delta in pending.items():
+                    row = conn.execute(
+                        "SELECT registers FROM hll_sketches WHERE name = ? AND scope = ? AND day = ?",
+                        (name, scope, day),
+                    ).fetchone()
+                    merged = self._load(row[0]) if row else None
+                    if merged is None:
+                        merged = delta
+                    else:
+                        merged.merge(delta)
+                    rows.append((name, scope, day, merged.to_bytes(), now))
+                conn.executemany(self._UPSERT_SQL, rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self.flushed_rows += len(rows)
+        return len(rows)
+
+    def flush(self) -> int:
+        """把内存增量并入库内草图，返回写入行数 (阻塞调用)"""
+        pending = self._take()
+        if not pending:
+            return 0
+        try:
+            return self._write(pending)
+        except Exception:
+            self._restore(pending)
+            raise
+        finally:
+            self._flushing = {}
+
+    async def flush_async(self) -> int:
+        """flush 的异步版本：增量的交换与回滚在事件循环中进行，只把 SQLite 写入放到线程"""
+        pending = self._take()
+        if not pending:
+            return 0
+        try:
+            return await asyncio.to_thread(self._write, pending)
+        except Exception:
+            self._restore(pending)
+            raise
+        finally:
+            self._flushing = {}
+
+    def prune(self, before_day: Any = None) -> int:
+        """删除早于保留期的草图"""
+        if before_day is None:
+            before_day = date.today() - timedelta(days=self.retention_days)
+        with self._lock:
+            cur = self._db().execute("DELETE FROM hll_sketches WHERE day < ?", (_day_str(before_day),))
+            return cur.rowcount
+
+    def _load(self, blob: bytes) -> Optional[HyperLogLog]:
+        try:
+            hll = HyperLogLog.from_bytes(blob)
+        except Exception as e:
+            logger.warning(f"HLL 草图损坏，已忽略: {e}")
+            self.skipped_rows += 1
+            return None
+        if hll.b != self.precision or hll.hash_id != HASH64_ID:
+            # 精度或哈希实现变更后旧草图无法合并
+            self.skipped_rows += 1
+            return None
+        return hll
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def _range(self, start_day: Any, end_day: Any, scopes: Optional[Iterable[Any]]):
+        start = _day_str(start_day)
+        end = _day_str(end_day) if end_day is not None else start
+        scope_list = [ALL_SCOPES] if scopes is None else list(dict.fromkeys(str(s) for s in scopes))
+        return start, end, scope_list
+
+    def _snapshot(self) -> Tuple[Dict[_Key, HyperLogLog], ...]:
+        """
+        取当前的增量字典引用 (须在事件循环线程中调用)
+
+        _take 会替换 _deltas 而不是清空，快照中的字典在落库期间保持不变，
+        因此先快照再读库：读库期间完成的落库也不会丢数据。
+        """
+        return (self._flushing, self._deltas)
+
+    def _read_union(self, name: str, start: str, end: str, scope_list: list) -> HyperLogLog:
+        """合并库内草图 (阻塞 I/O，可在线程中调用)"""
+        result = HyperLogLog(b=self.precision)
+        conn = self._reader()
+        with self._read_lock:
+            for i in range(0, len(scope_list), _IN_CHUNK):
+                chunk = scope_list[i:i + _IN_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT registers FROM hll_sketches WHERE name = ? AND day BETWEEN ? AND ? "
+                    f"AND scope IN ({placeholders})",
+                    (name, start, end, *chunk),
+                ).fetchall()
+                for (blob,) in rows:
+                    hll = self._load(blob)
+                    if hll is not None:
+                        result.merge(hll)
+        return result
+
+    @staticmethod
+    def _merge_pending(result: HyperLogLog, snapshot, name: str, start: str, end: str, scope_list: list) -> None:
+        # 正在落库的增量可能已提交，重复合并对取最大值无影响
+        wanted = set(scope_list)
+        for pending in snapshot:
+            for (key_name, scope, day), delta in pending.items():
+                if key_name == name and scope in wanted and start <= day <= end:
+                    result.merge(delta)
+
+    def union(
+        self,
+        name: str,
+        start_day: Any,
+        end_day: Any = None,
+        scopes: Optional[Iterable[Any]] = None,
+    ) -> HyperLogLog:
+        """
+        合并日期区间 [start_day, end_day] 内指定作用域 (默认全部) 的草图 (阻塞调用)
+
+        需在调用 add 的线程中调用；事件循环中请使用 union_async。
+        """
+        start, end, scope_list = self._range(start_day, end_day, scopes)
+        snapshot = self._snapshot()
+        result = self._read_union(name, start, end, scope_list)
+        self._merge_pending(result, snapshot, name, start, end, scope_list)
+        return result
+
+    async def union_async(
+        self,
+        name: str,
+        start_day: Any,
+        end_day: Any = None,
+        scopes: Optional[Iterable[Any]] = None,
+    ) -> HyperLogLog:
+        """union 的异步版本：增量快照与合并在事件循环中进行，只把 SQLite 读取放到线程"""
+        start, end, scope_list = self._range(start_day, end_day, scopes)
+        snapshot = self._snapshot()
+        result = await asyncio.to_thread(self._read_union, name, start, end, scope_list)
+        self._merge_pending(result, snapshot, name, start, end, scope_list)
+        return result
+
+    def count(
+        self,
+        name: str,
+        start_day: Any,
+        end_day: Any = None,
+        scopes: Optional[Iterable[Any]] = None,
+    ) -> int:
+        """日期区间 × 作用域内的独立元素数估计 (阻塞调用)"""
+        return self.union(name, start_day, end_day, scopes).count()
+
+    async def count_async(
+        self,
+        name: str,
+        start_day: Any,
+        end_day: Any = None,
+        scopes: Optional[Iterable[Any]] = None,
+    ) -> int:
+        """count 的异步版本 (SQLite 读取在线程中进行)"""
+        return (await self.union_async(name, start_day, end_day, scopes)).count()
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    async def start(self, interval: float = 30.0) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop(interval), name="HLLStoreFlush")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        try:
+            await self.flush_async()
+        except Exception as e:
+            logger.error(f"HLL 草图落库失败: {e}")
+
+    async def _flush_loop(self, interval: float) -> None:
+        last_prune = 0.0
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.flush_async()
+                if time.time() - last_prune >= 86400:
+                    await asyncio.to_thread(self.prune)
+                    last_prune = time.time()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"HLL 草图落库失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "pending_sketches": len(self._deltas),
+            "flushed_rows": self.flushed_rows,
+            "skipped_rows": self.skipped_rows,
+        }
+
+
+_hll_store: Optional[HLLStore] = None
+
+
+def get_hll_store() -> HLLStore:
+    global _hll_store
+    if _hll_store is None:
+        from core.config import settings
+
+        _hll_store = HLLStore(
+            settings.HLL_STORE_PATH,
+            precision=settings.HLL_STORE_PRECISION,
+            retention_days=settings.HLL_STORE_RETENTION_DAYS,
+        )
+    return _hll_store
@@ -1,7 +1,7 @@
 import logging
 import asyncio
 from typing import Dict, List, Optional, Any
-from sqlalchemy import select, delete, func, text
+from sqlalchemy import select, delete, func, literal, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.sqlite import insert
 
@@ -24,27 +24,51 @@ class HotwordRepository:
         异步 UPSERT 写入原始统计数据。
         counts 格式: { word: {"f": frequency, "u": user_increment} }
         """
+        await self.save_temp_counts_bulk({channel: counts})
+
+    @staticmethod
+    def _raw_upsert_stmt():
+        """参数化的累加 UPSERT 语句 (配合参数列表走 executemany)"""
+        stmt = insert(HotRawStats)
+        return stmt.on_conflict_do_update(
+            index_elements=['channel', 'word'],
+            set_={
+                "score": HotRawStats.score + stmt.excluded.score,
+                "unique_users": HotRawStats.unique_users + stmt.excluded.unique_users,
+                "last_update": func.now(),
+            }
+        )
+
+    async def save_temp_counts_bulk(self, batches: Dict[str, Dict[str, Dict[str, Any]]]) -> int:
+        """
+        批量 UPSERT 多个频道的原始统计数据：单事务、单条参数化语句 executemany。
+        batches 格式: { channel: { word: {"f": frequency, "u": user_increment} } }
+
+        Returns:
+            写入的 (channel, word) 行数，失败时返回 0
+        """
+        params = [
+            {
+                "channel": channel,
+                "word": word,
+                "score": meta.get("f", 0.0),
+                "unique_users": meta.get("u", 0),
+            }
+            for channel, counts in batches.items()
+            for word, meta in counts.items()
+        ]
+        if not params:
+            return 0
+
         async with self.session_factory() as session:
             try:
-                # 采用 SQLite 批处理 UPSERT (Insert or Update)
-                for word, meta in counts.items():
-                    stmt = insert(HotRawStats).values(
-                        channel=channel,
-                        word=word,
-                        score=meta.get("f", 0.0),
-                        unique_users=meta.get("u", 0)
-                    ).on_conflict_do_update(
-                        index_elements=['channel', 'word'],
-                        set_={
-                            "score": HotRawStats.score + meta.get("f", 0.0),
-                            "unique_users": HotRawStats.unique_users + meta.get("u", 0)
-                        }
-                    )
-                    await session.execute(stmt)
+                await session.execute(self._raw_upsert_stmt(), params)
                 await session.commit()
+                return len(params)
             except Exception as e:
                 await session.rollback()
-                logger.error(f"Hotword DB Save Error ({channel}): {e}")
+                logger.error(f"Hotword DB Save Error ({len(batches)} channels, {len(params)} rows): {e}")
+                return 0
 
     async def load_rankings(self, channel: str, filename_or_period: str) -> Dict[str, Any]:
         """
@@ -134,76 +158,72 @@ class HotwordRepository:
                 logger.error(f"Hotword Config Save Error ({name}): {e}")
                 return False
 
-    async def move_temp_to_daily(self, date_key: str, semaphore: asyncio.Semaphore):
-        """将 hot_raw_stats 中的数据归档到 hot_period_stats (day 级)"""
-        channels = await self.get_channel_dirs()
-        for channel in channels:
-            async with semaphore:
-                async with self.session_factory() as session:
-                    try:
-                        # 1. 读取该频道所有 temp 数据
-                        stmt = select(HotRawStats).where(HotRawStats.channel == channel)
-                        result = await session.execute(stmt)
-                        rows = result.scalars().all()
-                        
-                        if not rows: continue
-                        
-                        # 2. 批量插入到 period 统计表
-                        for row in rows:
-                            new_row = HotPeriodStats(
-                                channel=channel,
-                                word=row.word,
-                                period='day',
-                                date_key=date_key,
-                                score=row.score,
-                                user_count=row.unique_users
-                            )
-                            session.add(new_row)
-                        
-                        # 3. 清空该频道的 raw 数据 (原子操作)
-                        await session.execute(delete(HotRawStats).where(HotRawStats.channel == channel))
-                        await session.commit()
-                        logger.info(f"Archived daily hotwords for channel: {channel}")
-                    except Exception as e:
-                        await session.rollback()
-                        logger.error(f"Archive Daily Error ({channel}): {e}")
-                await asyncio.sleep(0.05) # Jitter
-
-    async def summarize_period(self, source_period: str, target_period: str, source_date_pattern: str, target_date_key: str, semaphore: asyncio.Semaphore):
-        """跨周期聚合 (如 day -> month)"""
-        channels = await self.get_channel_dirs_from_period(source_period, source_date_pattern)
-        for channel in channels:
-            async with semaphore:
-                async with self.session_factory() as session:
-                    try:
-                        # 聚合逻辑：同一频道下的同一词在 source_date_pattern 范围内的总和
-                        # 简单实现：SELECT word, SUM(score), SUM(user_count) ...
-                        stmt = select(
-                            HotPeriodStats.word, 
-                            func.sum(HotPeriodStats.score).label("total_score"),
-                            func.sum(HotPeriodStats.user_count).label("total_users")
+    async def move_temp_to_daily(self, date_key: str, semaphore: asyncio.Semaphore) -> int:
+        """
+        将 hot_raw_stats 中的数据归档到 hot_period_stats (day 级)。
+        INSERT ... SELECT 与清空 raw 表在同一事务内完成，数据不经过 Python。
+
+        Returns:
+            归档行数，失败时返回 0
+        """
+        async with semaphore:
+            async with self.session_factory() as session:
+                try:
+                    archive = insert(HotPeriodStats).from_select(
+                        ['channel', 'word', 'period', 'date_key', 'score', 'user_count'],
+                        select(
+                            HotRawStats.channel,
+                            HotRawStats.word,
+                            literal('day'),
+                            literal(date_key),
+                            HotRawStats.score,
+                            HotRawStats.unique_users,
+                        )
+                    )
+                    result = await session.execute(archive)
+                    # 同一写事务内清空 raw 数据，期间到达的 flush 会等待锁，不会丢失
+                    await session.execute(delete(HotRawStats))
+                    await session.commit()
+                    archived = max(result.rowcount or 0, 0)
+                    logger.info(f"Archived daily hotwords for {date_key}: {archived} rows")
+                    return archived
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(f"Archive Daily Error ({date_key}): {e}")
+                    return 0
+
+    async def summarize_period(self, source_period: str, target_period: str, source_date_pattern: str, target_date_key: str, semaphore: asyncio.Semaphore) -> int:
+        """
+        跨周期聚合 (如 day -> month)：一条 INSERT ... SELECT ... GROUP BY 覆盖全部频道。
+
+        Returns:
+            聚合写入行数，失败时返回 0
+        """
+        async with semaphore:
+            async with self.session_factory() as session:
+                try:
+                    # 同一频道下的同一词在 source_date_pattern 范围内的总和
+                    summary = insert(HotPeriodStats).from_select(
+                        ['channel', 'word', 'period', 'date_key', 'score', 'user_count'],
+                        select(
+                            HotPeriodStats.channel,
+                            HotPeriodStats.word,
+                            literal(target_period),
+                            literal(target_date_key),
+                            func.sum(HotPeriodStats.score),
+                            func.sum(HotPeriodStats.user_count),
                         ).where(
-                            HotPeriodStats.channel == channel,
                             HotPeriodStats.period == source_period,
                             HotPeriodStats.date_key.like(f"{source_date_pattern}%")
-                        ).group_by(HotPeriodStats.word)
-                        
-                        result = await session.execute(stmt)
-                        for word, s, u in result.all():
-                            new_row = HotPeriodStats(
-                                channel=channel,
-                                word=word,
-                                period=target_period,
-                                date_key=target_date_key,
-                                score=s,
-                                user_count=u
-                            )
-                            session.add(new_row)
-                        await session.commit()
-                    except Exception as e:
-                        await session.rollback()
-                        logger.error(f"Summarize Period Error ({channel}): {e}")
-                await asyncio.sleep(0.1)
+                        ).group_by(HotPeriodStats.channel, HotPeriodStats.word)
+                    )
+                    result = await session.execute(summary)
+                    await session.commit()
+                    return max(result.rowcount or 0, 0)
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(f"Summarize Period Error ({source_period} -> {target_period}): {e}")
+                    return 0
 
     async def get_channel_dirs_from_period(self, period: str, date_pattern: str) -> List[str]:
         async with self.session_factory() as session:
@@ -23,6 +23,13 @@ class RuleRepository:
         # 统一使用 W-TinyLFU 替代 TTLCache
         self._source_rules_cache = WTinyLFUCompatible(ttl_seconds=15, maxsize=1024)
         self._target_rules_cache = WTinyLFUCompatible(ttl_seconds=15, maxsize=1024)
+        # 缓存失效监听者 (如 RuleRoutingIndex)，签名: callback(chat_id: Optional[int])
+        self._invalidation_listeners = []
+
+    def add_invalidation_listener(self, callback):
+        """注册规则缓存失效回调，所有 clear_cache 调用都会同步通知"""
+        if callback not in self._invalidation_listeners:
+            self._invalidation_listeners.append(callback)
 
     @staticmethod
     def _get_rule_select_options():
@@ -188,6 +195,12 @@ class RuleRepository:
         except Exception as e:
             logger.debug(f"Failed to clear cache: {e}")
 
+        for callback in self._invalidation_listeners:
+            try:
+                callback(chat_id)
+            except Exception as e:
+                logger.warning(f"Rule cache invalidation listener failed: {e}")
+
     async def get_rules_for_target_chat(self, chat_id, session=None) -> List[RuleDTO]:
         """获取目标聊天的规则 (只读点)"""
         cached = self._target_rules_cache.get(chat_id)
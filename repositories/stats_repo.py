@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Optional, Tuple
 from models.models import RuleLog, ChatStatistics, ErrorLog, RuleStatistics, ForwardRule, Chat
-from sqlalchemy import select, update, insert, func
+from sqlalchemy import select, insert, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import joinedload
 from datetime import date, datetime
 import asyncio
@@ -11,6 +12,9 @@ from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# SQLite 单条语句绑定参数上限 (3.32 之前为 999)
+_SQLITE_MAX_PARAMS = 999
+
 
 
 def _evict_by_level(buffer: list, keep_ratio: float) -> list:
@@ -170,6 +174,32 @@ class StatsRepository:
         except Exception as e:
             logger.error(f"Failed to flush logs to DB: {e}")
 
+    @staticmethod
+    async def _bulk_upsert_counters(session, model, key_col, counters: tuple, rows: list) -> None:
+        """
+        多行累加 UPSERT：INSERT ... VALUES (...), (...) ON CONFLICT(key, date) DO UPDATE SET x = x + excluded.x
+
+        多行 VALUES 中每个非主键列 (含 created_at 等默认值列) 各占一个绑定参数，
+        按 SQLite 参数上限计算每条语句的行数。
+        """
+        if not rows:
+            return
+        per_row = max(1, len(model.__table__.columns) - 1)
+        chunk = max(1, _SQLITE_MAX_PARAMS // per_row)
+        for i in range(0, len(rows), chunk):
+            stmt = sqlite_insert(model).values(rows[i:i + chunk])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key_col, model.date],
+                set_={
+                    **{
+                        col: func.coalesce(getattr(model, col), 0) + getattr(stmt.excluded, col)
+                        for col in counters
+                    },
+                    "updated_at": datetime.utcnow(),
+                },
+            )
+            await session.execute(stmt)
+
     @async_db_retry(max_retries=5)
     async def flush_stats(self):
         """批量将内存累加器 upsert 到 DB（一次事务，高效）"""
@@ -181,55 +211,36 @@ class StatsRepository:
             self._chat_stats_buffer.clear()
             self._rule_stats_buffer.clear()
 
+        chat_rows = [
+            {
+                "chat_id": chat_id, "date": dt,
+                "forward_count": vals.get("forward_count", 0),
+                "saved_traffic_bytes": vals.get("saved_traffic_bytes", 0),
+            }
+            for (chat_id, dt), vals in chat_snap.items()
+        ]
+        rule_rows = [
+            {
+                "rule_id": rule_id, "date": dt,
+                "total_triggered": vals.get("total_triggered", 0),
+                "success_count": vals.get("success_count", 0),
+                "error_count": vals.get("error_count", 0),
+                "filtered_count": vals.get("filtered_count", 0),
+            }
+            for (rule_id, dt), vals in rule_snap.items()
+        ]
+
         try:
             async with self.db.get_session() as session:
-
-                # 批量处理 ChatStatistics（upsert 累加）
-                for (chat_id, dt), vals in chat_snap.items():
-                    stmt = (
-                        update(ChatStatistics)
-                        .where(ChatStatistics.chat_id == chat_id, ChatStatistics.date == dt)
-                        .values(
-                            forward_count=ChatStatistics.forward_count + vals.get("forward_count", 0),
-                            saved_traffic_bytes=ChatStatistics.saved_traffic_bytes + vals.get("saved_traffic_bytes", 0)
-                        )
-                    )
-                    result = await session.execute(stmt)
-                    if result.rowcount == 0:
-                        try:
-                            await session.execute(insert(ChatStatistics).values(
-                                chat_id=chat_id, date=dt,
-                                forward_count=vals.get("forward_count", 0),
-                                saved_traffic_bytes=vals.get("saved_traffic_bytes", 0)
-                            ))
-                        except Exception:
-                            # 并发竞争时可能已被插入，重试 UPDATE
-                            await session.execute(stmt)
-
-                # 批量处理 RuleStatistics（upsert 累加）
-                for (rule_id, dt), vals in rule_snap.items():
-                    stmt = (
-                        update(RuleStatistics)
-                        .where(RuleStatistics.rule_id == rule_id, RuleStatistics.date == dt)
-                        .values(
-                            total_triggered=RuleStatistics.total_triggered + vals.get("total_triggered", 0),
-                            success_count=RuleStatistics.success_count + vals.get("success_count", 0),
-                            error_count=RuleStatistics.error_count + vals.get("error_count", 0),
-                            filtered_count=RuleStatistics.filtered_count + vals.get("filtered_count", 0),
-                        )
-                    )
-                    result = await session.execute(stmt)
-                    if result.rowcount == 0:
-                        try:
-                            await session.execute(insert(RuleStatistics).values(
-                                rule_id=rule_id, date=dt,
-                                total_triggered=vals.get("total_triggered", 0),
-                                success_count=vals.get("success_count", 0),
-                                error_count=vals.get("error_count", 0),
-                                filtered_count=vals.get("filtered_count", 0),
-                            ))
-                        except Exception:
-                            await session.execute(stmt)
+                # 每表一条多行 INSERT ... ON CONFLICT DO UPDATE (按参数上限分块)
+                await self._bulk_upsert_counters(
+                    session, ChatStatistics, ChatStatistics.chat_id,
+                    ("forward_count", "saved_traffic_bytes"), chat_rows,
+                )
+                await self._bulk_upsert_counters(
+                    session, RuleStatistics, RuleStatistics.rule_id,
+                    ("total_triggered", "success_count", "error_count", "filtered_count"), rule_rows,
+                )
 
                 await session.commit()
                 total_keys = len(chat_snap) + len(rule_snap)
@@ -398,6 +409,55 @@ class StatsRepository:
             items = result.scalars().all()
             return items, total
 
+    async def search_logs_fulltext(
+        self, match: str, limit: int = 50, after: Optional[Tuple[str, int]] = None
+    ) -> Optional[list]:
+        """
+        基于 rule_logs_fts 的全文检索 (只读)，按 (created_at, id) 由新到旧键集分页。
+
+        不按 BM25 排序：冷库各分区的 BM25 统计量与热库不可比，两层结果只能按时间合并。
+
+        Args:
+            match: FTS5 MATCH 表达式
+            after: 上一页最后一条的 (sort_ts, id)
+
+        Returns:
+            行字典列表 (含排序键 sort_ts)；全文索引不可用时返回 None，由调用方退回 LIKE
+        """
+        # 沿 rule_logs.created_at 索引从游标处由新到旧遍历、逐行探测 FTS 命中集合，凑满 limit 即停，
+        # 不再把全部命中行连表后整体排序。"+l.id" 阻止规划器改由 rowid IN 列表驱动；
+        # 键集条件写成对原始列的范围谓词，避免 OR / COALESCE 使索引失效
+        base = (
+            "SELECT l.id, l.rule_id, l.action, l.message_text, l.message_type, l.created_at, "
+            "COALESCE(l.created_at, '') AS sort_ts "
+            "FROM rule_logs l "
+            "WHERE +l.id IN (SELECT rowid FROM rule_logs_fts WHERE rule_logs_fts MATCH :match) "
+        )
+        order = "ORDER BY l.created_at DESC, l.id DESC LIMIT :limit"
+        params = {"match": match, "limit": limit}
+        null_tail = None
+        if after is None:
+            sql = base + order
+        elif after[0]:
+            sql = base + "AND l.created_at <= :ts AND (l.created_at < :ts OR l.id < :after_id) " + order
+            # created_at 为 NULL 的历史行 sort_ts 为空串，排在所有非空行之后，由范围谓词之外单独补齐
+            null_tail = base + "AND l.created_at IS NULL " + order
+            params.update(ts=after[0], after_id=after[1])
+        else:
+            sql = base + "AND l.created_at IS NULL AND l.id < :after_id " + order
+            params.update(after_id=after[1])
+
+        try:
+            async with self.db.get_session(readonly=True) as session:
+                rows = [dict(row._mapping) for row in await session.execute(text(sql), params)]
+                if null_tail is not None and len(rows) < limit:
+                    tail = await session.execute(text(null_tail), {**params, "limit": limit - len(rows)})
+                    rows += [dict(row._mapping) for row in tail]
+                return rows
+        except Exception as e:
+            logger.debug(f"[LogSearch] 全文索引不可用，退回 LIKE: {e}")
+            return None
+
     async def get_message_type_distribution(self):
         """获取消息类型分布统计 (只读)"""
         async with self.db.get_session(readonly=True) as session:
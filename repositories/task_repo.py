@@ -6,9 +6,13 @@ from core.states import validate_transition
 from core.config import settings
 from core.helpers.db_utils import async_db_retry
 from core.helpers.batch_sink import task_status_sink
+from core.helpers.task_signal import task_signal
 
 logger = logging.getLogger(__name__)
 
+# SQLite 单条语句绑定参数上限 (3.32 之前为 999)
+_SQLITE_MAX_PARAMS = 999
+
 class TaskRepository:
     def __init__(self, db):
         self.db = db
@@ -61,6 +65,8 @@ class TaskRepository:
             
             if result.rowcount > 0:
                 logger.info(f"✅ 任务入列成功 (Key: {unique_key})")
+                # 提交后唤醒 Dispatcher (延迟任务登记到期时间)
+                task_signal.schedule(scheduled_at)
             else:
                 if unique_key:
                     logger.warning(f"⚠️ 任务已存在，跳过入列: {unique_key}")
@@ -107,13 +113,20 @@ class TaskRepository:
         if not values_list:
             return
 
+        # 多行 VALUES 中每个非主键列 (含默认值列) 各占一个绑定参数，按 SQLite 参数上限分批
+        per_row = max(1, len(TaskQueue.__table__.columns) - 1)
+        chunk = max(1, _SQLITE_MAX_PARAMS // per_row)
+
         from core.db_factory import AsyncSessionManager
         async with AsyncSessionManager() as session:
-             # 使用 Core Insert + OR IGNORE (SQLite) 实现高性能批量去重写入
-             stmt = insert(TaskQueue).values(values_list).prefix_with('OR IGNORE')
-             await session.execute(stmt)
+             # 使用 Core Insert + OR IGNORE (SQLite) 实现高性能批量去重写入 (同一事务内分批)
+             for i in range(0, len(values_list), chunk):
+                 stmt = insert(TaskQueue).values(values_list[i:i + chunk]).prefix_with('OR IGNORE')
+                 await session.execute(stmt)
              # AsyncSessionManager handles commit automatically
              logger.info(f"✅ 批量聚合写入: {len(values_list)} 条任务")
+        # 退出上下文即已提交，唤醒 Dispatcher
+        task_signal.notify()
 
     @async_db_retry(max_retries=5)
     async def fetch_next(self, limit: int = 1):
@@ -220,6 +233,7 @@ class TaskRepository:
             result = await session.execute(stmt)
             task = result.scalar_one_or_none()
             
+            retry_at = None
             if task:
                 now = datetime.utcnow()
                 task.error_message = str(error)
@@ -231,6 +245,7 @@ class TaskRepository:
                         # 实现指数退避算法：2^(attempts) 秒
                         backoff_seconds = 2 ** task.attempts
                         task.next_retry_at = now + timedelta(seconds=backoff_seconds)
+                        retry_at = task.next_retry_at
                         task.updated_at = now
                         logger.info(f"任务重试: {task_id}, 重试次数: {task.attempts}, 下次重试时间: {task.next_retry_at}")
                 else:
@@ -239,6 +254,8 @@ class TaskRepository:
                         task.updated_at = now
                         logger.error(f"任务最终失败: {task_id}, 错误: {error}")
                 await session.commit()
+            if retry_at:
+                task_signal.schedule(retry_at)
             
     @async_db_retry(max_retries=5)
     async def rescue_stuck_tasks(self, timeout_minutes: int = 10):
@@ -265,6 +282,7 @@ class TaskRepository:
             
             if result.rowcount > 0:
                 logger.info(f"已救援 {result.rowcount} 个僵尸任务")
+                task_signal.notify()
             return result.rowcount
             
     @async_db_retry(max_retries=5)
@@ -288,6 +306,7 @@ class TaskRepository:
             await session.commit()
             if result.rowcount > 0:
                 logger.info(f"任务重新调度: {task_id}, 下次执行时间: {next_run_time}")
+                task_signal.schedule(next_run_time)
             else:
                 logger.warning(f"任务调度跳过(状态不匹配或不存在): {task_id}")
 
@@ -342,6 +361,23 @@ class TaskRepository:
             logger.info(f"🔒 原子锁定并获取媒体组任务: {len(tasks)} 个 (Group: {grouped_id})")
             return tasks
 
+    @async_db_retry(max_retries=5)
+    async def get_pending_due_times(self, limit: int = 1000) -> list:
+        """
+        获取尚未到期的 pending 任务的到期时间 (scheduled_at / next_retry_at 取较晚者)，
+        供 Dispatcher 启动时初始化到期堆。
+        """
+        now = datetime.utcnow()
+        async with self.db.get_session(readonly=True) as session:
+            stmt = (
+                select(TaskQueue.scheduled_at, TaskQueue.next_retry_at)
+                .where(TaskQueue.status == 'pending')
+                .where((TaskQueue.scheduled_at > now) | (TaskQueue.next_retry_at > now))
+                .limit(limit)
+            )
+            rows = (await session.execute(stmt)).all()
+        return [max(t for t in row if t is not None) for row in rows]
+
     @async_db_retry(max_retries=5)
     async def get_queue_status(self):
         """获取队列状态统计 (只读)"""
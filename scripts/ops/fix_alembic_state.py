@@ -11,7 +11,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 # 当前最新的迁移版本
-CURRENT_REVISION = "e76e90efcd4c"
+CURRENT_REVISION = "8e3b6c0a4d21"
 
 
 def get_db_path():
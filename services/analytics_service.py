@@ -1,3 +1,4 @@
+import heapq
 import logging
 import traceback
 import os
@@ -87,12 +88,10 @@ class AnalyticsService:
             except Exception as e:
                 logger.error(f"AnalyticsService 获取去重统计失败: {e}")
                 
-            # 4. 获取 HLL 独立消息估计
-            hll_stats = {'unique_messages_estimate': 0}
+            # 4. 获取 HLL 独立消息/发送者估计 (当日全局汇总草图)
+            hll_stats = {'unique_messages_estimate': 0, 'unique_senders_estimate': 0}
             try:
-                from core.algorithms.hll import GlobalHLL
-                hll = GlobalHLL.get_hll("unique_messages_today")
-                hll_stats = {'unique_messages_estimate': hll.count()}
+                hll_stats = await self.get_unique_counts()
             except Exception as e:
                 logger.warning(f"AnalyticsService 获取 HLL 统计失败: {e}")
 
@@ -140,6 +139,30 @@ class AnalyticsService:
                 'error': str(e)
             }
 
+    async def get_unique_counts(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        chat_ids: Optional[List[Any]] = None,
+    ) -> Dict[str, int]:
+        """
+        日期区间内 (默认今天) 的独立消息数与独立发送者数估计
+
+        Args:
+            start_date / end_date: "YYYY-MM-DD"，end_date 缺省时与 start_date 相同
+            chat_ids: 限定聊天 (并集去重)，None 表示全部聊天
+        """
+        from core.config import settings
+        if not settings.HLL_STORE_ENABLED:
+            return {'unique_messages_estimate': 0, 'unique_senders_estimate': 0}
+        from repositories.hll_store import get_hll_store
+        store = get_hll_store()
+        start = start_date or datetime.now().strftime("%Y-%m-%d")
+        return {
+            'unique_messages_estimate': await store.count_async("messages", start, end_date, chat_ids),
+            'unique_senders_estimate': await store.count_async("senders", start, end_date, chat_ids),
+        }
+
     async def get_system_status(self) -> Dict[str, Any]:
         """获取各项服务运行状态 (为系统中心页面提供真实数据)"""
         try:
@@ -658,19 +681,53 @@ class AnalyticsService:
                 'summary': {'total_forwards': 0, 'total_errors': 0}
             }
 
-    async def search_records(self, query: str, limit: int = 50) -> Dict[str, Any]:
-        """搜索转发记录 (支持跨热冷查询)"""
+    async def _search_log_rows(self, query: str, limit: int, cursor: Optional[str]):
+        """
+        检索 rule_logs，返回 (行列表, 下一页游标)。
+
+        查询 >= 3 字符时走全文索引：热库 FTS5 与冷库分区 sidecar 各取最新的 limit 条命中，
+        按 (created_at, id) 由新到旧合并并键集分页 (游标 "created_at:id")。
+        两层的 BM25 统计量来自不同语料、不可比较，因此不按相关度合并。
+        短查询或热库索引不可用时退回 LIKE (游标 "offset:N")。
+        """
+        q = (query or '').strip()
+        if len(q) >= 3 and not (cursor or '').startswith('offset:'):
+            match = '"' + q.replace('"', '""') + '"'
+            after = None
+            if cursor:
+                ts, _, row_id = cursor.rpartition(':')
+                after = (ts, int(row_id))
+
+            hot = await self.container.stats_repo.search_logs_fulltext(match, limit, after)
+            if hot is not None:
+                cold = await self.bridge.search_cold_text("rule_logs", match, limit, after)
+                rows, seen = [], set()
+                for row in heapq.merge(hot, cold, key=lambda r: (r['sort_ts'], r['id']), reverse=True):
+                    if row['id'] in seen:
+                        continue
+                    seen.add(row['id'])
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        break
+                next_cursor = f"{rows[-1]['sort_ts']}:{rows[-1]['id']}" if len(rows) >= limit else None
+                return rows, next_cursor
+
+        offset = int(cursor.split(':', 1)[1]) if (cursor or '').startswith('offset:') else 0
+        rows = await self.bridge.query_unified(
+            "rule_logs",
+            where_sql="(message_text LIKE ? OR action LIKE ?)",
+            params=[f'%{query}%', f'%{query}%'],
+            limit=limit,
+            offset=offset,
+            order_by="created_at DESC"
+        )
+        next_cursor = f"offset:{offset + limit}" if len(rows) >= limit else None
+        return rows, next_cursor
+
+    async def search_records(self, query: str, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """搜索转发记录 (支持跨热冷查询，由新到旧排序，cursor 为上一页返回的 next_cursor)"""
         try:
-            where_sql = "(message_text LIKE ? OR action LIKE ?)"
-            params = [f'%{query}%', f'%{query}%']
-            
-            rows = await self.bridge.query_unified(
-                "rule_logs",
-                where_sql=where_sql,
-                params=params,
-                limit=limit,
-                order_by="created_at DESC"
-            )
+            rows, next_cursor = await self._search_log_rows(query, limit, cursor)
             
             records = []
             # 预加载缓存规则
@@ -711,6 +768,12 @@ class AnalyticsService:
                         target_title = str(rule.target_chat_id)
                 
                 created_at = log.get('created_at')
+                if isinstance(created_at, str):
+                    # 热库全文检索返回 SQLite 原始时间字符串
+                    try:
+                        created_at = datetime.fromisoformat(created_at)
+                    except ValueError:
+                        pass
                 if isinstance(created_at, datetime):
                     created_at_str = created_at.replace(tzinfo=timezone.utc).isoformat()
                 else:
@@ -735,6 +798,7 @@ class AnalyticsService:
                 'total_results': len(records),
                 'records': records,
                 'limit': limit,
+                'next_cursor': next_cursor,
                 'is_unified': True
             }
         except Exception as e:
@@ -767,35 +831,32 @@ class AnalyticsService:
                 where_sql += " AND rule_id = ?"
                 params.append(rule_id)
             
-            # 使用 bridge 跨热冷查询
-            logs = await self.bridge.query_unified(
-                "rule_logs",
-                where_sql=where_sql,
-                params=params,
-                limit=10000, # 限制 10000 条导出
-                order_by="created_at DESC"
-            )
-            
-            if not logs:
-                return None
-                
+            # 使用 bridge 跨热冷流式查询：按 Arrow 批次写出，不一次性物化全部行
+            sql = f"SELECT * FROM {{table}} WHERE {where_sql} ORDER BY created_at DESC LIMIT 10000" # 限制 10000 条导出
             headers = ["ID", "Time", "RuleID", "Type", "Action", "Latency", "Message"]
+            written = 0
             with open(export_path, 'w', newline='', encoding='utf-8-sig') as f:
                 writer = csv.writer(f)
                 writer.writerow(headers)
-                for log in logs:
-                    created_at = log.get('created_at')
-                    time_str = created_at.strftime("%Y-%m-%d %H:%M:%S") if hasattr(created_at, 'strftime') else str(created_at)
-                    writer.writerow([
-                        log.get('id'),
-                        time_str,
-                        log.get('rule_id'),
-                        log.get('message_type'),
-                        log.get('action'),
-                        f"{log.get('processing_time', 0)/1000:.3f}s",
-                        (log.get('message_text') or '')[:200]
-                    ])
-            
+                async for batch in self.bridge.stream_aggregate("rule_logs", sql, params):
+                    for log in batch.to_pylist():
+                        created_at = log.get('created_at')
+                        time_str = created_at.strftime("%Y-%m-%d %H:%M:%S") if hasattr(created_at, 'strftime') else str(created_at)
+                        writer.writerow([
+                            log.get('id'),
+                            time_str,
+                            log.get('rule_id'),
+                            log.get('message_type'),
+                            log.get('action'),
+                            f"{(log.get('processing_time') or 0)/1000:.3f}s",
+                            (log.get('message_text') or '')[:200]
+                        ])
+                        written += 1
+
+            if not written:
+                os.remove(export_path)
+                return None
+
             return export_path
         except Exception as e:
             logger.error(f"Export logs to CSV failed: {e}\n{traceback.format_exc()}")
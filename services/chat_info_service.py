@@ -1,25 +1,40 @@
 import logging
 import asyncio
-from typing import Union, Optional, Dict
-from datetime import datetime
+import time
+from collections import OrderedDict
+from typing import Union, Optional, Dict, Iterable, List, Tuple
 from sqlalchemy import select
-from models.models import Chat
-from core.helpers.id_utils import resolve_entity_by_id_variants
+from models.models import Chat, ForwardRule
+from core.config import settings
+from core.helpers.id_utils import resolve_entity_by_id_variants, normalize_chat_id, build_candidate_telegram_ids
 from telethon import utils as telethon_utils
 
 logger = logging.getLogger(__name__)
 
+# 单条 IN (...) 查询最多携带的原始 ID 数 (每个 ID 约 5 个候选变体，避开 SQLite 变量上限)
+_DB_IN_CHUNK = 150
+
+
 class ChatInfoService:
     """
     聊天信息服务
     负责解析 ChatID 到名称的映射，并提供缓存机制。
+
+    - 有界 LRU 缓存，过期条目先返回旧名称、后台刷新
+    - 按 ID 单飞：同一 ID 的并发未命中共享一次数据库查询，不同 ID 互不阻塞
+    - 数据库未命中时 Telegram 解析在后台进行，期间返回原始 ID (负缓存)，热路径不等待网络
     """
-    def __init__(self, client=None, db=None):
+    def __init__(self, client=None, db=None, max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None, negative_ttl: Optional[float] = None):
         self.client = client
         self.db = db
-        self._name_cache: Dict[str, str] = {}
-        self._last_update: Dict[str, datetime] = {}
-        self._lock = asyncio.Lock()
+        self.max_entries = max_entries or settings.CHAT_NAME_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.CHAT_NAME_CACHE_TTL
+        self.negative_ttl = negative_ttl or settings.CHAT_NAME_NEGATIVE_TTL
+        # 标准化 ID -> (名称, 过期时间)；名称为 None 表示负缓存
+        self._name_cache: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Dict[str, asyncio.Task] = {}
 
     def set_client(self, client):
         self.client = client
@@ -27,51 +42,179 @@ class ChatInfoService:
     def set_db(self, db):
         self.db = db
 
+    @staticmethod
+    def _key(chat_id: Union[int, str]) -> str:
+        return normalize_chat_id(chat_id)
+
+    def _cache_get(self, key: str) -> Optional[Tuple[Optional[str], float]]:
+        entry = self._name_cache.get(key)
+        if entry is not None:
+            self._name_cache.move_to_end(key)
+        return entry
+
+    def _cache_put(self, key: str, name: Optional[str]) -> None:
+        ttl = self.ttl if name else self.negative_ttl
+        self._name_cache[key] = (name, time.monotonic() + ttl)
+        self._name_cache.move_to_end(key)
+        while len(self._name_cache) > self.max_entries:
+            self._name_cache.popitem(last=False)
+
+    def _lookup_cached(self, key: str, chat_id: Union[int, str]) -> Tuple[bool, Optional[str]]:
+        """返回 (是否命中, 名称)；过期的正缓存仍命中并触发后台刷新"""
+        entry = self._cache_get(key)
+        if entry is None:
+            return False, None
+        name, expire_at = entry
+        if expire_at >= time.monotonic():
+            return True, name
+        if name:
+            self._spawn(key, self._refresh(key, chat_id))
+            return True, name
+        # 负缓存过期，重新走数据库
+        del self._name_cache[key]
+        return False, None
+
     async def get_chat_name(self, chat_id: Union[int, str]) -> str:
         """
         获取聊天名称
-        优先级：内存缓存 > 数据库 > Telegram API
+        优先级：内存缓存 > 数据库 > Telegram API (后台)
         """
         str_id = str(chat_id)
-        
-        # 1. 内存缓存 (TTL 1小时可在此增加判断，暂时简单处理)
-        if str_id in self._name_cache:
-            return self._name_cache[str_id]
-        
-        async with self._lock:
-            # 双重检查
-            if str_id in self._name_cache:
-                return self._name_cache[str_id]
-            
-            # 2. 数据库查询
-            name_from_db = await self._get_name_from_db(str_id)
-            if name_from_db:
-                self._name_cache[str_id] = name_from_db
-                return name_from_db
-            
-            # 3. Telegram API 查询 (需要 client)
-            if self.client:
-                try:
-                    entity, _ = await resolve_entity_by_id_variants(self.client, chat_id)
-                    if entity:
-                        name = telethon_utils.get_display_name(entity)
-                        if name:
-                            self._name_cache[str_id] = name
-                            # 异步更新到数据库，不阻塞当前返回
-                            asyncio.create_task(self._update_chat_in_db(str_id, entity, name))
-                            return name
-                except Exception as e:
-                    logger.warning(f"Failed to resolve chat name for {chat_id} via API: {e}")
-            
-            # 降级：返回原始 ID
-            return str_id
+        key = self._key(chat_id)
+
+        hit, name = self._lookup_cached(key, chat_id)
+        if hit:
+            return name or str_id
+
+        name = await self._load(key, chat_id)
+        return name or str_id
+
+    async def get_chat_names(self, chat_ids: Iterable[Union[int, str]]) -> Dict[str, str]:
+        """
+        批量获取聊天名称，返回 {str(chat_id): 名称}
+
+        缓存未命中的 ID 合并为一次 IN (...) 查询，数据库仍未命中的在后台走 Telegram 解析。
+        """
+        chat_ids = list(chat_ids)
+        result: Dict[str, str] = {}
+        missing: Dict[str, Union[int, str]] = {}
+        for chat_id in chat_ids:
+            key = self._key(chat_id)
+            hit, name = self._lookup_cached(key, chat_id)
+            if hit:
+                result[str(chat_id)] = name or str(chat_id)
+            elif key in self._inflight:
+                result[str(chat_id)] = (await asyncio.shield(self._inflight[key])) or str(chat_id)
+            else:
+                missing.setdefault(key, chat_id)
+
+        if missing:
+            names = await self._get_names_from_db(list(missing.values()))
+            for key, chat_id in missing.items():
+                name = names.get(key)
+                if name:
+                    self._cache_put(key, name)
+                else:
+                    self._schedule_remote(key, chat_id)
+
+        for chat_id in chat_ids:
+            str_id = str(chat_id)
+            if str_id not in result:
+                entry = self._name_cache.get(self._key(chat_id))
+                result[str_id] = (entry[0] if entry else None) or str_id
+        return result
+
+    async def preload(self) -> int:
+        """启动预热：加载所有启用规则引用的聊天名称，返回加载条数"""
+        if not self.db:
+            return 0
+        try:
+            rule_chat_ids = select(ForwardRule.source_chat_id).where(ForwardRule.enable_rule == True).union(
+                select(ForwardRule.target_chat_id).where(ForwardRule.enable_rule == True)
+            )
+            async with self.db.get_session() as session:
+                stmt = select(Chat.telegram_chat_id, Chat.name).where(Chat.id.in_(rule_chat_ids))
+                rows = (await session.execute(stmt)).all()
+        except Exception as e:
+            logger.warning(f"预加载聊天名称失败: {e}")
+            return 0
+
+        loaded = 0
+        for telegram_chat_id, name in rows:
+            if name:
+                self._cache_put(self._key(telegram_chat_id), name)
+                loaded += 1
+        logger.info(f"已预加载 {loaded} 个聊天名称")
+        return loaded
+
+    async def _load(self, key: str, chat_id: Union[int, str]) -> Optional[str]:
+        """数据库层单飞加载；未命中时安排后台 Telegram 解析"""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            name = await self._get_name_from_db(str(chat_id))
+            if name:
+                self._cache_put(key, name)
+            else:
+                self._schedule_remote(key, chat_id)
+            future.set_result(name)
+            return name
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _schedule_remote(self, key: str, chat_id: Union[int, str]) -> None:
+        # 解析完成前先写负缓存，避免反复查库
+        self._cache_put(key, None)
+        if self.client:
+            self._spawn(key, self._resolve_remote(key, chat_id))
+
+    def _spawn(self, key: str, coro) -> None:
+        if key in self._background:
+            coro.close()
+            return
+        task = asyncio.create_task(coro)
+        self._background[key] = task
+        task.add_done_callback(lambda _t, k=key: self._background.pop(k, None))
+
+    async def _refresh(self, key: str, chat_id: Union[int, str]) -> None:
+        name = await self._get_name_from_db(str(chat_id))
+        if name:
+            self._cache_put(key, name)
+        elif self.client:
+            await self._resolve_remote(key, chat_id)
+
+    async def _resolve_remote(self, key: str, chat_id: Union[int, str]) -> None:
+        try:
+            entity, _ = await resolve_entity_by_id_variants(self.client, chat_id)
+            name = telethon_utils.get_display_name(entity) if entity else None
+        except Exception as e:
+            logger.warning(f"Failed to resolve chat name for {chat_id} via API: {e}")
+            name = None
+
+        if not name:
+            if not self._name_cache.get(key, (None,))[0]:
+                self._cache_put(key, None)
+            return
+        self._cache_put(key, name)
+        # 写回数据库，下次启动可直接命中
+        await self._update_chat_in_db(str(chat_id), entity, name)
 
     async def _get_name_from_db(self, chat_id: str) -> Optional[str]:
         if not self.db:
             return None
         
         try:
-            from core.helpers.id_utils import build_candidate_telegram_ids
             candidates = list(build_candidate_telegram_ids(chat_id))
             
             async with self.db.get_session() as session:
@@ -84,12 +227,38 @@ class ChatInfoService:
         
         return None
 
+    async def _get_names_from_db(self, chat_ids: List[Union[int, str]]) -> Dict[str, str]:
+        """批量查库，返回 {标准化 ID: 名称}"""
+        if not self.db or not chat_ids:
+            return {}
+
+        names: Dict[str, str] = {}
+        try:
+            async with self.db.get_session() as session:
+                for i in range(0, len(chat_ids), _DB_IN_CHUNK):
+                    candidates = set()
+                    for chat_id in chat_ids[i:i + _DB_IN_CHUNK]:
+                        candidates.update(build_candidate_telegram_ids(chat_id))
+                    stmt = select(Chat.telegram_chat_id, Chat.name).where(Chat.telegram_chat_id.in_(candidates))
+                    for telegram_chat_id, name in (await session.execute(stmt)).all():
+                        if name:
+                            names.setdefault(self._key(telegram_chat_id), name)
+        except Exception as e:
+            logger.error(f"Error querying chat names from DB for {len(chat_ids)} ids: {e}")
+        return names
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._name_cache),
+            "inflight": len(self._inflight),
+            "background": len(self._background),
+        }
+
     async def _update_chat_in_db(self, chat_id: str, entity: any, name: str):
         if not self.db:
             return
         
         try:
-            from core.helpers.id_utils import normalize_chat_id
             norm_id = normalize_chat_id(chat_id)
             
             async with self.db.get_session() as session:
@@ -1,6 +1,6 @@
 """
 智能去重系统 (Ultra-Fast Engine v3)
-实现高性能内容相似度检测、LSH Forest 近似查询与墓碑状态管理
+实现高性能内容相似度检测、多索引海明近邻查询与墓碑状态管理
 """
 
 import asyncio
@@ -29,7 +29,7 @@ class SmartDeduplicator:
     """
     智能去重器 (Facade)
     - 编排分布式去重策略
-    - 管理 L0 (Bloom), L1 (Memory), L2 (PCache), L3 (LSH), L4 (DB) 级缓存
+    - 管理 L0 (Bloom), L1 (Memory), L2 (PCache), L3 (Hamming), L4 (DB) 级缓存
     - 支持墓碑化 (Tombstone) 自动休眠与唤醒
     """
 
@@ -39,8 +39,12 @@ class SmartDeduplicator:
         self.content_hash_cache: Dict[str, OrderedDict] = {}
         self.text_fp_cache: Dict[str, OrderedDict] = {}
         
-        # LSH 近似索引 (chat_id -> LSHForest)
-        self.lsh_forests: Dict[str, Any] = {}
+        # SimHash 近邻索引 (按目标会话分作用域，精确海明距离校验)
+        self.near_index = self._create_near_index()
+        self._near_index_loaded = False
+        self._near_index_saved_at = time.time()
+        # SimHash 指纹环 (chat_id -> FingerprintRing)，相似度向量化比对
+        self.fp_rings: Dict[str, Any] = {}
 
         # 懒加载组件
         self._repo = None
@@ -90,6 +94,9 @@ class SmartDeduplicator:
                 "dedup_l0",
                 capacity=getattr(settings, "BLOOM_FILTER_CAPACITY", 2000000),
                 error_rate=getattr(settings, "BLOOM_FILTER_ERROR_RATE", 0.0005),
+                filepath=getattr(settings, "DEDUP_BLOOM_PATH", None),
+                # 导入时不创建文件，容器启动时在线程中映射 (或首次访问时)
+                lazy=True,
             )
             
             from core.algorithms.hll import GlobalHLL
@@ -104,17 +111,84 @@ class SmartDeduplicator:
         except Exception as e:
             logger.error(f"基础设施初始化失败: {e}")
 
-    def _get_lsh_forest(self, chat_id: str):
-        """按需获取/创建 LSH Forest 索引"""
-        if chat_id not in self.lsh_forests:
+    @staticmethod
+    def _create_near_index():
+        from core.algorithms.hamming_index import HammingIndex
+        try:
+            return HammingIndex(
+                k=int(getattr(settings, "DEDUP_NEAR_INDEX_K", 3)),
+                max_entries=int(getattr(settings, "DEDUP_NEAR_INDEX_MAX_ENTRIES", 100000)),
+                ttl=float(getattr(settings, "DEDUP_NEAR_INDEX_TTL_SECONDS", 604800)),
+            )
+        except (TypeError, ValueError):
+            return HammingIndex(k=3)
+
+    async def load_near_index_snapshot(self) -> int:
+        """从磁盘快照恢复近邻索引 (仅首次调用生效)"""
+        if self._near_index_loaded:
+            return 0
+        self._near_index_loaded = True
+        path = getattr(settings, "DEDUP_NEAR_INDEX_SNAPSHOT_PATH", None)
+        if not path:
+            return 0
+        try:
+            from core.algorithms.hamming_index import HammingIndex
+            import os
+            if not os.path.exists(path):
+                return 0
+            meta, rows = await asyncio.to_thread(HammingIndex.read_snapshot, path)
+            if meta.get("f", self.near_index.f) != self.near_index.f:
+                return 0
+            loaded = self.near_index.load_rows(rows)
+            self.near_index.dirty = False
+            logger.info(f"去重近邻索引已从快照恢复 {loaded} 条指纹")
+            return loaded
+        except Exception as e:
+            logger.warning(f"加载去重近邻索引快照失败: {e}")
+            return 0
+
+    async def save_near_index_snapshot(self, force: bool = False) -> bool:
+        """将近邻索引写入磁盘快照 (条目在事件循环内拷贝，序列化与写盘在线程中完成)"""
+        path = getattr(settings, "DEDUP_NEAR_INDEX_SNAPSHOT_PATH", None)
+        if not path or not (self.near_index.dirty or force):
+            return False
+        try:
+            rows = self.near_index.export_rows()
+            meta = self.near_index.snapshot_meta()
+            self.near_index.dirty = False
+            self._near_index_saved_at = time.time()
+            await asyncio.to_thread(self.near_index.write_snapshot, path, rows, meta)
+            return True
+        except Exception as e:
+            self.near_index.dirty = True
+            logger.warning(f"保存去重近邻索引快照失败: {e}")
+            return False
+
+    @staticmethod
+    def _near_doc_id(msg) -> Optional[str]:
+        """
+        近邻索引文档 ID：Telegram 消息 ID 只在来源会话内唯一，
+        而索引按目标会话分作用域，多个来源转发到同一目标时需带上来源会话 ID
+        """
+        msg_id = getattr(msg, 'id', None)
+        if msg_id is None:
+            return None
+        return f"{getattr(msg, 'chat_id', None) or 0}:{msg_id}"
+
+    @staticmethod
+    def _fp_ring_capacity(config) -> int:
+        """指纹环按自身配置定长 (text_fp_cache 仅作为无 numpy 时的回退窗口)"""
+        return max(1, int(config.get("fp_ring_capacity", DedupConfig.fp_ring_capacity)))
+
+    def _get_fp_ring(self, chat_id: str, capacity: int):
+        """按需获取/创建 SimHash 指纹环 (无 numpy 时返回 None，回退到 text_fp_cache 逐条比对)"""
+        if chat_id not in self.fp_rings:
             try:
-                from core.algorithms.lsh_forest import LSHForest
-                # 在分配前先创建，防止中途被清空导致的 KeyError
-                forest = LSHForest(num_trees=4, prefix_length=64)
-                self.lsh_forests[chat_id] = forest
+                from core.algorithms.simhash import FingerprintRing
+                self.fp_rings[chat_id] = FingerprintRing(capacity=capacity)
             except Exception:
                 return None
-        return self.lsh_forests.get(chat_id)
+        return self.fp_rings.get(chat_id)
 
     @property
     def repo(self):
@@ -142,20 +216,14 @@ class SmartDeduplicator:
             "time_window_cache": self.time_window_cache,
             "content_hash_cache": self.content_hash_cache,
             "text_fp_cache": text_fp_cache_str,
-            "lsh_forests": {
-                cid: {
-                    # Convert to lists for JSON-safe serialization
-                    "trees": [[list(item) for item in tree] for tree in forest.trees], 
-                    "num_trees": forest.num_trees, 
-                    "k": forest.prefix_length
-                }
-                for cid, forest in self.lsh_forests.items()
-            },
+            "near_index": [list(row) for row in self.near_index.export_rows()],
+            "fp_rings": {cid: ring.to_state() for cid, ring in self.fp_rings.items()},
         }
         self.time_window_cache = {}
         self.content_hash_cache = {}
         self.text_fp_cache = {}
-        self.lsh_forests = {}
+        self.near_index = self._create_near_index()
+        self.fp_rings = {}
         logger.debug("SmartDeduplicator 进入冬眠")
         return state
 
@@ -182,25 +250,39 @@ class SmartDeduplicator:
                 except ValueError:
                     self.text_fp_cache[cid][k] = v
         
-        # 恢复 LSH 索引
-        forest_data = state.get("lsh_forests", {})
-        self.lsh_forests = {}
-        for cid, data in forest_data.items():
-            try:
-                from core.algorithms.lsh_forest import LSHForest
-                f = LSHForest(num_trees=data.get("num_trees", 4), prefix_length=data.get("k", 64))
-                raw_trees = data.get("trees", [])
-                
-                # Robust conversion back to tuples
-                restored_trees = []
-                for tree in raw_trees:
-                    restored_trees.append([tuple(item) for item in tree if isinstance(item, (list, tuple))])
-                
-                f.trees = restored_trees
-                self.lsh_forests[cid] = f
-            except Exception as e:
-                logger.warning(f"从墓碑恢复 LSH 索引失败 ({cid}): {e}")
-                
+        # 恢复近邻索引 (旧版快照为 LSH Forest，其第 0 棵树未置换，可直接迁移)
+        self.near_index = self._create_near_index()
+        try:
+            if "near_index" in state:
+                self.near_index.load_rows(state.get("near_index") or [])
+            else:
+                for cid, data in state.get("lsh_forests", {}).items():
+                    trees = data.get("trees") or [[]]
+                    for item in trees[0]:
+                        if isinstance(item, (list, tuple)) and len(item) >= 2:
+                            self.near_index.add(int(item[0]), item[1], scope=cid)
+        except Exception as e:
+            logger.warning(f"从墓碑恢复近邻索引失败: {e}")
+
+        # 恢复指纹环 (旧版快照无此项时由 text_fp_cache 重建)
+        self.fp_rings = {}
+        capacity = self._fp_ring_capacity(self.config)
+        ring_data = state.get("fp_rings")
+        try:
+            from core.algorithms.simhash import FingerprintRing
+            if ring_data is not None:
+                for cid, data in ring_data.items():
+                    self.fp_rings[cid] = FingerprintRing.from_state(data, capacity=capacity)
+            else:
+                for cid, cache in self.text_fp_cache.items():
+                    ring = FingerprintRing(capacity=capacity)
+                    for fp, meta in cache.items():
+                        if isinstance(fp, int):
+                            ring.add(fp, meta.get("len", 0) if isinstance(meta, dict) else 0)
+                    self.fp_rings[cid] = ring
+        except Exception as e:
+            logger.warning(f"从墓碑恢复指纹环失败: {e}")
+
         logger.debug("SmartDeduplicator 已唤醒")
 
     async def check_duplicate(
@@ -217,6 +299,8 @@ class SmartDeduplicator:
         # 懒加载配置
         if not self._config_loaded:
              await self.load_config()
+        if not self._near_index_loaded:
+            await self.load_near_index_snapshot()
         
         # 自动复苏 (墓碑触发)
         if tombstone._is_frozen:
@@ -236,7 +320,8 @@ class SmartDeduplicator:
                 time_window_cache=self.time_window_cache,
                 content_hash_cache=self.content_hash_cache,
                 text_fp_cache=self.text_fp_cache,
-                lsh_forests=self.lsh_forests,
+                near_index=self.near_index,
+                fp_rings=self.fp_rings,
                 bloom_filter=self.bloom_filter,
                 hll=self.hll,
                 bg_tasks=self._bg_tasks,
@@ -320,7 +405,8 @@ class SmartDeduplicator:
             time_window_cache=self.time_window_cache,
             content_hash_cache=self.content_hash_cache,
             text_fp_cache=self.text_fp_cache,
-            lsh_forests=self.lsh_forests,
+            near_index=self.near_index,
+            fp_rings=self.fp_rings,
             bloom_filter=self.bloom_filter,
             hll=self.hll,
             bg_tasks=self._bg_tasks,
@@ -378,10 +464,12 @@ class SmartDeduplicator:
                         # 记录 fp 及其元数据 (长度，时间等)
                         if cid not in self.text_fp_cache: self.text_fp_cache[cid] = OrderedDict()
                         self.text_fp_cache[cid][fp] = {"ts": ts, "len": len(cleaned)}
+                        ring = self._get_fp_ring(cid, self._fp_ring_capacity(config))
+                        if ring is not None:
+                            ring.add(fp, len(cleaned))
                         
-                        # 加入 LSH Forest
-                        forest = self._get_lsh_forest(cid)
-                        if forest: forest.add(str(ts), fp)
+                        # 加入近邻索引 (以 来源会话:消息 ID 为文档 ID，便于回滚删除)
+                        self.near_index.add(fp, doc_id=self._near_doc_id(msg), scope=cid)
 
             # 4. 更新 HLL
             if self.hll and hasattr(msg, 'id'):
@@ -429,9 +517,13 @@ class SmartDeduplicator:
             if cid in self.content_hash_cache and len(self.content_hash_cache[cid]) > max_hash_size:
                 self.content_hash_cache[cid].popitem(last=False)
 
-            max_fp_size = config.get("max_text_fp_cache_size", 1000)
+            max_fp_size = config.get("max_text_fp_cache_size", DedupConfig.max_text_fp_cache_size)
             if cid in self.text_fp_cache and len(self.text_fp_cache[cid]) > max_fp_size:
                 self.text_fp_cache[cid].popitem(last=False)
+            # 指纹环写满后自行覆盖最旧项；配置调小时收缩到新容量
+            ring = self.fp_rings.get(cid)
+            if ring is not None:
+                ring.trim(self._fp_ring_capacity(config))
 
 
             # 确保后台刷写任务启动
@@ -471,6 +563,17 @@ class SmartDeduplicator:
                 self.time_window_cache[cid].pop(signature, None)
             if content_hash and cid in self.content_hash_cache:
                 self.content_hash_cache[cid].pop(content_hash, None)
+            text = getattr(message_obj, "message", "") or getattr(message_obj, "text", "")
+            if isinstance(text, str) and text:
+                fp = tools.calculate_simhash(tools.clean_text_for_hash(text, config.get("strip_numbers", True)))
+                if fp:
+                    if cid in self.text_fp_cache:
+                        self.text_fp_cache[cid].pop(fp, None)
+                    if cid in self.fp_rings:
+                        self.fp_rings[cid].discard(fp)
+            doc_id = self._near_doc_id(message_obj)
+            if doc_id is not None:
+                self.near_index.remove(doc_id, scope=cid)
             
             # 4. 从写缓冲移除 (防止尚未刷入 DB 的记录生效)
             async with self._buffer_lock:
@@ -490,6 +593,13 @@ class SmartDeduplicator:
             try:
                 await asyncio.sleep(5.0)
                 await self._flush_buffer()
+                self.near_index.expire()
+                if self.bloom_filter is not None:
+                    # 只 msync 上一轮以来修改过的页
+                    await asyncio.to_thread(self.bloom_filter.save)
+                interval = float(getattr(settings, "DEDUP_NEAR_INDEX_SNAPSHOT_INTERVAL", 300))
+                if time.time() - self._near_index_saved_at >= interval:
+                    await self.save_near_index_snapshot()
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -544,7 +654,8 @@ class SmartDeduplicator:
         return {
             "cached_signatures": sum(len(c) for c in self.time_window_cache.values()),
             "cached_content_hashes": sum(len(c) for c in self.content_hash_cache.values()),
-            "lsh_forests": len(self.lsh_forests),
+            "near_index_entries": len(self.near_index),
+            "fp_ring_entries": sum(len(r) for r in self.fp_rings.values()),
             "tracked_chats": len(self.time_window_cache),
             "buffer_size": len(self._write_buffer)
         }
@@ -4,7 +4,7 @@ import time
 from typing import Optional, Dict
 
 from services.dedup.strategies.base import BaseDedupStrategy
-from services.dedup.types import DedupContext, DedupResult
+from services.dedup.types import DedupConfig, DedupContext, DedupResult
 from services.dedup.tools import (
     calculate_simhash, 
     is_video, 
@@ -17,7 +17,7 @@ logger = logging.getLogger(__name__)
 
 class SimilarityStrategy(BaseDedupStrategy):
     async def process(self, ctx: DedupContext) -> Optional[DedupResult]:
-        """高级文本相似度去重 (LSH Forest + SimHash v3 + Pruning)"""
+        """高级文本相似度去重 (多索引海明近邻 + SimHash v3 + Pruning)"""
         
         config = ctx.config
         if not config.get("enable_smart_similarity", False):
@@ -49,59 +49,77 @@ class SimilarityStrategy(BaseDedupStrategy):
             current_fp = calculate_simhash(cleaned_text)
             if not current_fp: return None
             
-            # --- LSH Forest 快速索引查询 (Phase 5 核心) ---
-            cache_key = str(target_chat_id)
-            if hasattr(ctx, 'lsh_forests') and cache_key in ctx.lsh_forests:
-                forest = ctx.lsh_forests[cache_key]
-                # 查询 top-k 近似项
-                hits = forest.query(current_fp, top_k=5)
-                if hits:
-                    for doc_id in hits:
-                        # doc_id 通常存的是 timestamp 或 msg_id
-                        # 如果需要精确校验，可以去 text_cache 找，但这里直接命中 LSH 即视为相似
-                        try: DEDUP_FP_HITS_TOTAL.labels(algo="lsh_forest").inc()
-                        except: pass
-                        return DedupResult(True, "LSH索引命中 (语义重复)", "similarity_lsh", current_fp)
+            # --- 多索引海明近邻查询: 距离 <= k 的指纹必被找到，且每个结果都经精确校验 ---
+            near_index = getattr(ctx, 'near_index', None)
+            if near_index is not None:
+                hit = near_index.nearest(
+                    current_fp,
+                    scope=str(target_chat_id),
+                    k=int(config.get("simhash_dist_threshold", 3)),
+                )
+                if hit:
+                    _, matched_fp, dist = hit
+                    try: DEDUP_FP_HITS_TOTAL.labels(algo="hamming_index").inc()
+                    except: pass
+                    return DedupResult(True, f"SimHash 近邻命中 (海明距离 {dist})", "similarity_hamming", matched_fp)
 
         # 3. 内存缓存滚动比对 (带数学剪枝)
-        if ctx.text_fp_cache and str(target_chat_id) in ctx.text_fp_cache:
-            cache_key = str(target_chat_id)
-            # --- V4 自适应阈值计算 ---
-            # Threshold = min(0.95, 0.82 + 20 / (Length + 5))
-            def get_adaptive_threshold(length: int) -> float:
-                return min(0.95, 0.82 + 20.0 / (length + 5.0))
-            
-            base_threshold = config.get("similarity_threshold", 0.85)
-            # 如果没强制指定高阈值，则使用自适应阈值
-            current_threshold = max(base_threshold, get_adaptive_threshold(curr_len))
-            
-            # reversed 遍历，优先比对新消息
-            comparisons = 0
-            max_checks = config.get("max_similarity_comparisons", 100)
-            
-            for fp, meta in reversed(ctx.text_fp_cache[cache_key].items()):
-                if comparisons >= max_checks: break
-                
-                # 数学剪枝：如果长度差异过大，则不可能相似 (Jaccard 上限)
-                prev_len = meta.get('len', 0) if isinstance(meta, dict) else 0
-                if prev_len:
-                    upper_bound = min(prev_len, curr_len) / max(prev_len, curr_len)
-                    if upper_bound < current_threshold:
-                        continue
-                
-                # 计算相似度
-                sim = 1.0 - (bin(current_fp ^ fp).count('1') / 64.0)
-                comparisons += 1
-                
-                if sim >= current_threshold:
-                    try: DEDUP_HITS_TOTAL.labels(method="similarity_memory").inc()
-                    except: pass
-                    return DedupResult(True, f"文本相似度命中 (T={current_threshold:.2f}): {sim:.2f}", "similarity", fp)
+        if not current_fp:
+            return None
+        cache_key = str(target_chat_id)
+        ring = (getattr(ctx, 'fp_rings', None) or {}).get(cache_key)
+        legacy_cache = ctx.text_fp_cache.get(cache_key) if ctx.text_fp_cache else None
+        if ring is None and legacy_cache is None:
+            return None
+
+        # --- V4 自适应阈值计算 ---
+        # Threshold = min(0.95, 0.82 + 20 / (Length + 5))
+        def get_adaptive_threshold(length: int) -> float:
+            return min(0.95, 0.82 + 20.0 / (length + 5.0))
 
-            try: DEDUP_SIMILARITY_COMPARISONS.observe(float(comparisons))
+        base_threshold = config.get("similarity_threshold", 0.85)
+        # 如果没强制指定高阈值，则使用自适应阈值
+        current_threshold = max(base_threshold, get_adaptive_threshold(curr_len))
+        max_checks = config.get("max_similarity_comparisons", DedupConfig.max_similarity_comparisons)
+
+        if ring is not None:
+            # 向量化比对: 整个窗口一次 XOR + popcount (剪枝与比对上限语义同下方逐条比对)
+            fp, sim, comparisons = ring.nearest(current_fp, curr_len, current_threshold, max_checks)
+        else:
+            fp, sim, comparisons = self._scan_legacy(legacy_cache, current_fp, curr_len, current_threshold, max_checks)
+
+        if fp is not None:
+            try: DEDUP_HITS_TOTAL.labels(method="similarity_memory").inc()
             except: pass
+            return DedupResult(True, f"文本相似度命中 (T={current_threshold:.2f}): {sim:.2f}", "similarity", fp)
+
+        try: DEDUP_SIMILARITY_COMPARISONS.observe(float(comparisons))
+        except: pass
 
         return None
 
+    @staticmethod
+    def _scan_legacy(cache, current_fp, curr_len: int, threshold: float, max_checks: int):
+        """逐条比对 text_fp_cache (无指纹环时的回退路径)"""
+        comparisons = 0
+        # reversed 遍历，优先比对新消息
+        for fp, meta in reversed(cache.items()):
+            if comparisons >= max_checks: break
+
+            # 数学剪枝：如果长度差异过大，则不可能相似 (Jaccard 上限)
+            prev_len = meta.get('len', 0) if isinstance(meta, dict) else 0
+            if prev_len:
+                upper_bound = min(prev_len, curr_len) / max(prev_len, curr_len)
+                if upper_bound < threshold:
+                    continue
+
+            # 计算相似度
+            sim = 1.0 - (bin(current_fp ^ fp).count('1') / 64.0)
+            comparisons += 1
+
+            if sim >= threshold:
+                return fp, sim, comparisons
+        return None, 0.0, comparisons
+
     async def record(self, ctx: DedupContext, result: DedupResult):
         pass
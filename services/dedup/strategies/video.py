@@ -13,6 +13,7 @@ from services.dedup.tools import (
     calculate_text_similarity,
     generate_v3_fingerprint
 )
+from core.cache.media_cache import get_media_cache
 from core.helpers.metrics import DEDUP_HITS_TOTAL, VIDEO_HASH_PCACHE_HITS_TOTAL
 from services.dedup.tools import _HAS_XXHASH
 import xxhash
@@ -20,6 +21,25 @@ import hashlib
 
 logger = logging.getLogger(__name__)
 
+
+def _hash_local_samples(h: Any, path: str, offsets: list) -> None:
+    """
+    按采样点读取本地文件喂给哈希
+
+    iter_download 的 limit 为分块数而非字节数，远端路径每个采样点都会读到文件末尾；
+    这里保持相同的读取范围，保证缓存命中与否算出的哈希一致。
+    """
+    with open(path, "rb") as f:
+        for offset in sorted(set(offsets)):
+            if offset < 0:
+                continue
+            f.seek(offset)
+            while True:
+                block = f.read(1024 * 1024)
+                if not block:
+                    break
+                h.update(block)
+
 class VideoStrategy(BaseDedupStrategy):
     async def process(self, ctx: DedupContext) -> Optional[DedupResult]:
         """高级视频去重逻辑 (FileID, SSH v4, Strict Verification)"""
@@ -177,10 +197,15 @@ class VideoStrategy(BaseDedupStrategy):
             else:
                 offsets = [int(i * (total_size - chunk_size) / (num_points - 1)) for i in range(num_points)]
             
-            for offset in sorted(list(set(offsets))):
-                if offset < 0: continue
-                async for chunk in client.iter_download(doc, offset=offset, limit=chunk_size):
-                    h.update(chunk)
+            # 文件已在媒体缓存中时直接读本地，产出的字节与 iter_download 一致
+            local_path = get_media_cache().lookup(ctx.message_obj)
+            if local_path:
+                await asyncio.to_thread(_hash_local_samples, h, local_path, offsets)
+            else:
+                for offset in sorted(list(set(offsets))):
+                    if offset < 0: continue
+                    async for chunk in client.iter_download(doc, offset=offset, limit=chunk_size):
+                        h.update(chunk)
             
             vhash = h.hexdigest()
             # 写入 PCache
@@ -30,6 +30,8 @@ class DedupConfig:
     max_text_cache_size: int = 300
     max_text_fp_cache_size: int = 500
     max_similarity_checks: int = 50
+    max_similarity_comparisons: int = 20000  # 相似度比对窗口 (指纹环向量化比对)
+    fp_ring_capacity: int = 20000            # 每个目标会话保留的 SimHash 指纹数
     max_signature_cache_size: int = 5000
     max_content_hash_cache_size: int = 2000
     min_text_length: int = 10
@@ -75,7 +77,8 @@ class DedupContext:
     
     content_hash_cache: Dict[str, OrderedDict] = None
     text_fp_cache: Dict[str, OrderedDict] = None
-    lsh_forests: Dict[str, Any] = field(default_factory=dict) # chat_id -> LSHForest
+    near_index: Any = None # HammingIndex (scope = 目标会话)
+    fp_rings: Dict[str, Any] = field(default_factory=dict) # chat_id -> FingerprintRing
     simhash_provider: Any = None
 
 
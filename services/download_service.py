@@ -2,6 +2,7 @@ import os
 import asyncio
 import logging
 from core.config import settings
+from core.cache.media_cache import get_media_cache
 
 logger = logging.getLogger(__name__)
 
@@ -59,7 +60,7 @@ class DownloadService:
                 logger.info(f"⬇️ 开始下载: {file_name} -> {sub_folder}")
                 
                 # 3. 执行下载
-                path = await self.client.download_media(message, file=file_path)
+                path = await get_media_cache().fetch(message, save_dir, client=self.client, file_name=file_name)
                 
                 logger.info(f"✅ 下载完成: {path}")
                 return path
@@ -0,0 +1,206 @@
+"""
+转发聚合器 (Forward Aggregator)
+
+SmartBuffer 按 (rule_id, target) 聚合，不同规则/不同任务发往同一目标的纯转发
+仍各自调用一次 ForwardMessages。本聚合器按 (client, 源, 目标, 转发参数) 在
+短延迟预算内收集各调用方的消息 ID，合并为一次 ForwardMessagesRequest
+(最多 100 个 ID)，再把逐条结果分发回各调用方。
+
+- 每个调用方的 ID 列表作为整体 (媒体组不拆分)，批次内按到达顺序排列
+- 合并调用失败时退回逐调用方发送，单条坏消息不会连累同批其他任务
+- 限流、FloodWait 与熔断仍由 TelegramQueueService.run_guarded_operation 负责
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.helpers.metrics import FORWARD_AGGREGATED_TOTAL
+from services.queue_service import (
+    FloodWaitException,
+    forward_messages_queued,
+    telegram_queue_service,
+)
+
+logger = logging.getLogger(__name__)
+
+# Telegram messages.forwardMessages 单次最多 100 个 ID
+TELEGRAM_MAX_FORWARD_IDS = 100
+
+
+def _normalize_ids(messages: Any) -> List[int]:
+    if isinstance(messages, int):
+        return [messages]
+    if hasattr(messages, 'id'):
+        return [messages.id]
+    if isinstance(messages, (list, tuple)):
+        return [m.id if hasattr(m, 'id') else int(m) for m in messages]
+    return [int(messages)]
+
+
+class _PendingForward:
+    """一个待发出的批次：[(调用方 ID 列表, 调用方 Future)]"""
+
+    __slots__ = ("units", "size", "timer")
+
+    def __init__(self):
+        self.units: List[Tuple[List[int], asyncio.Future]] = []
+        self.size = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class ForwardAggregator:
+    """
+    按 源->目标 合并短时间内的纯转发请求
+
+    所有状态只在事件循环线程内修改，无需加锁。
+    """
+
+    def __init__(self, window_ms: float = 300.0, max_ids: int = TELEGRAM_MAX_FORWARD_IDS):
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_ids = max(1, min(max_ids, TELEGRAM_MAX_FORWARD_IDS))
+        self._pending: Dict[Tuple, _PendingForward] = {}
+        self._tasks: set = set()
+
+        self.requests = 0
+        self.api_calls = 0
+        self.fallbacks = 0
+
+    async def forward(
+        self, client: Any, source_chat_id: Any, target_chat_id: Any, messages: Any, **kwargs: Any
+    ) -> List[Optional[Any]]:
+        """
+        转发消息 (与 forward_messages_queued 参数一致)
+
+        Returns:
+            与输入 ID 顺序一致的结果列表，转发失败的位置为 None
+        """
+        ids = _normalize_ids(messages)
+        if not ids:
+            return []
+        # 超过单批上限的调用方 (极少见) 直接走原有路径
+        if len(ids) > self.max_ids:
+            result = await forward_messages_queued(client, source_chat_id, target_chat_id, ids, **kwargs)
+            return result if isinstance(result, list) else [result] * len(ids)
+
+        self.requests += 1
+        key = (id(client), source_chat_id, target_chat_id, tuple(sorted(kwargs.items())))
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._pending.get(key)
+        if batch is not None and batch.size + len(ids) > self.max_ids:
+            # 放不下则先发出当前批次，媒体组保持完整
+            self._flush(key, batch, client, source_chat_id, target_chat_id, kwargs)
+            batch = None
+        if batch is None:
+            batch = _PendingForward()
+            self._pending[key] = batch
+            batch.timer = loop.call_later(
+                self.window, self._flush, key, batch, client, source_chat_id, target_chat_id, kwargs
+            )
+        batch.units.append((ids, future))
+        batch.size += len(ids)
+        if batch.size >= self.max_ids:
+            self._flush(key, batch, client, source_chat_id, target_chat_id, kwargs)
+
+        # shield: 单个调用方被取消不影响同批次的其他任务
+        return await asyncio.shield(future)
+
+    def _flush(
+        self, key: Tuple, batch: _PendingForward, client: Any,
+        source_chat_id: Any, target_chat_id: Any, kwargs: Dict[str, Any]
+    ) -> None:
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        if not batch.units:
+            return
+
+        units, batch.units = batch.units, []
+        task = asyncio.ensure_future(self._run(units, client, source_chat_id, target_chat_id, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, client: Any, source_chat_id: Any, target_chat_id: Any, ids: List[int], kwargs: Dict[str, Any]) -> List[Optional[Any]]:
+        self.api_calls += 1
+        result = await telegram_queue_service.run_guarded_operation(
+            target_chat_id, source_chat_id, "ForwardAggregate",
+            lambda: client.forward_messages(target_chat_id, ids, from_peer=source_chat_id, **kwargs)
+        )
+        if isinstance(result, list) and len(result) == len(ids):
+            return result
+        # 非列表返回 (如单条 Message)，视为整体成功
+        return [result] * len(ids)
+
+    async def _run(
+        self, units: List[Tuple[List[int], asyncio.Future]], client: Any,
+        source_chat_id: Any, target_chat_id: Any, kwargs: Dict[str, Any]
+    ) -> None:
+        ids = [mid for unit_ids, _ in units for mid in unit_ids]
+        FORWARD_AGGREGATED_TOTAL.labels(result="api_call").inc()
+        FORWARD_AGGREGATED_TOTAL.labels(result="message").inc(len(ids))
+        try:
+            results = await self._send(client, source_chat_id, target_chat_id, ids, kwargs)
+        except asyncio.CancelledError:
+            for _, future in units:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            if len(units) == 1 or isinstance(e, FloodWaitException):
+                self._fail(units, e)
+                return
+            # 合并请求失败 (如其中一条已被删除)，退回逐调用方发送以隔离错误
+            logger.warning(f"聚合转发失败，退回逐任务发送: {source_chat_id} -> {target_chat_id}, {len(units)} 个任务, 错误={e}")
+            self.fallbacks += 1
+            FORWARD_AGGREGATED_TOTAL.labels(result="fallback").inc()
+            for unit_ids, future in units:
+                try:
+                    unit_results = await self._send(client, source_chat_id, target_chat_id, unit_ids, kwargs)
+                except Exception as unit_error:
+                    self._fail([(unit_ids, future)], unit_error)
+                    continue
+                if not future.done():
+                    future.set_result(unit_results)
+            return
+
+        offset = 0
+        for unit_ids, future in units:
+            if not future.done():
+                future.set_result(results[offset:offset + len(unit_ids)])
+            offset += len(unit_ids)
+
+    @staticmethod
+    def _fail(units: List[Tuple[List[int], asyncio.Future]], error: Exception) -> None:
+        for _, future in units:
+            if not future.done():
+                future.set_exception(error)
+                # 调用方已取消时避免 "exception was never retrieved"
+                future.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """聚合统计 (saved_api_calls 为相比逐任务转发省下的 ForwardMessages 次数)"""
+        return {
+            "requests": self.requests,
+            "api_calls": self.api_calls,
+            "saved_api_calls": max(0, self.requests - self.api_calls),
+            "fallbacks": self.fallbacks,
+            "pending_batches": len(self._pending),
+        }
+
+
+_forward_aggregator: Optional[ForwardAggregator] = None
+
+
+def get_forward_aggregator() -> ForwardAggregator:
+    """全局聚合器 (首次使用时按配置创建，导入本模块不读取配置)"""
+    global _forward_aggregator
+    if _forward_aggregator is None:
+        _forward_aggregator = ForwardAggregator(
+            window_ms=settings.FORWARD_AGGREGATE_WINDOW_MS,
+            max_ids=settings.FORWARD_AGGREGATE_MAX_IDS,
+        )
+    return _forward_aggregator
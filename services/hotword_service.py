@@ -10,7 +10,8 @@ from core.logging import get_logger, log_performance
 from core.helpers.lazy_import import LazyImport
 from repositories.hotword_repo import HotwordRepository
 
-from core.algorithms.simhash import SimHash, SimHashIndex
+from core.algorithms.simhash import SimHash
+from core.algorithms.hamming_index import HammingIndex
 from core.algorithms.ac_automaton import ACManager
 
 logger = get_logger(__name__)
@@ -223,10 +224,13 @@ class HotwordService:
         self._learning_lock = asyncio.Lock()
         self.io_semaphore = asyncio.Semaphore(10)  # IO 削峰信号量
 
-        self.spam_lsh_current = SimHashIndex(k=3, f=64)
-        self.spam_lsh_backup: Optional[SimHashIndex] = None
-        self.spam_hash_count = 0
-        from core.algorithms.simhash import SimHash
+        # 垃圾消息 SimHash 拦截网: 精确海明距离校验，按上限与 TTL 滑动淘汰
+        self.spam_index = HammingIndex(
+            k=3,
+            f=64,
+            max_entries=settings.HOTWORD_SPAM_INDEX_MAX_ENTRIES,
+            ttl=settings.HOTWORD_SPAM_TTL_SECONDS,
+        )
         self.simhash_engine = SimHash(f=64)
 
         self.is_suspended = False
@@ -344,11 +348,7 @@ class HotwordService:
             text = str(raw_text) if raw_text is not None else ""
             if len(text) > 30:
                 sh = self.simhash_engine.build_fingerprint(text)
-                is_spam = self.spam_lsh_current.search(sh)
-                if not is_spam and self.spam_lsh_backup:
-                    is_spam = self.spam_lsh_backup.search(sh)
-                    
-                if is_spam:
+                if self.spam_index.contains_near(sh, scope="spam"):
                     # 拦截：该消息结构被判定为变种广告，直接丢弃
                     continue
                 if isinstance(item, dict):
@@ -370,17 +370,12 @@ class HotwordService:
         new_spam_hashes = results.get("spam_hashes", [])
 
         async with self._lock:
-            # 更新 SimHash 拦截网 (滑动过期)
+            # 更新 SimHash 拦截网 (上限淘汰 + TTL 滑动过期)
             for h in new_spam_hashes:
-                if self.spam_hash_count >= 5000:
-                    # 爆仓熔断：滑动至 backup 前瞻缓存，保护防守不断档
-                    self.spam_lsh_backup = self.spam_lsh_current
-                    self.spam_lsh_current = SimHashIndex(k=3, f=64)
-                    self.spam_hash_count = 0
-                self.spam_lsh_current.add("spam", h)
-                self.spam_hash_count += 1
+                self.spam_index.add(h, scope="spam")
+            if new_spam_hashes:
+                self.spam_index.expire()
 
-                
             # 更新得分缓存 L1: { channel: { word: {"f": score, "u": unique_users} } }
             for target in [channel_name, "global"]:
                 stats = self.l1_cache.setdefault(target, {})
@@ -410,14 +405,17 @@ class HotwordService:
 
         # ── 锁已释放，以下全是无竞争的 IO ────────────────────────────────
 
-        # 1. 刷写热词得分 (含多样性元数据)
+        # 1. 刷写热词得分 (含多样性元数据)：全部频道合并为一次批量 UPSERT
+        batches = {}
         for channel, stats in snapshot_cache.items():
             disk_data = {
                 w: {"f": round(v["f"], 2), "u": v["u"]}
                 for w, v in stats.items() if v["f"] >= 0.5
             }
             if disk_data:
-                await self.repo.save_temp_counts(channel, disk_data)
+                batches[channel] = disk_data
+        if batches:
+            await self.repo.save_temp_counts_bulk(batches)
 
         # 2. 噪声候选词：合并到持久累积池，不再同步读盘，改由 _noise_learning_job 信号驱动处理
         if snapshot_noise:
@@ -3,6 +3,7 @@ import os
 import logging
 from typing import Dict, Optional
 from core.constants import TEMP_DIR
+from core.cache.media_cache import get_media_cache
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +66,8 @@ class MediaHydrationService:
             # Start download
             self._status[file_id] = MediaStatus.PENDING
             try:
-                path = await message.download_media(file=TEMP_DIR)
+                # 底层文件经媒体缓存共享，这里拿到的是本调用方独占的链接
+                path = await get_media_cache().fetch(message, TEMP_DIR)
                 if path:
                     self._paths[file_id] = path
                     self._status[file_id] = MediaStatus.DOWNLOADED
@@ -13,6 +13,7 @@ from telethon import TelegramClient
 from core.logging import get_logger
 from core.helpers.error_handler import handle_errors, handle_telegram_errors
 from core.constants import TEMP_DIR, PROCESSED_GROUP_TTL_SECONDS, PROCESSED_GROUP_MAX
+from core.cache.media_cache import get_media_cache
 
 logger = get_logger(__name__)
 
@@ -88,7 +89,7 @@ class MediaService:
         for msg in messages:
             if msg.media:
                 try:
-                    file_path = await msg.download_media(temp_dir)
+                    file_path = await get_media_cache().fetch(msg, temp_dir)
                     if file_path:
                         files.append(file_path)
                 except Exception as e:
@@ -0,0 +1,152 @@
+"""
+消息拉取合并器 (Message Fetch Coalescer)
+
+并发 Worker 处理同一聊天的任务时，会在几毫秒内各自发起 GetMessages。
+本合并器按 (client, chat_id) 收集短窗口内的消息 ID 请求，窗口到期或凑满
+Telegram 单次上限 (100 个 ID) 时只发起一次 get_messages_queued，
+再把结果按 ID 分发给各个等待者。实体修复、限流与熔断仍由
+get_messages_queued 负责。
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.config import settings
+from core.helpers.metrics import MESSAGE_FETCH_COALESCED_TOTAL
+from services.queue_service import get_messages_queued
+
+logger = logging.getLogger(__name__)
+
+# Telegram messages.getMessages 单次最多 100 个 ID
+TELEGRAM_MAX_IDS = 100
+
+
+class _PendingBatch:
+    """一个待发出的批次：ID 集合 + 共享的结果 Future ({message_id: message})"""
+
+    __slots__ = ("ids", "future", "timer")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.ids: Dict[int, None] = {}
+        self.future: asyncio.Future = loop.create_future()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MessageFetchCoalescer:
+    """
+    按聊天合并短窗口内的 GetMessages 请求
+
+    所有状态只在事件循环线程内修改，无需加锁。
+    """
+
+    def __init__(self, window_ms: float = 5.0, max_ids: int = TELEGRAM_MAX_IDS):
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_ids = max(1, min(max_ids, TELEGRAM_MAX_IDS))
+        # (id(client), chat_id) -> 正在收集中的批次
+        self._pending: Dict[Tuple[int, int], _PendingBatch] = {}
+        self._tasks: set = set()
+
+        self.requests = 0
+        self.requested_ids = 0
+        self.api_calls = 0
+
+    async def fetch(self, client: Any, chat_id: Any, message_ids: Iterable[int]) -> List[Optional[Any]]:
+        """
+        获取消息，结果顺序与 message_ids 一致 (缺失位置为 None)
+
+        同一批次内任一请求失败，该批次的所有等待者都会收到同一个异常。
+        """
+        ids = [int(mid) for mid in message_ids]
+        if not ids:
+            return []
+
+        self.requests += 1
+        self.requested_ids += len(ids)
+        futures = self._enqueue(client, int(chat_id), ids)
+        found: Dict[int, Any] = {}
+        for future in dict.fromkeys(futures):
+            # shield: 单个等待者被取消不影响同批次的其他调用方
+            found.update(await asyncio.shield(future))
+        return [found.get(mid) for mid in ids]
+
+    def _enqueue(self, client: Any, chat_id: int, ids: List[int]) -> List[asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        key = (id(client), chat_id)
+        futures = []
+        for mid in ids:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = _PendingBatch(loop)
+                self._pending[key] = batch
+                batch.timer = loop.call_later(self.window, self._flush, key, batch, client, chat_id)
+            batch.ids[mid] = None
+            futures.append(batch.future)
+            if len(batch.ids) >= self.max_ids:
+                # 凑满上限立即发出，后续 ID 进入新批次
+                self._flush(key, batch, client, chat_id)
+        return futures
+
+    def _flush(self, key: Tuple[int, int], batch: _PendingBatch, client: Any, chat_id: int) -> None:
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        if batch.future.done():
+            return
+
+        task = asyncio.ensure_future(self._run(batch, client, chat_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _PendingBatch, client: Any, chat_id: int) -> None:
+        ids = list(batch.ids)
+        self.api_calls += 1
+        MESSAGE_FETCH_COALESCED_TOTAL.labels(result="api_call").inc()
+        MESSAGE_FETCH_COALESCED_TOTAL.labels(result="id").inc(len(ids))
+        try:
+            messages = await get_messages_queued(client, chat_id, ids=ids)
+        except BaseException as e:
+            if not batch.future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    batch.future.cancel()
+                else:
+                    batch.future.set_exception(e)
+                    # 等待者均已取消时避免 "exception was never retrieved"
+                    batch.future.exception()
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        if not isinstance(messages, list):
+            messages = [messages]
+        found: Dict[int, Any] = {}
+        for message in messages:
+            if message is not None and getattr(message, "id", None) is not None:
+                found[int(message.id)] = message
+        if not batch.future.done():
+            batch.future.set_result(found)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """合并统计 (saved_api_calls 为相比逐请求调用省下的 GetMessages 次数)"""
+        return {
+            "requests": self.requests,
+            "requested_ids": self.requested_ids,
+            "api_calls": self.api_calls,
+            "saved_api_calls": max(0, self.requests - self.api_calls),
+            "pending_batches": len(self._pending),
+        }
+
+
+_message_fetch_coalescer: Optional[MessageFetchCoalescer] = None
+
+
+def get_message_fetch_coalescer() -> MessageFetchCoalescer:
+    """全局合并器 (首次使用时按配置创建，导入本模块不读取配置)"""
+    global _message_fetch_coalescer
+    if _message_fetch_coalescer is None:
+        _message_fetch_coalescer = MessageFetchCoalescer(
+            window_ms=settings.MESSAGE_FETCH_COALESCE_WINDOW_MS,
+            max_ids=settings.MESSAGE_FETCH_COALESCE_MAX_IDS,
+        )
+    return _message_fetch_coalescer
@@ -0,0 +1,192 @@
+"""
+消息交接缓存 (Message Handoff Cache)
+
+监听器在收到 NewMessage 事件时已经持有完整的 Telethon Message 对象，
+但任务队列只保存 {chat_id, message_id}，导致 Worker 需要再次调用
+get_messages_queued 拉取同一条消息。
+
+本缓存在进程内按 (chat_id, message_id) 保存监听器拿到的消息对象，
+Worker 优先读取缓存，仅在未命中时 (历史任务、重启后等) 才回源 Telegram。
+容量同时受条目数、估算字节数与 TTL 三重约束，防止在 1GB VPS 上膨胀。
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.config import settings
+from core.helpers.metrics import MESSAGE_HANDOFF_LOOKUPS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# 单条消息对象的固定开销估算 (Telethon Message + 实体/媒体元数据)
+_BASE_MESSAGE_BYTES = 2048
+
+
+def _estimate_size(message: Any) -> int:
+    """粗略估算消息对象的内存占用 (字节)"""
+    size = _BASE_MESSAGE_BYTES
+    text = getattr(message, "message", None)
+    if isinstance(text, str):
+        size += len(text) * 2
+    entities = getattr(message, "entities", None)
+    if entities:
+        try:
+            size += len(entities) * 128
+        except TypeError:
+            pass
+    if getattr(message, "media", None) is not None:
+        size += 1024
+    return size
+
+
+class MessageHandoffCache:
+    """
+    有界消息交接缓存 (LRU + TTL + 字节预算)
+
+    所有操作均在事件循环线程内同步完成，不涉及 await，因此无需加锁。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        max_entries: int = 5000,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # (chat_id, message_id) -> (message, expire_at, size)
+        self._store: "OrderedDict[Tuple[int, int], Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_calls = 0
+        self.puts = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(chat_id: Any, message_id: Any) -> Tuple[int, int]:
+        return int(chat_id), int(message_id)
+
+    def put(self, chat_id: int, message: Any) -> None:
+        """写入一条监听器已持有的消息对象"""
+        message_id = getattr(message, "id", None)
+        if chat_id is None or message_id is None:
+            return
+
+        key = self._key(chat_id, message_id)
+        size = _estimate_size(message)
+        if size > self.max_bytes:
+            return
+
+        old = self._store.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+
+        self._store[key] = (message, time.monotonic() + self.ttl_seconds, size)
+        self._bytes += size
+        self.puts += 1
+        self._evict()
+
+    def put_many(self, chat_id: int, messages: Iterable[Any]) -> None:
+        """批量写入同一会话的消息 (历史任务分页、媒体组)"""
+        for message in messages:
+            if message is not None:
+                self.put(chat_id, message)
+
+    def get(self, chat_id: int, message_id: int) -> Optional[Any]:
+        """读取单条消息，未命中或过期返回 None"""
+        found, _ = self.get_many(chat_id, [message_id])
+        return found.get(int(message_id))
+
+    def get_many(self, chat_id: int, message_ids: Iterable[int]) -> Tuple[Dict[int, Any], List[int]]:
+        """
+        批量读取
+
+        Returns:
+            (命中的 {message_id: message}, 未命中的 message_id 列表，保持输入顺序)
+        """
+        found: Dict[int, Any] = {}
+        missing: List[int] = []
+        now = time.monotonic()
+
+        for mid in message_ids:
+            key = self._key(chat_id, mid)
+            entry = self._store.get(key)
+            if entry is not None and entry[1] < now:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                missing.append(int(mid))
+                continue
+
+            self._store.move_to_end(key)
+            found[int(mid)] = entry[0]
+
+        if found and not missing:
+            # 全部命中即省去一次 GetMessages 往返
+            self.saved_calls += 1
+        if found:
+            self.hits += len(found)
+            MESSAGE_HANDOFF_LOOKUPS_TOTAL.labels(result="hit").inc(len(found))
+        if missing:
+            self.misses += len(missing)
+            MESSAGE_HANDOFF_LOOKUPS_TOTAL.labels(result="miss").inc(len(missing))
+        return found, missing
+
+    def discard(self, chat_id: int, message_id: int) -> None:
+        """主动移除一条缓存 (例如源消息已删除)"""
+        self._drop(self._key(chat_id, message_id))
+
+    def clear(self) -> None:
+        self._store.clear()
+        self._bytes = 0
+
+    def _drop(self, key: Tuple[int, int]) -> None:
+        entry = self._store.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _evict(self) -> None:
+        """按 LRU 顺序淘汰，直至条目数与字节数均回到预算内"""
+        if len(self._store) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+
+        now = time.monotonic()
+        while self._store and (len(self._store) > self.max_entries or self._bytes > self.max_bytes):
+            key, (_, expire_at, size) = self._store.popitem(last=False)
+            self._bytes -= size
+            if expire_at < now:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中统计 (saved_api_calls 为完全命中、无需回源的批次数)"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._store),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "saved_api_calls": self.saved_calls,
+            "puts": self.puts,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+message_handoff_cache = MessageHandoffCache(
+    ttl_seconds=settings.MESSAGE_HANDOFF_TTL_SECONDS,
+    max_entries=settings.MESSAGE_HANDOFF_MAX_ENTRIES,
+    max_bytes=settings.MESSAGE_HANDOFF_MAX_BYTES,
+)
@@ -4,59 +4,92 @@ Metrics Collection Service
 """
 import time
 import logging
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Optional
 from datetime import datetime
 
+from core.algorithms.quantile_sketch import DDSketch, WindowedSketch
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+# 滑动窗口: 名称 -> 秒数
+LATENCY_WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+
 class LatencyMetrics:
-    """延迟指标"""
-    count: int = 0
-    total_ms: float = 0.0
-    min_ms: float = float('inf')
-    max_ms: float = 0.0
-    p50_ms: float = 0.0
-    p95_ms: float = 0.0
-    p99_ms: float = 0.0
-    samples: list = field(default_factory=list)
-    
+    """
+    延迟指标
+
+    分位数由 DDSketch 流式估计 (相对误差 1%)：记录 O(1)、内存固定，
+    读取时才计算 p50/p95/p99；另按 1m/5m/1h 滑动窗口分别统计。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.reset()
+
+    def reset(self):
+        """清空所有统计"""
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float('inf')
+        self.max_ms = 0.0
+        self._sketch = DDSketch()
+        self._windows = WindowedSketch(LATENCY_WINDOWS, clock=self._clock)
+
     def record(self, latency_ms: float):
         """记录一次延迟"""
         self.count += 1
         self.total_ms += latency_ms
-        self.min_ms = min(self.min_ms, latency_ms)
-        self.max_ms = max(self.max_ms, latency_ms)
-        
-        # 保留最近1000个样本用于百分位计算
-        self.samples.append(latency_ms)
-        if len(self.samples) > 1000:
-            self.samples.pop(0)
-        
-        # 更新百分位
-        if self.samples:
-            sorted_samples = sorted(self.samples)
-            self.p50_ms = sorted_samples[len(sorted_samples) // 2]
-            self.p95_ms = sorted_samples[int(len(sorted_samples) * 0.95)]
-            self.p99_ms = sorted_samples[int(len(sorted_samples) * 0.99)]
-    
+        if latency_ms < self.min_ms:
+            self.min_ms = latency_ms
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+        self._sketch.add(latency_ms)
+        self._windows.add(latency_ms)
+
+    @property
+    def p50_ms(self) -> float:
+        return self._sketch.quantile(0.50)
+
+    @property
+    def p95_ms(self) -> float:
+        return self._sketch.quantile(0.95)
+
+    @property
+    def p99_ms(self) -> float:
+        return self._sketch.quantile(0.99)
+
     @property
     def avg_ms(self) -> float:
         """平均延迟"""
         return self.total_ms / self.count if self.count > 0 else 0.0
-    
+
+    @staticmethod
+    def _summary(sketch: DDSketch) -> Dict[str, Any]:
+        p50, p95, p99 = sketch.quantiles((0.50, 0.95, 0.99))
+        return {
+            "count": sketch.count,
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "p99_ms": round(p99, 2),
+        }
+
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
+        p50, p95, p99 = self._sketch.quantiles((0.50, 0.95, 0.99))
         return {
             "count": self.count,
             "avg_ms": round(self.avg_ms, 2),
             "min_ms": round(self.min_ms, 2) if self.min_ms != float('inf') else 0.0,
             "max_ms": round(self.max_ms, 2),
-            "p50_ms": round(self.p50_ms, 2),
-            "p95_ms": round(self.p95_ms, 2),
-            "p99_ms": round(self.p99_ms, 2)
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "p99_ms": round(p99, 2),
+            "windows": {
+                name: self._summary(self._windows.window(name))
+                for name in LATENCY_WINDOWS
+            },
         }
 
 
@@ -80,6 +113,8 @@ class MetricsCollector:
             "api_call": LatencyMetrics(),
             "file_io": LatencyMetrics()
         }
+        # Telegram API 按操作类型 (SendMsg/Forward/GetMsgs...) 分别统计
+        self._api_latency: Dict[str, LatencyMetrics] = {}
         self._start_time = time.time()
         self._custom_metrics: Dict[str, Any] = {}
         # 差分日志缓存：记录上一次成功打印的指标值
@@ -107,6 +142,20 @@ class MetricsCollector:
         else:
             logger.warning(f"Unknown I/O operation: {operation}")
     
+    def record_api_latency(self, operation: str, latency_ms: float):
+        """
+        记录一次 Telegram API 调用延迟 (同时计入 api_call 汇总)
+
+        Args:
+            operation: TelegramQueueService 的操作类型，如 SendMsg、Forward、GetMsgs
+            latency_ms: 延迟时间 (毫秒)
+        """
+        metrics = self._api_latency.get(operation)
+        if metrics is None:
+            metrics = self._api_latency[operation] = LatencyMetrics()
+        metrics.record(latency_ms)
+        self._io_latency["api_call"].record(latency_ms)
+
     def set_custom_metric(self, key: str, value: Any):
         """设置自定义指标"""
         self._custom_metrics[key] = value
@@ -142,6 +191,13 @@ class MetricsCollector:
             for operation, metrics in self._io_latency.items()
         }
     
+    def get_api_latency_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """获取按操作类型划分的 Telegram API 延迟指标"""
+        return {
+            operation: metrics.to_dict()
+            for operation, metrics in self._api_latency.items()
+        }
+
     def get_system_metrics(self) -> Dict[str, Any]:
         """获取系统指标 (带差分过滤逻辑)"""
         import psutil
@@ -207,6 +263,7 @@ class MetricsCollector:
             "compression": self.get_compression_metrics(),
             "rate_limit": self.get_rate_limit_metrics(),
             "io_latency": self.get_io_latency_metrics(),
+            "api_latency": self.get_api_latency_metrics(),
             "system": self.get_system_metrics(),
             "custom": self._custom_metrics
         }
@@ -216,11 +273,8 @@ class MetricsCollector:
         self._compression_metrics = None
         self._rate_limit_metrics = {}
         for metrics in self._io_latency.values():
-            metrics.count = 0
-            metrics.total_ms = 0.0
-            metrics.min_ms = float('inf')
-            metrics.max_ms = 0.0
-            metrics.samples = []
+            metrics.reset()
+        self._api_latency = {}
         self._custom_metrics = {}
         
         # 重置服务层统计
@@ -1,9 +1,10 @@
 import asyncio
 import logging
-from typing import Any, Callable, Awaitable, Dict, Tuple
-from collections import defaultdict
+from typing import Any, Callable, Awaitable, Deque, Dict, Optional, Tuple
+from collections import defaultdict, deque
 from services.network.pid import PIDController
 from services.network.circuit_breaker import CircuitBreaker
+from services.metrics_collector import metrics_collector
 import time
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,7 @@ class MessageQueueService:
     - Dynamic Routing (CAP Algorithm)
     - Strict Priority Dispatch (Event-Based)
     - Isolation & Anti-Starvation
+    - Optional Write-Ahead Spool (crash-safe until push_batch commits)
     """
     
     LANE_CRITICAL = 'critical'
@@ -40,7 +42,7 @@ class MessageQueueService:
     # Score = Base - (Pending * Factor)
     CONGESTION_PENALTY_FACTOR = 0.5 
     
-    def __init__(self, max_size: int = 1000, workers: int = 5):
+    def __init__(self, max_size: int = 1000, workers: int = 5, spool=None):
         # [Phase 1: Multi-Lane Infrastructure]
         self.lanes: Dict[str, asyncio.Queue] = {
             self.LANE_CRITICAL: asyncio.Queue(maxsize=max_size),
@@ -48,6 +50,11 @@ class MessageQueueService:
             self.LANE_STANDARD: asyncio.Queue(maxsize=max_size)
         }
         self.lane_priority = [self.LANE_CRITICAL, self.LANE_FAST, self.LANE_STANDARD]
+
+        # [WAL Spool] 与各泳道一一对应的 spool 序号 (与队列内条目保持相同 FIFO 顺序)
+        # 泳道本身仍只保存原始条目，保证外部直接读取 lanes 的代码不受影响
+        self.spool = spool
+        self._lane_seqs: Dict[str, Deque[Optional[int]]] = {name: deque() for name in self.lanes}
         
         self.pending_counts: Dict[int, int] = defaultdict(int)
         self._newItemEvent = asyncio.Event()
@@ -82,6 +89,11 @@ class MessageQueueService:
         if not self._processor_callback:
             raise RuntimeError("Processor callback must be set before starting MessageQueueService")
 
+        recovered = []
+        if self.spool:
+            recovered = self.spool.recover()
+            self.spool.start()
+
         max_s = self.lanes[self.LANE_STANDARD].maxsize
         logger.info(f"正在启动 MessageQueueService (QoS 4.0)，包含 {self.workers} 个工作线程 (Lanes: {list(self.lanes.keys())}, MaxSize: {max_s})")
         for i in range(self.workers):
@@ -89,6 +101,12 @@ class MessageQueueService:
             self._worker_tasks.append(task)
         self._started = True
 
+        # [WAL Spool] 重放上次未提交的条目 (沿用原序号，不重复写入 spool)
+        for seq, item in recovered:
+            await self._put(item, seq)
+        if recovered:
+            logger.info(f"♻️ 已重放 {len(recovered)} 条未提交的入队记录")
+
     async def stop(self):
         """Gracefully stops the service."""
         logger.info("正在停止 MessageQueueService... 正在等待队列清空")
@@ -100,6 +118,9 @@ class MessageQueueService:
             task.cancel()
         
         await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self.spool:
+            await self.spool.close()
         self._started = False
         logger.info("MessageQueueService 已停止")
 
@@ -109,54 +130,62 @@ class MessageQueueService:
         Routes item to specific lane based on CAP Algorithm.
         """
         try:
-            # 1. Parse Metadata for Routing
-            priority = 0
-            chat_id = 0
-            
-            # Unpack (Action, Payload, Priority) tuple
-            if isinstance(item, tuple) and len(item) >= 3:
-                priority = item[2]
-                payload = item[1]
-                if isinstance(payload, dict):
-                    chat_id = payload.get('chat_id', 0)
-                elif hasattr(payload, 'chat_id'):
-                    chat_id = getattr(payload, 'chat_id', 0)
-            
-            # 2. CAP Algorithm (Congestion-Aware Priority)
-            # Score = Base - (Pending * Factor)
-            current_pending = self.pending_counts[chat_id]
-            score = priority - (current_pending * self.CONGESTION_PENALTY_FACTOR)
-            
-            # 3. Dynamic Routing
-            target_lane = self.LANE_STANDARD
-            if score >= 90:
-                target_lane = self.LANE_CRITICAL
-            elif score >= 50:
-                target_lane = self.LANE_FAST
-            # else STANDARD
-            
-            # 4. Enqueue
-            queue = self.lanes[target_lane]
-            
-            # Backpressure Check
-            if queue.full():
-                logger.warning(f"泳道 [{target_lane}] 已满！正在应用背压 (Score={score}, ChatID={chat_id}, Pending={current_pending})")
-            
-            await queue.put(item)
-            
-            # 5. Update State
-            self.pending_counts[chat_id] += 1
-            self._newItemEvent.set()
-            
+            # 0. Write-Ahead: 先落 spool 再进入内存泳道
+            seq = self.spool.append(item) if self.spool else None
+            await self._put(item, seq)
         except Exception as e:
             logger.error(f"Failed to enqueue item: {e}")
             raise
 
+    async def _put(self, item: Any, seq: Optional[int] = None):
+        """Routes a single item into its lane, keeping spool sequence alignment."""
+        # 1. Parse Metadata for Routing
+        priority = 0
+        chat_id = 0
+        
+        # Unpack (Action, Payload, Priority) tuple
+        if isinstance(item, tuple) and len(item) >= 3:
+            priority = item[2]
+            payload = item[1]
+            if isinstance(payload, dict):
+                chat_id = payload.get('chat_id', 0)
+            elif hasattr(payload, 'chat_id'):
+                chat_id = getattr(payload, 'chat_id', 0)
+        
+        # 2. CAP Algorithm (Congestion-Aware Priority)
+        # Score = Base - (Pending * Factor)
+        current_pending = self.pending_counts[chat_id]
+        score = priority - (current_pending * self.CONGESTION_PENALTY_FACTOR)
+        
+        # 3. Dynamic Routing
+        target_lane = self.LANE_STANDARD
+        if score >= 90:
+            target_lane = self.LANE_CRITICAL
+        elif score >= 50:
+            target_lane = self.LANE_FAST
+        # else STANDARD
+        
+        # 4. Enqueue
+        queue = self.lanes[target_lane]
+        
+        # Backpressure Check
+        if queue.full():
+            logger.warning(f"泳道 [{target_lane}] 已满！正在应用背压 (Score={score}, ChatID={chat_id}, Pending={current_pending})")
+        
+        await queue.put(item)
+        # put 之后无 await，序号与条目在同一步内入列，顺序严格一致
+        self._lane_seqs[target_lane].append(seq)
+        
+        # 5. Update State
+        self.pending_counts[chat_id] += 1
+        self._newItemEvent.set()
+
     async def _worker_loop(self, worker_id: int):
         """Consumer process with Strict Priority Logic (Event-Based)."""
         logger.debug(f"Worker-{worker_id} started (QoS 4.0).")
         BATCH_SIZE = 100 # Batching within same lane
         buffer = []
+        seqs = []
         
         while True:
             try:
@@ -176,6 +205,7 @@ class MessageQueueService:
                             try:
                                 selected_item = q.get_nowait()
                                 selected_lane = lane_name
+                                seqs.append(self._lane_seqs[lane_name].popleft())
                                 break
                             except asyncio.QueueEmpty:
                                 continue
@@ -198,14 +228,21 @@ class MessageQueueService:
                     try:
                         while len(buffer) < BATCH_SIZE and not q.empty():
                             buffer.append(q.get_nowait())
+                            seqs.append(self._lane_seqs[selected_lane].popleft())
                     except Exception:
                         pass
                         
                     # Process Batch
                     try:
                         await self._processor_callback(buffer)
+                        # [WAL Spool] 仅在批量提交成功后写入检查点
+                        if self.spool:
+                            self.spool.ack(seqs)
                     except Exception as e:
                         logger.error(f"Worker-{worker_id} failed to process batch: {e}", exc_info=True)
+                        # [WAL Spool] 失败批次转写到 spool 尾部待重启重放，旧分段得以释放
+                        if self.spool:
+                            self.spool.retry(seqs, buffer)
                     finally:
                         # Cleanup & State Update
                         for item in buffer:
@@ -231,6 +268,7 @@ class MessageQueueService:
                         if q_deep > 800: self._current_delay = 0
                         
                         buffer = []
+                        seqs = []
                         # Yield control briefly to avoid starving event loop if processing is synchronous-heavy
                         # But with pure async, it's fine. 
                         # Using PID delay to pace usage if needed
@@ -243,6 +281,12 @@ class MessageQueueService:
                 logger.error(f"Worker-{worker_id} crashed loop: {e}", exc_info=True)
                 await asyncio.sleep(1)
 
+    def get_spool_stats(self) -> Dict[str, Any]:
+        """Spool 运行状态 (未启用时返回 enabled=False)"""
+        if not self.spool:
+            return {"enabled": False}
+        return {"enabled": True, **self.spool.get_stats()}
+
 from core.config import settings
 
 class TelegramQueueService:
@@ -283,7 +327,11 @@ class TelegramQueueService:
                     now = time.time()
                     wait = max(0, self._global_next_at - now, self._target_next_at.get(target_key, 0) - now, self._pair_next_at.get(pair_key, 0) - now)
                     if wait > 0: await asyncio.sleep(wait)
-                    result = await func()
+                    started = time.perf_counter()
+                    try:
+                        result = await func()
+                    finally:
+                        metrics_collector.record_api_latency(operation_name, (time.perf_counter() - started) * 1000)
                     self._update_next_at(target_key, pair_key)
                     return result
                 except Exception as e:
@@ -0,0 +1,289 @@
+"""
+MessageQueueService 预写日志 (Write-Ahead Spool)
+
+内存泳道中的任务在 TaskRepository.push_batch 提交前只存在于进程内，
+进程崩溃或被 OOM Killer 杀死时会直接丢失。Spool 以追加写的方式把每次
+enqueue 记录到分段日志文件，批量提交成功后再追加 ack 记录；启动时重放
+所有未 ack 的条目回泳道。
+
+文件格式 (JSON Lines，每段 spool-<起始序号>.log):
+    {"s": 12, "i": ["process_message", {...}, 10]}   入队记录
+    {"s": 13, "i": [...], "r": 1}                    提交失败后转写的记录 (r 为已失败次数)
+    {"a": [10, 11, 12]}                              提交确认记录
+
+写入使用 os.write 直接落到内核页缓存 (进程被杀不丢失)，
+fsync 由后台任务按固定间隔批量执行 (防掉电)。
+"""
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PREFIX = "spool-"
+_SEGMENT_SUFFIX = ".log"
+
+
+class _Segment:
+    """单个日志分段的内存状态"""
+    __slots__ = ("path", "start_seq", "outstanding", "size")
+
+    def __init__(self, path: Path, start_seq: int, size: int = 0):
+        self.path = path
+        self.start_seq = start_seq
+        self.outstanding: set = set()
+        self.size = size
+
+
+class QueueSpool:
+    """追加写、分段、fsync 批量化的入队日志"""
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_bytes: int = 4 * 1024 * 1024,
+        fsync_interval: float = 0.2,
+        max_retries: int = 3,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.max_retries = max_retries
+
+        self._segments: List[_Segment] = []
+        self._seq_segment: Dict[int, _Segment] = {}
+        # 序号 -> 已失败的提交次数 (无记录即为 0)
+        self._retries: Dict[int, int] = {}
+        self._next_seq = 1
+        self._fd: Optional[int] = None
+        self._dirty = False
+        self._fsync_task: Optional[asyncio.Task] = None
+
+        self.appended = 0
+        self.acked = 0
+        self.replayed = 0
+        self.dropped = 0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def recover(self) -> List[Tuple[int, Any]]:
+        """
+        扫描已有分段，返回所有未确认的 (seq, item)，按序号升序。
+        必须在 append 之前调用一次。
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        pending: Dict[int, Any] = {}
+        acked: set = set()
+        max_seq = 0
+
+        for path in sorted(self.directory.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}")):
+            try:
+                start_seq = int(path.stem[len(_SEGMENT_PREFIX):])
+            except ValueError:
+                logger.warning(f"忽略无法识别的 spool 文件: {path.name}")
+                continue
+
+            segment = _Segment(path, start_seq, path.stat().st_size)
+            self._segments.append(segment)
+
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时最后一行可能只写了一半，直接跳过
+                        logger.warning(f"spool 分段 {path.name} 存在损坏记录，已跳过")
+                        continue
+
+                    if "s" in record:
+                        seq = int(record["s"])
+                        pending[seq] = tuple(record["i"])
+                        segment.outstanding.add(seq)
+                        self._seq_segment[seq] = segment
+                        if record.get("r"):
+                            self._retries[seq] = int(record["r"])
+                        max_seq = max(max_seq, seq)
+                    elif "a" in record:
+                        acked.update(int(s) for s in record["a"])
+
+        for seq in acked:
+            pending.pop(seq, None)
+            segment = self._seq_segment.pop(seq, None)
+            if segment is not None:
+                segment.outstanding.discard(seq)
+            self._retries.pop(seq, None)
+
+        # 最新分段可能只含 ack 记录或为空 (如刚滚动后崩溃)，其起始序号会大于 max_seq，
+        # 此时 _open_segment 直接续写该分段
+        last_start = self._segments[-1].start_seq if self._segments else 1
+        self._next_seq = max(max_seq + 1, last_start)
+        self._open_segment()
+        self._drop_completed_segments()
+
+        items = sorted(pending.items())
+        self.replayed = len(items)
+        if items:
+            logger.warning(f"♻️ [Spool] 发现 {len(items)} 条未提交的入队记录，将重放回泳道")
+        return items
+
+    def start(self) -> None:
+        """启动后台 fsync 任务"""
+        if self._fsync_task is None or self._fsync_task.done():
+            self._fsync_task = asyncio.create_task(self._fsync_loop(), name="queue_spool_fsync")
+
+    async def close(self) -> None:
+        """停止 fsync 任务并落盘；若全部已确认则清理所有分段"""
+        if self._fsync_task:
+            self._fsync_task.cancel()
+            try:
+                await self._fsync_task
+            except asyncio.CancelledError:
+                pass
+            self._fsync_task = None
+
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+        if not self._seq_segment:
+            for segment in self._segments:
+                self._unlink(segment)
+            self._segments.clear()
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def append(self, item: Any, retries: int = 0) -> Optional[int]:
+        """记录一次入队，返回分配的序号；无法序列化的条目返回 None (不做持久化保护)"""
+        seq = self._next_seq
+        record = {"s": seq, "i": list(item)}
+        if retries:
+            record["r"] = retries
+        try:
+            line = json.dumps(record, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"[Spool] 条目无法序列化，跳过持久化: {e}")
+            return None
+
+        self._next_seq += 1
+        segment = self._write(line)
+        segment.outstanding.add(seq)
+        self._seq_segment[seq] = segment
+        if retries:
+            self._retries[seq] = retries
+        self.appended += 1
+        return seq
+
+    def ack(self, seqs: Iterable[Optional[int]]) -> None:
+        """记录一批条目已由 push_batch 提交"""
+        done = [s for s in seqs if s is not None and s in self._seq_segment]
+        if not done:
+            return
+
+        self._write(json.dumps({"a": done}))
+        for seq in done:
+            self._seq_segment.pop(seq).outstanding.discard(seq)
+            self._retries.pop(seq, None)
+        self.acked += len(done)
+        self._drop_completed_segments()
+
+    def retry(self, seqs: Iterable[Optional[int]], items: Iterable[Any]) -> List[Optional[int]]:
+        """
+        提交失败的批次：以新序号转写到当前分段并确认旧序号，
+        避免失败条目长期钉住旧分段；超过 max_retries 次的条目直接丢弃。
+        返回各条目的新序号 (被丢弃或未持久化的为 None)。
+        """
+        new_seqs: List[Optional[int]] = []
+        old_seqs: List[int] = []
+        for seq, item in zip(seqs, items):
+            if seq is None or seq not in self._seq_segment:
+                new_seqs.append(None)
+                continue
+            old_seqs.append(seq)
+            attempts = self._retries.get(seq, 0) + 1
+            if attempts > self.max_retries:
+                logger.error(f"[Spool] 条目 seq={seq} 已连续提交失败 {attempts} 次，放弃重放: {item!r:.200}")
+                self.dropped += 1
+                new_seqs.append(None)
+                continue
+            new_seqs.append(self.append(item, attempts))
+        self.ack(old_seqs)
+        return new_seqs
+
+    def _write(self, line: str) -> _Segment:
+        active = self._segments[-1]
+        if active.size >= self.segment_bytes:
+            self._rotate()
+            active = self._segments[-1]
+
+        data = (line + "\n").encode("utf-8")
+        os.write(self._fd, data)
+        active.size += len(data)
+        self._dirty = True
+        return active
+
+    # ------------------------------------------------------------------
+    # 分段管理
+    # ------------------------------------------------------------------
+    def _open_segment(self) -> None:
+        path = self.directory / f"{_SEGMENT_PREFIX}{self._next_seq:012d}{_SEGMENT_SUFFIX}"
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if self._segments and self._segments[-1].path == path:
+            # 续写恢复时已登记的分段，不能重复登记 (否则会被当作已完成分段删除)
+            self._segments[-1].size = os.fstat(self._fd).st_size
+            return
+        self._segments.append(_Segment(path, self._next_seq, os.fstat(self._fd).st_size))
+
+    def _rotate(self) -> None:
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+        self._open_segment()
+
+    def _drop_completed_segments(self) -> None:
+        """
+        只按顺序删除前缀分段：某分段中的 ack 记录只会引用该段及更早分段的序号，
+        因此前缀全部确认后删除不会让后续重放误判。最后一个分段是 _fd 正在写入的分段，从不删除。
+        """
+        while len(self._segments) > 1 and not self._segments[0].outstanding:
+            self._unlink(self._segments.pop(0))
+
+    @staticmethod
+    def _unlink(segment: _Segment) -> None:
+        try:
+            segment.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除 spool 分段失败 {segment.path.name}: {e}")
+
+    async def _fsync_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(self.fsync_interval)
+                if self._dirty and self._fd is not None:
+                    self._dirty = False
+                    await asyncio.to_thread(os.fsync, self._fd)
+            except asyncio.CancelledError:
+                break
+            except OSError as e:
+                logger.error(f"[Spool] fsync 失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "segments": len(self._segments),
+            "outstanding": len(self._seq_segment),
+            "appended": self.appended,
+            "acked": self.acked,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+        }
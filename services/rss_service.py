@@ -16,6 +16,7 @@ except ImportError:
     AIOHTTP_AVAILABLE = False
 
 from core.config import settings
+from core.cache.media_cache import get_media_cache
 
 logger = logging.getLogger(__name__)
 
@@ -137,7 +138,7 @@ class RssService:
                filename = f"photo_{message_id}.jpg"
                local_path = os.path.join(rule_media_path, filename)
                if not os.path.exists(local_path):
-                   await message.download_media(local_path)
+                   await get_media_cache().fetch(message, rule_media_path, file_name=filename)
                
                if os.path.exists(local_path):
                    media_list.append({
@@ -154,7 +155,7 @@ class RssService:
                local_path = os.path.join(rule_media_path, filename)
                
                if not os.path.exists(local_path):
-                   await message.download_media(local_path)
+                   await get_media_cache().fetch(message, rule_media_path, file_name=filename)
 
                if os.path.exists(local_path):
                    mime = message.document.mime_type or "application/octet-stream"
@@ -1,11 +1,263 @@
 import logging
 import re
-from typing import List, Optional, Any
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional, Any, Tuple, Dict, Sequence
 from enums.enums import ForwardMode
-from core.algorithms.ac_automaton import ACManager
+from core.algorithms.ac_automaton import ACAutomaton, ACManager, MultiRuleAutomaton
 
 logger = logging.getLogger(__name__)
 
+# 关键词标签位
+TAG_WHITE = 1
+TAG_BLACK = 2
+
+
+class CompiledKeywordSet:
+    """
+    单条规则的预编译关键词集合
+
+    - 普通关键词: 一个 AC 自动机，每个关键词带白/黑名单标签位
+    - 正则关键词: 白/黑名单各一个合并后的交替正则 (预编译，忽略大小写)
+
+    一次扫描同时得到白名单与黑名单命中情况，四种 ForwardMode 的判定均基于该结果。
+    """
+
+    __slots__ = ("has_white", "has_black", "_ac", "_white_regex", "_black_regex")
+
+    def __init__(self, keywords: List[Any]):
+        self.has_white = False
+        self.has_black = False
+        self._ac: Optional[ACAutomaton] = None
+        white_patterns: List[str] = []
+        black_patterns: List[str] = []
+        fixed_tags = {}
+
+        for k in keywords or []:
+            word = getattr(k, 'keyword', None)
+            if not word:
+                continue
+            is_black = bool(getattr(k, 'is_blacklist', True))
+            if is_black:
+                self.has_black = True
+            else:
+                self.has_white = True
+
+            if getattr(k, 'is_regex', False):
+                (black_patterns if is_black else white_patterns).append(word)
+            else:
+                word = word.lower()
+                fixed_tags[word] = fixed_tags.get(word, 0) | (TAG_BLACK if is_black else TAG_WHITE)
+
+        if fixed_tags:
+            self._ac = ACAutomaton()
+            for word, tag in fixed_tags.items():
+                self._ac.add_keyword(word, tag)
+            self._ac.build()
+
+        self._white_regex = self._compile_patterns(white_patterns)
+        self._black_regex = self._compile_patterns(black_patterns)
+
+    @staticmethod
+    def _compile_patterns(patterns: List[str]) -> List[re.Pattern]:
+        """
+        无捕获组的模式合并为单个交替正则；含捕获组的模式 (合并后反向引用组号会错位)
+        及内联标志等无法合并的情况逐个编译
+        """
+        combinable, separate = [], []
+        for pattern in patterns:
+            try:
+                compiled = re.compile(pattern, re.I)
+            except re.error as e:
+                logger.error(f"正则匹配出错: {pattern}, {e}")
+                continue
+            if compiled.groups:
+                separate.append(compiled)
+            else:
+                combinable.append(pattern)
+
+        if len(combinable) > 1:
+            try:
+                return [re.compile("|".join(f"(?:{p})" for p in combinable), re.I)] + separate
+            except re.error:
+                pass
+        return [re.compile(p, re.I) for p in combinable] + separate
+
+    def match(self, text: str, fixed_mask: Optional[int] = None) -> Tuple[bool, bool]:
+        """
+        单次扫描返回 (命中白名单, 命中黑名单)
+
+        Args:
+            fixed_mask: 普通关键词的预扫描结果 (来自 RuleGroupKeywordIndex)，提供时跳过本规则的 AC 扫描
+        """
+        if not text:
+            return False, False
+
+        mask = fixed_mask or 0
+        if fixed_mask is None and self._ac is not None:
+            wanted = (TAG_WHITE if self.has_white else 0) | (TAG_BLACK if self.has_black else 0)
+            mask = self._ac.match_tags(text.lower(), stop_mask=wanted)
+
+        white = bool(mask & TAG_WHITE) or any(r.search(text) for r in self._white_regex)
+        black = bool(mask & TAG_BLACK) or any(r.search(text) for r in self._black_regex)
+        return white, black
+
+    def decide(
+        self,
+        mode_value: str,
+        text: str,
+        reverse_blacklist: bool = False,
+        reverse_whitelist: bool = False,
+        fixed_mask: Optional[int] = None,
+    ) -> bool:
+        """根据转发模式给出是否转发"""
+        white, black = self.match(text, fixed_mask)
+
+        if mode_value == ForwardMode.WHITELIST.value:
+            if not white:
+                return False
+            if reverse_blacklist and black:
+                logger.info("白名单匹配成功，但被反转黑名单否决")
+                return False
+            return True
+        if mode_value == ForwardMode.BLACKLIST.value:
+            if black:
+                if reverse_whitelist and white:
+                    logger.info("黑名单匹配成功，但被反转白名单豁免")
+                    return True
+                return False
+            return True
+        if mode_value == ForwardMode.WHITELIST_THEN_BLACKLIST.value:
+            return white and not black
+        if mode_value == ForwardMode.BLACKLIST_THEN_WHITELIST.value:
+            if black:
+                return bool(reverse_whitelist and white)
+            return True if reverse_whitelist else white
+
+        logger.error(f"未知的转发模式: {mode_value}")
+        return False
+
+
+class RuleGroupKeywordIndex:
+    """
+    同一源聊天多条规则的合并关键词索引
+
+    所有规则的普通关键词并入一个 MultiRuleAutomaton，每条规则的白/黑名单各占一位，
+    一次扫描得到每条规则的普通关键词命中位 (TAG_WHITE | TAG_BLACK)。正则关键词仍由各规则自行匹配。
+    """
+
+    __slots__ = ("rule_ids", "_scanner")
+
+    def __init__(self, rules: Sequence[Any]):
+        groups: Dict[Tuple[Any, int], List[str]] = {}
+        for rule in rules:
+            for k in getattr(rule, 'keywords', None) or []:
+                word = getattr(k, 'keyword', None)
+                if not word or getattr(k, 'is_regex', False):
+                    continue
+                tag = TAG_BLACK if bool(getattr(k, 'is_blacklist', True)) else TAG_WHITE
+                groups.setdefault((rule.id, tag), []).append(word.lower())
+        self.rule_ids = tuple(rule.id for rule in rules)
+        self._scanner = MultiRuleAutomaton(groups)
+
+    def scan(self, text: str) -> Dict[Any, int]:
+        """规则 ID -> 普通关键词命中位"""
+        hits = dict.fromkeys(self.rule_ids, 0)
+        if text:
+            for rule_id, tag in self._scanner.match_rules(text.lower()):
+                hits[rule_id] |= tag
+        return hits
+
+
+# 当前消息的多规则预扫描结果: (消息文本, 规则 ID -> 命中位)
+_prescanned: ContextVar[Optional[Tuple[str, Dict[Any, int]]]] = ContextVar("keyword_prescan", default=None)
+
+
+def _prescanned_mask(rule_id: Any, text: str) -> Optional[int]:
+    """取预扫描命中位；文本已被改写 (如追加文件名) 或规则不在本组时返回 None"""
+    state = _prescanned.get()
+    if state is None or state[0] != text:
+        return None
+    return state[1].get(rule_id)
+
+
+def _keyword_stamp(keywords: List[Any]) -> Tuple:
+    """关键词版本戳：内容变化 (增删改、正则/黑白名单切换) 即变化"""
+    return tuple(
+        (getattr(k, 'keyword', None), bool(getattr(k, 'is_regex', False)), bool(getattr(k, 'is_blacklist', True)))
+        for k in keywords or []
+    )
+
+
+class KeywordSetCache:
+    """按 规则ID + 关键词版本戳 缓存 CompiledKeywordSet (LRU, 线程安全)"""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # key -> (keywords 对象引用, 版本戳, 编译结果)
+        self._entries: "OrderedDict[Any, Tuple[Any, Tuple, CompiledKeywordSet]]" = OrderedDict()
+
+    def get(self, keywords: List[Any], rule_id: Optional[int] = None) -> CompiledKeywordSet:
+        with self._lock:
+            key = rule_id
+            entry = self._entries.get(key) if key is not None else None
+            # 同一 DTO 快照的关键词列表对象不变，直接命中，无需计算版本戳
+            if entry is not None and entry[0] is keywords:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+            stamp = _keyword_stamp(keywords)
+            if key is None:
+                key = ("anon", stamp)
+                entry = self._entries.get(key)
+            if entry is not None and entry[1] == stamp:
+                self._entries[key] = (keywords, stamp, entry[2])
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        compiled = CompiledKeywordSet(keywords)
+        with self._lock:
+            self._entries[key] = (keywords, stamp, compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def get_group(self, rules: Sequence[Any]) -> RuleGroupKeywordIndex:
+        """按 规则ID组合 + 各规则关键词版本戳 缓存 RuleGroupKeywordIndex"""
+        key = ("group",) + tuple(rule.id for rule in rules)
+        refs = tuple(getattr(rule, 'keywords', None) for rule in rules)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and all(a is b for a, b in zip(entry[0], refs)):
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        stamp = tuple(_keyword_stamp(k) for k in refs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == stamp:
+                self._entries[key] = (refs, stamp, entry[2])
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        compiled = RuleGroupKeywordIndex(rules)
+        with self._lock:
+            self._entries[key] = (refs, stamp, compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+keyword_set_cache = KeywordSetCache()
+
 class RuleFilterService:
     """
     转发规则过滤服务
@@ -52,6 +304,7 @@ class RuleFilterService:
         # [Fix] 兼容 Enum 对象与字符串比较
         mode_value = forward_mode.value if hasattr(forward_mode, 'value') else forward_mode
         
+        # 各模式均基于预编译关键词集合的单次扫描结果判定
         if mode_value == ForwardMode.WHITELIST.value:
             return await RuleFilterService.process_whitelist_mode(rule, message_text, reverse_blacklist)
         elif mode_value == ForwardMode.BLACKLIST.value:
@@ -66,106 +319,71 @@ class RuleFilterService:
 
     @staticmethod
     async def process_whitelist_mode(rule: Any, message_text: str, reverse_blacklist: bool) -> bool:
-        # 1. 检查白名单匹配
-        whitelist_keywords = [k for k in rule.keywords if not k.is_blacklist]
-        if not await RuleFilterService.check_keywords_fast(whitelist_keywords, message_text, rule.id):
-            return False
-        
-        # 2. 存在反转黑名单逻辑：若匹配黑名单则否决转发
-        if reverse_blacklist:
-            reversed_blacklist = [k for k in rule.keywords if k.is_blacklist]
-            if reversed_blacklist:
-                if await RuleFilterService.check_keywords_fast(reversed_blacklist, message_text, rule.id):
-                    logger.info("白名单匹配成功，但被反转黑名单否决")
-                    return False
-        return True
+        compiled = keyword_set_cache.get(rule.keywords, rule.id)
+        return compiled.decide(
+            ForwardMode.WHITELIST.value, message_text, reverse_blacklist=reverse_blacklist,
+            fixed_mask=_prescanned_mask(rule.id, message_text),
+        )
 
     @staticmethod
     async def process_blacklist_mode(rule: Any, message_text: str, reverse_whitelist: bool) -> bool:
-        # 1. 检查黑名单匹配
-        blacklist_keywords = [k for k in rule.keywords if k.is_blacklist]
-        is_blacklisted = await RuleFilterService.check_keywords_fast(blacklist_keywords, message_text, rule.id)
-        
-        if is_blacklisted:
-            # 2. 存在反转白名单：若是白名单内容则豁免黑名单
-            if reverse_whitelist:
-                reversed_whitelist = [k for k in rule.keywords if not k.is_blacklist]
-                if await RuleFilterService.check_keywords_fast(reversed_whitelist, message_text, rule.id):
-                    logger.info("黑名单匹配成功，但被反转白名单豁免")
-                    return True
-            return False
-
-        return True
+        compiled = keyword_set_cache.get(rule.keywords, rule.id)
+        return compiled.decide(
+            ForwardMode.BLACKLIST.value, message_text, reverse_whitelist=reverse_whitelist,
+            fixed_mask=_prescanned_mask(rule.id, message_text),
+        )
 
     @staticmethod
     async def process_whitelist_then_blacklist_mode(rule: Any, message_text: str, reverse_blacklist: bool) -> bool:
-        whitelist_keywords = [k for k in rule.keywords if not k.is_blacklist]
-        if not await RuleFilterService.check_keywords_fast(whitelist_keywords, message_text, rule.id):
-            return False
-            
-        blacklist_keywords = [k for k in rule.keywords if k.is_blacklist]
-        if reverse_blacklist:
-            # 反转逻辑：必须命中黑名单才拦截（即：命中白名单且命中黑名单 -> 拦截）
-            if await RuleFilterService.check_keywords_fast(blacklist_keywords, message_text, rule.id):
-                return False
-        else:
-            # 标准逻辑：命中黑名单则拦截
-            if await RuleFilterService.check_keywords_fast(blacklist_keywords, message_text, rule.id):
-                return False
-        return True
+        compiled = keyword_set_cache.get(rule.keywords, rule.id)
+        return compiled.decide(
+            ForwardMode.WHITELIST_THEN_BLACKLIST.value, message_text, reverse_blacklist=reverse_blacklist,
+            fixed_mask=_prescanned_mask(rule.id, message_text),
+        )
 
     @staticmethod
     async def process_blacklist_then_whitelist_mode(rule: Any, message_text: str, reverse_whitelist: bool) -> bool:
-        blacklist_keywords = [k for k in rule.keywords if k.is_blacklist]
-        if await RuleFilterService.check_keywords_fast(blacklist_keywords, message_text, rule.id):
-            # 命中黑名单，检查是否有反转白名单豁免
-            if reverse_whitelist:
-                whitelist_keywords = [k for k in rule.keywords if not k.is_blacklist]
-                if await RuleFilterService.check_keywords_fast(whitelist_keywords, message_text, rule.id):
-                    return True
-            return False
+        compiled = keyword_set_cache.get(rule.keywords, rule.id)
+        return compiled.decide(
+            ForwardMode.BLACKLIST_THEN_WHITELIST.value, message_text, reverse_whitelist=reverse_whitelist,
+            fixed_mask=_prescanned_mask(rule.id, message_text),
+        )
 
-        # 未命中黑名单，检查原本的白名单逻辑
-        whitelist_keywords = [k for k in rule.keywords if not k.is_blacklist]
-        if reverse_whitelist:
-            # 如果开启反转，则白名单行为反转？这通常不建议，我们保持“通过”
-            return True
-        else:
-            if not await RuleFilterService.check_keywords_fast(whitelist_keywords, message_text, rule.id):
-                return False
-        return True
+    @staticmethod
+    def prescan_keywords(rules: Sequence[Any], message_text: str) -> None:
+        """
+        同一消息命中多条规则时，用合并自动机一次扫描所有规则的普通关键词，
+        结果供随后各规则的 check_keywords 直接使用 (N 条规则只扫描一次)。
+        """
+        if len(rules) < 2 or not message_text:
+            _prescanned.set(None)
+            return
+        try:
+            hits = keyword_set_cache.get_group(rules).scan(message_text)
+            _prescanned.set((message_text, hits))
+        except Exception as e:
+            logger.warning(f"多规则关键词预扫描失败，回退到逐规则匹配: {e}")
+            _prescanned.set(None)
+
+    @staticmethod
+    def clear_prescan() -> None:
+        """丢弃当前消息的预扫描结果"""
+        _prescanned.set(None)
 
     @staticmethod
     async def check_keywords_fast(keywords: List[Any], message_text: str, rule_id: Optional[int] = None) -> bool:
+        """任意关键词 (不区分黑白名单) 是否命中"""
         if not keywords or not message_text:
             return False
 
-        fixed_kws = []
-        regex_kws = []
-        for k in keywords:
-            if getattr(k, 'is_regex', False):
-                regex_kws.append(k)
-            else:
-                fixed_kws.append(k)
-                
-        for k in regex_kws:
-            try:
-                if k.keyword and re.search(k.keyword, message_text, re.I):
-                    return True
-            except Exception as e:
-                logger.error(f"正则匹配出错: {k.keyword}, {e}")
-                
-        if fixed_kws:
-            kw_list = [k.keyword.lower() for k in fixed_kws]
-            try:
-                target_id = rule_id or hash(tuple(kw_list))
-                ac = ACManager.get_automaton(target_id, kw_list)
-                if ac.has_any_match(message_text.lower()):
+        try:
+            # 调用方传入的是按需拼出的子列表，不能用 rule_id 作为缓存键，交由版本戳区分
+            white, black = keyword_set_cache.get(keywords).match(message_text)
+            return white or black
+        except Exception as e:
+            logger.error(f"关键词匹配出错: {e}")
+            lowered = message_text.lower()
+            for k in keywords:
+                if k.keyword and not getattr(k, 'is_regex', False) and k.keyword.lower() in lowered:
                     return True
-            except Exception as e:
-                logger.error(f"AC自动机匹配出错: {e}")
-                for kw in fixed_kws:
-                    if kw.keyword.lower() in message_text.lower():
-                        return True
-                        
-        return False
+            return False
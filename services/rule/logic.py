@@ -24,6 +24,22 @@ class RuleLogicService:
     def container(self):
         from core.container import container
         return container
+
+    @staticmethod
+    async def _source_chat_ids(session, rules) -> set:
+        """规则源聊天的 telegram_chat_id (在提交前查询，提交后用于清理规则缓存与路由索引)"""
+        from models.models import Chat
+        from sqlalchemy import select
+
+        chat_pks = {r.source_chat_id for r in rules if r is not None and r.source_chat_id}
+        if not chat_pks:
+            return set()
+        result = await session.execute(select(Chat.telegram_chat_id).where(Chat.id.in_(chat_pks)))
+        return {int(tid) for tid in result.scalars().all() if tid}
+
+    def _clear_source_caches(self, chat_ids) -> None:
+        for chat_id in chat_ids:
+            self.container.rule_repo.clear_cache(chat_id)
         
     @handle_errors(default_return={'success': False, 'error': 'Rule copy failed'})
     async def copy_rule(self, source_rule_id: int, target_rule_id: Optional[int] = None) -> Dict[str, Any]:
@@ -536,6 +552,7 @@ class RuleLogicService:
             if not rule: return {'success': False, 'error': 'Rule not found'}
             
             rule.summary_time = time
+            touched = [rule]
             
             # 同步配置到关联规则
             if rule.enable_sync:
@@ -544,11 +561,14 @@ class RuleLogicService:
                     target = await s.get(ForwardRule, sync_obj.sync_rule_id)
                     if target:
                         target.summary_time = time
+                        touched.append(target)
                         if target.is_summary:
                             main = await get_main_module()
                             if main.scheduler: await main.scheduler.schedule_rule(target)
             
+            chat_ids = await self._source_chat_ids(s, touched)
             await s.commit()
+            self._clear_source_caches(chat_ids)
             
             # 更新当前规则调度
             if rule.is_summary:
@@ -568,14 +588,19 @@ class RuleLogicService:
             if not rule: return {'success': False, 'error': 'Rule not found'}
             
             rule.ai_model = model
+            touched = [rule]
             
             if rule.enable_sync:
                 result = await s.execute(select(RuleSync).filter(RuleSync.rule_id == rule.id))
                 for sync_obj in result.scalars().all():
                     target = await s.get(ForwardRule, sync_obj.sync_rule_id)
-                    if target: target.ai_model = model
+                    if target:
+                        target.ai_model = model
+                        touched.append(target)
             
+            chat_ids = await self._source_chat_ids(s, touched)
             await s.commit()
+            self._clear_source_caches(chat_ids)
             return {'success': True}
 
     @handle_errors(default_return={'success': False, 'error': 'Toggle setting failed'})
@@ -595,6 +620,7 @@ class RuleLogicService:
                 new_val = value
                 
             setattr(rule, field, new_val)
+            touched = [rule]
             
             # 同步配置
             if rule.enable_sync:
@@ -603,10 +629,11 @@ class RuleLogicService:
                     target = await s.get(ForwardRule, sync_obj.sync_rule_id)
                     if target and hasattr(target, field):
                         setattr(target, field, new_val)
+                        touched.append(target)
             
+            chat_ids = await self._source_chat_ids(s, touched)
             await s.commit()
-            if rule.source_chat:
-                self.container.rule_repo.clear_cache(int(rule.source_chat.telegram_chat_id))
+            self._clear_source_caches(chat_ids)
                 
             return {'success': True, 'new_value': new_val}
 
@@ -628,6 +655,7 @@ class RuleLogicService:
                 
             new_val = not getattr(rule.media_types, media_type, False)
             setattr(rule.media_types, media_type, new_val)
+            touched = [rule]
             
             # 同步到从属规则
             if rule.enable_sync:
@@ -640,10 +668,11 @@ class RuleLogicService:
                             target.media_types = MediaTypes()
                             s.add(target.media_types)
                         setattr(target.media_types, media_type, new_val)
+                        touched.append(target)
             
+            chat_ids = await self._source_chat_ids(s, touched)
             await s.commit()
-            if rule.source_chat:
-                self.container.rule_repo.clear_cache(int(rule.source_chat.telegram_chat_id))
+            self._clear_source_caches(chat_ids)
                 
             return {'success': True, 'new_value': new_val}
 
@@ -669,6 +698,7 @@ class RuleLogicService:
                 new_ext = MediaExtensions(rule_id=rule.id, extension=extension)
                 s.add(new_ext)
                 added = True
+            touched = [rule]
                 
             # 同步
             if rule.enable_sync:
@@ -677,15 +707,16 @@ class RuleLogicService:
                     target_stmt = select(ForwardRule).options(selectinload(ForwardRule.media_extensions)).filter_by(id=sync_obj.sync_rule_id)
                     target = (await s.execute(target_stmt)).scalar_one_or_none()
                     if target:
+                         touched.append(target)
                          t_existing = next((ext for ext in target.media_extensions if ext.extension == extension), None)
                          if added and not t_existing:
                              s.add(MediaExtensions(rule_id=target.id, extension=extension))
                          elif not added and t_existing:
                              await s.delete(t_existing)
             
+            chat_ids = await self._source_chat_ids(s, touched)
             await s.commit()
-            if rule.source_chat:
-                self.container.rule_repo.clear_cache(int(rule.source_chat.telegram_chat_id))
+            self._clear_source_caches(chat_ids)
                 
             return {'success': True, 'added': added}
 
@@ -749,7 +780,7 @@ class RuleLogicService:
     @handle_errors(default_return={'success': False, 'error': 'Toggle rule sync failed'})
     async def toggle_rule_sync(self, source_rule_id: int, target_rule_id: int) -> Dict[str, Any]:
         """建立或撤销两条规则之间的配置同步关系"""
-        from models.models import RuleSync
+        from models.models import ForwardRule, RuleSync
         from sqlalchemy import select, delete
         
         async with self.container.db.get_session() as s:
@@ -767,7 +798,10 @@ class RuleLogicService:
                 s.add(new_sync)
                 action = "added"
             
+            touched = [await s.get(ForwardRule, int(source_rule_id)), await s.get(ForwardRule, int(target_rule_id))]
+            chat_ids = await self._source_chat_ids(s, touched)
             await s.commit()
+            self._clear_source_caches(chat_ids)
             return {'success': True, 'action': action}
 
     @handle_errors(default_return={'success': False, 'error': 'Setting current source chat failed'})
@@ -797,6 +831,7 @@ class RuleLogicService:
             
             old_val = getattr(rule, field)
             setattr(rule, field, value)
+            touched = [rule]
             
             # 记录需要重新调度的规则 ID 列表
             rules_to_reschedule = [rule.id] if rule.is_summary and field == 'summary_time' else []
@@ -809,10 +844,13 @@ class RuleLogicService:
                     target = await s.get(ForwardRule, sync_obj.sync_rule_id)
                     if target and hasattr(target, field):
                         setattr(target, field, value)
+                        touched.append(target)
                         if target.is_summary and field == 'summary_time':
                             rules_to_reschedule.append(target.id)
             
+            chat_ids = await self._source_chat_ids(s, touched)
             await s.commit()
+            self._clear_source_caches(chat_ids)
             
             # 触发调度更新 (副作用)
             if rules_to_reschedule and self.container.scheduler:
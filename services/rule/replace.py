@@ -0,0 +1,159 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 出现任一字符即按正则处理
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+
+# 全文替换模式
+FULL_REPLACE_PATTERN = '.*'
+
+
+def _is_literal(pattern: str) -> bool:
+    return bool(pattern) and not any(ch in _REGEX_META for ch in pattern)
+
+
+def _overlaps(a: str, b: str) -> bool:
+    """两个字面串在某个对齐下能否共享字符 (包含或首尾相接)"""
+    if a in b or b in a:
+        return True
+    for k in range(1, min(len(a), len(b))):
+        if a.endswith(b[:k]) or b.endswith(a[:k]):
+            return True
+    return False
+
+
+class ReplaceProgram:
+    """
+    单条规则的预编译替换程序
+
+    - 首个 `.*` 规则在编译期确定为全文替换，之前与之后的规则都不再执行
+    - 连续的字面规则在互不干扰时合并为一个交替正则，一次扫描完成
+    - 其余规则逐条预编译，按原顺序执行；非法正则在编译期记录并跳过
+
+    合并条件保证与逐条 re.sub 的结果一致：后一条的模式不能与前面任一条的模式或替换文本重叠
+    (否则前一条的替换会制造/破坏后一条的匹配)，且组内除最后一条外替换文本不能为空 (删除会拼接出新匹配)。
+    """
+
+    __slots__ = ("full_replace", "steps")
+
+    def __init__(self, replace_rules: List[Any]):
+        self.full_replace: Optional[str] = None
+        # (编译后正则, 替换模板或回调, 描述)
+        self.steps: List[Tuple[re.Pattern, Any, str]] = []
+        group: List[Tuple[str, str]] = []
+
+        for rr in replace_rules or []:
+            pattern = getattr(rr, 'pattern', None)
+            if pattern is None:
+                continue
+            content = getattr(rr, 'content', None) or ''
+            if pattern == FULL_REPLACE_PATTERN:
+                self.full_replace = content
+                self.steps = []
+                return
+            if _is_literal(pattern) and '\\' not in content:
+                if group and not self._can_merge(group, pattern):
+                    self._flush(group)
+                    group = []
+                group.append((pattern, content))
+                continue
+            if group:
+                self._flush(group)
+                group = []
+            try:
+                self.steps.append((re.compile(pattern), content, pattern))
+            except re.error as e:
+                logger.error(f'替换规则格式错误: {pattern}, 错误: {str(e)}')
+        if group:
+            self._flush(group)
+
+    @staticmethod
+    def _can_merge(group: List[Tuple[str, str]], pattern: str) -> bool:
+        for prev_pattern, prev_content in group:
+            if not prev_content or _overlaps(prev_pattern, pattern) or _overlaps(prev_content, pattern):
+                return False
+        return True
+
+    def _flush(self, group: List[Tuple[str, str]]) -> None:
+        if len(group) == 1:
+            pattern, content = group[0]
+            self.steps.append((re.compile(re.escape(pattern)), content, pattern))
+            return
+        table = dict(group)
+        regex = re.compile("|".join(re.escape(p) for p, _ in group))
+        self.steps.append((regex, lambda m, t=table: t[m.group()], f"<{len(group)} 条字面规则>"))
+
+    def apply(self, text: str) -> Tuple[str, int]:
+        """返回 (替换后文本, 替换次数)"""
+        if self.full_replace is not None:
+            return self.full_replace, 1
+        total = 0
+        for regex, repl, desc in self.steps:
+            try:
+                text, count = regex.subn(repl, text)
+            except re.error as e:
+                # 替换模板非法 (如引用不存在的分组)
+                logger.error(f'替换规则格式错误: {desc}, 错误: {str(e)}')
+                continue
+            total += count
+        return text, total
+
+
+def _replace_stamp(replace_rules: List[Any]) -> Tuple:
+    """替换规则版本戳：模式或替换内容变化即变化"""
+    return tuple(
+        (getattr(rr, 'pattern', None), getattr(rr, 'content', None))
+        for rr in replace_rules or []
+    )
+
+
+class ReplaceProgramCache:
+    """按 规则ID + 替换规则版本戳 缓存 ReplaceProgram (LRU, 线程安全)"""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # key -> (replace_rules 对象引用, 版本戳, 编译结果)
+        self._entries: "OrderedDict[Any, Tuple[Any, Tuple, ReplaceProgram]]" = OrderedDict()
+
+    def get(self, replace_rules: List[Any], rule_id: Optional[int] = None) -> ReplaceProgram:
+        with self._lock:
+            key = rule_id
+            entry = self._entries.get(key) if key is not None else None
+            # 同一 DTO 快照的列表对象不变，直接命中
+            if entry is not None and entry[0] is replace_rules:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+            stamp = _replace_stamp(replace_rules)
+            if key is None:
+                key = ("anon", stamp)
+                entry = self._entries.get(key)
+            if entry is not None and entry[1] == stamp:
+                self._entries[key] = (replace_rules, stamp, entry[2])
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        program = ReplaceProgram(replace_rules)
+        with self._lock:
+            self._entries[key] = (replace_rules, stamp, program)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return program
+
+    def invalidate(self, chat_id: Optional[int] = None) -> None:
+        """规则缓存失效回调 (签名同 RuleRepository 监听者)；缓存按规则 ID 组织，直接全部清空"""
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+replace_program_cache = ReplaceProgramCache()
@@ -0,0 +1,257 @@
+"""
+规则路由索引 (Rule Routing Index)
+
+启动时从 ForwardRule / ForwardMapping 一次性编译出
+"标准化源 chat_id -> 启用规则 DTO 元组" 的不可变快照，
+RuleLoaderMiddleware 在热路径上只需一次字典查找，不访问数据库。
+
+规则变更沿用现有失效入口 (RuleRepository.clear_cache /
+RuleQueryService.invalidate_caches_for_chat)：被失效的 chat 标记为脏并在
+后台增量重建，重建完成后整体替换快照。脏 chat 在重建完成前返回 None，
+由调用方回退到 RuleRepository 查询，保证变更后不会读到旧规则。
+
+快照另有最大存活时间 (max_age_seconds)：超时后首次查询触发全量重建，
+兜底未经过失效入口的写路径，效果与原规则缓存的 TTL 相同。
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from core.helpers.id_utils import build_candidate_telegram_ids, normalize_chat_id
+from models.models import Chat, ForwardMapping, ForwardRule
+from schemas.rule import RuleDTO
+
+logger = logging.getLogger(__name__)
+
+
+class RuleRoutingIndex:
+    """源聊天 -> 启用规则的只读路由快照"""
+
+    def __init__(self, db, rule_repo, debounce_seconds: float = 0.05, max_age_seconds: float = 0.0):
+        self.db = db
+        self.rule_repo = rule_repo
+        self.debounce_seconds = debounce_seconds
+        # 快照最大存活时间 (秒)，0 表示只依赖失效入口
+        self.max_age_seconds = max_age_seconds
+        self._built_at = 0.0
+
+        self._routes: Mapping[str, Tuple[RuleDTO, ...]] = MappingProxyType({})
+        self._ready = False
+        self._dirty: Set[str] = set()
+        self._rebuilding: Set[str] = set()
+        self._full_rebuild_pending = False
+        self._full_rebuilding = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        self.version = 0
+        self.hits = 0
+        self.fallbacks = 0
+
+    # ------------------------------------------------------------------
+    # 热路径
+    # ------------------------------------------------------------------
+    def lookup(self, chat_id) -> Optional[List[RuleDTO]]:
+        """
+        查找源聊天的启用规则。
+
+        Returns:
+            规则列表 (无规则时为空列表)；索引未就绪或该 chat 待重建时返回 None，调用方应回退查库
+        """
+        key = normalize_chat_id(chat_id)
+        if (
+            not self._ready
+            or self._full_rebuild_pending
+            or self._full_rebuilding
+            or key in self._dirty
+            or key in self._rebuilding
+        ):
+            self.fallbacks += 1
+            return None
+        if self.max_age_seconds and time.monotonic() - self._built_at > self.max_age_seconds:
+            # 兜底：快照过期，全量重建完成前回退查库
+            self.invalidate()
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return list(self._routes.get(key, ()))
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    # ------------------------------------------------------------------
+    # 构建与增量重建
+    # ------------------------------------------------------------------
+    async def build(self) -> None:
+        """全量编译路由快照 (启动时调用)"""
+        async with self._lock:
+            # 先清标记再编译：编译期间到达的失效会重新置位，由下一轮处理
+            self._full_rebuild_pending = False
+            self._dirty.clear()
+            self._full_rebuilding = True
+            try:
+                routes = await self._compile()
+                self._swap(routes)
+                self._built_at = time.monotonic()
+                self._ready = True
+            finally:
+                self._full_rebuilding = False
+        logger.info(f"🧭 [路由索引] 已编译 {len(routes)} 个源聊天的规则路由 (版本 {self.version})")
+
+    def invalidate(self, chat_id=None) -> None:
+        """标记失效并调度后台重建；chat_id 为空表示全量重建"""
+        if chat_id is None:
+            self._full_rebuild_pending = True
+        else:
+            self._dirty.add(normalize_chat_id(chat_id))
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        if not self._ready:
+            return
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        try:
+            self._refresh_task = asyncio.get_running_loop().create_task(
+                self._refresh(), name="rule_routing_index_refresh"
+            )
+        except RuntimeError:
+            # 无事件循环 (同步脚本)，保持脏标记，查询自动回退到数据库
+            pass
+
+    async def _refresh(self) -> None:
+        # 合并短时间内的连续变更 (如批量编辑规则)
+        await asyncio.sleep(self.debounce_seconds)
+        while self._full_rebuild_pending or self._dirty:
+            try:
+                if self._full_rebuild_pending:
+                    await self.build()
+                    continue
+
+                async with self._lock:
+                    keys, self._rebuilding = set(self._dirty), set(self._dirty)
+                    self._dirty.clear()
+                    try:
+                        partial = await self._compile(keys)
+                        routes = dict(self._routes)
+                        for key in keys:
+                            routes.pop(key, None)
+                        routes.update(partial)
+                        self._swap(routes)
+                    except Exception:
+                        self._dirty |= keys
+                        raise
+                    finally:
+                        self._rebuilding = set()
+                logger.debug(f"[路由索引] 增量重建 {len(keys)} 个源聊天 (版本 {self.version})")
+            except Exception as e:
+                logger.error(f"[路由索引] 重建失败，查询将回退到数据库: {e}", exc_info=True)
+                break
+
+    def _swap(self, routes: Dict[str, Tuple[RuleDTO, ...]]) -> None:
+        """原子替换快照 (单次引用赋值)"""
+        self._routes = MappingProxyType(routes)
+        self.version += 1
+
+    async def _compile(self, keys: Optional[Iterable[str]] = None) -> Dict[str, Tuple[RuleDTO, ...]]:
+        """
+        编译路由表，语义与 RuleRepository.get_rules_for_source_chat 一致:
+        - 源聊天存在启用的 ForwardMapping 时，以映射为准 (rule_id 或 源/目标 对应的规则)
+        - 否则取 source_chat_id 指向该聊天的所有启用规则
+
+        Args:
+            keys: 仅编译这些标准化 chat_id (增量重建)；为空时全量编译
+        """
+        async with self.db.get_session(readonly=True) as session:
+            chat_stmt = select(Chat.id, Chat.telegram_chat_id)
+            if keys is not None:
+                candidates: Set[str] = set()
+                for key in keys:
+                    candidates |= build_candidate_telegram_ids(key)
+                chat_stmt = chat_stmt.where(Chat.telegram_chat_id.in_(list(candidates)))
+            chat_keys = {
+                row.id: normalize_chat_id(row.telegram_chat_id)
+                for row in (await session.execute(chat_stmt)).all()
+                if row.telegram_chat_id
+            }
+            if keys is not None:
+                wanted = set(keys)
+                chat_keys = {cid: key for cid, key in chat_keys.items() if key in wanted}
+            if not chat_keys:
+                return {}
+
+            rule_stmt = (
+                select(ForwardRule)
+                .options(*self.rule_repo._get_rule_select_options())
+                .where(ForwardRule.enable_rule == True)
+            )
+            mapping_stmt = select(ForwardMapping).where(ForwardMapping.enabled == True)
+            if keys is not None:
+                source_ids = list(chat_keys)
+                rule_stmt = rule_stmt.where(ForwardRule.source_chat_id.in_(source_ids))
+                mapping_stmt = mapping_stmt.where(ForwardMapping.source_chat_id.in_(source_ids))
+            orm_rules = (await session.execute(rule_stmt)).scalars().all()
+            mappings = (await session.execute(mapping_stmt)).scalars().all()
+
+            # 映射可能引用 source_chat_id 不同的规则，补齐这些规则
+            rules_by_id = {r.id: r for r in orm_rules}
+            extra_ids = {m.rule_id for m in mappings if m.rule_id and m.rule_id not in rules_by_id}
+            if extra_ids:
+                extra_stmt = (
+                    select(ForwardRule)
+                    .options(*self.rule_repo._get_rule_select_options())
+                    .where(ForwardRule.enable_rule == True, ForwardRule.id.in_(list(extra_ids)))
+                )
+                for r in (await session.execute(extra_stmt)).scalars().all():
+                    rules_by_id[r.id] = r
+
+            dtos = {rid: RuleDTO.model_validate(r) for rid, r in rules_by_id.items()}
+
+        rules_by_source: Dict[int, List[ForwardRule]] = defaultdict(list)
+        for r in orm_rules:
+            rules_by_source[r.source_chat_id].append(r)
+        mappings_by_source: Dict[int, List[ForwardMapping]] = defaultdict(list)
+        for m in mappings:
+            mappings_by_source[m.source_chat_id].append(m)
+
+        routes: Dict[str, List[RuleDTO]] = defaultdict(list)
+        seen: Dict[str, Set[int]] = defaultdict(set)
+        for chat_id, key in chat_keys.items():
+            chat_mappings = mappings_by_source.get(chat_id)
+            if chat_mappings:
+                rule_ids = [m.rule_id for m in chat_mappings if m.rule_id in dtos]
+                for m in chat_mappings:
+                    if not m.rule_id:
+                        match = next(
+                            (r for r in rules_by_source.get(chat_id, ()) if r.target_chat_id == m.target_chat_id),
+                            None,
+                        )
+                        if match:
+                            rule_ids.append(match.id)
+            else:
+                rule_ids = [r.id for r in rules_by_source.get(chat_id, ())]
+
+            for rid in rule_ids:
+                if rid not in seen[key]:
+                    seen[key].add(rid)
+                    routes[key].append(dtos[rid])
+
+        return {key: tuple(rules) for key, rules in routes.items()}
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "ready": self._ready,
+            "version": self.version,
+            "routes": len(self._routes),
+            "dirty": len(self._dirty),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
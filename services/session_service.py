@@ -8,10 +8,12 @@ import logging
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 
+from core.config import settings
 from core.container import container
 from core.helpers.tombstone import tombstone
 from core.helpers.time_range import format_time_range_display, parse_time_range_to_dates
 from services.forward_settings_service import forward_settings_service
+from services.message_handoff_cache import message_handoff_cache
 from services.dedup.engine import smart_deduplicator
 
 logger = logging.getLogger(__name__)
@@ -450,114 +452,104 @@ class SessionService:
                 f"source={source_chat_id}, target={target_chat_id}"
             )
             
-            async for message in client.iter_messages(
-                source_chat_id, reverse=True, offset_date=begin_date
-            ):
-                # 检查取消事件
-                if cancel_event.is_set():
-                    logger.info(f"⏸️ 历史任务已取消: user_id={user_id}")
-                    progress.status = "cancelled"
-                    break
-                
-                # 检查结束时间
-                if end_date and message.date > end_date.replace(tzinfo=timezone.utc):
-                    logger.info(f"✅ 已达到结束时间: {end_date}")
-                    break
-                
-                # 更新当前消息ID
-                progress.current_message_id = message.id
-                task_info['current_message_id'] = message.id
-                
-                # 媒体筛选
-                should_process, filter_reason = await media_filter.should_process_message(message)
-                if not should_process:
-                    progress.increment('filtered')
-                    progress.increment('done')
-                    task_info['filtered'] = progress.filtered
-                    task_info['done'] = progress.done
-                    logger.debug(f"⏭️ 消息 {message.id} 被过滤: {filter_reason}")
-                    continue
-                
-                # Dry Run Logic
-                if dry_run:
-                    # 模拟成功处理
-                    progress.increment('forwarded')
-                    progress.increment('done')
-                    task_info['forwarded'] = progress.forwarded
-                    task_info['done'] = progress.done
-                    
-                    # 简单模拟背压，避免过快 (仅每50条check一次)
-                    if progress.done % 50 == 0:
-                        task_info.update(progress.to_dict())
-                        should_continue = await backpressure.check_and_wait(
-                            container.task_repo, # 这里可能需要 mock task_repo 或者 ignoring count
-                            progress.done,
-                            cancel_event
-                        )
-                        if not should_continue:
-                            progress.status = "cancelled"
-                            break
-                        # 短暂 yield 释放 event loop
-                        await asyncio.sleep(0.01)
-                    continue
-
-                # 推送到处理队列
-                payload = {
-                    "chat_id": source_chat_id,
-                    "message_id": message.id,
-                    "rule_id": rule_id,
-                    "is_history": True,
-                    "target_chat_id": target_chat_id
-                }
-                
-                # 使用错误处理器推送任务
-                context = {
-                    'user_id': user_id,
-                    'rule_id': rule_id,
-                    'message_id': message.id
-                }
-                
-                success, result = await error_handler.retry_with_backoff(
-                    container.task_repo.push,
-                    "process_message",
-                    payload,
-                    priority=5,
-                    context=context
+            # 读取与写入流水线：读取端按页预取，写入端整页筛选并批量入队，
+            # 已拉取的消息对象放入交接缓存，Worker 无需再次 GetMessages
+            pages: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.HISTORY_PREFETCH_PAGES))
+            reader = asyncio.create_task(
+                self._read_history_pages(
+                    client, source_chat_id, begin_date, end_date,
+                    max(1, settings.HISTORY_PUSH_CHUNK_SIZE), pages, cancel_event
                 )
-                
-                if success:
-                    progress.increment('forwarded')
-                    task_info['forwarded'] = progress.forwarded
-                else:
-                    progress.increment('failed')
-                    task_info['failed'] = progress.failed
-                    logger.error(f"❌ 消息 {message.id} 推送失败: {result}")
-                
-                # 更新进度
-                progress.increment('done')
-                task_info['done'] = progress.done
-                
-                # 背压控制
-                should_continue = await backpressure.check_and_wait(
-                    container.task_repo,
-                    progress.done,
-                    cancel_event
-                )
-                
-                if not should_continue:
-                    logger.info(f"⏸️ 历史任务被取消: user_id={user_id}")
-                    progress.status = "cancelled"
-                    break
-                
-                # 定期更新任务信息
-                if progress.done % 50 == 0:
+            )
+            try:
+                while True:
+                    page = await pages.get()
+                    if page is None:
+                        break
+
+                    # 检查取消事件
+                    if cancel_event.is_set():
+                        break
+
+                    # 更新当前消息ID
+                    progress.current_message_id = page[-1].id
+                    task_info['current_message_id'] = page[-1].id
+                    done_before = progress.done
+
+                    # 媒体筛选
+                    kept, filtered = await media_filter.filter_messages(page)
+                    if filtered:
+                        progress.increment('filtered', len(filtered))
+                        logger.debug(f"⏭️ 本页 {len(filtered)} 条消息被过滤: {filtered[0][1]} ...")
+
+                    if dry_run:
+                        # 模拟成功处理
+                        progress.increment('forwarded', len(kept))
+                    elif kept:
+                        if settings.MESSAGE_HANDOFF_ENABLED:
+                            message_handoff_cache.put_many(source_chat_id, kept)
+
+                        # 推送到处理队列
+                        tasks_data = [
+                            ("process_message", {
+                                "chat_id": source_chat_id,
+                                "message_id": message.id,
+                                "rule_id": rule_id,
+                                "is_history": True,
+                                "target_chat_id": target_chat_id
+                            }, 5)
+                            for message in kept
+                        ]
+                        context = {
+                            'user_id': user_id,
+                            'rule_id': rule_id,
+                            'message_ids': f"{kept[0].id}-{kept[-1].id}"
+                        }
+                        success, result = await error_handler.retry_with_backoff(
+                            container.task_repo.push_batch,
+                            tasks_data,
+                            context=context
+                        )
+
+                        if success:
+                            progress.increment('forwarded', len(kept))
+                        else:
+                            progress.increment('failed', len(kept))
+                            logger.error(
+                                f"❌ 消息 {kept[0].id}-{kept[-1].id} 批量推送失败 ({len(kept)} 条): {result}"
+                            )
+
+                    # 更新进度
+                    progress.increment('done', len(page))
                     task_info.update(progress.to_dict())
-                    logger.info(
-                        f"📈 进度更新: {progress.done}/{progress.total} "
-                        f"({progress.get_percentage():.1f}%) "
-                        f"转发={progress.forwarded} 过滤={progress.filtered} "
-                        f"失败={progress.failed}"
+
+                    # 背压控制
+                    should_continue = await backpressure.check_and_wait(
+                        container.task_repo,
+                        progress.done,
+                        cancel_event,
+                        previous_count=done_before
                     )
+                    if not should_continue:
+                        break
+
+                    if progress.done // 500 != done_before // 500:
+                        logger.info(
+                            f"📈 进度更新: {progress.done}/{progress.total} "
+                            f"({progress.get_percentage():.1f}%) "
+                            f"转发={progress.forwarded} 过滤={progress.filtered} "
+                            f"失败={progress.failed}"
+                        )
+            finally:
+                reader.cancel()
+                reader_result, = await asyncio.gather(reader, return_exceptions=True)
+
+            if isinstance(reader_result, Exception):
+                raise reader_result
+
+            if cancel_event.is_set():
+                logger.info(f"⏸️ 历史任务已取消: user_id={user_id}")
+                progress.status = "cancelled"
             
             # 任务完成
             if progress.status != "cancelled":
@@ -598,6 +590,40 @@ class SessionService:
                 }
             )
 
+    async def _read_history_pages(
+        self, client, chat_id: int, begin_date, end_date, page_size: int,
+        pages: asyncio.Queue, cancel_event: asyncio.Event
+    ) -> None:
+        """按页读取历史消息放入队列，读完、到达结束时间或取消后放入 None"""
+        end_limit = end_date.replace(tzinfo=timezone.utc) if end_date else None
+        page = []
+        try:
+            async for message in client.iter_messages(
+                chat_id, reverse=True, offset_date=begin_date
+            ):
+                if cancel_event.is_set():
+                    break
+
+                # 检查结束时间
+                if end_limit and message.date > end_limit:
+                    logger.info(f"✅ 已达到结束时间: {end_date}")
+                    break
+
+                page.append(message)
+                if len(page) >= page_size:
+                    await pages.put(page)
+                    page = []
+
+            if page and not cancel_event.is_set():
+                await pages.put(page)
+        except asyncio.CancelledError:
+            # 由写入端取消，无需结束标记
+            raise
+        except Exception:
+            await pages.put(None)
+            raise
+        await pages.put(None)
+
     async def _estimate_message_count(
         self, client, chat_id: int, begin_date=None, end_date=None
     ) -> int:
@@ -348,7 +348,7 @@ class SystemService:
         from sqlalchemy import func, select
         from models.models import ForwardRule, Chat, MediaSignature, ErrorLog
         from services.network.api_optimization import get_api_optimizer
-        from core.algorithms.hll import GlobalHLL
+        from repositories.hll_store import get_hll_store
         
         async with self.container.db.get_session() as s:
             # 1. 基础规则统计
@@ -366,8 +366,8 @@ class SystemService:
             
             # 3. HLL 估值
             unique_today = 0
-            hll = GlobalHLL.get_hll("unique_messages_today")
-            if hll: unique_today = hll.count()
+            if settings.HLL_STORE_ENABLED:
+                unique_today = await get_hll_store().count_async("messages", datetime.now().strftime("%Y-%m-%d"))
             
             # 4. 官方 API 实时统计
             realtime_data = {}
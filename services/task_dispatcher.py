@@ -3,6 +3,7 @@ import json
 import time
 from datetime import datetime
 from core.config import settings
+from core.helpers.task_signal import task_signal, WAKE_SIGNAL, WAKE_DEADLINE, WAKE_POLL
 from core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -12,11 +13,15 @@ class TaskDispatcher:
     中央任务分发器 (Centralized Task Dispatcher)
     借鉴成熟消息队列 (Celery/SQS) 的 Prefetch 与 Backpressure 设计。
     负责从数据库批量拉取任务，通过 pre-parse 减轻 Worker 负载，并提供原子锁定。
+
+    空闲时不再盲目退避轮询：TaskRepository 提交新任务后通过 task_signal 立即唤醒，
+    延迟任务按最小堆中的最近到期时间唤醒，TASK_DISPATCHER_MAX_SLEEP 仅作为兜底轮询间隔。
     """
-    def __init__(self, repo, queue: asyncio.Queue, client=None):
+    def __init__(self, repo, queue: asyncio.Queue, client=None, signal=None):
         self.repo = repo
         self.queue = queue
         self.client = client
+        self.signal = signal or task_signal
         self.running = False
         self._task = None
         
@@ -24,7 +29,7 @@ class TaskDispatcher:
         self._entity_cache = set()
         self._last_cache_clear = time.time()
         
-        # 自制休眠配置 (Inspired by Binary Exponential Backoff)
+        # 休眠配置: max_sleep 为兜底轮询间隔；current_sleep 为 ResourceGuard 施加的降速延迟
         self.min_sleep = getattr(settings, 'TASK_DISPATCHER_SLEEP_BASE', 1.0)
         self.max_sleep = getattr(settings, 'TASK_DISPATCHER_MAX_SLEEP', 30.0)
         self.current_sleep = self.min_sleep
@@ -32,6 +37,8 @@ class TaskDispatcher:
         # 统计指标 (Observability)
         self.total_dispatched = 0
         self.last_fetch_count = 0
+        self.empty_fetches = 0
+        self.wakeups = {WAKE_SIGNAL: 0, WAKE_DEADLINE: 0, WAKE_POLL: 0}
         self.start_time = None
 
     async def start(self):
@@ -56,6 +63,7 @@ class TaskDispatcher:
 
     async def _dispatch_loop(self):
         """主分发核心循环 (Central Fetch & Pre-Parse)"""
+        await self._seed_deadlines()
         while self.running:
             try:
                 # 1. 背压控制 (Backpressure)
@@ -65,12 +73,15 @@ class TaskDispatcher:
                     continue
 
                 # 2. 批量拉取与原子锁定
+                # 先清除信号再拉取，拉取期间提交的新任务会让下一次等待立即返回
+                self.signal.clear()
                 batch_size = settings.TASK_DISPATCHER_BATCH_SIZE
                 tasks = await self.repo.fetch_next(limit=batch_size)
                 
                 if not tasks:
                     self.last_fetch_count = 0
-                    await self._adaptive_sleep()
+                    self.empty_fetches += 1
+                    await self._wait_for_tasks()
                     continue
 
                 # [NEW] 预热实体缓存 (Entity Prefetching)
@@ -117,19 +128,26 @@ class TaskDispatcher:
                 logger.error(f"Dispatcher loop panic: {e}", exc_info=True)
                 await asyncio.sleep(5) # 严重错误时进行冷静期休眠
 
-    async def _adaptive_sleep(self):
-        """自适应退避 (Exponential Backoff with Jitter)"""
-        import random
-        # 增加随机扰动因子，防止多个 Dispatcher 并发启动时的惊群效应
-        jitter = random.uniform(0.8, 1.2)
-        sleep_time = self.current_sleep * jitter
-        
-        logger.debug(f"Dispatcher 空载，进入休眠: {sleep_time:.2f}s (Current: {self.current_sleep:.2f}s)")
-        await asyncio.sleep(sleep_time)
-        
-        # 指数增长 (1.5x)
-        if self.current_sleep < self.max_sleep:
-            self.current_sleep = min(self.current_sleep * 1.5, self.max_sleep)
+    async def _wait_for_tasks(self):
+        """空载等待：新任务通知 / 延迟任务到期 / 兜底轮询，三者取最早"""
+        reason = await self.signal.wait(self.max_sleep)
+        self.wakeups[reason] += 1
+        logger.debug(f"Dispatcher 被唤醒: {reason}")
+
+        # ResourceGuard 降速期间，唤醒后仍需等待降速延迟再拉取
+        if self.current_sleep > self.min_sleep:
+            await asyncio.sleep(self.current_sleep)
+
+    async def _seed_deadlines(self):
+        """启动时从数据库加载尚未到期的延迟任务，避免只能依赖兜底轮询"""
+        try:
+            due_times = await self.repo.get_pending_due_times()
+            for due_at in due_times:
+                self.signal.schedule(due_at)
+            if due_times:
+                logger.info(f"⏰ Dispatcher 已登记 {len(due_times)} 个延迟任务到期时间")
+        except Exception as e:
+            logger.debug(f"Dispatcher 初始化到期堆失败，依赖兜底轮询: {e}")
 
     def throttle(self):
         """外部触发的降速背压，强制拉高休眠时间实现软熔断"""
@@ -181,6 +199,9 @@ class TaskDispatcher:
             "total_dispatched": self.total_dispatched,
             "last_fetch": self.last_fetch_count,
             "current_queue_size": self.queue.qsize(),
+            "empty_fetches": self.empty_fetches,
+            "wakeups": dict(self.wakeups),
+            "pending_deadlines": self.signal.pending_deadlines(),
             "uptime_sec": int(uptime),
             "throughput_per_min": int(self.total_dispatched / (uptime / 60)) if uptime > 60 else 0
         }
@@ -12,6 +12,8 @@ from core.config import settings
 
 from core.logging import get_logger, short_id
 from services.queue_service import get_messages_queued, send_file_queued
+from services.message_fetch_coalescer import get_message_fetch_coalescer
+from services.message_handoff_cache import message_handoff_cache
 from filters.delay_filter import RescheduleTaskException
 
 logger = get_logger(__name__)
@@ -390,9 +392,9 @@ class WorkerService:
                     except Exception as ex:
                         logger.warning(f"Failed to parse group task data: {ex}")
             
-            # 关键点：从 Telethon 获取真实消息对象 (批量获取)
+            # 关键点：获取真实消息对象 (优先命中监听器交接缓存，未命中再批量回源 Telegram)
             # 如果消息已过期或被删，这里会返回 None
-            messages = await get_messages_queued(self.client, chat_id, ids=all_message_ids)
+            messages = await self._fetch_messages(chat_id, all_message_ids)
             
             # 过滤掉 None (有些消息可能已被删)
             valid_messages = []
@@ -561,6 +563,33 @@ class WorkerService:
                 # 记录具体的错误信息到数据库
                 await self.repo.fail(task.id, f"Unhandled: {str(e)}")
 
+    async def _fetch_messages(self, chat_id, message_ids: list) -> list:
+        """
+        获取任务对应的消息对象，结果顺序与 message_ids 一致 (缺失位置为 None)。
+
+        监听器已将实时消息放入交接缓存，命中时无需再走 GetMessages；
+        仅对未命中的 ID (历史任务、进程重启后的积压等) 回源 Telegram，
+        并与其他 Worker 同一聊天的并发拉取合并为一次请求。
+        """
+        if not settings.MESSAGE_HANDOFF_ENABLED:
+            return await self._get_messages(chat_id, message_ids)
+
+        found, missing = message_handoff_cache.get_many(chat_id, message_ids)
+        if missing:
+            fetched = await self._get_messages(chat_id, missing)
+            if not isinstance(fetched, list):
+                fetched = [fetched]
+            for m in fetched:
+                if m is not None and getattr(m, 'id', None) is not None:
+                    found[int(m.id)] = m
+
+        return [found.get(int(mid)) for mid in message_ids]
+
+    async def _get_messages(self, chat_id, message_ids: list):
+        if settings.MESSAGE_FETCH_COALESCE_ENABLED:
+            return await get_message_fetch_coalescer().fetch(self.client, chat_id, message_ids)
+        return await get_messages_queued(self.client, chat_id, ids=message_ids)
+
     # ... Helper methods stay same ...
 
     def get_performance_stats(self):
@@ -572,6 +601,10 @@ class WorkerService:
             "max_concurrency": settings.WORKER_MAX_CONCURRENCY,
         }
         
+        # 消息交接缓存命中统计 (每次完全命中节省一次 GetMessages 调用)
+        stats["message_handoff"] = message_handoff_cache.get_stats()
+        stats["message_fetch"] = get_message_fetch_coalescer().get_stats()
+
         # 调度器统计
         if getattr(self, 'dispatcher', None):
             stats["dispatcher"] = self.dispatcher.get_stats()
@@ -0,0 +1,44 @@
+"""
+性能基准: LatencyMetrics.record 的单次开销不随已记录样本数增长
+
+旧实现每次 record 都对最近 1000 个样本全量排序 (并 pop(0))，
+DDSketch 实现只做一次对数分桶。
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+# 路径修复
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from services.metrics_collector import LatencyMetrics
+
+
+def _record_cost_us(prefill: int, batch: int = 20000) -> float:
+    """预先记录 prefill 个样本后，测量单次 record 的平均耗时 (微秒，取 3 次最优)"""
+    rng = random.Random(prefill)
+    metrics = LatencyMetrics()
+    for _ in range(prefill):
+        metrics.record(rng.expovariate(1 / 50))
+    samples = [rng.expovariate(1 / 50) for _ in range(batch)]
+
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for v in samples:
+            metrics.record(v)
+        best = min(best, time.perf_counter() - start)
+    return best / batch * 1e6
+
+
+def test_record_cost_flat_against_sample_count():
+    costs = {n: _record_cost_us(n) for n in (1_000, 100_000, 1_000_000)}
+    for n, cost in costs.items():
+        print(f"已记录 {n:>9} 个样本: record {cost:.2f} us/次")
+    # 样本数增长 1000 倍，单次记录开销应基本不变
+    assert costs[1_000_000] < costs[1_000] * 3
+
+
+if __name__ == "__main__":
+    test_record_cost_flat_against_sample_count()
@@ -5,6 +5,9 @@
 import sys
 import os
 import logging
+import atexit
+import shutil
+import tempfile
 from pathlib import Path
 
 # 确保项目根目录在 sys.path 最前面
@@ -12,6 +15,27 @@ _project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
+# 运行期数据文件 (SQLite 缓存、HLL、布隆过滤器、转发统计等) 一律写到临时目录，
+# 避免在仓库 data/ 下生成文件并在多次运行间残留状态。
+# 通过环境变量设置，保证在任何模块导入 settings 之前生效。
+_TEST_DATA_DIR = Path(tempfile.mkdtemp(prefix="tg_test_data_"))
+atexit.register(shutil.rmtree, _TEST_DATA_DIR, ignore_errors=True)
+_TEST_DATA_PATHS = {
+    "DATA_ROOT": _TEST_DATA_DIR,
+    "DB_DIR": _TEST_DATA_DIR / "db",
+    "HOT_DIR": _TEST_DATA_DIR / "hot",
+    "HOT_DB_PATH": _TEST_DATA_DIR / "db" / "hotwords.db",
+    "PERSIST_CACHE_SQLITE": _TEST_DATA_DIR / "db" / "cache.db",
+    "HLL_STORE_PATH": _TEST_DATA_DIR / "db" / "hll.db",
+    "FORWARD_RECORDER_DIR": _TEST_DATA_DIR / "zhuanfaji",
+    "QUEUE_SPOOL_DIR": _TEST_DATA_DIR / "spool" / "ingest",
+    "MEDIA_CACHE_DIR": _TEST_DATA_DIR / "media_cache",
+    "DEDUP_BLOOM_PATH": _TEST_DATA_DIR / "dedup" / "dedup_l0.bbf",
+    "DEDUP_NEAR_INDEX_SNAPSHOT_PATH": _TEST_DATA_DIR / "dedup" / "near_index.jsonl",
+}
+for _key, _path in _TEST_DATA_PATHS.items():
+    os.environ[_key] = str(_path)
+
 # ============================================================
 # PHASE 0: 预导入关键包 & Patch 核心基础设施
 # ============================================================
@@ -115,9 +139,8 @@ mock_settings.RSS_ENABLED = False
 mock_settings.RSS_MEDIA_DIR = Path("./temp_rss_media")
 mock_settings.USER_MESSAGE_DELETE_ENABLE = False
 mock_settings.BOT_MESSAGE_DELETE_TIMEOUT = 300
-mock_settings.DB_DIR = Path("./temp_test_db")
-if not mock_settings.DB_DIR.exists():
-    mock_settings.DB_DIR.mkdir(parents=True, exist_ok=True)
+mock_settings.DB_DIR = _TEST_DATA_PATHS["DB_DIR"]
+mock_settings.DB_DIR.mkdir(parents=True, exist_ok=True)
 
 # JWT Settings
 mock_settings.SECRET_KEY = "test_jwt_secret"
@@ -146,6 +169,9 @@ for key, value in mock_settings.__dict__.items():
 core.config.settings.SECRET_KEY = "test_jwt_secret"
 core.config.settings.JWT_ALGORITHM = "HS256"
 core.config.settings.DATABASE_URL = "sqlite+aiosqlite:///file:testdb_early?mode=memory&cache=shared&uri=true"
+# 上面的 mock_settings 复制可能覆盖路径，重新指向临时目录
+for _key, _path in _TEST_DATA_PATHS.items():
+    setattr(core.config.settings, _key, _path)
 
 
 # # Mock 暂时不需要测试且存在导入错误的业务模块
@@ -110,5 +110,119 @@ def test_ac_automaton_performance():
     logger.info(f"\nSpeedup vs Naive: {naive_time/ac_time:.2f}x")
     logger.info(f"Speedup vs Regex: {regex_time/ac_time:.2f}x")
 
+def _legacy_check_keywords_fast(keywords, text, rule_id):
+    """旧版 RuleFilterService.check_keywords_fast 路径 (每次拆分/小写化/逐个正则)"""
+    fixed_kws = [k for k in keywords if not k.is_regex]
+    regex_kws = [k for k in keywords if k.is_regex]
+    for k in regex_kws:
+        if re.search(k.keyword, text, re.I):
+            return True
+    if fixed_kws:
+        kw_list = [k.keyword.lower() for k in fixed_kws]
+        if ACManager.get_automaton(rule_id, kw_list).has_any_match(text.lower()):
+            return True
+    return False
+
+
+def _legacy_whitelist_then_blacklist(rule, text):
+    white = [k for k in rule.keywords if not k.is_blacklist]
+    if not _legacy_check_keywords_fast(white, text, rule.id):
+        return False
+    black = [k for k in rule.keywords if k.is_blacklist]
+    return not _legacy_check_keywords_fast(black, text, rule.id)
+
+
+def test_compiled_keyword_set_performance():
+    """CompiledKeywordSet (单次扫描) vs 旧版逐列表匹配"""
+    from types import SimpleNamespace
+    from enums.enums import ForwardMode
+    from services.rule.filter import keyword_set_cache
+
+    def kw(word, black, regex=False):
+        return SimpleNamespace(keyword=word, is_blacklist=black, is_regex=regex)
+
+    keywords = (
+        [kw(f"Promo_{i}", False) for i in range(300)]
+        + [kw(f"spam_{i}", True) for i in range(300)]
+        + [kw(rf"order\s*#{i}\d+", False, True) for i in range(20)]
+        + [kw(rf"casino{i}\w*", True, True) for i in range(20)]
+    )
+    rule = SimpleNamespace(id=424242, keywords=keywords, forward_mode=ForwardMode.WHITELIST_THEN_BLACKLIST)
+    texts = [
+        "Weekly digest with promo_150 inside " * 8,
+        "Nothing interesting here, just chatting " * 8,
+        "promo_7 but also SPAM_299 in the same message " * 8,
+        "Order #12345 confirmed, no spam " * 8,
+    ]
+
+    iterations = 500
+    mode = ForwardMode.WHITELIST_THEN_BLACKLIST.value
+
+    start = time.time()
+    legacy = []
+    for _ in range(iterations):
+        legacy = [_legacy_whitelist_then_blacklist(rule, t) for t in texts]
+    legacy_time = time.time() - start
+
+    keyword_set_cache.clear()
+    start = time.time()
+    compiled = []
+    for _ in range(iterations):
+        compiled = [keyword_set_cache.get(rule.keywords, rule.id).decide(mode, t) for t in texts]
+    compiled_time = time.time() - start
+
+    logger.info(f"Legacy path:   {legacy_time:.4f}s ({iterations * len(texts) / legacy_time:.0f} msgs/s)")
+    logger.info(f"Compiled set:  {compiled_time:.4f}s ({iterations * len(texts) / compiled_time:.0f} msgs/s)")
+    logger.info(f"Speedup: {legacy_time / compiled_time:.2f}x")
+
+    assert compiled == legacy
+
+
+def test_multi_rule_single_pass_performance():
+    """MultiRuleAutomaton (N 条规则一次扫描) vs 每条规则各扫描一次"""
+    from core.algorithms.ac_automaton import MultiRuleAutomaton
+
+    rule_keywords = {rid: [f"r{rid}kw{i}" for i in range(20)] for rid in range(200)}
+    per_rule = {}
+    for rid, words in rule_keywords.items():
+        ac = ACAutomaton()
+        for w in words:
+            ac.add_keyword(w)
+        ac.build()
+        per_rule[rid] = ac
+
+    start = time.time()
+    multi = MultiRuleAutomaton(rule_keywords)
+    build_time = time.time() - start
+
+    texts = [
+        "status update r17kw3 and r150kw19 plus filler text " * 6,
+        "nothing relevant in this message at all " * 6,
+    ]
+    iterations = 50
+
+    start = time.time()
+    separate = []
+    for _ in range(iterations):
+        separate = [{rid for rid, ac in per_rule.items() if ac.has_any_match(t)} for t in texts]
+    separate_time = time.time() - start
+
+    start = time.time()
+    merged = []
+    for _ in range(iterations):
+        merged = [multi.match_rules(t) for t in texts]
+    merged_time = time.time() - start
+
+    logger.info(f"Multi-rule build ({len(rule_keywords)} rules): {build_time:.4f}s, table {multi._ac.memory_bytes()} bytes")
+    logger.info(f"Per-rule scans: {separate_time:.4f}s")
+    logger.info(f"Single pass:    {merged_time:.4f}s")
+    logger.info(f"Speedup: {separate_time / merged_time:.2f}x")
+
+    assert merged == separate
+    assert merged[0] == {17, 150}
+
+
 if __name__ == "__main__":
     test_ac_automaton_performance()
+    test_compiled_keyword_set_performance()
+    test_multi_rule_single_pass_performance()
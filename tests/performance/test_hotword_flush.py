@@ -0,0 +1,99 @@
+"""
+Performance Test: Hotword Flush
+测试热词落盘逐词 UPSERT 与批量 executemany UPSERT 随词量变化的耗时
+"""
+import asyncio
+import time
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.hotword import Base, HotRawStats
+from repositories.hotword_repo import HotwordRepository
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def _legacy_save(repo: HotwordRepository, channel: str, counts):
+    """旧实现：每个词一条 INSERT ... ON CONFLICT"""
+    async with repo.session_factory() as session:
+        for word, meta in counts.items():
+            stmt = insert(HotRawStats).values(
+                channel=channel, word=word,
+                score=meta["f"], unique_users=meta["u"],
+            ).on_conflict_do_update(
+                index_elements=['channel', 'word'],
+                set_={
+                    "score": HotRawStats.score + meta["f"],
+                    "unique_users": HotRawStats.unique_users + meta["u"],
+                }
+            )
+            await session.execute(stmt)
+        await session.commit()
+
+
+async def _make_repo(path: Path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    repo = HotwordRepository.__new__(HotwordRepository)
+    repo.session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    return engine, repo
+
+
+def _batches(words: int, channels: int = 10):
+    per = words // channels
+    return {
+        f"chan_{c}": {f"w{c}_{i}": {"f": 1.5, "u": 1} for i in range(per)}
+        for c in range(channels)
+    }
+
+
+async def _run(tmp_path: Path):
+    results = []
+    for words in (1000, 5000, 10000):
+        batches = _batches(words)
+
+        engine, repo = await _make_repo(tmp_path / f"legacy_{words}.db")
+        start = time.perf_counter()
+        for channel, counts in batches.items():
+            await _legacy_save(repo, channel, counts)
+        legacy = time.perf_counter() - start
+        await engine.dispose()
+
+        engine, repo = await _make_repo(tmp_path / f"bulk_{words}.db")
+        start = time.perf_counter()
+        assert await repo.save_temp_counts_bulk(batches) == words
+        # 第二次 flush 走冲突累加分支
+        assert await repo.save_temp_counts_bulk(batches) == words
+        bulk = (time.perf_counter() - start) / 2
+        sample = await repo.load_rankings("chan_0", "chan_0_temp.json")
+        assert sample["w0_0"] == {"f": 3.0, "u": 2}
+        await engine.dispose()
+
+        logger.info(
+            f"Hotword flush {words:>6} words: per-word {legacy * 1000:8.1f}ms, "
+            f"bulk {bulk * 1000:8.1f}ms ({legacy / bulk:.1f}x)"
+        )
+        results.append((words, legacy, bulk))
+    return results
+
+
+def test_hotword_flush_scaling(tmp_path):
+    """批量 UPSERT 在各词量级上都应明显快于逐词 UPSERT"""
+    results = asyncio.run(_run(tmp_path))
+    for words, legacy, bulk in results:
+        assert bulk < legacy, f"{words} words: bulk {bulk:.3f}s >= legacy {legacy:.3f}s"
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        asyncio.run(_run(Path(d)))
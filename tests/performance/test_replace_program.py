@@ -0,0 +1,73 @@
+"""
+Performance Test: ReplaceFilter
+测试 60 条替换规则下逐条 re.finditer + re.sub 与预编译 ReplaceProgram 的耗时
+"""
+import re
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from services.rule.replace import ReplaceProgramCache
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _legacy_replace(replace_rules, message_text):
+    """旧版 ReplaceFilter._process 的替换循环 (每条规则 finditer + sub，模式按字符串传入)"""
+    for replace_rule in replace_rules:
+        if replace_rule.pattern == '.*':
+            return replace_rule.content or ''
+        try:
+            matches = re.finditer(replace_rule.pattern, message_text)
+            old_text = message_text
+            message_text = re.sub(replace_rule.pattern, replace_rule.content or '', message_text)
+            if old_text != message_text:
+                [m.group(0) for m in matches]
+        except re.error:
+            pass
+    return message_text
+
+
+def test_replace_program_performance():
+    """ReplaceProgram (预编译 + 字面规则合并) vs 旧版逐条替换"""
+    rules = (
+        [SimpleNamespace(pattern=f"频道{i}号", content=f"<c{i}>") for i in range(40)]
+        + [SimpleNamespace(pattern=rf"@user{i}\w*", content="@***") for i in range(10)]
+        + [SimpleNamespace(pattern=f"推广链接{i}", content="") for i in range(10)]
+    )
+    texts = [
+        "今日更新 频道3号 与 频道17号 联合发布，联系 @user4_bot 获取 推广链接2 " * 6,
+        "普通消息，没有任何需要替换的内容，只是一些填充文本。" * 6,
+    ]
+    iterations = 300
+    cache = ReplaceProgramCache()
+
+    start = time.time()
+    legacy = []
+    for _ in range(iterations):
+        legacy = [_legacy_replace(rules, t) for t in texts]
+    legacy_time = time.time() - start
+
+    start = time.time()
+    compiled = []
+    for _ in range(iterations):
+        compiled = [cache.get(rules, 1).apply(t)[0] for t in texts]
+    compiled_time = time.time() - start
+
+    program = cache.get(rules, 1)
+    logger.info(f"Rules: {len(rules)}, compiled steps: {len(program.steps)}")
+    logger.info(f"Legacy path:     {legacy_time:.4f}s ({iterations * len(texts) / legacy_time:.0f} msgs/s)")
+    logger.info(f"ReplaceProgram:  {compiled_time:.4f}s ({iterations * len(texts) / compiled_time:.0f} msgs/s)")
+    logger.info(f"Speedup: {legacy_time / compiled_time:.2f}x")
+
+    assert compiled == legacy
+
+
+if __name__ == "__main__":
+    test_replace_program_performance()
@@ -15,6 +15,17 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', '..
 from core.archive.bridge import UnifiedQueryBridge
 
 
+def _mock_con(rows=(), cols=()):
+    """模拟 DuckDB 根连接：查询线程派生的游标即其自身，结果经 Arrow 表返回"""
+    mock_con = MagicMock()
+    mock_con.execute.return_value = mock_con
+    mock_con.cursor.return_value = mock_con
+    mock_con.fetch_arrow_table.return_value.to_pylist.return_value = [
+        dict(zip(cols, row)) for row in rows
+    ]
+    return mock_con
+
+
 # ─────────────────────────────────────────────
 # UnifiedQueryBridge 单元测试
 # ─────────────────────────────────────────────
@@ -51,10 +62,7 @@ class TestUnifiedQueryBridgeUnit:
         """当没有 Parquet 文件时，应仅查询热数据"""
         bridge.archive_root = "/nonexistent/path"
 
-        mock_con = MagicMock()
-        mock_con.execute.return_value = mock_con
-        mock_con.fetchall.return_value = [(1, "test")]
-        mock_con.description = [("id",), ("name",)]
+        mock_con = _mock_con([(1, "test")], ["id", "name"])
         bridge._con = mock_con
 
         with patch("glob.glob", return_value=[]):  # 没有 Parquet 文件
@@ -68,30 +76,26 @@ class TestUnifiedQueryBridgeUnit:
     @pytest.mark.asyncio
     async def test_query_unified_fallback_on_error(self, bridge):
         """联合查询失败时应降级为仅热数据查询"""
-        mock_con = MagicMock()
+        mock_con = _mock_con([(1,)], ["id"])
         # 第一次调用（联合查询）抛出异常
         # 第二次调用（仅热数据）成功
         mock_con.execute.side_effect = [
             Exception("Parquet read error"),
             mock_con
         ]
-        mock_con.fetchall.return_value = [(1, "test")]
-        mock_con.description = [("id",)]
         bridge._con = mock_con
 
         with patch("glob.glob", return_value=["/some/file.parquet"]):
             result = await bridge.query_unified("task_queue", "1=1", [], limit=10)
 
         # 降级后应该成功返回结果
-        assert isinstance(result, list)
+        assert result == [{"id": 1}]
+        assert "UNION ALL" not in mock_con.execute.call_args[0][0]
 
     @pytest.mark.asyncio
     async def test_query_unified_use_hot_only(self, bridge):
         """use_cold=False 时应只查询热数据"""
-        mock_con = MagicMock()
-        mock_con.execute.return_value = mock_con
-        mock_con.fetchall.return_value = []
-        mock_con.description = []
+        mock_con = _mock_con([], [])
         bridge._con = mock_con
 
         await bridge.query_unified("task_queue", "1=1", [], use_hot=True, use_cold=False)
@@ -103,10 +107,7 @@ class TestUnifiedQueryBridgeUnit:
     @pytest.mark.asyncio
     async def test_query_unified_use_cold_only(self, bridge):
         """use_hot=False 时应只查询冷数据"""
-        mock_con = MagicMock()
-        mock_con.execute.return_value = mock_con
-        mock_con.fetchall.return_value = []
-        mock_con.description = []
+        mock_con = _mock_con([], [])
         bridge._con = mock_con
 
         with patch("glob.glob", return_value=["/fake.parquet"]):
@@ -125,10 +126,7 @@ class TestUnifiedQueryBridgeUnit:
     @pytest.mark.asyncio
     async def test_get_task_detail_found(self, bridge):
         """get_task_detail 找到记录时应返回字典"""
-        mock_con = MagicMock()
-        mock_con.execute.return_value = mock_con
-        mock_con.fetchall.return_value = [(42, "forward", "completed")]
-        mock_con.description = [("id",), ("task_type",), ("status",)]
+        mock_con = _mock_con([(42, "forward", "completed")], ["id", "task_type", "status"])
         bridge._con = mock_con
 
         with patch("glob.glob", return_value=[]):
@@ -141,10 +139,7 @@ class TestUnifiedQueryBridgeUnit:
     @pytest.mark.asyncio
     async def test_get_task_detail_not_found(self, bridge):
         """get_task_detail 找不到记录时应返回 None"""
-        mock_con = MagicMock()
-        mock_con.execute.return_value = mock_con
-        mock_con.fetchall.return_value = []
-        mock_con.description = []
+        mock_con = _mock_con([], [])
         bridge._con = mock_con
 
         with patch("glob.glob", return_value=[]):
@@ -155,10 +150,7 @@ class TestUnifiedQueryBridgeUnit:
     @pytest.mark.asyncio
     async def test_list_tasks_with_filters(self, bridge):
         """list_tasks 应正确传递 status 和 task_type 过滤条件"""
-        mock_con = MagicMock()
-        mock_con.execute.return_value = mock_con
-        mock_con.fetchall.return_value = []
-        mock_con.description = []
+        mock_con = _mock_con([], [])
         bridge._con = mock_con
 
         with patch("glob.glob", return_value=[]):
@@ -173,10 +165,7 @@ class TestUnifiedQueryBridgeUnit:
         """query_aggregate 在没有冷数据时应仅查询热数据"""
         bridge.archive_root = "/nonexistent"
 
-        mock_con = MagicMock()
-        mock_con.execute.return_value = mock_con
-        mock_con.fetchall.return_value = [(10,)]
-        mock_con.description = [("count",)]
+        mock_con = _mock_con([(10,)], ["count"])
         bridge._con = mock_con
 
         with patch("glob.glob", return_value=[]):
@@ -269,3 +258,32 @@ class TestUnifiedQueryBridgeIntegration:
 
         # 热数据 5 条 + 冷数据 3 条 = 8 条
         assert result == 8, f"联合查询应返回 8 条记录，实际: {result}"
+
+    @pytest.mark.asyncio
+    async def test_cold_query_via_executor(self, cold_parquet):
+        """冷数据查询经执行池返回行字典，流式查询按批次产出"""
+        import duckdb
+        with patch("core.archive.bridge.settings") as mock_settings:
+            mock_settings.DB_PATH = "sqlite+aiosqlite:///data/db/forward.db"
+            mock_settings.ARCHIVE_QUERY_DEBUG = False
+            mock_settings.ARCHIVE_QUERY_WORKERS = 2
+            mock_settings.ARCHIVE_QUERY_TIMEOUT = 10.0
+            mock_settings.ARCHIVE_QUERY_BATCH_ROWS = 2
+            bridge = UnifiedQueryBridge()
+            bridge.archive_root = cold_parquet.replace("\\", "/")
+            # 离线环境无法安装 sqlite 扩展，直接注入根连接
+            bridge._con = duckdb.connect(":memory:")
+
+            rows = await bridge.query_aggregate(
+                "rule_logs", "SELECT COUNT(*) AS cnt FROM {table}", use_hot=False
+            )
+            assert rows == [{"cnt": 3}]
+
+            batches = [
+                b async for b in bridge.stream_aggregate(
+                    "rule_logs", "SELECT id FROM {table} ORDER BY id", use_hot=False
+                )
+            ]
+            assert [b.num_rows for b in batches] == [2, 1]
+            assert [r["id"] for b in batches for r in b.to_pylist()] == [100, 101, 102]
+            await bridge.close()
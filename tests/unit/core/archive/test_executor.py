@@ -0,0 +1,121 @@
+"""
+DuckDBExecutor 单元测试
+覆盖：线程池执行、超时中断、取消、并发上限、Arrow 流式读取
+"""
+import asyncio
+import threading
+import time
+
+import duckdb
+import pytest
+
+from core.archive.executor import DuckDBExecutor, QueryTimeoutError
+
+SLOW_SQL = "SELECT count(*) FROM range(10000000000) t1, range(100) t2"
+
+
+@pytest.fixture
+def executor():
+    con = duckdb.connect(":memory:")
+    ex = DuckDBExecutor(lambda: con, max_workers=2, timeout=10.0, batch_rows=4)
+    yield ex
+    con.close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_dicts_runs_off_loop(executor):
+    rows = await executor.fetch_dicts(
+        "SELECT i AS n, current_setting('threads') IS NOT NULL AS ok FROM range(3) t(i) WHERE i >= ?", [1]
+    )
+    assert rows == [{"n": 1, "ok": True}, {"n": 2, "ok": True}]
+
+    loop_thread = threading.get_ident()
+    seen = []
+
+    def job(handle):
+        seen.append((threading.get_ident(), threading.current_thread().name))
+
+    await executor._submit(job, None, "probe")
+    assert seen[0][0] != loop_thread
+    assert seen[0][1].startswith("duckdb-query")
+    await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timeout_interrupts_query_and_keeps_loop_responsive(executor):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    tick_task = asyncio.create_task(ticker())
+    start = time.monotonic()
+    with pytest.raises(QueryTimeoutError):
+        await executor.fetch_dicts(SLOW_SQL, timeout=0.3)
+    elapsed = time.monotonic() - start
+    tick_task.cancel()
+
+    assert elapsed < 2.0
+    # 查询期间事件循环持续调度
+    assert ticks >= 10
+    assert executor.get_stats()["timeouts"] == 1
+    # 被中断的线程游标可以继续使用
+    assert await executor.fetch_dicts("SELECT 42 AS v") == [{"v": 42}]
+    await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_cancel_interrupts_running_query(executor):
+    task = asyncio.create_task(executor.fetch_dicts(SLOW_SQL))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert executor.get_stats()["cancelled"] == 1
+
+    # 中断后线程很快释放，后续查询不受影响
+    rows = await asyncio.wait_for(executor.fetch_dicts("SELECT 1 AS v"), timeout=5)
+    assert rows == [{"v": 1}]
+    await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    con = duckdb.connect(":memory:")
+    ex = DuckDBExecutor(lambda: con, max_workers=1, timeout=10.0)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def job(handle):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    await asyncio.gather(*(ex._submit(job, None, "bounded") for _ in range(4)))
+    assert peak == 1
+    assert ex.get_stats()["completed"] == 4
+    await ex.close()
+    con.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_record_batches(executor):
+    batches = [b async for b in executor.stream("SELECT i FROM range(10) t(i) ORDER BY i")]
+    assert [b.num_rows for b in batches] == [4, 4, 2]
+    assert [r["i"] for b in batches for r in b.to_pylist()] == list(range(10))
+
+    # 提前结束迭代时游标被关闭，执行器仍可用
+    stream = executor.stream("SELECT i FROM range(100) t(i)", batch_rows=10)
+    first = await stream.__anext__()
+    assert first.num_rows == 10
+    await stream.aclose()
+    assert await executor.fetch_dicts("SELECT 7 AS v") == [{"v": 7}]
+    await executor.close()
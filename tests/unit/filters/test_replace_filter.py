@@ -62,3 +62,55 @@ async def test_replace_filter_invalid_regex(replace_filter, mock_context):
     result = await replace_filter._process(mock_context)
     assert result is True
     assert mock_context.message_text == "original text with some pattern"
+
+def _sequential(rules, text):
+    """旧实现：逐条 re.sub"""
+    import re
+    for rr in rules:
+        if rr.pattern == ".*":
+            return rr.content or ""
+        try:
+            text = re.sub(rr.pattern, rr.content or "", text)
+        except re.error:
+            pass
+    return text
+
+def test_replace_program_merges_only_independent_literals():
+    from services.rule.replace import ReplaceProgram
+    rules = [
+        SimpleNamespace(pattern="广告", content="[已删]"),
+        SimpleNamespace(pattern="引流", content="[已删]"),
+        SimpleNamespace(pattern="a", content="b"),
+        SimpleNamespace(pattern="b", content="c"),   # 依赖上一条的替换结果
+        SimpleNamespace(pattern="xy", content=""),
+        SimpleNamespace(pattern="zw", content="!"),   # 前一条删除可拼接出新匹配
+        SimpleNamespace(pattern=r"\d+", content="#"),
+        SimpleNamespace(pattern="[bad", content="x"),
+    ]
+    program = ReplaceProgram(rules)
+    # [广告, 引流, a] [b, xy] [zw] [\d+] 四步，[bad 在编译期丢弃
+    assert len(program.steps) == 4
+    for text in ["广告a引流b", "zxyw 123 aab", "abcxyzw广告引流广告"]:
+        assert program.apply(text)[0] == _sequential(rules, text)
+
+def test_replace_program_full_replace_short_circuit():
+    from services.rule.replace import ReplaceProgram
+    program = ReplaceProgram([
+        SimpleNamespace(pattern="a", content="b"),
+        SimpleNamespace(pattern=".*", content="all"),
+        SimpleNamespace(pattern="[bad", content="x"),
+    ])
+    assert program.full_replace == "all"
+    assert program.steps == []
+
+def test_replace_program_cache_reuses_and_invalidates():
+    from services.rule.replace import ReplaceProgramCache
+    cache = ReplaceProgramCache()
+    rules = [SimpleNamespace(pattern="a", content="b")]
+    first = cache.get(rules, rule_id=9)
+    assert cache.get(rules, rule_id=9) is first
+    # 新快照但内容相同 -> 复用
+    assert cache.get([SimpleNamespace(pattern="a", content="b")], rule_id=9) is first
+    assert cache.get([SimpleNamespace(pattern="a", content="c")], rule_id=9) is not first
+    cache.invalidate(123)
+    assert cache.get(rules, rule_id=9) is not first
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.hotword import Base, HotPeriodStats, HotRawStats
+from repositories.hotword_repo import HotwordRepository
+
+
+@pytest.fixture
+async def repo(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'hot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    repo = HotwordRepository.__new__(HotwordRepository)
+    repo.session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    yield repo
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_accumulates_across_channels(repo):
+    written = await repo.save_temp_counts_bulk({
+        "a": {"x": {"f": 1.5, "u": 1}, "y": {"f": 2.0, "u": 2}},
+        "b": {"x": {"f": 3.0, "u": 1}},
+    })
+    assert written == 3
+    await repo.save_temp_counts("a", {"x": {"f": 1.0, "u": 4}})
+
+    assert await repo.load_rankings("a", "a_temp.json") == {
+        "x": {"f": 2.5, "u": 5},
+        "y": {"f": 2.0, "u": 2},
+    }
+    assert await repo.load_rankings("b", "b_temp.json") == {"x": {"f": 3.0, "u": 1}}
+    assert await repo.save_temp_counts_bulk({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_archive_and_summarize_are_set_based(repo):
+    await repo.save_temp_counts_bulk({
+        "a": {"x": {"f": 1.0, "u": 1}},
+        "b": {"x": {"f": 2.0, "u": 1}, "y": {"f": 4.0, "u": 3}},
+    })
+    sem = asyncio.Semaphore(1)
+    assert await repo.move_temp_to_daily("20260301", sem) == 3
+    assert await repo.get_channel_dirs() == []
+
+    await repo.save_temp_counts("b", {"y": {"f": 1.0, "u": 1}})
+    assert await repo.move_temp_to_daily("20260302", sem) == 1
+
+    assert await repo.summarize_period("day", "month", "202603", "202603", sem) == 3
+    month = await repo.load_rankings("b", "b_month_202603.json")
+    assert month == {"x": {"f": 2.0, "u": 1}, "y": {"f": 5.0, "u": 4}}
+
+    async with repo.session_factory() as session:
+        days = (await session.execute(
+            select(HotPeriodStats).where(HotPeriodStats.period == "day")
+        )).scalars().all()
+        raw = (await session.execute(select(HotRawStats))).scalars().all()
+    assert len(days) == 4
+    assert raw == []
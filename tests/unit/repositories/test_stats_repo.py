@@ -195,6 +195,26 @@ class TestFlushStats:
         assert row is not None
         assert row.forward_count == 3  # 1 + 2
 
+    async def test_flush_chunks_many_keys(self, repo, db):
+        """键数超过单条语句参数上限时应分块 upsert，且与已有行累加"""
+        today = date.today().isoformat()
+        repo._rule_stats_buffer = {
+            (rule_id, today): {"success_count": 1, "error_count": 0, "filtered_count": 0, "total_triggered": 1}
+            for rule_id in range(1, 501)
+        }
+        await repo.flush_stats()
+        await repo.increment_rule_stats(rule_id=250, status="error")
+        await repo.flush_stats()
+
+        count = (await db.execute(select(func.count(RuleStatistics.id)))).scalar()
+        assert count == 500
+        row = (await db.execute(
+            select(RuleStatistics).where(RuleStatistics.rule_id == 250)
+        )).scalar_one()
+        assert row.total_triggered == 2
+        assert row.success_count == 1
+        assert row.error_count == 1
+
     async def test_flush_noop_when_empty(self, repo, db):
         """空 buffer 时 flush 不应写入任何行"""
         assert len(repo._chat_stats_buffer) == 0
@@ -32,6 +32,16 @@ class TestTaskRepository:
         count = (await db.execute(stmt_count)).scalar()
         assert count == 1
 
+    async def test_push_batch_splits_under_sqlite_param_limit(self, repo, db):
+        # 500 行 × 每行十余个绑定参数，远超 SQLite 999 参数上限，需分批写入
+        tasks = [("forward", {"chat_id": 1, "message_id": i}, 0) for i in range(500)]
+        await repo.push_batch(tasks)
+        # 重复写入被 OR IGNORE 去重
+        await repo.push_batch(tasks[:10])
+
+        count = (await db.execute(select(func.count(TaskQueue.id)))).scalar()
+        assert count == 500
+
     async def test_fetch_next_order_and_status(self, repo, db):
         # 插入两个任务，一个优先级高
         await repo.push("low", {"id": 1}, priority=0)
@@ -0,0 +1,121 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from middlewares.loader import RuleLoaderMiddleware
+from services.rule.routing_index import RuleRoutingIndex
+
+
+def _rule(rid):
+    return SimpleNamespace(id=rid)
+
+
+def _index(routes):
+    index = RuleRoutingIndex(MagicMock(), MagicMock(), debounce_seconds=0)
+    index._compile = AsyncMock(return_value=routes)
+    return index
+
+
+@pytest.mark.asyncio
+async def test_lookup_normalizes_chat_id_variants():
+    index = _index({"123456": (_rule(1), _rule(2))})
+    await index.build()
+
+    assert [r.id for r in index.lookup(-100123456)] == [1, 2]
+    assert [r.id for r in index.lookup("123456")] == [1, 2]
+    # 已编译但无规则的聊天返回空列表 (不回退查库)
+    assert index.lookup(999) == []
+
+
+@pytest.mark.asyncio
+async def test_lookup_before_build_falls_back():
+    index = _index({})
+    assert index.lookup(1) is None
+    assert index.get_stats()["fallbacks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_marks_dirty_and_rebuilds_incrementally():
+    index = _index({"1": (_rule(1),), "2": (_rule(2),)})
+    await index.build()
+    version = index.version
+
+    index._compile = AsyncMock(return_value={"1": (_rule(10),)})
+    index.invalidate(-1001)
+    # 重建完成前，被失效的聊天回退查库，其他聊天继续命中快照
+    assert index.lookup(1) is None
+    assert [r.id for r in index.lookup(2)] == [2]
+
+    await index._refresh_task
+    index._compile.assert_awaited_once_with({"1"})
+    assert [r.id for r in index.lookup(1)] == [10]
+    assert [r.id for r in index.lookup(2)] == [2]
+    assert index.version == version + 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_all_triggers_full_rebuild():
+    index = _index({"1": (_rule(1),)})
+    await index.build()
+
+    index._compile = AsyncMock(return_value={"2": (_rule(2),)})
+    index.invalidate()
+    assert index.lookup(2) is None
+
+    await index._refresh_task
+    index._compile.assert_awaited_once_with()
+    assert index.lookup(1) == []
+    assert [r.id for r in index.lookup(2)] == [2]
+
+
+@pytest.mark.asyncio
+async def test_loader_uses_index_without_db_access():
+    index = _index({"123": (_rule(7),)})
+    await index.build()
+    repo = MagicMock()
+    repo.get_rules_for_source_chat = AsyncMock()
+
+    ctx = SimpleNamespace(chat_id=-100123, metadata={}, rules=[], is_terminated=False)
+    next_call = AsyncMock()
+    await RuleLoaderMiddleware(repo, index).process(ctx, next_call)
+
+    assert [r.id for r in ctx.rules] == [7]
+    repo.get_rules_for_source_chat.assert_not_awaited()
+    next_call.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_loader_falls_back_to_repo_when_index_not_ready():
+    index = _index({})
+    repo = MagicMock()
+    repo.get_rules_for_source_chat = AsyncMock(return_value=[_rule(3)])
+
+    ctx = SimpleNamespace(chat_id=5, metadata={}, rules=[], is_terminated=False)
+    await RuleLoaderMiddleware(repo, index).process(ctx, AsyncMock())
+
+    repo.get_rules_for_source_chat.assert_awaited_once_with(5)
+    assert [r.id for r in ctx.rules] == [3]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_expires_after_max_age(monkeypatch):
+    """快照超过最大存活时间后回退查库并全量重建，兜底未触发失效的写路径"""
+    import services.rule.routing_index as mod
+
+    now = [1000.0]
+    monkeypatch.setattr(mod.time, "monotonic", lambda: now[0])
+    index = _index({"1": (_rule(1),)})
+    index.max_age_seconds = 30
+    await index.build()
+    assert [r.id for r in index.lookup(1)] == [1]
+
+    # 规则在库中被修改但未调用 clear_cache
+    index._compile = AsyncMock(return_value={"1": (_rule(2),)})
+    now[0] += 31
+    assert index.lookup(1) is None
+
+    await index._refresh_task
+    index._compile.assert_awaited_once_with()
+    assert [r.id for r in index.lookup(1)] == [2]
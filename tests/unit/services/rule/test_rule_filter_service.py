@@ -115,3 +115,65 @@ async def test_case_insensitivity():
     )
     # AC 自动机和正则都应支持大小写忽略
     assert await RuleFilterService.check_keywords(rule, "apple") is True
+
+def test_compiled_keyword_set_single_pass_tags():
+    from services.rule.filter import CompiledKeywordSet
+    compiled = CompiledKeywordSet([
+        MockKeyword("good", is_blacklist=False),
+        MockKeyword("bad", is_blacklist=True),
+        MockKeyword(r"v\d+", is_blacklist=False, is_regex=True),
+    ])
+    assert compiled.match("GOOD and BAD") == (True, True)
+    assert compiled.match("release v2") == (True, False)
+    assert compiled.match("nothing") == (False, False)
+
+def test_compiled_keyword_set_uncombinable_regex_fallback():
+    from services.rule.filter import CompiledKeywordSet
+    # 反向引用在合并为交替正则后组号会错位，应退回逐个编译
+    compiled = CompiledKeywordSet([
+        MockKeyword(r"(a)\1", is_blacklist=True, is_regex=True),
+        MockKeyword(r"(b)\1", is_blacklist=True, is_regex=True),
+        MockKeyword(r"[unclosed", is_blacklist=True, is_regex=True),
+    ])
+    assert compiled.match("xbbx") == (False, True)
+    assert compiled.match("abab") == (False, False)
+
+def test_keyword_set_cache_invalidates_on_keyword_change():
+    from services.rule.filter import KeywordSetCache
+    cache = KeywordSetCache()
+    keywords = [MockKeyword("alpha")]
+    first = cache.get(keywords, rule_id=7)
+    assert cache.get(keywords, rule_id=7) is first
+    # 新的 DTO 快照但内容相同 -> 复用
+    assert cache.get([MockKeyword("alpha")], rule_id=7) is first
+    # 关键词变化 -> 重新编译
+    changed = cache.get([MockKeyword("beta")], rule_id=7)
+    assert changed is not first
+    assert changed.match("beta")[1] is True
+
+def test_rule_group_index_single_scan_per_rule_hits():
+    from services.rule.filter import KeywordSetCache, TAG_WHITE, TAG_BLACK
+    r1 = MockRule(ForwardMode.WHITELIST, [MockKeyword("Apple", is_blacklist=False), MockKeyword("spam")])
+    r2 = MockRule(ForwardMode.BLACKLIST, [MockKeyword("spam"), MockKeyword(r"\d+", is_regex=True)])
+    r2.id = 2
+    cache = KeywordSetCache()
+    group = cache.get_group([r1, r2])
+    assert cache.get_group([r1, r2]) is group
+    # 正则关键词不参与合并扫描
+    assert group.scan("APPLE 123") == {1: TAG_WHITE, 2: 0}
+    assert group.scan("apple spam") == {1: TAG_WHITE | TAG_BLACK, 2: TAG_BLACK}
+
+@pytest.mark.asyncio
+async def test_prescan_matches_per_rule_decisions():
+    from services.rule import filter as rule_filter
+    r1 = MockRule(ForwardMode.WHITELIST, [MockKeyword("apple", is_blacklist=False)])
+    r2 = MockRule(ForwardMode.BLACKLIST, [MockKeyword("spam"), MockKeyword(r"ca\w+no", is_regex=True)])
+    r2.id = 2
+    for text in ["apple pie", "spam apple", "casino", "plain"]:
+        expected = [await RuleFilterService.check_keywords(r, text) for r in (r1, r2)]
+        RuleFilterService.prescan_keywords([r1, r2], text)
+        assert rule_filter._prescanned_mask(2, text) is not None
+        assert [await RuleFilterService.check_keywords(r, text) for r in (r1, r2)] == expected
+        # 文本被改写后不使用预扫描结果
+        assert rule_filter._prescanned_mask(2, text + " file.txt") is None
+        RuleFilterService.clear_prescan()
@@ -154,6 +154,8 @@ async def test_search_records(analytics_service):
          patch.object(analytics_service.bridge, 'query_unified', new_callable=AsyncMock) as mock_query_unified:
         
         mock_container_prop.return_value = mock_container
+        # 全文索引不可用 -> 退回 LIKE 查询
+        mock_container.stats_repo.search_logs_fulltext = AsyncMock(return_value=None)
         mock_query_unified.return_value = [{
             'id': 1,
             'rule_id': 101,
@@ -169,3 +171,42 @@ async def test_search_records(analytics_service):
         assert result['records'][0]['source_chat'] == "Source Chat Name"
         assert result['records'][0]['target_chat'] == "Target Chat Name"
         assert result['records'][0]['source_chat_id'] == "Source Chat Name"
+
+
+@pytest.mark.asyncio
+async def test_search_records_merges_fulltext_tiers(analytics_service):
+    """全文检索：热/冷两层按 (created_at, id) 由新到旧合并去重，并返回键集游标"""
+    mock_session = MagicMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = []
+    mock_session.execute = AsyncMock(return_value=mock_result)
+    mock_container = MagicMock()
+    mock_container.db.get_session.return_value.__aenter__.return_value = mock_session
+    mock_container.stats_repo.search_logs_fulltext = AsyncMock(return_value=[
+        {'id': 12, 'rule_id': 1, 'action': 'forwarded', 'message_text': 'hello b',
+         'created_at': '2026-01-02 03:04:05.000000', 'sort_ts': '2026-01-02 03:04:05.000000'},
+        {'id': 10, 'rule_id': 1, 'action': 'forwarded', 'message_text': 'hello a',
+         'created_at': '2025-06-01 00:00:00.000000', 'sort_ts': '2025-06-01 00:00:00.000000'},
+    ])
+
+    with patch.object(AnalyticsService, 'container', new_callable=PropertyMock) as mock_container_prop, \
+         patch.object(analytics_service.bridge, 'search_cold_text', new_callable=AsyncMock) as mock_cold, \
+         patch.object(analytics_service.bridge, 'query_unified', new_callable=AsyncMock) as mock_like:
+        mock_container_prop.return_value = mock_container
+        # 冷库行的 BM25 不参与排序：更新的冷行排在更旧的热行之前
+        mock_cold.return_value = [
+            {'id': 10, 'rule_id': 1, 'action': 'forwarded', 'message_text': 'hello a',
+             'created_at': datetime(2025, 6, 1), 'sort_ts': '2025-06-01 00:00:00.000000'},
+            {'id': 3, 'rule_id': 1, 'action': 'forwarded', 'message_text': 'hello c',
+             'created_at': datetime(2025, 1, 1), 'sort_ts': '2025-01-01 00:00:00.000000'},
+        ]
+
+        result = await analytics_service.search_records(query='hello', limit=2)
+        assert [r['id'] for r in result['records']] == [12, 10]
+        assert result['records'][0]['created_at'].startswith('2026-01-02T03:04:05')
+        assert result['next_cursor'] == '2025-06-01 00:00:00.000000:10'
+        mock_like.assert_not_called()
+
+        await analytics_service.search_records(query='hello', limit=2, cursor=result['next_cursor'])
+        assert mock_container.stats_repo.search_logs_fulltext.call_args[0][2] == ('2025-06-01 00:00:00.000000', 10)
+        assert mock_cold.call_args[0][3] == ('2025-06-01 00:00:00.000000', 10)
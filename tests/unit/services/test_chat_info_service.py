@@ -98,3 +98,57 @@ async def test_update_chat_in_db_updates_existing_chat(service, mock_db):
     # We explicitly removed updated_at assignment, so we check it was NOT set
     # Note: Logic was `chat.updated_at = ...` (removed).
     # We can check if `updated_at` attribute was accessed or set if we want, but simpler is just to ensure no error.
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_db_lookup_and_slow_api_does_not_block():
+    import asyncio
+
+    service = ChatInfoService(db=MagicMock(), client=MagicMock())
+    db_calls = []
+
+    async def fake_db(chat_id):
+        db_calls.append(chat_id)
+        await asyncio.sleep(0.01)
+        return "Known" if chat_id == "111" else None
+
+    release = asyncio.Event()
+
+    async def slow_resolve(client, chat_id):
+        await release.wait()
+        return None, None
+
+    service._get_name_from_db = fake_db
+    with patch("services.chat_info_service.resolve_entity_by_id_variants", slow_resolve):
+        names = await asyncio.gather(*[service.get_chat_name(111) for _ in range(5)], service.get_chat_name(222))
+        # 222 的 Telegram 解析仍挂起，后续查询直接命中负缓存
+        assert await asyncio.wait_for(service.get_chat_name(222), 0.1) == "222"
+        release.set()
+        await asyncio.sleep(0)
+
+    assert names == ["Known"] * 5 + ["222"]
+    assert db_calls == ["111", "222"]
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_lru():
+    service = ChatInfoService(max_entries=2)
+    service._cache_put("1", "a")
+    service._cache_put("2", "b")
+    assert await service.get_chat_name(1) == "a"
+    service._cache_put("3", "c")
+    assert list(service._name_cache) == ["1", "3"]
+
+
+@pytest.mark.asyncio
+async def test_get_chat_names_uses_single_query(service, mock_db):
+    service._cache_put("100", "Cached")
+    session = mock_db.get_session.return_value.__aenter__.return_value
+    result = MagicMock()
+    result.all.return_value = [("200", "Two"), ("300", None)]
+    session.execute.return_value = result
+
+    names = await service.get_chat_names([100, -100200, 300])
+
+    session.execute.assert_awaited_once()
+    assert names == {"100": "Cached", "-100200": "Two", "300": "300"}
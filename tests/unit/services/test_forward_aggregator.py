@@ -0,0 +1,102 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from services.forward_aggregator import ForwardAggregator
+from services.queue_service import FloodWaitException
+
+
+async def _direct(target, source, name, func, **kwargs):
+    return await func()
+
+
+def _client(bad_ids=()):
+    client = MagicMock()
+
+    async def forward_messages(target, ids, from_peer=None, **kwargs):
+        if len(ids) > 1 and any(mid in bad_ids for mid in ids):
+            raise ValueError("MESSAGE_ID_INVALID")
+        return [None if mid in bad_ids else MagicMock(id=mid + 1000) for mid in ids]
+
+    client.forward_messages = AsyncMock(side_effect=forward_messages)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def guarded():
+    with patch("services.forward_aggregator.telegram_queue_service.run_guarded_operation", side_effect=_direct):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_tasks_to_same_target_share_one_request():
+    aggregator = ForwardAggregator(window_ms=20)
+    client = _client()
+    a, b, c = await asyncio.gather(
+        aggregator.forward(client, 1, 2, [10, 11]),   # 媒体组
+        aggregator.forward(client, 1, 2, 12),
+        aggregator.forward(client, 1, 3, 13),         # 不同目标
+    )
+
+    calls = [(c.args[0], c.args[1]) for c in client.forward_messages.call_args_list]
+    assert sorted(calls) == [(2, [10, 11, 12]), (3, [13])]
+    assert [m.id for m in a] == [1010, 1011]
+    assert [m.id for m in b] == [1012]
+    assert [m.id for m in c] == [1013]
+    assert aggregator.get_stats()["saved_api_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_media_group_not_split_across_batches():
+    aggregator = ForwardAggregator(window_ms=20, max_ids=4)
+    client = _client()
+    await asyncio.gather(
+        aggregator.forward(client, 1, 2, [1, 2, 3]),
+        aggregator.forward(client, 1, 2, [4, 5]),
+        aggregator.forward(client, 1, 2, [6]),
+    )
+
+    batches = [c.args[1] for c in client.forward_messages.call_args_list]
+    assert batches == [[1, 2, 3], [4, 5, 6]]
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_falls_back_per_task():
+    aggregator = ForwardAggregator(window_ms=20)
+    client = _client(bad_ids={21})
+    ok, bad = await asyncio.gather(
+        aggregator.forward(client, 1, 2, [20]),
+        aggregator.forward(client, 1, 2, [21, 22]),
+        return_exceptions=True,
+    )
+
+    assert [m.id for m in ok] == [1020]
+    assert isinstance(bad, ValueError)
+    assert aggregator.get_stats()["fallbacks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_reaches_every_task_without_fallback():
+    aggregator = ForwardAggregator(window_ms=20)
+    client = MagicMock()
+    client.forward_messages = AsyncMock(side_effect=FloodWaitException(30))
+    results = await asyncio.gather(
+        aggregator.forward(client, 1, 2, [1]),
+        aggregator.forward(client, 1, 2, [2]),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, FloodWaitException) for r in results)
+    client.forward_messages.assert_awaited_once()
+
+
+def test_singleton_reads_settings_on_first_use():
+    """导入时不读取配置；首次获取时按配置创建，之后复用同一实例"""
+    import services.forward_aggregator as mod
+
+    settings = MagicMock(FORWARD_AGGREGATE_WINDOW_MS=8.0, FORWARD_AGGREGATE_MAX_IDS=50)
+    with patch.object(mod, "settings", settings), patch.object(mod, "_forward_aggregator", None):
+        aggregator = mod.get_forward_aggregator()
+        assert aggregator.max_ids == 50
+        assert mod.get_forward_aggregator() is aggregator
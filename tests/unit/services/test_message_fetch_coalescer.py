@@ -0,0 +1,79 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from services.message_fetch_coalescer import MessageFetchCoalescer
+
+
+def _msg(mid):
+    m = MagicMock()
+    m.id = mid
+    return m
+
+
+def _fake_get_messages():
+    async def _get(client, chat_id, ids=None, **kwargs):
+        return [_msg(mid) if mid < 1000 else None for mid in ids]
+    return AsyncMock(side_effect=_get)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fetches_share_one_call():
+    coalescer = MessageFetchCoalescer(window_ms=20)
+    client = MagicMock()
+    with patch("services.message_fetch_coalescer.get_messages_queued", _fake_get_messages()) as mock_get:
+        results = await asyncio.gather(
+            coalescer.fetch(client, 555, [1, 2]),
+            coalescer.fetch(client, 555, [3]),
+            coalescer.fetch(client, 555, [2, 1000]),
+        )
+
+    mock_get.assert_awaited_once()
+    assert mock_get.call_args.kwargs["ids"] == [1, 2, 3, 1000]
+    assert [m.id for m in results[0]] == [1, 2]
+    assert [m.id for m in results[1]] == [3]
+    assert results[2][0].id == 2 and results[2][1] is None
+    assert coalescer.get_stats()["saved_api_calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batches_split_at_max_ids_and_by_chat():
+    coalescer = MessageFetchCoalescer(window_ms=20, max_ids=100)
+    client = MagicMock()
+    with patch("services.message_fetch_coalescer.get_messages_queued", _fake_get_messages()) as mock_get:
+        big, other = await asyncio.gather(
+            coalescer.fetch(client, 555, list(range(150))),
+            coalescer.fetch(client, 777, [5]),
+        )
+
+    calls = sorted((c.args[1], len(c.kwargs["ids"])) for c in mock_get.call_args_list)
+    assert calls == [(555, 50), (555, 100), (777, 1)]
+    assert [m.id for m in big] == list(range(150))
+    assert other[0].id == 5
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_all_waiters():
+    coalescer = MessageFetchCoalescer(window_ms=20)
+    client = MagicMock()
+    with patch("services.message_fetch_coalescer.get_messages_queued", AsyncMock(side_effect=ValueError("boom"))):
+        results = await asyncio.gather(
+            coalescer.fetch(client, 555, [1]),
+            coalescer.fetch(client, 555, [2]),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_singleton_reads_settings_on_first_use():
+    """导入时不读取配置；首次获取时按配置创建，之后复用同一实例"""
+    import services.message_fetch_coalescer as mod
+
+    settings = MagicMock(MESSAGE_FETCH_COALESCE_WINDOW_MS=8.0, MESSAGE_FETCH_COALESCE_MAX_IDS=50)
+    with patch.object(mod, "settings", settings), patch.object(mod, "_message_fetch_coalescer", None):
+        coalescer = mod.get_message_fetch_coalescer()
+        assert coalescer.window == pytest.approx(0.008)
+        assert coalescer.max_ids == 50
+        assert mod.get_message_fetch_coalescer() is coalescer
@@ -0,0 +1,112 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from services.message_handoff_cache import MessageHandoffCache
+
+
+def _msg(mid, text="hello"):
+    return SimpleNamespace(id=mid, message=text, entities=None, media=None)
+
+
+class TestMessageHandoffCache:
+    def test_put_and_get_hit(self):
+        cache = MessageHandoffCache()
+        msg = _msg(1)
+        cache.put(100, msg)
+
+        assert cache.get(100, 1) is msg
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 0
+        assert stats["saved_api_calls"] == 1
+
+    def test_get_many_partial_miss_preserves_order(self):
+        cache = MessageHandoffCache()
+        cache.put_many(100, [_msg(1), _msg(3)])
+
+        found, missing = cache.get_many(100, [1, 2, 3, 4])
+        assert set(found) == {1, 3}
+        assert missing == [2, 4]
+        # 部分命中仍需回源，不计入节省的调用
+        assert cache.get_stats()["saved_api_calls"] == 0
+
+    def test_ttl_expiry(self):
+        cache = MessageHandoffCache(ttl_seconds=0.01)
+        cache.put(100, _msg(1))
+        time.sleep(0.02)
+
+        assert cache.get(100, 1) is None
+        assert len(cache) == 0
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_entry_limit_evicts_lru(self):
+        cache = MessageHandoffCache(max_entries=2)
+        cache.put(100, _msg(1))
+        cache.put(100, _msg(2))
+        cache.get(100, 1)  # 1 变为最近使用
+        cache.put(100, _msg(3))
+
+        assert cache.get(100, 2) is None
+        assert cache.get(100, 1) is not None
+        assert cache.get(100, 3) is not None
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_byte_budget_evicts(self):
+        cache = MessageHandoffCache(max_bytes=10_000)
+        for i in range(10):
+            cache.put(100, _msg(i, "x" * 1000))
+
+        stats = cache.get_stats()
+        assert stats["bytes"] <= 10_000
+        assert stats["entries"] < 10
+        assert cache.get(100, 9) is not None
+
+    def test_keys_are_scoped_by_chat(self):
+        cache = MessageHandoffCache()
+        cache.put(100, _msg(1))
+        assert cache.get(200, 1) is None
+
+
+def _worker_cls():
+    from services.worker_service import WorkerService
+    if not isinstance(WorkerService, type):
+        # tests/unit/handlers/conftest.py 会把 services.worker_service 替换为 MagicMock
+        pytest.skip("services.worker_service 已被 mock")
+    return WorkerService
+
+
+@pytest.mark.asyncio
+async def test_worker_fetch_messages_only_fetches_misses():
+    WorkerService = _worker_cls()
+    cache = MessageHandoffCache()
+    cached = _msg(10)
+    cache.put(555, cached)
+    fetched = _msg(11)
+
+    worker = WorkerService(MagicMock(), MagicMock(), MagicMock())
+    with patch("services.worker_service.message_handoff_cache", cache), \
+         patch("services.message_fetch_coalescer.get_messages_queued", AsyncMock(return_value=[fetched])) as mock_get:
+        result = await worker._fetch_messages(555, [10, 11])
+
+    mock_get.assert_awaited_once()
+    assert mock_get.call_args.kwargs["ids"] == [11]
+    assert result == [cached, fetched]
+
+
+@pytest.mark.asyncio
+async def test_worker_fetch_messages_full_hit_skips_api():
+    WorkerService = _worker_cls()
+
+    cache = MessageHandoffCache()
+    cache.put_many(555, [_msg(1), _msg(2)])
+
+    worker = WorkerService(MagicMock(), MagicMock(), MagicMock())
+    with patch("services.worker_service.message_handoff_cache", cache), \
+         patch("services.message_fetch_coalescer.get_messages_queued", AsyncMock()) as mock_get:
+        result = await worker._fetch_messages(555, [1, 2])
+
+    mock_get.assert_not_awaited()
+    assert [m.id for m in result] == [1, 2]
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from services.queue_service import MessageQueueService
+from services.queue_spool import QueueSpool
+
+
+def _item(mid, priority=10):
+    return ("process_message", {"chat_id": 100, "message_id": mid}, priority)
+
+
+class TestQueueSpool:
+    def test_recover_returns_unacked_in_order(self, tmp_path):
+        spool = QueueSpool(tmp_path)
+        assert spool.recover() == []
+        s1 = spool.append(_item(1))
+        s2 = spool.append(_item(2))
+        s3 = spool.append(_item(3))
+        spool.ack([s2])
+
+        reopened = QueueSpool(tmp_path)
+        recovered = reopened.recover()
+        assert [seq for seq, _ in recovered] == [s1, s3]
+        assert recovered[0][1] == _item(1)
+        # 新序号接续，不与未提交记录冲突
+        assert reopened.append(_item(4)) == s3 + 1
+
+    def test_truncated_tail_is_ignored(self, tmp_path):
+        spool = QueueSpool(tmp_path)
+        spool.recover()
+        spool.append(_item(1))
+        segment = spool._segments[-1].path
+        with open(segment, "a", encoding="utf-8") as f:
+            f.write('{"s": 99, "i": ["process_')
+
+        recovered = QueueSpool(tmp_path).recover()
+        assert [item for _, item in recovered] == [_item(1)]
+
+    def test_segments_rotate_and_acked_prefix_is_removed(self, tmp_path):
+        spool = QueueSpool(tmp_path, segment_bytes=200)
+        spool.recover()
+        seqs = [spool.append(_item(i)) for i in range(10)]
+        assert len(list(tmp_path.glob("spool-*.log"))) > 1
+
+        spool.ack(seqs)
+        # 只保留当前活动分段
+        assert len(list(tmp_path.glob("spool-*.log"))) == 1
+        assert QueueSpool(tmp_path).recover() == []
+
+    def test_recover_with_ack_only_last_segment(self, tmp_path):
+        spool = QueueSpool(tmp_path, segment_bytes=60)
+        spool.recover()
+        s1 = spool.append(_item(1))
+        s2 = spool.append(_item(2))
+        # 确认记录落在新滚动出的分段中，该分段不含任何入队记录
+        spool.ack([s2])
+        last = spool._segments[-1].path
+        assert last.name != spool._seq_segment[s1].path.name
+
+        reopened = QueueSpool(tmp_path, segment_bytes=60)
+        assert [seq for seq, _ in reopened.recover()] == [s1]
+        # 续写同一活动分段，而不是登记两次后把它当作已完成分段删除
+        assert reopened._segments[-1].path == last
+        assert len({seg.path for seg in reopened._segments}) == len(reopened._segments)
+        reopened.ack([s1])
+        s3 = reopened.append(_item(3))
+        assert last.exists()
+        assert [seq for seq, _ in QueueSpool(tmp_path).recover()] == [s3]
+
+    def test_failed_batch_is_carried_forward_then_dropped(self, tmp_path):
+        spool = QueueSpool(tmp_path, segment_bytes=60, max_retries=2)
+        spool.recover()
+        seqs = [spool.append(_item(1))]
+        first_segment = spool._segments[0].path
+
+        seqs = spool.retry(seqs, [_item(1)])
+        assert seqs[0] is not None
+        # 旧序号已确认，旧分段不再被钉住
+        assert not first_segment.exists()
+
+        reopened = QueueSpool(tmp_path, max_retries=2)
+        recovered = reopened.recover()
+        assert recovered == [(seqs[0], _item(1))]
+
+        seqs = reopened.retry(seqs, [_item(1)])
+        assert seqs[0] is not None
+        assert reopened.retry(seqs, [_item(1)]) == [None]
+        assert reopened.get_stats()["dropped"] == 1
+        assert QueueSpool(tmp_path).recover() == []
+
+    def test_unserializable_item_is_not_spooled(self, tmp_path):
+        spool = QueueSpool(tmp_path)
+        spool.recover()
+        assert spool.append(("process_message", {"obj": object()}, 0)) is None
+        assert spool.get_stats()["outstanding"] == 0
+
+    @pytest.mark.asyncio
+    async def test_close_removes_segments_when_fully_acked(self, tmp_path):
+        spool = QueueSpool(tmp_path)
+        spool.recover()
+        spool.start()
+        spool.ack([spool.append(_item(1))])
+        await spool.close()
+        assert list(tmp_path.glob("spool-*.log")) == []
+
+
+@pytest.mark.asyncio
+async def test_queue_service_replays_uncommitted_batch(tmp_path):
+    # 第一轮：提交失败，条目保留在 spool 中
+    failing = MessageQueueService(max_size=10, workers=1, spool=QueueSpool(tmp_path))
+
+    async def _fail(batch):
+        raise RuntimeError("db locked")
+
+    failing.set_processor(_fail)
+    await failing.start()
+    await failing.enqueue(_item(1))
+    await failing.enqueue(_item(2, priority=95))
+    await failing.stop()
+    assert failing.spool.get_stats()["outstanding"] == 2
+
+    # 第二轮：重启后自动重放并在提交成功后写入检查点
+    committed = []
+
+    async def _commit(batch):
+        committed.extend(batch)
+
+    restarted = MessageQueueService(max_size=10, workers=1, spool=QueueSpool(tmp_path))
+    restarted.set_processor(_commit)
+    await restarted.start()
+    for _ in range(50):
+        if len(committed) == 2:
+            break
+        await asyncio.sleep(0.01)
+    await restarted.stop()
+
+    assert sorted(item[1]["message_id"] for item in committed) == [1, 2]
+    assert restarted.spool.get_stats()["outstanding"] == 0
+    assert list(tmp_path.glob("spool-*.log")) == []
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timezone
@@ -22,6 +24,7 @@ def mock_container():
         
         # Mock Task Repo
         mock.task_repo.push = AsyncMock()
+        mock.task_repo.push_batch = AsyncMock()
         mock.task_repo.get_queue_status = AsyncMock(return_value={'active_queues': 0})
         
         # Mock User Client
@@ -86,6 +89,8 @@ async def test_start_history_task_success(session_service, mock_container, mock_
     mock_session.execute.return_value = mock_result
     
     mock_session.get.return_value = mock_chat
+    mock_rule.source_chat = mock_chat
+    mock_container.rule_repo.get_by_id = AsyncMock(return_value=mock_rule)
 
     # Mock iter_messages (Async Generator)
     async def mock_iter(*args, **kwargs):
@@ -112,11 +117,12 @@ async def test_start_history_task_success(session_service, mock_container, mock_
     assert progress['total'] == 0
     assert progress['done'] == 1
     
-    # Check push called
-    mock_container.task_repo.push.assert_called_once()
-    args, kwargs = mock_container.task_repo.push.call_args
-    # "process_message" is args[0], payload is args[1]
-    payload = args[1] if len(args) > 1 else kwargs['payload']
+    # Check push_batch called
+    mock_container.task_repo.push_batch.assert_called_once()
+    args, kwargs = mock_container.task_repo.push_batch.call_args
+    # tasks_data: [("process_message", payload, priority)]
+    (task_type, payload, priority), = args[0]
+    assert task_type == "process_message"
     assert payload['chat_id'] == 999
     assert payload['target_chat_id'] == 888
 
@@ -135,6 +141,8 @@ async def test_backpressure_logic(session_service, mock_container, mock_rule_mgm
     mock_result.scalar_one_or_none.return_value = mock_rule
     mock_session.execute.return_value = mock_result
     mock_session.get.return_value = MagicMock(telegram_chat_id=100)
+    mock_rule.source_chat = MagicMock(telegram_chat_id=100)
+    mock_container.rule_repo.get_by_id = AsyncMock(return_value=mock_rule)
 
     # Produce 150 messages (trigger backpressure check at 100)
     async def mock_iter(*args, **kwargs):
@@ -169,3 +177,56 @@ async def test_backpressure_logic(session_service, mock_container, mock_rule_mgm
     assert progress['done'] == 150, f"Only processed {progress['done']} messages, expected 150"
     
     assert mock_container.task_repo.get_queue_status.call_count >= 1, f"Call count: {mock_container.task_repo.get_queue_status.call_count}"
+
+
+@pytest.mark.asyncio
+async def test_history_task_pushes_pages_and_hands_off_messages(session_service, mock_container, mock_forward_settings):
+    user_id = 333
+    rule_id = 444
+    rule = MagicMock()
+    rule.source_chat.telegram_chat_id = 100
+    rule.target_chat.telegram_chat_id = 200
+    mock_container.rule_repo.get_by_id = AsyncMock(return_value=rule)
+
+    # 10 条文本 + 1 条被禁用的视频
+    mock_forward_settings.get_global_media_settings = AsyncMock(
+        return_value={"allow_text": True, "media_types": {"video": False}}
+    )
+
+    async def mock_iter(*args, **kwargs):
+        for i in range(1, 12):
+            msg = MagicMock()
+            msg.id = i
+            msg.date = datetime.now(timezone.utc)
+            msg.media = None
+            if i == 11:
+                msg.media = MagicMock()
+                msg.video = True
+            yield msg
+
+    mock_container.user_client.iter_messages.return_value = mock_iter()
+    session_service._estimate_message_count = AsyncMock(return_value=11)
+    task_info = {'status': 'running'}
+    session_service._get_user_session(user_id)['history_task'] = task_info
+
+    with patch("services.session_service.settings") as mock_settings, \
+         patch("services.session_service.message_handoff_cache") as mock_handoff:
+        mock_settings.HISTORY_PUSH_CHUNK_SIZE = 4
+        mock_settings.HISTORY_PREFETCH_PAGES = 1
+        mock_settings.MESSAGE_HANDOFF_ENABLED = True
+        with patch("core.helpers.history.media_filter.MediaFilter._get_media_type", side_effect=lambda m: "video" if m.media else None):
+            await session_service._run_history_task(user_id, rule_id, {}, asyncio.Event())
+
+    assert task_info['status'] == 'completed'
+    assert task_info['done'] == 11
+    assert task_info['forwarded'] == 10
+    assert task_info['filtered'] == 1
+
+    # 每页一次批量写入，逐条 push 不再使用
+    batches = [c.args[0] for c in mock_container.task_repo.push_batch.call_args_list]
+    assert [len(b) for b in batches] == [4, 4, 2]
+    assert [p['message_id'] for b in batches for _, p, _ in b] == list(range(1, 11))
+    mock_container.task_repo.push.assert_not_called()
+
+    handed_off = [m.id for c in mock_handoff.put_many.call_args_list for m in c.args[1]]
+    assert handed_off == list(range(1, 11))
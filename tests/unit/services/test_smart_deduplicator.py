@@ -148,3 +148,77 @@ async def test_readonly_mode(dedup, msg):
         
         # Verify memory cache NOT updated
         assert str(chat_id) not in dedup.time_window_cache
+
+@pytest.mark.asyncio
+async def test_near_index_hit_and_hibernate_roundtrip(dedup, msg):
+    """SimHash 近邻索引命中需经海明距离校验，且冬眠/唤醒后保留"""
+    chat_id = 777
+    msg.message = "Breaking news: the quick brown fox jumps over the lazy dog today"
+    config = {'enable_smart_similarity': True, 'enable_time_window': False, 'enable_content_hash': False}
+
+    fp = tools.calculate_simhash(tools.clean_text_for_hash(msg.message, True))
+    dedup.near_index.add(fp ^ 0b1, doc_id=1, scope=str(chat_id))
+    dedup.near_index.add(fp ^ 0xFFFF, doc_id=2, scope="other")
+
+    is_dup, reason = await dedup.check_duplicate(msg, chat_id, config, readonly=True)
+    assert is_dup and "近邻" in reason
+
+    state = dedup._hibernate_state()
+    assert len(dedup.near_index) == 0
+    dedup._wakeup_state(state)
+    assert dedup.near_index.nearest(fp, scope=str(chat_id))[0] == "1"
+
+
+@pytest.mark.asyncio
+async def test_near_index_doc_ids_do_not_collide_across_sources(dedup):
+    """不同来源会话的同号消息转发到同一目标时各自保留指纹"""
+    target = 888
+    texts = [
+        "Source one reports the quick brown fox jumps over the lazy dog",
+        "Completely different announcement about weekend maintenance window",
+    ]
+    msgs = []
+    for source, text in zip((1001, 1002), texts):
+        m = MagicMock(id=42, chat_id=source, message=text, photo=None, video=None,
+                      document=None, sticker=None, media=None, grouped_id=None)
+        msgs.append(m)
+        await dedup.record_message(m, target)
+    assert len(dedup.near_index) == 2
+
+    dedup._repo.delete_media_signature = AsyncMock()
+    dedup._repo.delete_content_hash = AsyncMock()
+    await dedup.remove_message(msgs[0], target)
+    assert len(dedup.near_index) == 1
+
+
+@pytest.mark.asyncio
+async def test_fp_ring_sized_independently_and_follows_removal(dedup):
+    """指纹环按 fp_ring_capacity 定长 (不受 text_fp_cache 上限约束)，回滚的消息不再参与相似度比对"""
+    pytest.importorskip("numpy")
+    target = 999
+    dedup.config.max_text_fp_cache_size = 2
+    dedup.config.fp_ring_capacity = 10
+    dedup._repo.delete_media_signature = AsyncMock()
+    dedup._repo.delete_content_hash = AsyncMock()
+    texts = [
+        "First bulletin about the quarterly earnings of the company",
+        "Second bulletin regarding the new office opening downtown",
+        "Third bulletin covering the annual sports event results",
+    ]
+    msgs = []
+    for i, text in enumerate(texts):
+        m = MagicMock(id=i, chat_id=1, message=text, photo=None, video=None,
+                      document=None, sticker=None, media=None, grouped_id=None)
+        msgs.append(m)
+        await dedup.record_message(m, target)
+
+    ring = dedup.fp_rings[str(target)]
+    assert ring.capacity == 10
+    assert len(ring) == 3
+    assert len(dedup.text_fp_cache[str(target)]) == 2
+    removed_fp = list(dedup.text_fp_cache[str(target)])[-1]
+
+    await dedup.remove_message(msgs[-1], target)
+    assert removed_fp not in dedup.text_fp_cache[str(target)]
+    assert removed_fp not in ring.to_state()["fps"]
+    assert len(ring.to_state()["fps"]) == 2
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.helpers.task_signal import TaskSignal, WAKE_DEADLINE, WAKE_POLL, WAKE_SIGNAL
+from services.task_dispatcher import TaskDispatcher
+
+
+def _task(tid):
+    task = MagicMock()
+    task.id = tid
+    task.task_data = '{"chat_id": 1, "message_id": %d}' % tid
+    task.grouped_id = None
+    return task
+
+
+class TestTaskSignal:
+    @pytest.mark.asyncio
+    async def test_notify_wakes_waiter(self):
+        signal = TaskSignal()
+        waiter = asyncio.create_task(signal.wait(5.0))
+        await asyncio.sleep(0.01)
+        signal.notify()
+        assert await asyncio.wait_for(waiter, 1.0) == WAKE_SIGNAL
+
+    @pytest.mark.asyncio
+    async def test_notify_before_wait_is_not_lost(self):
+        signal = TaskSignal()
+        signal.clear()
+        signal.notify()
+        assert await signal.wait(5.0) == WAKE_SIGNAL
+
+    @pytest.mark.asyncio
+    async def test_deadline_wakes_at_due_time(self):
+        signal = TaskSignal()
+        signal.schedule(datetime.utcnow() + timedelta(milliseconds=50))
+        start = time.monotonic()
+        assert await signal.wait(5.0) == WAKE_DEADLINE
+        assert time.monotonic() - start < 1.0
+        assert signal.pending_deadlines() == 0
+
+    @pytest.mark.asyncio
+    async def test_schedule_rearms_without_signal(self):
+        signal = TaskSignal()
+        waiter = asyncio.create_task(signal.wait(5.0))
+        await asyncio.sleep(0.01)
+        # 更早的到期时间只会缩短等待，不会伪装成新任务通知
+        signal.schedule(datetime.utcnow() + timedelta(milliseconds=30))
+        assert await asyncio.wait_for(waiter, 1.0) == WAKE_DEADLINE
+
+    @pytest.mark.asyncio
+    async def test_poll_fallback(self):
+        signal = TaskSignal()
+        assert await signal.wait(0.02) == WAKE_POLL
+
+    def test_past_due_schedule_is_notify(self):
+        signal = TaskSignal()
+        signal.schedule(datetime.utcnow() - timedelta(seconds=1))
+        assert signal.pending_deadlines() == 0
+        assert signal.notifications == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_wakes_on_push_signal():
+    signal = TaskSignal()
+    repo = MagicMock()
+    repo.get_pending_due_times = AsyncMock(return_value=[])
+    pending = []
+
+    async def _fetch_next(limit=1):
+        batch, pending[:] = pending[:limit], pending[limit:]
+        return batch
+
+    repo.fetch_next = AsyncMock(side_effect=_fetch_next)
+    queue = asyncio.Queue(maxsize=10)
+    with patch("services.task_dispatcher.settings") as mock_settings:
+        mock_settings.TASK_DISPATCHER_BATCH_SIZE = 10
+        dispatcher = TaskDispatcher(repo, queue, signal=signal)
+        dispatcher.min_sleep = dispatcher.current_sleep = 1.0
+        dispatcher.max_sleep = 30.0
+
+        await dispatcher.start()
+        await asyncio.sleep(0.05)
+        idle_fetches = repo.fetch_next.await_count
+
+        pending.append(_task(1))
+        start = time.monotonic()
+        signal.notify()
+        group = await asyncio.wait_for(queue.get(), 1.0)
+        latency = time.monotonic() - start
+        await dispatcher.stop()
+
+    assert group[0].id == 1
+    assert latency < 0.1
+    assert idle_fetches == 1
+    assert dispatcher.get_stats()["wakeups"][WAKE_SIGNAL] == 1
@@ -123,6 +123,56 @@ class TestArchiveStore:
                 parquet_files = glob.glob(os.path.join(out_dir, "*.parquet"))
                 assert len(parquet_files) >= 3
 
+class TestTextIndexSidecar:
+
+    def test_sidecar_search_across_partitions(self, temp_archive_root):
+        """rule_logs 分区 sidecar：跨分区按 (created_at, id) 由新到旧合并、键集分页、缺失 sidecar 的分区单独返回"""
+        day1 = archive_store._partition_path("rule_logs", datetime(2026, 1, 1))
+        day2 = archive_store._partition_path("rule_logs", datetime(2026, 1, 2))
+        day3 = archive_store._partition_path("rule_logs", datetime(2026, 1, 3))
+        for d in (day1, day2, day3):
+            os.makedirs(d)
+        archive_store._write_text_index("rule_logs", day1, [
+            {"id": 1, "message_text": "你好世界测试", "action": "forwarded", "created_at": datetime(2026, 1, 1, 8)},
+            {"id": 2, "message_text": "nothing here", "action": "filtered", "created_at": datetime(2026, 1, 1, 9)},
+        ])
+        archive_store._write_text_index("rule_logs", day2, [
+            {"id": 3, "message_text": "世界测试世界测试", "action": "forwarded", "created_at": "2026-01-02T10:00:00"},
+        ])
+        # 非索引表不生成 sidecar
+        archive_store._write_text_index("task_queue", day3, [{"id": 9, "message_text": "世界测试"}])
+
+        hits, unindexed = archive_store.search_text_index("rule_logs", '"世界测"', limit=10)
+        assert hits == [
+            ("2026-01-02 10:00:00.000000", 3, day2),
+            ("2026-01-01 08:00:00.000000", 1, day1),
+        ]
+        assert unindexed == [day3]
+
+        page2, _ = archive_store.search_text_index("rule_logs", '"世界测"', limit=10, after=hits[0][:2])
+        assert [h[1] for h in page2] == [1]
+
+    def test_sidecar_search_stops_after_newest_partitions(self, temp_archive_root):
+        """凑满 limit 后不再检索更旧的分区；整体不早于游标的分区直接跳过"""
+        days = [archive_store._partition_path("rule_logs", datetime(2026, 2, d)) for d in (1, 2, 3)]
+        for i, d in enumerate(days, start=1):
+            os.makedirs(d)
+            archive_store._write_text_index("rule_logs", d, [
+                {"id": i, "message_text": "世界测试", "action": "forwarded", "created_at": datetime(2026, 2, i, 12)},
+            ])
+
+        real_connect = archive_store.sqlite3.connect
+        with patch.object(archive_store.sqlite3, "connect", side_effect=real_connect) as connect:
+            hits, _ = archive_store.search_text_index("rule_logs", '"世界测"', limit=1)
+        assert [h[1] for h in hits] == [3]
+        # 3 次键区间探测 + 仅最新分区 1 次 MATCH
+        assert connect.call_count == 4
+
+        with patch.object(archive_store.sqlite3, "connect", side_effect=real_connect) as connect:
+            page2, _ = archive_store.search_text_index("rule_logs", '"世界测"', limit=1, after=hits[0][:2])
+        assert [h[1] for h in page2] == [2]
+        assert connect.call_count == 4
+
 class TestArchiveErrorRecovery:
     
     def test_write_io_error_cleanup(self, temp_archive_root):
@@ -1,8 +1,10 @@
 """
 AC自动机单元测试
 """
+import random
+
 import pytest
-from core.algorithms.ac_automaton import ACAutomaton, ACManager
+from core.algorithms.ac_automaton import ACAutomaton, ACManager, MultiRuleAutomaton
 
 
 class TestACAutomaton:
@@ -115,6 +117,71 @@ class TestACAutomaton:
         matches = ac.search("你好世界")
         assert len(matches) == 2
 
+    def test_match_tags(self):
+        """测试标签位汇总 (含失败链继承)"""
+        ac = ACAutomaton()
+        ac.add_keyword("abc", 1)
+        ac.add_keyword("bc", 2)
+        ac.add_keyword("x", 4)
+        ac.build()
+
+        assert ac.match_tags("zabcz") == 3
+        assert ac.match_tags("bcx") == 6
+        assert ac.match_tags("bcx", stop_mask=2) == 2
+        assert ac.match_tags("none") == 0
+
+    def test_add_after_build_raises(self):
+        """构建后不可再添加关键词"""
+        ac = ACAutomaton()
+        ac.add_keyword("a")
+        ac.build()
+        with pytest.raises(RuntimeError):
+            ac.add_keyword("b")
+
+    def test_matches_naive_substring_search(self):
+        """随机关键词/文本与朴素子串查找结果一致"""
+        rng = random.Random(7)
+        alphabet = "abc你好"
+        for _ in range(200):
+            keywords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 10))]
+            ac = ACAutomaton()
+            for kw in keywords:
+                ac.add_keyword(kw)
+            ac.build()
+            for _ in range(10):
+                text = "".join(rng.choice(alphabet + "xy") for _ in range(rng.randint(0, 25)))
+                expected = sorted(i for i, kw in enumerate(keywords) if kw in text)
+                assert ac.search(text) == expected
+                assert ac.has_any_match(text) == bool(expected)
+
+
+class TestMultiRuleAutomaton:
+    """测试多规则合并自动机"""
+
+    def test_match_rules_single_scan(self):
+        """一次扫描返回所有命中的规则"""
+        multi = MultiRuleAutomaton({
+            10: ["apple", "pear"],
+            20: ["pie"],
+            30: ["banana"],
+            40: ["apple"],
+        })
+        assert multi.match_rules("apple pie") == {10, 20, 40}
+        assert multi.match_rules("banana") == {30}
+        assert multi.match_rules("nothing") == set()
+        assert multi.match_mask("pear") == multi.bit_of(10)
+
+    def test_arbitrary_rule_keys(self):
+        """规则键可为任意可哈希对象"""
+        multi = MultiRuleAutomaton({(1, "w"): ["ok"], (1, "b"): ["bad"], (2, "b"): [""]})
+        assert multi.match_rules("ok bad") == {(1, "w"), (1, "b")}
+        assert multi.bit_of((3, "w")) == 0
+
+    def test_empty(self):
+        """无规则"""
+        multi = MultiRuleAutomaton({})
+        assert multi.match_rules("anything") == set()
+
 
 class TestACManager:
     """测试AC自动机管理器"""
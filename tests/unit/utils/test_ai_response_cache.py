@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from ai.response_cache import AIResponseCache, make_key
+
+
+def test_key_normalizes_text_but_not_prompt_or_images():
+    base = make_key("openai", "gpt-4o", "p", "hello \r\nworld  ")
+    assert make_key("openai", "gpt-4o", "p", "hello\nworld") == base
+    assert make_key("openai", "gpt-4o", "p2", "hello\nworld") != base
+    assert make_key("openai", "gpt-4o-mini", "p", "hello\nworld") != base
+    assert make_key("openai", "gpt-4o", "p", "hello\nworld", [{"data": "x", "mime_type": "image/png"}]) != base
+
+
+@pytest.mark.asyncio
+async def test_hit_and_lru_eviction():
+    cache = AIResponseCache(max_entries=2, ttl=60)
+    calls = []
+
+    async def call(v):
+        calls.append(v)
+        return f"r-{v}"
+
+    assert await cache.get_or_call("a", lambda: call("a")) == "r-a"
+    assert await cache.get_or_call("a", lambda: call("a")) == "r-a"
+    await cache.get_or_call("b", lambda: call("b"))
+    await cache.get_or_call("c", lambda: call("c"))
+    # a 被淘汰
+    await cache.get_or_call("a", lambda: call("a"))
+    assert calls == ["a", "b", "c", "a"]
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 4
+    assert stats["saved_tokens"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call():
+    cache = AIResponseCache()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    calls = 0
+
+    async def slow():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await release.wait()
+        return "summary"
+
+    tasks = [asyncio.create_task(cache.get_or_call("k", slow)) for _ in range(5)]
+    await started.wait()
+    release.set()
+    assert await asyncio.gather(*tasks) == ["summary"] * 5
+    assert calls == 1
+    assert cache.get_stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_failures_and_error_text_are_not_cached():
+    cache = AIResponseCache()
+
+    async def boom():
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_call("k", boom)
+
+    async def error_text():
+        return "AI处理失败: timeout"
+
+    assert await cache.get_or_call("k", error_text) == "AI处理失败: timeout"
+    assert await cache.get_or_call("k", error_text) == "AI处理失败: timeout"
+    assert cache.get_stats()["entries"] == 0
@@ -2,7 +2,7 @@
 布隆过滤器单元测试
 """
 import pytest
-from core.algorithms.bloom_filter import BloomFilter, GlobalBloomFilter
+from core.algorithms.bloom_filter import BLOCK_BYTES, BloomFilter, GlobalBloomFilter
 
 
 class TestBloomFilter:
@@ -52,6 +52,17 @@ class TestBloomFilter:
         actual_rate = false_positives / test_count
         assert actual_rate < 0.05, f"假阳性率过高: {actual_rate}"
     
+    @pytest.mark.parametrize("capacity,error_rate", [(20000, 0.001), (20000, 0.0005)])
+    def test_false_positive_rate_meets_target(self, capacity, error_rate):
+        """测试满载时实测假阳性率不超过设定值 (允许统计波动)"""
+        bf = BloomFilter(capacity=capacity, error_rate=error_rate)
+        for i in range(capacity):
+            bf.add(f"item_{i}")
+
+        probes = 200000
+        false_positives = sum(1 for i in range(probes) if f"probe_{i}" in bf)
+        assert false_positives / probes <= error_rate * 1.2
+
     def test_empty_filter(self):
         """测试空过滤器"""
         bf = BloomFilter()
@@ -67,6 +78,57 @@ class TestBloomFilter:
         assert "test" in bf
         assert bf.count == 3  # 计数会增加
 
+    def test_bits_within_one_block(self):
+        """测试每个元素的位都落在同一个 64 字节块内"""
+        bf = BloomFilter(capacity=1000, error_rate=0.01)
+        bf.add("only")
+        touched = [i // BLOCK_BYTES for i, byte in enumerate(bf.bit_array) if byte]
+        assert len(set(touched)) == 1
+        assert sum(bin(byte).count("1") for byte in bf.bit_array) <= bf.hash_count
+
+
+class TestBloomFilterPersistence:
+    """测试 mmap 持久化"""
+
+    def test_reopen_keeps_members(self, tmp_path):
+        path = tmp_path / "f.bbf"
+        bf = BloomFilter(capacity=10000, error_rate=0.001, filepath=str(path))
+        for i in range(500):
+            bf.add(f"k{i}")
+        bf.close()
+
+        reopened = BloomFilter(capacity=10000, error_rate=0.001, filepath=str(path))
+        assert reopened.count == 500
+        assert all(f"k{i}" in reopened for i in range(500))
+        reopened.close()
+
+    def test_lazy_filter_maps_on_first_use(self, tmp_path):
+        path = tmp_path / "lazy.bbf"
+        bf = BloomFilter(capacity=1000, error_rate=0.01, filepath=str(path), lazy=True)
+        assert not path.exists()
+        bf.save()
+        assert not path.exists()
+
+        assert "x" not in bf
+        assert path.exists()
+        bf.add("x")
+        bf.close()
+        assert "x" in BloomFilter(capacity=1000, error_rate=0.01, filepath=str(path), lazy=True)
+
+    def test_incompatible_file_is_recreated(self, tmp_path):
+        path = tmp_path / "f.bbf"
+        path.write_bytes(b"legacy pickle payload")
+        bf = BloomFilter(capacity=1000, error_rate=0.01, filepath=str(path))
+        assert bf.count == 0
+        assert "x" not in bf
+        bf.add("x")
+        bf.close()
+
+        # 容量变化同样重建
+        bf = BloomFilter(capacity=50000, error_rate=0.01, filepath=str(path))
+        assert bf.count == 0
+        bf.close()
+
 
 class TestGlobalBloomFilter:
     """测试全局布隆过滤器管理器"""
@@ -0,0 +1,121 @@
+"""
+多索引海明近邻表单元测试
+"""
+import random
+
+import pytest
+from core.algorithms.hamming_index import HammingIndex
+
+
+def _flip(fp, bits, rng):
+    for pos in rng.sample(range(64), bits):
+        fp ^= 1 << pos
+    return fp
+
+
+class TestHammingIndex:
+    """测试 HammingIndex 基本功能"""
+
+    def test_recall_and_exact_verification(self):
+        """与暴力搜索结果完全一致 (距离 <= k 必召回，且无超距结果)"""
+        rng = random.Random(3)
+        idx = HammingIndex(k=3)
+        base = [rng.getrandbits(64) for _ in range(50)]
+        stored = {}
+        for i in range(2000):
+            fp = _flip(rng.choice(base), rng.randint(0, 8), rng)
+            idx.add(fp, doc_id=i)
+            stored[str(i)] = fp
+
+        for _ in range(200):
+            query = _flip(rng.choice(base), rng.randint(0, 5), rng)
+            for k in (0, 1, 3):
+                expected = {doc for doc, fp in stored.items() if (fp ^ query).bit_count() <= k}
+                got = idx.query(query, k=k)
+                assert {doc for doc, _, _ in got} == expected
+                assert all(dist <= k for _, _, dist in got)
+
+    def test_nearest_orders_by_distance(self):
+        """最近项优先"""
+        idx = HammingIndex(k=3)
+        idx.add(0b111, doc_id="far")
+        idx.add(0b1, doc_id="near")
+        assert idx.nearest(0) == ("near", 0b1, 1)
+        assert idx.query(0, k=0) == []
+
+    def test_remove_and_replace(self):
+        """按文档 ID 删除与替换"""
+        idx = HammingIndex(k=2)
+        idx.add(0xABCD, doc_id=1)
+        idx.add(0xFFFF0000, doc_id=1)
+        assert len(idx) == 1
+        assert not idx.contains_near(0xABCD)
+        assert idx.remove(1)
+        assert not idx.remove(1)
+        assert len(idx) == 0 and idx.get_stats()["scopes"] == 0
+
+        idx.add(0x1234)
+        idx.add(0x1234)
+        assert idx.remove_fingerprint(0x1234) == 2
+
+    def test_scope_isolation(self):
+        """不同作用域互不可见"""
+        idx = HammingIndex(k=3)
+        idx.add(42, doc_id="a", scope="chat1")
+        assert idx.contains_near(42, scope="chat1")
+        assert not idx.contains_near(42, scope="chat2")
+        assert idx.clear_scope("chat1") == 1
+
+    def test_ttl_expiry(self):
+        """过期条目不再命中并可被清理"""
+        idx = HammingIndex(k=1, ttl=10)
+        idx.add(7, doc_id="x", now=100.0)
+        idx.add(6, doc_id="y", ttl=0, now=100.0)
+        assert idx.contains_near(7)
+        assert [doc for doc, _, _ in idx.query(7, now=111.0)] == ["y"]
+        assert idx.expire(now=111.0) == 1
+        assert len(idx) == 1
+
+    def test_max_entries_evicts_oldest(self):
+        """超出上限时淘汰最早写入的条目"""
+        idx = HammingIndex(k=1, max_entries=3)
+        for i in range(5):
+            idx.add(1 << (i * 8), doc_id=i)
+        assert len(idx) == 3
+        assert not idx.contains_near(1)
+        assert idx.contains_near(1 << 32)
+        assert idx.get_stats()["evictions"] == 2
+
+    def test_snapshot_roundtrip(self, tmp_path):
+        """快照落盘与恢复，损坏的尾行被忽略"""
+        path = tmp_path / "near.jsonl"
+        idx = HammingIndex(k=3, ttl=3600)
+        idx.add((1 << 63) | 5, doc_id="m1", scope="100")
+        idx.add(99, doc_id="m2", scope="200", ttl=0)
+        idx.save(path)
+        assert not idx.dirty
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('["300", "m3", 1')
+
+        restored = HammingIndex(k=3)
+        assert restored.load(path) == 2
+        assert restored.nearest((1 << 63) | 4, scope="100")[0] == "m1"
+        assert restored.contains_near(99, scope="200")
+        assert HammingIndex(k=3).load(tmp_path / "missing.jsonl") == 0
+
+    def test_invalid_k(self):
+        """k 越界"""
+        with pytest.raises(ValueError):
+            HammingIndex(k=64)
+
+
+def test_expiry_heap_stays_bounded_under_eviction_and_replacement():
+    """上限淘汰与 doc_id 替换不会让过期堆无限增长"""
+    idx = HammingIndex(k=3, max_entries=100, ttl=3600)
+    for i in range(20000):
+        idx.add(i * 0x9E3779B97F4A7C15 & ((1 << 64) - 1), doc_id=i % 150, now=1000.0)
+    assert len(idx) == 100
+    assert len(idx._expiry) <= 2 * len(idx)
+    # 重建后过期仍按 TTL 生效
+    assert idx.expire(now=1000.0 + 3601) == 100
+    assert len(idx) == 0
@@ -120,6 +120,53 @@ class TestHyperLogLog:
         # 高精度应该更准确
         assert error_high < error_low
 
+    def test_sparse_to_dense(self):
+        """测试低基数稀疏表示，超过阈值后转为稠密寄存器"""
+        hll = HyperLogLog(b=10)
+        for i in range(50):
+            hll.add(i)
+        assert hll.is_sparse
+
+        for i in range(50, 5000):
+            hll.add(i)
+        assert not hll.is_sparse
+        assert len(hll.registers) == 1024
+
+    def test_merge_is_union(self):
+        """测试按寄存器取最大值合并 (稀疏与稠密混合)"""
+        a, b, both = HyperLogLog(b=12), HyperLogLog(b=12), HyperLogLog(b=12)
+        for i in range(20000):
+            a.add(i)
+            both.add(i)
+        for i in range(15000, 15100):
+            b.add(i)
+            both.add(i)
+        for i in range(30000, 30100):
+            b.add(i)
+            both.add(i)
+
+        a.merge(b)
+        assert a.count() == both.count()
+
+        with pytest.raises(ValueError):
+            a.merge(HyperLogLog(b=10))
+
+    def test_serialization_roundtrip(self):
+        """测试序列化：稀疏格式紧凑，往返后估计值不变"""
+        small = HyperLogLog(b=14)
+        for i in range(100):
+            small.add(i)
+        data = small.to_bytes()
+        assert len(data) < 400
+        assert HyperLogLog.from_bytes(data).count() == small.count()
+
+        large = HyperLogLog(b=14)
+        for i in range(50000):
+            large.add(i)
+        restored = HyperLogLog.from_bytes(large.to_bytes())
+        assert restored.registers == large.registers
+        assert restored.count() == large.count()
+
 
 class TestGlobalHLL:
     """测试全局HLL管理器"""
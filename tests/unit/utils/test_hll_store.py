@@ -0,0 +1,104 @@
+"""
+HLL 基数存储单元测试
+"""
+import threading
+
+import pytest
+
+from repositories.hll_store import HLLStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = HLLStore(str(tmp_path / "hll.db"), precision=12)
+    yield s
+    s.close()
+
+
+def test_count_includes_unflushed_and_survives_restart(store, tmp_path):
+    """未落库的增量参与查询，落库后重启仍可查询"""
+    for sender in range(300):
+        store.add("senders", 100, sender, day="2026-10-01")
+    assert store.count("senders", "2026-10-01") == pytest.approx(300, rel=0.05)
+
+    assert store.flush() == 2  # 聊天 100 + 全局汇总
+    store.close()
+
+    reopened = HLLStore(str(tmp_path / "hll.db"), precision=12)
+    try:
+        assert reopened.count("senders", "2026-10-01", scopes=[100]) == pytest.approx(300, rel=0.05)
+    finally:
+        reopened.close()
+
+
+def test_union_across_days_and_chats(store):
+    """跨日期、跨聊天的并集按元素去重"""
+    # 同一批发送者在两个聊天、三天中重复出现
+    for day in ("2026-10-01", "2026-10-02", "2026-10-03"):
+        for chat in (1, 2):
+            for sender in range(1000):
+                store.add("senders", chat, sender, day=day)
+        store.flush()
+    for sender in range(1000, 1500):
+        store.add("senders", 3, sender, day="2026-10-02")
+
+    assert store.count("senders", "2026-10-01", "2026-10-03") == pytest.approx(1500, rel=0.05)
+    assert store.count("senders", "2026-10-01", "2026-10-03", scopes=[1, 2]) == pytest.approx(1000, rel=0.05)
+    assert store.count("senders", "2026-10-03", scopes=[3]) == 0
+    assert store.count("messages", "2026-10-01", "2026-10-03") == 0
+
+
+def test_flush_merges_into_existing_rows_and_prune(store):
+    """多次落库在库内按寄存器取最大值合并，过期草图可清理"""
+    for sender in range(500):
+        store.add("senders", 1, sender, day="2026-01-01")
+    store.flush()
+    for sender in range(250, 750):
+        store.add("senders", 1, sender, day="2026-01-01")
+    store.flush()
+
+    assert store.count("senders", "2026-01-01", scopes=[1]) == pytest.approx(750, rel=0.05)
+    assert store.prune("2026-06-01") == 2
+    assert store.count("senders", "2026-01-01") == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_async_restores_deltas_on_failure(store, monkeypatch):
+    """落库失败时增量放回内存，下次刷新不丢数据"""
+    store.add("messages", 1, "1:1", day="2026-10-01")
+
+    def boom(pending):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(store, "_write", boom)
+    with pytest.raises(RuntimeError):
+        await store.flush_async()
+    monkeypatch.undo()
+
+    assert store.get_stats()["pending_sketches"] == 2
+    assert await store.flush_async() == 2
+    assert store.count("messages", "2026-10-01", scopes=[1]) == 1
+
+
+@pytest.mark.asyncio
+async def test_count_async_reads_in_thread_and_keeps_flushing_deltas(store, monkeypatch):
+    """异步查询在线程中读库；读库期间完成的落库不会使增量丢失"""
+    for sender in range(200):
+        store.add("senders", 1, sender, day="2026-10-01")
+    store.flush()
+    for sender in range(200, 400):
+        store.add("senders", 1, sender, day="2026-10-01")
+
+    loop_thread = threading.get_ident()
+    read_union = store._read_union
+
+    def read_then_flush(*args):
+        # 读库后才落库：新增量不在本次读取的结果中，只能来自快照
+        assert threading.get_ident() != loop_thread
+        result = read_union(*args)
+        store.flush()
+        return result
+
+    monkeypatch.setattr(store, "_read_union", read_then_flush)
+    assert await store.count_async("senders", "2026-10-01", scopes=[1]) == pytest.approx(400, rel=0.05)
+    assert store.get_stats()["pending_sketches"] == 0
@@ -0,0 +1,103 @@
+import asyncio
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.cache.media_cache import MediaCache, media_key
+
+
+def _message(doc_id, payload=b"x" * 100, name="video.mp4", calls=None, gate=None):
+    msg = MagicMock()
+    msg.document = MagicMock(id=doc_id)
+    msg.photo = None
+
+    async def download_media(target, **kwargs):
+        if calls is not None:
+            calls.append(doc_id)
+        if gate is not None:
+            await gate.wait()
+        path = os.path.join(target, name) if os.path.isdir(target) else target
+        with open(path, "wb") as f:
+            f.write(payload)
+        return path
+
+    msg.download_media = download_media
+    return msg
+
+
+def test_media_key():
+    assert media_key(_message(7)) == "document:7:full"
+    assert media_key(_message(7), thumb=0) == "document:7:thumb:0"
+    web = MagicMock()
+    web.document = None
+    web.photo = None
+    web.media = None
+    assert media_key(web) is None
+
+
+@pytest.mark.asyncio
+async def test_shared_download_and_private_links(tmp_path):
+    cache = MediaCache(tmp_path / "cache", max_bytes=10_000)
+    calls = []
+    gate = asyncio.Event()
+    dest = tmp_path / "temp"
+
+    tasks = [asyncio.create_task(cache.fetch(_message(1, calls=calls, gate=gate), dest)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    gate.set()
+    paths = await asyncio.gather(*tasks)
+
+    assert calls == [1]
+    assert len(set(paths)) == 3
+    # 调用方删除自己的文件不影响缓存
+    os.remove(paths[0])
+    again = await cache.fetch(_message(1, calls=calls), dest)
+    assert calls == [1]
+    assert open(again, "rb").read() == b"x" * 100
+    stats = cache.get_stats()
+    assert stats["misses"] == 1 and stats["shared"] == 2 and stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_budget_and_recovery(tmp_path):
+    root = tmp_path / "cache"
+    cache = MediaCache(root, max_bytes=250)
+    for doc_id in (1, 2, 3):
+        await cache.fetch(_message(doc_id, name=f"{doc_id}.bin"), tmp_path / "temp")
+    # 3 x 100 字节超出预算，最久未用的 1 被淘汰
+    assert cache.lookup(_message(1)) is None
+    assert cache.lookup(_message(3)) is not None
+
+    # 模拟崩溃：残留的下载临时目录与残缺条目在重启时被清理
+    (root / ".tmp" / "partial").mkdir(parents=True)
+    (root / "broken").mkdir()
+    restarted = MediaCache(root, max_bytes=250)
+    assert restarted.recover() == 2
+    assert not (root / ".tmp").exists() and not (root / "broken").exists()
+    assert restarted.lookup(_message(2)) is not None
+
+
+@pytest.mark.asyncio
+async def test_load_off_loop_and_export_naming(tmp_path):
+    root = tmp_path / "cache"
+    await MediaCache(root, max_bytes=10_000).fetch(_message(1), tmp_path / "warm")
+
+    cache = MediaCache(root, max_bytes=10_000)
+    # 索引未加载前 lookup 按未命中处理，不扫描目录
+    assert cache.lookup(_message(1)) is None
+    assert await cache.load() == 1
+    assert cache.lookup(_message(1)) is not None
+
+    dest = tmp_path / "downloads"
+    dest.mkdir()
+    (dest / "named.mp4").write_bytes(b"old")
+    # 指定文件名时覆盖同名文件 (与直接下载一致)
+    path = await cache.fetch(_message(1), dest, file_name="named.mp4")
+    assert path == str(dest / "named.mp4")
+    assert open(path, "rb").read() == b"x" * 100
+    # 未指定文件名时不覆盖已有文件
+    first = await cache.fetch(_message(1), dest)
+    second = await cache.fetch(_message(1), dest)
+    assert first != second
+    assert sorted(os.listdir(dest)) == ["named.mp4", "video (1).mp4", "video.mp4"]
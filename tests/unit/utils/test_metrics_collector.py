@@ -45,6 +45,16 @@ class TestLatencyMetrics:
         assert 'p50_ms' in data
         assert data['count'] == 2
 
+    def test_windows_in_dict(self):
+        """测试滑动窗口统计"""
+        metrics = LatencyMetrics()
+        metrics.record(10.0)
+
+        windows = metrics.to_dict()["windows"]
+        assert set(windows) == {"1m", "5m", "1h"}
+        assert windows["1m"]["count"] == 1
+        assert windows["1m"]["p50_ms"] == pytest.approx(10.0, rel=0.01)
+
 
 class TestMetricsCollector:
     """测试指标收集器"""
@@ -90,6 +100,17 @@ class TestMetricsCollector:
         assert "db_read" in metrics
         assert metrics["db_read"]["count"] == 2
     
+    def test_record_api_latency_per_operation(self):
+        """测试按 Telegram 操作类型记录 API 延迟"""
+        self.collector.record_api_latency("SendMsg", 120.0)
+        self.collector.record_api_latency("GetMsgs", 30.0)
+        self.collector.record_api_latency("GetMsgs", 50.0)
+
+        per_op = self.collector.get_api_latency_metrics()
+        assert per_op["SendMsg"]["count"] == 1
+        assert per_op["GetMsgs"]["count"] == 2
+        assert self.collector.get_io_latency_metrics()["api_call"]["count"] == 3
+
     def test_set_custom_metric(self):
         """测试设置自定义指标"""
         self.collector.set_custom_metric("test_key", "test_value")
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from core.cache.persistent_cache import AsyncPersistentCache, SQLitePersistentCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = SQLitePersistentCache(str(tmp_path / "cache.db"), sweep_interval=0, sweep_batch=2)
+    yield c
+    c.close()
+
+
+def test_get_set_reuses_thread_connection(cache):
+    cache.set("a", "1", ttl=30)
+    conn = cache._conn()
+    assert cache.get("a") == "1"
+    assert cache.get("missing") is None
+    # 同一线程复用长连接
+    assert cache._conn() is conn
+
+    seen = []
+    t = threading.Thread(target=lambda: seen.append((cache.get("a"), cache._conn())))
+    t.start()
+    t.join()
+    assert seen[0][0] == "1"
+    assert seen[0][1] is not conn
+
+
+def test_expired_rows_hidden_until_swept(cache):
+    cache.set("old", "x", ttl=1)
+    cache.set("new", "y", ttl=60)
+    # 直接把 old 改为已过期
+    cache._conn().execute("UPDATE kv_cache SET expires_at = ? WHERE key = 'old'", (int(time.time()) - 5,))
+
+    assert cache.get("old") is None
+    assert cache.get_many(["old", "new"]) == {"new": "y"}
+    # 读取不删除行，由 sweep 清理
+    assert cache.count_prefix("old") == 1
+    assert cache.sweep() == 1
+    assert cache.count_prefix("old") == 0
+    assert cache.get("new") == "y"
+
+
+def test_sweep_is_batched(cache):
+    past = int(time.time()) - 10
+    cache._conn().executemany(
+        "INSERT INTO kv_cache(key, value, expires_at) VALUES (?, ?, ?)",
+        [(f"k{i}", "v", past) for i in range(7)],
+    )
+    cache.sweep_max_batches = 2
+    # 每轮最多 2 批 x 2 行
+    assert cache.sweep() == 4
+    assert cache.sweep() == 3
+    assert cache.count_prefix("k") == 0
+
+
+def test_get_many_set_many(cache):
+    items = {f"key{i}": str(i) for i in range(1000)}
+    cache.set_many(items, ttl=30)
+    got = cache.get_many(list(items) + ["nope"])
+    assert got == items
+    assert cache.get_many([]) == {}
+
+
+def test_delete_and_prefix(cache):
+    cache.set_many({"p:1": "a", "p:2": "bb", "q:1": "c"}, ttl=30)
+    assert cache.stat_prefix("p:") == {"count": 2, "bytes": 3}
+    cache.delete("p:1")
+    assert cache.delete_prefix("p:") == 1
+    assert cache.get_many(["p:1", "p:2", "q:1"]) == {"q:1": "c"}
+
+
+@pytest.mark.asyncio
+async def test_async_facade_runs_on_dedicated_thread(cache):
+    acache = AsyncPersistentCache(cache)
+    await acache.set_many({"a": "1", "b": "2"}, ttl=30)
+    await acache.set("c", "3", ttl=30)
+    assert await acache.get("c") == "3"
+    assert await acache.get_many(["a", "b", "x"]) == {"a": "1", "b": "2"}
+    await acache.delete("a")
+    assert await acache.get("a") is None
+
+    names = []
+    cache_get = cache.get
+
+    def probe(key):
+        names.append(threading.current_thread().name)
+        return cache_get(key)
+
+    cache.get = probe
+    await acache.get("b")
+    assert names[0].startswith("persist-cache")
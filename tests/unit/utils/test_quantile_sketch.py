@@ -0,0 +1,82 @@
+"""
+DDSketch / 滑动窗口分位数单元测试
+"""
+import random
+
+import pytest
+from core.algorithms.quantile_sketch import DDSketch, WindowedSketch
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDDSketch:
+    """测试分位数草图"""
+
+    def test_relative_error_bound(self):
+        """估计值与精确分位数的相对误差不超过 1%"""
+        rng = random.Random(42)
+        values = [rng.lognormvariate(3, 1.5) for _ in range(20000)]
+        sketch = DDSketch(relative_accuracy=0.01)
+        for v in values:
+            sketch.add(v)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.95, 0.99):
+            exact = ordered[int(q * len(ordered))]
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+
+    def test_merge_equals_single_sketch(self):
+        """合并两个草图与直接记录全部样本结果一致"""
+        a, b, whole = DDSketch(), DDSketch(), DDSketch()
+        for i in range(1, 1001):
+            (a if i % 2 else b).add(float(i))
+            whole.add(float(i))
+        a.merge(b)
+
+        assert a.count == whole.count
+        assert a.quantiles((0.5, 0.99)) == whole.quantiles((0.5, 0.99))
+
+    def test_bucket_count_is_bounded(self):
+        """桶数受 max_buckets 限制，高分位数不受影响"""
+        sketch = DDSketch(max_buckets=64)
+        for i in range(1, 100001):
+            sketch.add(float(i))
+
+        assert sketch.bucket_count <= 64
+        assert sketch.quantile(0.99) == pytest.approx(99000, rel=0.01)
+
+    def test_zero_and_empty(self):
+        """空草图返回 0，零值样本进入零桶"""
+        sketch = DDSketch()
+        assert sketch.quantile(0.5) == 0.0
+        sketch.add(0.0)
+        sketch.add(0.0)
+        sketch.add(10.0)
+        assert sketch.quantile(0.5) == 0.0
+        assert sketch.quantile(0.99) == pytest.approx(10.0, rel=0.01)
+
+
+class TestWindowedSketch:
+    """测试滑动时间窗口"""
+
+    def test_old_slots_leave_short_windows(self):
+        """超出窗口的时间片不再参与统计"""
+        clock = FakeClock()
+        windowed = WindowedSketch({"1m": 60, "5m": 300}, slot_seconds=10, clock=clock)
+
+        windowed.add(1000.0)
+        clock.now = 120
+        windowed.add(1.0)
+
+        assert windowed.window("1m").count == 1
+        assert windowed.window("1m").quantile(0.99) == pytest.approx(1.0, rel=0.01)
+        assert windowed.window("5m").count == 2
+
+        clock.now = 1000
+        assert windowed.window("5m").count == 0
@@ -1,8 +1,10 @@
 """
 SimHash单元测试
 """
+import random
+
 import pytest
-from core.algorithms.simhash import SimHash, SimHashIndex
+from core.algorithms.simhash import SimHash, FingerprintRing, compute_simhash_batch
 
 
 class TestSimHash:
@@ -242,46 +244,104 @@ class TestSimHashPerformance:
         assert len(set(fingerprints)) == 1
 
 
-class TestSimHashIndex:
-    """测试SimHash索引功能"""
-    
-    def test_index_search(self):
-        """测试索引搜索"""
-        sh = SimHash()
-        idx = SimHashIndex(k=3)
-        
-        # 使用较长的文本以确保指纹稳定性
-        text1 = "The quick brown fox jumps over the lazy dog. " * 10 + "This is a long document about foxes and dogs."
-        text2 = "The quick brown fox jumps over the lazy dog. " * 10 + "This is a long document about foxes and cats." # minor diff
-        text3 = "Machine learning is subset of artificial intelligence. " * 10 # completely diff
-        
-        fp1 = sh.build_fingerprint(text1)
-        fp2 = sh.build_fingerprint(text2)
-        fp3 = sh.build_fingerprint(text3)
-        
-        idx.add("doc1", fp1)
-        idx.add("doc2", fp2)
-        idx.add("doc3", fp3)
-        
-        # 搜索与 doc1 相似的
-        results = idx.search(fp1)
-        assert "doc1" in results
-        assert "doc2" in results
-        assert "doc3" not in results
-        
-    def test_index_remove(self):
-        """测试索引移除"""
-        sh = SimHash()
-        idx = SimHashIndex(k=3)
-        
-        text1 = "The quick brown fox"
-        fp1 = sh.build_fingerprint(text1)
-        
-        idx.add("doc1", fp1)
-        assert "doc1" in idx.search(fp1)
-        
-        idx.remove("doc1", fp1)
-        assert "doc1" not in idx.search(fp1)
+class TestBatchFingerprint:
+    """测试批量指纹生成"""
+
+    def test_batch_matches_pure_python(self):
+        """批量结果与逐条纯 Python 按位累加一致"""
+        rng = random.Random(5)
+        words = ["alpha", "beta", "gamma", "你好", "世界", "deal", "x1"]
+        texts = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 30))) for _ in range(200)]
+        texts += ["", "!!!", "single"]
+        for f in (64, 32):
+            sh = SimHash(f)
+            expected = [sh._fold(sh._extract_features(t)) if t else 0 for t in texts]
+            assert sh.build_fingerprints(texts) == expected
+            assert [sh.build_fingerprint(t) for t in texts] == expected
+
+    def test_compute_simhash_batch(self):
+        """快捷函数"""
+        assert compute_simhash_batch(["hello world", ""]) == [SimHash().build_fingerprint("hello world"), 0]
+
+
+class TestFingerprintRing:
+    """测试 NumPy 指纹环"""
+
+    @staticmethod
+    def _flips(rng, max_bits):
+        mask = 0
+        for _ in range(rng.randint(0, max_bits)):
+            mask |= 1 << rng.randrange(64)
+        return mask
+
+    @staticmethod
+    def _legacy_scan(entries, fp, length, threshold, max_checks):
+        comparisons = 0
+        for prev_fp, prev_len in reversed(entries):
+            if comparisons >= max_checks:
+                break
+            if prev_len and min(prev_len, length) / max(prev_len, length) < threshold:
+                continue
+            sim = 1.0 - bin(fp ^ prev_fp).count('1') / 64.0
+            comparisons += 1
+            if sim >= threshold:
+                return prev_fp, sim, comparisons
+        return None, 0.0, comparisons
+
+    def test_nearest_matches_legacy_scan(self):
+        """向量化比对与逐条比对 (剪枝、比对上限、新者优先) 结果一致"""
+        rng = random.Random(11)
+        base = rng.getrandbits(64)
+        ring = FingerprintRing(capacity=64)
+        entries = []
+        for _ in range(150):
+            fp = base ^ self._flips(rng, 12)
+            length = rng.choice([0, 20, 40, 80])
+            ring.add(fp, length)
+            entries = (entries + [(fp, length)])[-64:]
+        assert len(ring) == 64
+
+        for _ in range(100):
+            query = base ^ self._flips(rng, 10)
+            length = rng.choice([20, 40, 80])
+            threshold = rng.choice([0.8, 0.9, 0.95])
+            max_checks = rng.choice([5, 30, 1000])
+            assert ring.nearest(query, length, threshold, max_checks) == self._legacy_scan(
+                entries, query, length, threshold, max_checks
+            )
+
+    def test_state_roundtrip(self):
+        """导出/恢复保持顺序与容量"""
+        ring = FingerprintRing(capacity=3)
+        for i in range(1, 6):
+            ring.add((1 << 63) | i, i)
+        state = ring.to_state()
+        assert state["fps"] == [(1 << 63) | i for i in (3, 4, 5)]
+        restored = FingerprintRing.from_state(state)
+        assert restored.to_state() == state
+        assert restored.nearest((1 << 63) | 5, threshold=1.0)[0] == (1 << 63) | 5
+
+    def test_trim_and_discard(self):
+        """收缩窗口后只比对最新条目，删除的指纹不再命中"""
+        ring = FingerprintRing(capacity=8)
+        fps = [(1 << 63) | i for i in range(1, 11)]
+        for fp in fps:
+            ring.add(fp, 0)
+        ring.trim(3)
+        assert ring.to_state()["fps"] == fps[-3:]
+        assert ring.nearest(fps[-4], threshold=1.0)[0] is None
+
+        assert ring.discard(fps[-1]) == 1
+        assert ring.nearest(fps[-1], threshold=1.0)[0] is None
+        assert ring.to_state()["fps"] == fps[-3:-1]
+        # 继续写入仍按新旧顺序排列
+        ring.add(fps[0], 0)
+        assert ring.to_state()["fps"] == [fps[-3], fps[-2], fps[0]]
+
+    def test_empty_ring(self):
+        """空环"""
+        assert FingerprintRing(capacity=4).nearest(123, 10, 0.5) == (None, 0.0, 0)
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
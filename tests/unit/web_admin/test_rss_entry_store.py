@@ -0,0 +1,93 @@
+import json
+import shutil
+
+import pytest
+
+from web_admin.rss.crud.entry_store import EntryLog
+
+
+def _rec(i):
+    return {"id": f"e{i}", "title": f"t{i}", "media": [{"filename": f"m{i}.jpg"}]}
+
+
+@pytest.fixture
+def log(tmp_path):
+    return EntryLog(tmp_path / "entries", segment_size=4)
+
+
+def test_append_rolls_segments_and_reads_newest_first(log):
+    log.append_many(_rec(i) for i in range(10))
+    assert [s["count"] for s in log._manifest["segments"]] == [4, 4, 2]
+    assert [r["id"] for r in log.read(0, 3)] == ["e9", "e8", "e7"]
+    # 跨段分页
+    assert [r["id"] for r in log.read(1, 4)] == ["e8", "e7", "e6", "e5"]
+    assert log.read(20, 5) == []
+    assert len(log) == 10
+
+
+def test_read_skips_segments_before_offset(log, monkeypatch):
+    log.append_many(_rec(i) for i in range(10))
+    opened = []
+    original = EntryLog._read_lines
+
+    def spy(path):
+        opened.append(path.name)
+        return original(path)
+
+    monkeypatch.setattr(EntryLog, "_read_lines", staticmethod(spy))
+    assert [r["id"] for r in log.read(6, 2)] == ["e3", "e2"]
+    # offset 覆盖的整段不会被读取
+    assert opened == ["00000001.jsonl"]
+
+
+def test_trim_drops_whole_segments(log):
+    log.append_many(_rec(i) for i in range(10))
+    dropped = log.trim(5)
+    # 删除 1 段后剩 6 条 >= 5，再删会不足
+    assert [r["id"] for r in dropped] == ["e0", "e1", "e2", "e3"]
+    assert not (log.root / "00000001.jsonl").exists()
+    # 读取端按 keep 截断
+    assert len(log) == 5
+    assert [r["id"] for r in log.read(0, 100)] == ["e9", "e8", "e7", "e6", "e5"]
+
+
+def test_update_delete_rewrite_single_segment(log):
+    log.append_many(_rec(i) for i in range(6))
+    assert log.update("e1", {"title": "new"})
+    assert log.delete("e5")
+    assert not log.delete("missing")
+    ids = [r["id"] for r in log.read(0, 10)]
+    assert ids == ["e4", "e3", "e2", "e1", "e0"]
+    assert log.read(3, 1)[0]["title"] == "new"
+
+
+def test_manifest_survives_reopen_and_tail_recount(log):
+    log.append_many(_rec(i) for i in range(5))
+    version = log.version
+    # 模拟追加后未写清单即崩溃
+    with open(log.root / "00000002.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(_rec(5)) + "\n")
+    reopened = EntryLog(log.root, segment_size=4)
+    assert reopened.version == version
+    assert len(reopened) == 6
+    assert reopened.read(0, 1)[0]["id"] == "e5"
+
+
+def test_evicted_log_does_not_resurrect_deleted_segments(tmp_path, monkeypatch):
+    from web_admin.rss.crud import entry as entry_crud
+
+    monkeypatch.setattr(entry_crud, "get_rule_data_dir", lambda rule_id: str(tmp_path / str(rule_id)))
+    monkeypatch.setattr(entry_crud.settings, "RSS_ENTRY_SEGMENT_SIZE", 2, raising=False)
+    monkeypatch.setattr(entry_crud, "_entry_logs", {})
+
+    log = entry_crud.get_entry_log(7)
+    log.append_many([{"id": str(i)} for i in range(3)])
+
+    # 删除规则数据：先丢弃缓存实例，再删除目录
+    entry_crud.evict_entry_log(7)
+    shutil.rmtree(tmp_path / "7")
+
+    fresh = entry_crud.get_entry_log(7)
+    assert fresh is not log
+    fresh.append({"id": "new"})
+    assert [e["id"] for e in fresh.read()] == ["new"]
@@ -0,0 +1,114 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+from web_admin.rss.services import feed_cache as feed_cache_module
+from web_admin.rss.services.feed_cache import FeedCache
+from web_admin.rss.services.feed_generator import FeedService
+
+
+class _FakeLog:
+    def __init__(self):
+        self.version = 1
+
+
+@pytest.fixture
+def env(monkeypatch):
+    state = {
+        "config": {"rule_id": 1, "enable_rss": True, "rule_title": "T", "rule_description": None, "language": None},
+        "entries": [SimpleNamespace(id="a", message_id="a")],
+        "log": _FakeLog(),
+        "rendered": [],
+        "config_loads": 0,
+    }
+
+    def snapshot(rule_id):
+        state["config_loads"] += 1
+        return dict(state["config"]) if state["config"] else None
+
+    async def get_entries(rule_id, limit=100, offset=0):
+        return list(state["entries"])
+
+    def render_entry(entry, rss_config, base_url):
+        state["rendered"].append(entry.id)
+        return {"id": entry.id}
+
+    monkeypatch.setattr(feed_cache_module, "_snapshot_config", snapshot)
+    monkeypatch.setattr("web_admin.rss.crud.entry.get_entries", get_entries)
+    monkeypatch.setattr("web_admin.rss.crud.entry.get_entry_log", lambda rule_id: state["log"])
+    monkeypatch.setattr(FeedService, "render_entry", staticmethod(render_entry))
+    monkeypatch.setattr(FeedService, "add_rendered_entry", staticmethod(lambda fg, parts: None))
+    return state
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_and_incremental_rebuild(env):
+    cache = FeedCache(config_ttl=300, gzip_enabled=True)
+    feed = await cache.get(1, "http://h")
+    assert feed.etag.startswith('"') and feed.etag_gz.endswith('-gz"')
+    assert gzip.decompress(feed.body_gz) == feed.body
+    # 版本不变时直接命中
+    assert await cache.get(1, "http://h") is feed
+    assert env["rendered"] == ["a"]
+    assert env["config_loads"] == 1
+
+    # 新条目只渲染新增部分
+    env["entries"].insert(0, SimpleNamespace(id="b", message_id="b"))
+    env["log"].version += 1
+    rebuilt = await cache.get(1, "http://h")
+    assert rebuilt is not feed
+    assert env["rendered"] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_config_invalidation_rerenders_entries(env):
+    cache = FeedCache(config_ttl=300, gzip_enabled=False)
+    feed = await cache.get(1, "http://h")
+    assert feed.body_gz is None
+
+    env["config"]["rule_title"] = "T2"
+    cache.invalidate_config(1)
+    await cache.get(1, "http://h")
+    # 配置版本变化后条目缓存作废
+    assert env["rendered"] == ["a", "a"]
+    assert env["config_loads"] == 2
+
+    env["config"]["enable_rss"] = False
+    cache.invalidate_config(1)
+    assert await cache.get(1, "http://h") is None
+
+
+@pytest.mark.asyncio
+async def test_edited_entry_is_rerendered(env):
+    cache = FeedCache(config_ttl=300, gzip_enabled=False)
+    await cache.get(1, "http://h")
+
+    # update_entry 只改内容不改 ID，日志版本变化后应重新渲染该条目
+    env["entries"][0] = SimpleNamespace(id="a", message_id="a", title="edited")
+    env["log"].version += 1
+    await cache.get(1, "http://h")
+    assert env["rendered"] == ["a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_slots_are_bounded_by_lru(env):
+    cache = FeedCache(config_ttl=300, gzip_enabled=False, max_slots=2)
+    for host in ("http://a", "http://b", "http://c"):
+        await cache.get(1, host)
+    assert list(cache._slots) == [(1, "http://b"), (1, "http://c")]
+
+    # 命中会刷新 LRU 顺序
+    await cache.get(1, "http://b")
+    await cache.get(1, "http://d")
+    assert list(cache._slots) == [(1, "http://b"), (1, "http://d")]
+
+
+@pytest.mark.asyncio
+async def test_drop_rule_discards_rendered_slots(env):
+    cache = FeedCache(config_ttl=300, gzip_enabled=False)
+    feed = await cache.get(1, "http://h")
+    cache.drop_rule(1)
+    # 规则数据重建后日志版本可能回到相同值，不能复用旧输出
+    assert await cache.get(1, "http://h") is not feed
+    assert env["rendered"] == ["a", "a"]
@@ -36,9 +36,12 @@ async def get_tasks_list(
         
         # 批量获取关联信息以优化性能
         rule_ids = set()
+        chat_ids = set()
         for t in tasks:
             try:
                 payload = json.loads(t.task_data) if t.task_data else {}
+                if payload.get('chat_id'):
+                    chat_ids.add(payload['chat_id'])
                 if payload.get('rule_id'):
                     rule_ids.add(int(payload['rule_id']))
                 if payload.get('target_rule_id'):
@@ -46,6 +49,7 @@ async def get_tasks_list(
             except: pass
         
         rules_map = await rule_repo.get_by_ids(list(rule_ids)) if rule_ids else {}
+        chat_names = await chat_info_service.get_chat_names(chat_ids) if chat_ids else {}
 
         data = []
         for t in tasks:
@@ -73,7 +77,7 @@ async def get_tasks_list(
                 if t.task_type == 'process_message':
                     chat_id = payload.get('chat_id')
                     rule_id = payload.get('rule_id') or payload.get('target_rule_id')
-                    source_name = await chat_info_service.get_chat_name(chat_id) if chat_id else "未知"
+                    source_name = chat_names.get(str(chat_id), str(chat_id)) if chat_id else "未知"
                     
                     if rule_id and int(rule_id) in rules_map:
                         rule = rules_map[int(rule_id)]
@@ -86,7 +90,7 @@ async def get_tasks_list(
                 
                 elif t.task_type == 'message_delete':
                     chat_id = payload.get('chat_id')
-                    source_name = await chat_info_service.get_chat_name(chat_id) if chat_id else "未知"
+                    source_name = chat_names.get(str(chat_id), str(chat_id)) if chat_id else "未知"
                     task_dict['name'] = f"删除 {source_name} 的消息"
                     
                 elif t.task_type in ('download_file', 'manual_download'):
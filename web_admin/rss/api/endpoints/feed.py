@@ -5,15 +5,14 @@ import logging
 import os
 import json
 from pathlib import Path
-from ...services.feed_generator import FeedService
+from ...services.feed_cache import get_feed_cache
 from ...models.entry import Entry
 from core.config import settings
 from core.constants import get_rule_media_dir, get_rule_data_dir
-from ...crud.entry import get_entries, create_entry, delete_entry
-from core.cache.unified_cache import cached
+from ...crud.entry import get_entries, create_entry, delete_entry, evict_entry_log
 import mimetypes
 from models.models import get_read_session as get_session, RSSConfig
-from datetime import datetime
+from email.utils import parsedate_to_datetime
 from ai import get_ai_provider
 from models.models import ForwardRule
 import re
@@ -58,136 +57,76 @@ async def root():
     return {"status": "ok", "service": "TG Forwarder RSS"}
 
 
+def _not_modified(request: Request, etag: str, mtime: int) -> bool:
+    """按 If-None-Match / If-Modified-Since 判断是否可返回 304"""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        candidates = [t.strip() for t in if_none_match.split(",")]
+        return "*" in candidates or any(
+            (t[2:] if t.startswith("W/") else t) == etag for t in candidates
+        )
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
 @router.get("/rss/feed/{rule_id}")
-@cached(cache_name="rss.get_feed", ttl=30)
 async def get_feed(rule_id: int, request: Request):
-    """返回规则对应的RSS Feed"""
-    session = None
+    """返回规则对应的RSS Feed（预渲染缓存 + ETag/Last-Modified 条件请求）"""
     try:
-        # 创建数据库会话
-        session = get_session()
-        # 查询规则配置
-        rss_config = (
-            session.query(RSSConfig).filter(RSSConfig.rule_id == rule_id).first()
-        )
-        if not rss_config or not rss_config.enable_rss:
-            logger.warning(f"规则 {rule_id} 的RSS未启用或不存在")
-            raise HTTPException(status_code=404, detail="RSS feed 未启用或不存在")
         # 获取请求URL的基础部分
         base_url = str(request.base_url).rstrip("/")
-        logger.info(f"请求基础URL: {base_url}")
-        logger.info(f"请求 {request.headers}")
-        logger.info(f"请求客户 {request.client}")
         # 检查是否有环境变量中配置的基础URL
         if RSS_MEDIA_BASE_URL:
-            logger.info(f"使用环境变量中配置的媒体基础URL: {RSS_MEDIA_BASE_URL}")
             base_url = RSS_MEDIA_BASE_URL.rstrip("/")
         else:
             # 检查是否有X-Forwarded-Host或Host
             forwarded_host = request.headers.get("X-Forwarded-Host")
             host_header = request.headers.get("Host")
             if forwarded_host:
-                logger.info(f"检测到X-Forwarded-Host: {forwarded_host}")
-                # 构建基于forwarded_host的URL
                 scheme = request.headers.get("X-Forwarded-Proto", "http")
                 base_url = f"{scheme}://{forwarded_host}"
-                logger.info(f"基于X-Forwarded-Host的媒体基础URL: {base_url}")
             elif host_header and host_header != f"{settings.RSS_HOST}:{settings.RSS_PORT}":
-                logger.info(f"检测到自定义Host: {host_header}")
-                # 构建基于Host的URL
                 scheme = request.url.scheme
                 base_url = f"{scheme}://{host_header}"
-                logger.info(f"基于Host的媒体基础URL: {base_url}")
-        logger.info(f"最终使用的媒体基础URL: {base_url}")
-        # 获取规则对应的条目
-        entries = await get_entries(rule_id)
-        logger.info(f"获取 {len(entries)} 个条目")
-        # 如果没有条目，返回测试数据
-        if not entries:
-            logger.warning(f"规则 {rule_id} 没有条目数据，返回测试数据")
-            try:
-                fg = FeedService.generate_test_feed(rule_id, base_url)
-                # 生成 RSS XML
-                rss_xml = fg.rss_str(pretty=True)
-                # 确保rss_xml是字符串类型
-                if isinstance(rss_xml, bytes):
-                    logger.info("将RSS XML从字节转换为字符串")
-                    rss_xml = rss_xml.decode("utf-8")
-                # 记录XML内容的一部分
-                xml_sample = rss_xml[:500] + "..." if len(rss_xml) > 500 else rss_xml
-                logger.info(f"生成的测试RSS XML (前500字符): {xml_sample}")
-                # 检查XML中是否还有硬编码的localhost27.0.0.1地址
-                if "127.0.0.1" in rss_xml or "localhost" in rss_xml:
-                    logger.warning(f"RSS XML中仍包含硬编码的本地地址")
-                    # 替换硬编码的地址
-                    rss_xml = rss_xml.replace(
-                        f"http://127.0.0.1:{settings.RSS_PORT}", base_url
-                    )
-                    rss_xml = rss_xml.replace(
-                        f"http://localhost:{settings.RSS_PORT}", base_url
-                    )
-                    rss_xml = rss_xml.replace(
-                        f"http://{settings.RSS_HOST}:{settings.RSS_PORT}", base_url
-                    )
-                    logger.info(f"已替换硬编码的本地地址 {base_url}")
-                # 确保返回的是字节类型
-                if isinstance(rss_xml, str):
-                    rss_xml = rss_xml.encode("utf-8")
-                return Response(
-                    content=rss_xml, media_type="application/xml; charset=utf-8"
-                )
-            except Exception as e:
-                logger.error(f"生成测试Feed时出错 {str(e)}", exc_info=True)
-                raise HTTPException(
-                    status_code=500, detail=f"生成测试Feed失败: {str(e)}"
-                )
-        else:
-            # 根据真实数据生成 Feed，传入基础URL
-            try:
-                fg = await FeedService.generate_feed_from_entries(
-                    rule_id, entries, base_url
-                )
-                # 生成 RSS XML
-                rss_xml = fg.rss_str(pretty=True)
-                # 确保rss_xml是字符串类型
-                if isinstance(rss_xml, bytes):
-                    logger.info("将RSS XML从字节转换为字符串")
-                    rss_xml = rss_xml.decode("utf-8")
-                # 记录XML内容的一部分
-                xml_sample = rss_xml[:500] + "..." if len(rss_xml) > 500 else rss_xml
-                logger.info(f"生成的RSS XML (前500字符): {xml_sample}")
-                # 检查XML中是否还有硬编码的localhost27.0.0.1地址
-                if "127.0.0.1" in rss_xml or "localhost" in rss_xml:
-                    logger.warning(f"RSS XML中仍包含硬编码的本地地址")
-                    # 替换硬编码的地址
-                    rss_xml = rss_xml.replace(
-                        f"http://127.0.0.1:{settings.RSS_PORT}", base_url
-                    )
-                    rss_xml = rss_xml.replace(
-                        f"http://localhost:{settings.RSS_PORT}", base_url
-                    )
-                    rss_xml = rss_xml.replace(
-                        f"http://{settings.RSS_HOST}:{settings.RSS_PORT}", base_url
-                    )
-                    logger.info(f"已替换硬编码的本地地址 {base_url}")
-                # 确保返回的是字节类型
-                if isinstance(rss_xml, str):
-                    rss_xml = rss_xml.encode("utf-8")
-                return Response(
-                    content=rss_xml, media_type="application/xml; charset=utf-8"
-                )
-            except Exception as e:
-                logger.error(f"生成真实条目Feed时出错 {str(e)}", exc_info=True)
-                raise HTTPException(status_code=500, detail=f"生成Feed失败: {str(e)}")
+        logger.debug(f"Feed 请求 - 规则ID: {rule_id}, 媒体基础URL: {base_url}")
+
+        feed = await get_feed_cache().get(rule_id, base_url)
+        if feed is None:
+            logger.warning(f"规则 {rule_id} 的RSS未启用或不存在")
+            raise HTTPException(status_code=404, detail="RSS feed 未启用或不存在")
+
+        use_gzip = feed.body_gz is not None and "gzip" in request.headers.get(
+            "Accept-Encoding", ""
+        )
+        etag = feed.etag_gz if use_gzip else feed.etag
+        headers = {
+            "ETag": etag,
+            "Last-Modified": feed.last_modified,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if _not_modified(request, etag, feed.mtime):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(
+                content=feed.body_gz,
+                media_type="application/xml; charset=utf-8",
+                headers=headers,
+            )
+        return Response(
+            content=feed.body, media_type="application/xml; charset=utf-8", headers=headers
+        )
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"生成RSS feed时出错 {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    finally:
-        # 确保会话被关闭
-        if session:
-            session.close()
 
 
 @router.get("/media/{rule_id}/{filename}")
@@ -267,14 +206,11 @@ async def add_entry(rule_id: int, entry_data: Dict[str, Any] = Body(...)):
         # 验证媒体数据
         if media_count > 0:
             media_filenames = []
-            # 检查当前条目数量，如果接近限制则删除最旧的条目
-            current_entries = await get_entries(rule_id)
             for m in entry_data.get("media", []):
                 if isinstance(m, dict):
                     media_filenames.append(m.get("filename", "未知"))
                 else:
                     media_filenames.append(getattr(m, "filename", "未知"))
-                to_delete_count = len(current_entries) - (max_items - 1)
 
             # 确保媒体文件存在
             for media in entry_data.get("media", []):
@@ -294,55 +230,7 @@ async def add_entry(rule_id: int, entry_data: Dict[str, Any] = Body(...)):
         entry_data["rule_id"] = rule_id
         if not entry_data.get("message_id"):
             entry_data["message_id"] = entry_data.get("id", "")
-        # 检查当前条目数量，如果接近限制则删除最旧的条目
-        current_entries = await get_entries(rule_id)
-        if len(current_entries) >= max_items - 1:
-            # 计算需要删除除的条目数量，确保添加新条目后总数不超过最大限额
-            to_delete_count = len(current_entries) - (max_items - 1)
-            if to_delete_count > 0:
-                logger.info(
-                    f"当前条目数量({len(current_entries)})将超过限制({max_items})，需要删除 {to_delete_count} 个最早的条目"
-                )
-                # 对条目按发布时间排序（从早到晚）
-                sorted_entries = sorted(
-                    current_entries,
-                    key=lambda e: (
-                        datetime.fromisoformat(e.published)
-                        if hasattr(e, "published")
-                        else datetime.now()
-                    ),
-                )
-                # 获取要删除的条目
-                entries_to_delete = sorted_entries[:to_delete_count]
-                # 删除多余条目
-                for entry in entries_to_delete:
-                    try:
-                        # 删除条目前先处理其媒体文
-                        if hasattr(entry, "media") and entry.media:
-                            logger.info(
-                                f"条目 {entry.id} 包含 {len(entry.media)} 个媒体文件，将一并删除"
-                            )
-                            # 删除媒体文件
-                            media_dir = Path(get_rule_media_dir(rule_id))
-                            for media in entry.media:
-                                if hasattr(media, "filename"):
-                                    media_path = media_dir / media.filename
-                                    if media_path.exists():
-                                        try:
-                                            os.remove(media_path)
-                                            logger.info(f"已删除媒体文件 {media_path}")
-                                        except Exception as e:
-                                            logger.error(
-                                                f"删除媒体文件失败: {media_path}, 错误: {str(e)}"
-                                            )
-                        # 删除条目
-                        success = await delete_entry(rule_id, entry.id)
-                        if success:
-                            logger.info(f"已删除条目 {entry.id}")
-                        else:
-                            logger.warning(f"删除条目失败: {entry.id}")
-                    except Exception as e:
-                        logger.error(f"处理过期条目时出错 {str(e)}")
+        # 超出 max_items 的旧条目及其媒体文件由 create_entry 按分段淘汰
         # 转换为Entry对象
         entry = Entry(
             rule_id=rule_id,
@@ -609,6 +497,9 @@ async def delete_rule_data(rule_id: int):
         deleted_files = 0
         deleted_dirs = 0
         failed_paths = []
+        # 先丢弃内存中的条目日志与已渲染 Feed，否则旧清单会在下次写入时被写回
+        evict_entry_log(rule_id)
+        get_feed_cache().drop_rule(rule_id)
 
         # 辅助函数：强制删除目录
         def force_delete_directory(dir_path):
@@ -1,16 +1,20 @@
 import json
 import logging
+import os
 import uuid
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
 from ..models.entry import Entry
-from core.cache.unified_cache import get_smart_cache
+from .entry_store import EntryLog
 from core.config import settings
-from core.constants import get_rule_data_dir
+from core.constants import get_rule_data_dir, get_rule_media_dir
 
 logger = logging.getLogger(__name__)
 
+# 规则 ID -> 分段日志实例
+_entry_logs: Dict[int, EntryLog] = {}
+
 
 # 确保数据存储目录存在
 def ensure_storage_exists():
@@ -21,33 +25,68 @@ def ensure_storage_exists():
 
 # 获取规则对应的条目存储文件路径
 def get_rule_entries_path(rule_id: int) -> Path:
-    """获取规则对应的条目存储文件路径"""
+    """获取规则对应的旧版条目存储文件路径 (entries.json，仅用于迁移)"""
     # 使用规则特定的数据目录
     rule_data_path = get_rule_data_dir(rule_id)
     return Path(rule_data_path) / "entries.json"
 
 
+def _migrate_legacy_entries(log: EntryLog, legacy_path: Path) -> None:
+    """将旧版 entries.json 一次性导入分段日志，完成后重命名为 .migrated"""
+    if not log.exists:
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"读取旧版条目文件失败，跳过迁移: {legacy_path}, {e}")
+            data = []
+        # 旧文件无序，按发布时间从早到晚追加
+        data.sort(key=lambda x: x.get("published", ""))
+        log.append_many(data)
+        logger.info(f"已迁移 {len(data)} 个条目到分段日志: {log.root}")
+    legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
+
+
+def get_entry_log(rule_id: int) -> EntryLog:
+    """获取规则对应的分段条目日志（首次访问时迁移旧版 entries.json）"""
+    log = _entry_logs.get(rule_id)
+    if log is None:
+        rule_data_path = Path(get_rule_data_dir(rule_id))
+        log = EntryLog(rule_data_path / "entries", settings.RSS_ENTRY_SEGMENT_SIZE)
+        legacy_path = rule_data_path / "entries.json"
+        if legacy_path.exists():
+            _migrate_legacy_entries(log, legacy_path)
+        _entry_logs[rule_id] = log
+    return log
+
+
+def evict_entry_log(rule_id: int) -> None:
+    """丢弃缓存的分段日志实例 (删除规则数据目录前调用，避免旧清单被写回新目录)"""
+    _entry_logs.pop(rule_id, None)
+
+
+def _remove_entry_media(rule_id: int, records: List[Dict[str, Any]]) -> None:
+    """删除被淘汰条目关联的媒体文件"""
+    media_dir = Path(get_rule_media_dir(rule_id))
+    for record in records:
+        for media in record.get("media") or []:
+            filename = media.get("filename") if isinstance(media, dict) else None
+            if not filename:
+                continue
+            media_path = media_dir / filename
+            if media_path.exists():
+                try:
+                    os.remove(media_path)
+                    logger.info(f"已删除媒体文件 {media_path}")
+                except Exception as e:
+                    logger.error(f"删除媒体文件失败: {media_path}, 错误: {str(e)}")
+
+
 async def get_entries(rule_id: int, limit: int = 100, offset: int = 0) -> List[Entry]:
-    """获取规则对应的条目"""
+    """获取规则对应的条目（最新在前）"""
     try:
-        file_path = get_rule_entries_path(rule_id)
-        # 如果文件不存在，返回空列表
-        if not file_path.exists():
-            return []
-        # 读取文件内容（带 L1/L2 缓存）
-        cache = get_smart_cache("rss.entries", l1_ttl=10, l2_ttl=20)
-        cache_key = f"entries:{rule_id}:{file_path.stat().st_mtime_ns}"
-        data = cache.get(cache_key)
-        if data is None:
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-            cache.set(cache_key, data)
-        # 将数据转换为Entry对象
-        entries = [Entry(**entry) for entry in data]
-        # 按发布时间排序（新的在前面）
-        entries.sort(key=lambda x: x.published, reverse=True)
-        # 应用分页
-        return entries[offset : offset + limit]
+        records = get_entry_log(rule_id).read(offset=offset, limit=limit)
+        return [Entry(**record) for record in records]
     except Exception as e:
         logger.error(f"获取条目时出错: {str(e)}")
         return []
@@ -60,19 +99,6 @@ async def create_entry(entry: Entry) -> bool:
         if not entry.id:
             entry.id = str(uuid.uuid4())
         entry.created_at = datetime.now().isoformat()
-        # 获取规则对应的条目
-        file_path = get_rule_entries_path(entry.rule_id)
-        entries = []
-        # 如果文件已存在，读取现有条目
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as file:
-                try:
-                    entries = json.load(file)
-                except json.JSONDecodeError:
-                    logger.warning(f"解析条目文件时出错，将创建新文件: {file_path}")
-                    entries = []
-        # 转换Entry对象为字典并添加到列表
-        entries.append(entry.dict())
         # 获取规则的RSS配置，获取最大条目数量
         try:
             from models.models import get_read_session as get_session, RSSConfig
@@ -92,14 +118,13 @@ async def create_entry(entry: Entry) -> bool:
         except Exception as e:
             logger.warning(f"获取RSS配置失败，使用默认最大条目数量50: {str(e)}")
             max_items = 50
-        # 限制条目数量，保留最新的N个
-        if len(entries) > max_items:
-            # 按发布时间排序（新的在前面）
-            entries.sort(key=lambda x: x.get("published", ""), reverse=True)
-            entries = entries[:max_items]
-        # 保存到文件
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(entries, file, ensure_ascii=False, indent=2)
+        # 追加到日志尾部，并按整段淘汰最旧的条目
+        log = get_entry_log(entry.rule_id)
+        log.append(entry.dict())
+        dropped = log.trim(max_items)
+        if dropped:
+            logger.info(f"规则 {entry.rule_id} 淘汰 {len(dropped)} 个最早的条目")
+            _remove_entry_media(entry.rule_id, dropped)
         return True
     except Exception as e:
         logger.error(f"创建条目时出错: {str(e)}")
@@ -111,26 +136,7 @@ async def update_entry(
 ) -> bool:
     """更新条目"""
     try:
-        file_path = get_rule_entries_path(rule_id)
-        # 如果文件不存在，返回False
-        if not file_path.exists():
-            return False
-        # 读取文件内容
-        with open(file_path, "r", encoding="utf-8") as file:
-            entries = json.load(file)
-        # 查找并更新条目
-        found = False
-        for i, entry in enumerate(entries):
-            if entry.get("id") == entry_id:
-                entries[i].update(updated_data)
-                found = True
-                break
-        if not found:
-            return False
-        # 保存到文件
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(entries, file, ensure_ascii=False, indent=2)
-        return True
+        return get_entry_log(rule_id).update(entry_id, updated_data)
     except Exception as e:
         logger.error(f"更新条目时出错: {str(e)}")
         return False
@@ -139,22 +145,7 @@ async def update_entry(
 async def delete_entry(rule_id: int, entry_id: str) -> bool:
     """删除条目"""
     try:
-        file_path = get_rule_entries_path(rule_id)
-        # 如果文件不存在，返回False
-        if not file_path.exists():
-            return False
-        # 读取文件内容
-        with open(file_path, "r", encoding="utf-8") as file:
-            entries = json.load(file)
-        # 查找并删除条目
-        original_length = len(entries)
-        entries = [entry for entry in entries if entry.get("id") != entry_id]
-        if len(entries) == original_length:
-            return False  # 没有找到对应ID的条目
-        # 保存到文件
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(entries, file, ensure_ascii=False, indent=2)
-        return True
+        return get_entry_log(rule_id).delete(entry_id)
     except Exception as e:
         logger.error(f"删除条目时出错: {str(e)}")
         return False
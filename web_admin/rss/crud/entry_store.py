@@ -0,0 +1,226 @@
+"""
+RSS 条目分段日志存储
+
+每个规则一个目录 ``<RSS_DATA_DIR>/<rule_id>/entries/``：
+  - ``00000001.jsonl`` ... 按追加顺序编号的分段文件，每行一条条目 JSON；
+  - ``manifest.json`` 记录分段列表、每段条目数、保留上限与版本号。
+
+追加只写当前分段末尾一行；超出保留上限时整段删除最旧的分段；
+读取从最新分段倒序遍历，仅对落在 offset/limit 窗口内的行做 JSON 解析。
+更新/删除为低频操作，只重写命中的单个分段。
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class EntryLog:
+    """单个规则的追加式分段条目日志 (非线程安全，由事件循环串行调用)"""
+
+    def __init__(self, root: Path, segment_size: int = 64):
+        self.root = Path(root)
+        self.segment_size = max(1, int(segment_size))
+        self._manifest_path = self.root / MANIFEST_NAME
+        self._manifest = self._load_manifest()
+
+    # ---------- manifest ----------
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        manifest = {"version": 0, "next_segment": 1, "keep": None, "segments": []}
+        if self._manifest_path.exists():
+            try:
+                with open(self._manifest_path, "r", encoding="utf-8") as f:
+                    manifest.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"条目日志清单损坏，按分段文件重建: {self._manifest_path}, {e}")
+                manifest = self._rebuild_manifest()
+        # 追加与清单写入之间可能崩溃：以尾段实际行数为准
+        if manifest["segments"]:
+            tail = manifest["segments"][-1]
+            tail["count"] = self._count_lines(self.root / tail["name"])
+        return manifest
+
+    def _rebuild_manifest(self) -> Dict[str, Any]:
+        names = sorted(p.name for p in self.root.glob("*.jsonl"))
+        segments = [{"name": n, "count": self._count_lines(self.root / n)} for n in names]
+        next_segment = int(names[-1].split(".")[0]) + 1 if names else 1
+        return {"version": 0, "next_segment": next_segment, "keep": None, "segments": segments}
+
+    def _save_manifest(self) -> None:
+        self._manifest["version"] += 1
+        tmp = self._manifest_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp, self._manifest_path)
+
+    @staticmethod
+    def _count_lines(path: Path) -> int:
+        try:
+            with open(path, "rb") as f:
+                return sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _read_lines(path: Path) -> List[str]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return [line for line in f.read().splitlines() if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    # ---------- 属性 ----------
+
+    @property
+    def exists(self) -> bool:
+        return self._manifest_path.exists()
+
+    @property
+    def version(self) -> int:
+        """每次写操作递增，可作为读缓存/ETag 的版本号"""
+        return self._manifest["version"]
+
+    def __len__(self) -> int:
+        total = sum(seg["count"] for seg in self._manifest["segments"])
+        keep = self._manifest.get("keep")
+        return total if keep is None else min(total, keep)
+
+    # ---------- 写 ----------
+
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """按顺序追加多条记录，仅写一次清单"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        segments = self._manifest["segments"]
+        written = 0
+        handle = None
+        try:
+            for record in records:
+                if not segments or segments[-1]["count"] >= self.segment_size:
+                    if handle:
+                        handle.close()
+                        handle = None
+                    name = f"{self._manifest['next_segment']:08d}.jsonl"
+                    self._manifest["next_segment"] += 1
+                    segments.append({"name": name, "count": 0})
+                if handle is None:
+                    handle = open(self.root / segments[-1]["name"], "a", encoding="utf-8")
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+                segments[-1]["count"] += 1
+                written += 1
+        finally:
+            if handle:
+                handle.close()
+        if written:
+            self._save_manifest()
+        return written
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self.append_many([record])
+
+    def trim(self, keep: int) -> List[Dict[str, Any]]:
+        """
+        保留最新 keep 条：读取端立即按 keep 截断，
+        完全落在窗口之外的旧分段整段删除。返回被删除分段中的记录（用于清理媒体文件）。
+        """
+        keep = max(0, int(keep))
+        segments = self._manifest["segments"]
+        total = sum(seg["count"] for seg in segments)
+        dropped: List[Dict[str, Any]] = []
+        changed = self._manifest.get("keep") != keep
+        self._manifest["keep"] = keep
+        while segments and total - segments[0]["count"] >= keep and len(segments) > 1:
+            seg = segments.pop(0)
+            path = self.root / seg["name"]
+            dropped.extend(self._parse_lines(self._read_lines(path), path))
+            total -= seg["count"]
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            changed = True
+        if changed:
+            self._save_manifest()
+        return dropped
+
+    def update(self, entry_id: str, patch: Dict[str, Any]) -> bool:
+        return self._rewrite_matching(entry_id, lambda record: {**record, **patch})
+
+    def delete(self, entry_id: str) -> bool:
+        return self._rewrite_matching(entry_id, lambda record: None)
+
+    def _rewrite_matching(
+        self, entry_id: str, fn: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    ) -> bool:
+        """定位包含 entry_id 的分段并只重写该段"""
+        needle = json.dumps(entry_id, ensure_ascii=False)
+        for seg in reversed(self._manifest["segments"]):
+            path = self.root / seg["name"]
+            lines = self._read_lines(path)
+            for i, line in enumerate(lines):
+                # 先做子串预筛，避免逐行解析
+                if needle not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("id") != entry_id:
+                    continue
+                new_record = fn(record)
+                if new_record is None:
+                    del lines[i]
+                else:
+                    lines[i] = json.dumps(new_record, ensure_ascii=False)
+                tmp = path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write("".join(line + "\n" for line in lines))
+                os.replace(tmp, path)
+                seg["count"] = len(lines)
+                self._save_manifest()
+                return True
+        return False
+
+    # ---------- 读 ----------
+
+    def read(self, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """按追加顺序倒序（最新在前）分页读取，只解析窗口内的行"""
+        offset = max(0, int(offset))
+        limit = max(0, int(limit))
+        keep = self._manifest.get("keep")
+        if keep is not None:
+            limit = min(limit, max(0, keep - offset))
+        if limit == 0:
+            return []
+
+        result: List[Dict[str, Any]] = []
+        skip = offset
+        for seg in reversed(self._manifest["segments"]):
+            if skip >= seg["count"]:
+                # 整段落在 offset 之前，无需打开文件
+                skip -= seg["count"]
+                continue
+            path = self.root / seg["name"]
+            lines = self._read_lines(path)
+            lines.reverse()
+            window = lines[skip : skip + (limit - len(result))]
+            skip = 0
+            result.extend(self._parse_lines(window, path))
+            if len(result) >= limit:
+                break
+        return result
+
+    @staticmethod
+    def _parse_lines(lines: List[str], path: Path) -> List[Dict[str, Any]]:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"跳过损坏的条目行: {path}")
+        return records
@@ -0,0 +1,238 @@
+"""
+已渲染 RSS Feed 缓存
+
+按 (rule_id, base_url) 保存最终 XML 字节（及可选 gzip 版本）、强 ETag 与 Last-Modified，
+有效性由 (条目日志版本, 配置版本, base_url) 决定：
+  - 条目版本来自 EntryLog.version，create_entry/update/delete 后自动变化；
+  - 配置版本由 RSSConfig 的 ORM 事件立即失效，另按 RSS_FEED_CONFIG_TTL 复核一次快照。
+重建时只渲染新增或内容变化的条目，其余条目的 HTML 按 (条目 ID, 内容指纹) 复用。
+base_url 来自请求头，槽位总数按 LRU 限制在 RSS_FEED_CACHE_MAX_SLOTS 以内。
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from core.config import settings
+from models.models import RSSConfig, get_read_session
+from .feed_generator import FeedGenerator, FeedService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RenderedFeed:
+    """一份可直接返回的 Feed 输出"""
+
+    key: Tuple[int, int, str]
+    body: bytes
+    body_gz: Optional[bytes]
+    etag: str
+    etag_gz: str
+    mtime: int
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime, usegmt=True)
+
+
+@dataclass
+class _FeedSlot:
+    """单个 (rule_id, base_url) 的缓存状态"""
+
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    feed: Optional[RenderedFeed] = None
+    # 已渲染条目所基于的配置版本，及 {entry_id: (内容指纹, 渲染结果)}
+    config_version: Optional[int] = None
+    rendered: Dict[str, Tuple[bytes, Dict[str, Any]]] = field(default_factory=dict)
+
+
+def _entry_stamp(entry: Any) -> bytes:
+    """条目内容指纹：update_entry 修改任一字段后都会变化"""
+    data = entry.dict() if hasattr(entry, "dict") else vars(entry)
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).digest()
+
+
+def _snapshot_config(rule_id: int) -> Optional[Dict[str, Any]]:
+    """读取 RSSConfig 行为普通字典（在线程中调用）"""
+    session = get_read_session()
+    try:
+        row = session.query(RSSConfig).filter(RSSConfig.rule_id == rule_id).first()
+        if row is None:
+            return None
+        return {c.name: getattr(row, c.name, None) for c in RSSConfig.__table__.columns}
+    finally:
+        session.close()
+
+
+def _localize_urls(xml: str, base_url: str) -> str:
+    """替换 XML 中硬编码的本地地址"""
+    if "127.0.0.1" in xml or "localhost" in xml:
+        for host in ("127.0.0.1", "localhost", settings.RSS_HOST):
+            xml = xml.replace(f"http://{host}:{settings.RSS_PORT}", base_url)
+    return xml
+
+
+class FeedCache:
+    def __init__(self, config_ttl: float = 300.0, gzip_enabled: bool = True, max_slots: int = 64):
+        self.config_ttl = config_ttl
+        self.gzip_enabled = gzip_enabled
+        self.max_slots = max(1, max_slots)
+        # rule_id -> (配置快照, 配置版本, 加载时间)
+        self._configs: Dict[int, Tuple[Optional[Dict[str, Any]], int, float]] = {}
+        self._config_versions: Dict[int, int] = {}
+        # (rule_id, base_url) -> 槽位，按最近访问排序
+        self._slots: "OrderedDict[Tuple[int, str], _FeedSlot]" = OrderedDict()
+
+    def _slot(self, rule_id: int, base_url: str) -> _FeedSlot:
+        key = (rule_id, base_url)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _FeedSlot()
+            while len(self._slots) > self.max_slots:
+                self._slots.popitem(last=False)
+        else:
+            self._slots.move_to_end(key)
+        return slot
+
+    def invalidate_config(self, rule_id: int) -> None:
+        """配置变更：丢弃快照，下一次请求重新加载"""
+        self._configs.pop(rule_id, None)
+
+    def drop_rule(self, rule_id: int) -> None:
+        """规则数据被删除：丢弃该规则的全部槽位 (新日志的版本号会从头计数)"""
+        for key in [k for k in self._slots if k[0] == rule_id]:
+            del self._slots[key]
+
+    async def _get_config(self, rule_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        cached = self._configs.get(rule_id)
+        if cached is not None and time.monotonic() - cached[2] < self.config_ttl:
+            return cached[0], cached[1]
+        snapshot = await asyncio.to_thread(_snapshot_config, rule_id)
+        version = self._config_versions.get(rule_id, 0)
+        if cached is None or cached[0] != snapshot:
+            version += 1
+            self._config_versions[rule_id] = version
+        self._configs[rule_id] = (snapshot, version, time.monotonic())
+        return snapshot, version
+
+    async def get(self, rule_id: int, base_url: str) -> Optional[RenderedFeed]:
+        """返回最新的渲染结果；RSS 未启用或不存在时返回 None"""
+        from ..crud.entry import get_entry_log
+
+        config, config_version = await self._get_config(rule_id)
+        if not config or not config.get("enable_rss"):
+            return None
+
+        slot = self._slot(rule_id, base_url)
+        feed = slot.feed
+        if feed is not None and feed.key == (get_entry_log(rule_id).version, config_version, base_url):
+            return feed
+
+        async with slot.lock:
+            entries_version = get_entry_log(rule_id).version
+            key = (entries_version, config_version, base_url)
+            feed = slot.feed
+            if feed is not None and feed.key == key:
+                return feed
+            feed = await self._rebuild(rule_id, base_url, config, key, slot)
+            slot.feed = feed
+            return feed
+
+    async def _rebuild(
+        self,
+        rule_id: int,
+        base_url: str,
+        config: Dict[str, Any],
+        key: Tuple[int, int, str],
+        slot: _FeedSlot,
+    ) -> RenderedFeed:
+        from ..crud.entry import get_entries
+
+        entries = await get_entries(rule_id)
+        config_version = key[1]
+        rendered = slot.rendered if slot.config_version == config_version else {}
+
+        body, rendered = await asyncio.to_thread(
+            self._render, rule_id, base_url, SimpleNamespace(**config), entries, rendered
+        )
+        slot.config_version = config_version
+        slot.rendered = rendered
+        previous = slot.feed
+
+        digest = hashlib.sha1(body).hexdigest()
+        etag = f'"{digest}"'
+        if previous is not None and previous.etag == etag:
+            # 内容未变（如仅配置快照复核），保持原 Last-Modified
+            mtime = previous.mtime
+        else:
+            mtime = int(time.time())
+        body_gz = gzip.compress(body, compresslevel=6, mtime=0) if self.gzip_enabled else None
+        logger.info(f"已重建规则 {rule_id} 的 Feed 缓存: {len(entries)} 个条目, {len(body)} 字节")
+        return RenderedFeed(
+            key=key, body=body, body_gz=body_gz,
+            etag=etag, etag_gz=f'"{digest}-gz"', mtime=mtime,
+        )
+
+    @staticmethod
+    def _render(
+        rule_id: int,
+        base_url: str,
+        rss_config: SimpleNamespace,
+        entries: List[Any],
+        rendered: Dict[str, Tuple[bytes, Dict[str, Any]]],
+    ) -> Tuple[bytes, Dict[str, Tuple[bytes, Dict[str, Any]]]]:
+        """构建 XML；仅对未缓存或内容已变化的条目调用 render_entry"""
+        fg = FeedGenerator()
+        fg.load_extension("base", atom=True)
+        FeedService.apply_feed_header(fg, rule_id, rss_config, base_url)
+        current: Dict[str, Tuple[bytes, Dict[str, Any]]] = {}
+        for entry in entries:
+            entry_id = entry.id or entry.message_id
+            try:
+                stamp = _entry_stamp(entry)
+                cached = rendered.get(entry_id)
+                if cached is not None and cached[0] == stamp:
+                    parts = cached[1]
+                else:
+                    parts = FeedService.render_entry(entry, rss_config, base_url)
+                current[entry_id] = (stamp, parts)
+                FeedService.add_rendered_entry(fg, parts)
+            except Exception as e:
+                logger.error(f"添加条目到Feed时出错: {str(e)}")
+        xml = fg.rss_str(pretty=True)
+        if isinstance(xml, bytes):
+            xml = xml.decode("utf-8")
+        return _localize_urls(xml, base_url).encode("utf-8"), current
+
+
+_feed_cache: Optional[FeedCache] = None
+
+
+def get_feed_cache() -> FeedCache:
+    global _feed_cache
+    if _feed_cache is None:
+        _feed_cache = FeedCache(
+            config_ttl=settings.RSS_FEED_CONFIG_TTL,
+            gzip_enabled=settings.RSS_FEED_GZIP,
+            max_slots=settings.RSS_FEED_CACHE_MAX_SLOTS,
+        )
+    return _feed_cache
+
+
+def _on_rss_config_change(mapper, connection, target) -> None:
+    if _feed_cache is not None and target.rule_id is not None:
+        _feed_cache.invalidate_config(target.rule_id)
+
+
+for _evt in ("after_insert", "after_update", "after_delete"):
+    event.listen(RSSConfig, _evt, _on_rss_config_change)